@@ -286,6 +286,8 @@ async def get_full_dashboard():
     """
     Retourne un dashboard complet avec toutes les analytics
     
+    Une seule conversion des produits en colonnes NumPy pour les cinq analyses.
+    
     Combine:
     - KPIs
     - Tendances
@@ -302,25 +304,14 @@ async def get_full_dashboard():
                 "message": "Aucun produit disponible"
             }
         
-        # Calcule toutes les analytics
-        kpis = analytics_service.calculate_product_kpis(products)
-        trends = analytics_service.analyze_trends(products)
-        predictions = analytics_service.predict_demand(products, days_ahead=30)
-        segments = analytics_service.segment_products(products)
-        anomalies = analytics_service.detect_anomalies(products)
+        # Calcule toutes les analytics (produits convertis en colonnes une fois)
+        dashboard = analytics_service.build_dashboard(products, days_ahead=30)
         
         return {
             "success": True,
             "generated_at": str(__import__('datetime').datetime.now()),
             "products_analyzed": len(products),
-            "kpis": kpis,
-            "trends": trends,
-            "demand_predictions": {
-                "urgent_restock": sum(1 for p in predictions if p['restock_urgency'] == 'HIGH'),
-                "top_10_urgent": predictions[:10]
-            },
-            "segments": segments,
-            "anomalies": anomalies
+            **dashboard
         }
     except Exception as e:
         logger.error(f"Erreur génération dashboard: {e}")
@@ -2,14 +2,20 @@
 API Routes - ETL (Extract, Transform, Load)
 """
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
 from typing import Optional, List
 from pathlib import Path
 import logging
 import shutil
 
 from app.config import settings
+from app.core import job_store
+from app.core.upload_store import StoredUpload, UploadTooLarge, upload_store
 from app.models.schemas import ETLProcessingResult, ETLImportResult, RankCategory, PriceBucket, StockStatus
-from app.services.etl_service import etl_service
+from app.services.etl_service import ETLService, etl_service
+from app.services.etl_jobs import etl_job_runner
+from app.services.etl_cache import etl_result_cache
 from app.services.java_client import java_client
 
 logger = logging.getLogger(__name__)
@@ -17,51 +23,53 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/etl", tags=["ETL"])
 
 
-@router.post("/upload", response_model=ETLProcessingResult)
+@router.post("/upload", status_code=202)
 async def upload_and_process_csv(
     file: UploadFile = File(...),
     validate: bool = Form(True),
-    clean: bool = Form(True)
+    clean: bool = Form(True),
+    max_products: Optional[int] = Form(None),
+    parallel: bool = Form(False),
+    reprocess: bool = Form(False)
 ):
     """
-    Upload et traite un fichier CSV
+    Upload un fichier CSV et lance son traitement en arrière-plan
     
     - **file**: Fichier CSV à traiter
     - **validate**: Valider les données (défaut: True)
     - **clean**: Nettoyer les données (défaut: True)
-    """
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Le fichier doit être un CSV")
+    - **max_products**: Produits renvoyés au plus; compteurs et résumé portent
+      sur tout le fichier (défaut: 100)
+    - **parallel**: Traitement réparti sur plusieurs processus
+      (ETL_PARALLEL_WORKERS) pour les gros fichiers (défaut: False); sans
+      point de reprise: un job interrompu retraite tout le fichier
+    - **reprocess**: Retraite même si ce contenu a déjà été traité avec les
+      mêmes paramètres (défaut: False, résultat repris du cache)
     
-    # Sauvegarde le fichier
-    upload_path = Path(settings.upload_dir) / file.filename
-    upload_path.parent.mkdir(parents=True, exist_ok=True)
+    Répond immédiatement (202) avec l'identifiant du job; le résultat
+    (ETLProcessingResult: résultat complet dans `output_file`, aperçu dans
+    `products`) est dans `result` de GET /api/etl/jobs/{job_id}.
     
-    try:
-        with open(upload_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        logger.info(f"📁 Fichier uploadé: {upload_path}")
-        
-        # Traite le CSV
-        result = etl_service.process_csv(
-            str(upload_path),
-            validate=validate,
-            clean=clean
-        )
-        
-        return result
-    
-    except Exception as e:
-        logger.error(f"❌ Erreur traitement: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    Le fichier est stocké sous son SHA-256 (`file_sha256`); au-delà de
+    MAX_UPLOAD_SIZE la copie s'arrête avec une erreur 413.
+    """
+    stored = await _save_job_upload(file)
+    job = etl_job_runner.submit(
+        str(stored.path), file.filename, file_sha256=stored.sha256,
+        validate=validate, clean=clean, max_products=max_products, parallel=parallel, reprocess=reprocess
+    )
+    return _job_accepted(job, stored)
 
 
 @router.post("/process-csv", response_model=ETLProcessingResult)
 async def process_existing_csv(
     file_path: str,
     validate: bool = True,
-    clean: bool = True
+    clean: bool = True,
+    stream: bool = False,
+    chunk_size: Optional[int] = None,
+    max_products: Optional[int] = None,
+    parallel: bool = False
 ):
     """
     Traite un fichier CSV existant
@@ -69,13 +77,23 @@ async def process_existing_csv(
     - **file_path**: Chemin vers le fichier CSV
     - **validate**: Valider les données
     - **clean**: Nettoyer les données
+    - **stream**: Traitement par blocs à mémoire bornée
+    - **chunk_size**: Lignes par bloc en streaming
+    - **max_products**: Produits renvoyés au plus
+    - **parallel**: Traitement par blocs sur plusieurs processus
     """
     path = Path(file_path)
     if not path.exists():
         raise HTTPException(status_code=404, detail=f"Fichier non trouvé: {file_path}")
     
     try:
-        result = etl_service.process_csv(str(path), validate=validate, clean=clean)
+        # Hors de la boucle asyncio: le traitement pandas est bloquant. Un
+        # service par appel: process_csv garde son rapport d'erreurs sur l'instance
+        result = await run_in_threadpool(
+            ETLService().process_csv,
+            str(path), validate=validate, clean=clean, stream=stream,
+            chunk_size=chunk_size, max_products=max_products, parallel=parallel
+        )
         return result
     except Exception as e:
         logger.error(f"❌ Erreur: {e}")
@@ -85,13 +103,16 @@ async def process_existing_csv(
 @router.post("/import-to-java", response_model=ETLImportResult)
 async def import_products_to_java(
     products: List[dict],
-    update_existing: bool = True
+    update_existing: bool = True,
+    diff: bool = True
 ):
     """
     Importe des produits vers le backend Java
     
     - **products**: Liste des produits à importer
     - **update_existing**: Mettre à jour les produits existants
+    - **diff**: Compare aux produits existants (par ASIN): seuls les nouveaux
+      et les modifiés sont envoyés (défaut: True)
     """
     if not products:
         raise HTTPException(status_code=400, detail="Liste de produits vide")
@@ -101,7 +122,7 @@ async def import_products_to_java(
         if not await java_client.health_check():
             raise HTTPException(status_code=503, detail="Backend Java non disponible")
         
-        result = await java_client.import_products_batch(products, update_existing)
+        result = await java_client.import_products_batch(products, update_existing, diff=diff)
         
         return ETLImportResult(
             success=result["failed"] == 0,
@@ -110,7 +131,10 @@ async def import_products_to_java(
             errors=result["errors"],
             details={
                 "created": result["created"],
-                "updated": result["updated"]
+                "updated": result["updated"],
+                "unchanged": result["unchanged"],
+                "skipped": result["skipped"],
+                "items": result["items"]
             }
         )
     except HTTPException:
@@ -120,41 +144,18 @@ async def import_products_to_java(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/upload-and-import")
+@router.post("/upload-and-import", status_code=202)
 async def upload_process_and_import(
     file: UploadFile = File(...),
     update_existing: bool = Form(True)
 ):
     """
-    Upload, traite et importe directement vers Java
-    """
-    # Upload et traite
-    process_result = await upload_and_process_csv(file, validate=True, clean=True)
-    
-    if not process_result.success or not process_result.products:
-        return {
-            "processing": process_result,
-            "import": None,
-            "message": "Échec du traitement, import annulé"
-        }
-    
-    # Convertit et importe
-    products_dict = [p.model_dump() for p in process_result.products]
+    Upload, traite et importe vers Java en arrière-plan
     
-    try:
-        import_result = await import_products_to_java(products_dict, update_existing)
-        
-        return {
-            "processing": process_result,
-            "import": import_result,
-            "message": f"✅ {import_result.imported_count} produits importés"
-        }
-    except HTTPException as e:
-        return {
-            "processing": process_result,
-            "import": None,
-            "message": f"Traitement OK mais import échoué: {e.detail}"
-        }
+    Même job que POST /api/etl/process-and-import (traitement puis import par
+    lots); suivi via GET /api/etl/jobs/{job_id}.
+    """
+    return await process_and_import_csv(file, update_existing)
 
 
 @router.post("/validate")
@@ -232,79 +233,124 @@ async def validate_csv_file(file: UploadFile = File(...)):
         }
 
 
-# Jobs storage (in-memory for simplicity)
-import_jobs = {}
+@router.delete("/cache")
+async def clear_result_cache():
+    """Vide le cache des résultats ETL (les prochains uploads sont retraités)"""
+    return {"cleared": etl_result_cache.clear()}
+
+
+async def _store_upload(file: UploadFile) -> StoredUpload:
+    """Enregistre un upload sous son SHA-256 (413 au-delà de MAX_UPLOAD_SIZE)"""
+    try:
+        return await upload_store.save(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+# === Jobs asynchrones ===
+
+async def _save_job_upload(file: UploadFile) -> StoredUpload:
+    """Enregistre l'upload d'un job (le job le relit plus tard)"""
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Le fichier doit être un CSV")
+    return await _store_upload(file)
+
+
+def _job_accepted(job: dict, stored: StoredUpload) -> dict:
+    """Réponse 202 d'un job créé depuis un upload"""
+    return {
+        "success": True,
+        "job_id": job['id'],
+        "status": job['status'],
+        "file_sha256": stored.sha256,
+        "message": f"Job {job['id']} en file, suivi via /api/etl/jobs/{job['id']}"
+    }
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    validate: bool = Form(True),
+    clean: bool = Form(True),
+    chunk_size: Optional[int] = Form(None),
+    import_to_java: bool = Form(False),
+    update_existing: bool = Form(True)
+):
+    """
+    Upload un CSV et lance son traitement en arrière-plan
+    
+    Répond immédiatement avec le job (`id`, `status`); l'avancement se suit via
+    GET /api/etl/jobs/{job_id}. Traitement en streaming avec point de reprise
+    après chaque bloc: un job interrompu (arrêt du service, échec de l'import)
+    reprend là où il s'était arrêté.
+    
+    - **chunk_size**: Lignes par bloc (défaut: ETL_CHUNK_SIZE)
+    - **import_to_java**: Importe ensuite les produits valides vers Java, par lots
+    - **update_existing**: Met à jour les produits existants lors de l'import
+    """
+    stored = await _save_job_upload(file)
+    return etl_job_runner.submit(
+        str(stored.path), file.filename, import_to_java, file_sha256=stored.sha256,
+        validate=validate, clean=clean, chunk_size=chunk_size, update_existing=update_existing
+    )
 
 
 @router.get("/jobs")
-async def list_import_jobs():
-    """Liste tous les jobs d'import"""
+async def list_jobs(status: Optional[str] = None, limit: int = 100):
+    """Liste les jobs ETL (plus récents d'abord), filtrables par statut"""
+    jobs = etl_job_runner.list(status, limit)
     return {
-        "jobs": list(import_jobs.values()),
-        "count": len(import_jobs)
+        "jobs": jobs,
+        "count": len(jobs)
     }
 
 
 @router.get("/jobs/{job_id}")
 async def get_job_status(job_id: str):
-    """Récupère le statut d'un job d'import"""
-    if job_id not in import_jobs:
+    """Statut, étape, progression et résultat d'un job"""
+    job = etl_job_runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} non trouvé")
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Annule un job en attente ou en cours (arrêt après le bloc ou lot courant)"""
+    job = etl_job_runner.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} non trouvé")
+    return job
+
+
+@router.post("/jobs/{job_id}/resume")
+async def resume_job(job_id: str):
+    """Relance un job en échec depuis son dernier point de reprise"""
+    job = etl_job_runner.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail=f"Job {job_id} non trouvé")
-    return import_jobs[job_id]
+    if job['status'] != job_store.FAILED:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} non repris (statut: {job['status']})")
+    return etl_job_runner.resume(job_id)
 
 
-@router.post("/process-and-import")
+@router.post("/process-and-import", status_code=202)
 async def process_and_import_csv(
     file: UploadFile = File(...),
     update_existing: bool = Form(True)
 ):
     """
-    Traite et importe un fichier CSV vers Java (alias de upload-and-import)
-    """
-    import uuid
-    from datetime import datetime
-    
-    job_id = str(uuid.uuid4())[:8]
-    import_jobs[job_id] = {
-        "id": job_id,
-        "filename": file.filename,
-        "status": "processing",
-        "started_at": datetime.now().isoformat(),
-        "completed_at": None,
-        "imported_count": 0,
-        "failed_count": 0,
-        "errors": []
-    }
+    Traite et importe un fichier CSV vers Java en arrière-plan
     
-    try:
-        result = await upload_process_and_import(file, update_existing)
-        
-        import_jobs[job_id].update({
-            "status": "completed" if result.get("import") else "partial",
-            "completed_at": datetime.now().isoformat(),
-            "imported_count": result.get("import", {}).get("imported_count", 0) if result.get("import") else 0,
-            "failed_count": result.get("import", {}).get("failed_count", 0) if result.get("import") else 0,
-            "processing_result": result.get("processing"),
-            "import_result": result.get("import")
-        })
-        
-        return {
-            "success": result.get("import") is not None,
-            "job_id": job_id,
-            "imported_count": import_jobs[job_id]["imported_count"],
-            "failed_count": import_jobs[job_id]["failed_count"],
-            "message": result.get("message"),
-            "processing": result.get("processing"),
-            "import": result.get("import")
-        }
-        
-    except Exception as e:
-        import_jobs[job_id].update({
-            "status": "failed",
-            "completed_at": datetime.now().isoformat(),
-            "errors": [str(e)]
-        })
-        raise HTTPException(status_code=500, detail=str(e))
+    Crée un job de traitement + import (voir POST /api/etl/jobs) et renvoie
+    son identifiant sans attendre la fin de l'import.
+    """
+    stored = await _save_job_upload(file)
+    job = etl_job_runner.submit(
+        str(stored.path), file.filename, import_to_java=True,
+        file_sha256=stored.sha256, update_existing=update_existing
+    )
+    return _job_accepted(job, stored)
 
 
 @router.get("/classify-rank/{rank}")
@@ -359,18 +405,24 @@ async def classify_stock(stock: int):
 
 @router.get("/files")
 async def list_uploaded_files():
-    """Liste les fichiers uploadés"""
-    upload_dir = Path(settings.upload_dir)
+    """
+    Liste les fichiers uploadés
     
-    if not upload_dir.exists():
-        return {"files": []}
+    Un élément par contenu (`sha256`), avec le nom d'origine (`filename`) et
+    tous les noms d'upload qui pointent vers lui (`filenames`)
+    """
+    return {"files": upload_store.list_files()}
+
+
+@router.get("/reports/{name}")
+async def download_error_report(name: str):
+    """
+    Télécharge le rapport d'erreurs complet d'un traitement (CSV)
     
-    files = []
-    for f in upload_dir.glob("*.csv"):
-        files.append({
-            "name": f.name,
-            "size_kb": round(f.stat().st_size / 1024, 2),
-            "path": str(f)
-        })
+    - **name**: Nom du fichier indiqué par `error_report` dans le résultat
+    """
+    path = Path(settings.processed_dir) / Path(name).name
+    if not path.name.endswith('_errors.csv') or not path.is_file():
+        raise HTTPException(status_code=404, detail=f"Rapport non trouvé: {name}")
     
-    return {"files": files}
+    return FileResponse(path, media_type="text/csv", filename=path.name)
@@ -37,7 +37,7 @@ async def health_check():
             name="search",
             status="healthy" if search_service.is_ready else "degraded",
             details={
-                "indexed_products": len(search_service.products_data),
+                "indexed_products": len(search_service.products),
                 "model": settings.embedding_model
             }
         ))
@@ -4,9 +4,15 @@ Produits similaires, cross-selling, up-selling, deals
 """
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
+import asyncio
 import logging
+import time
 
+from app.models.schemas import CartRecommendationRequest
 from app.services.recommendation_service import recommendation_service
+from app.services.copurchase_service import copurchase_engine
+from app.services.recommendation_batch import recommendation_materializer
+from app.services.personalization_service import personalization_engine
 from app.services.java_client import java_client
 
 logger = logging.getLogger(__name__)
@@ -45,6 +51,21 @@ async def index_products_for_recommendations(products: Optional[List[dict]] = No
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/products")
+async def upsert_products_for_recommendations(products: List[dict]):
+    """
+    Ajoute ou met à jour des produits dans l'index de recommandations
+    
+    Sans réindexation complète: les index triés par catégorie sont mis à jour.
+    """
+    try:
+        stats = recommendation_service.upsert_products(products)
+        return {"success": True, **stats}
+    except Exception as e:
+        logger.error(f"Erreur mise à jour produits: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/similar/{product_id}")
 async def get_similar_products(
     product_id: int,
@@ -141,6 +162,127 @@ async def get_crosssell_products(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/copurchase/refresh")
+async def refresh_copurchase(full: bool = False):
+    """
+    Met à jour la matrice de co-achats depuis les lignes de vente
+    
+    Par défaut, seules les nouvelles lignes sont lues; full=true reconstruit tout.
+    """
+    try:
+        return await asyncio.to_thread(copurchase_engine.refresh, None, full)
+    except Exception as e:
+        logger.error(f"Erreur co-achats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/copurchase/status")
+async def get_copurchase_status():
+    """Statut du moteur de co-achats"""
+    return copurchase_engine.get_status()
+
+
+@router.get("/user/{user_id}")
+async def get_personalized_recommendations(
+    user_id: int,
+    limit: int = Query(10, ge=1, le=50)
+):
+    """
+    Recommandations personnalisées d'un utilisateur
+    
+    Basé sur l'historique d'achats (factorisation ALS); produits tendance sinon.
+    """
+    try:
+        if not recommendation_service.product_index:
+            products = await java_client.get_all_products()
+            if products:
+                recommendation_service.index_products(products)
+        
+        results = recommendation_service.get_personalized_recommendations(user_id, limit=limit)
+        
+        return {
+            "user_id": user_id,
+            "count": len(results),
+            "personalized": user_id in personalization_engine.user_row,
+            "recommendations": results
+        }
+    except Exception as e:
+        logger.error(f"Erreur: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/personalization/train")
+async def train_personalization():
+    """Lance l'entraînement du modèle de personnalisation en arrière-plan"""
+    return personalization_engine.start_training()
+
+
+@router.get("/personalization/status")
+async def get_personalization_status():
+    """Statut du modèle de personnalisation (progression, dernier entraînement)"""
+    return personalization_engine.get_status()
+
+
+@router.post("/materialize")
+async def materialize_recommendations():
+    """
+    Précalcule les recommandations de tous les produits
+    
+    Exécuté automatiquement après chaque synchronisation.
+    """
+    try:
+        if not recommendation_service.product_index:
+            products = await java_client.get_all_products()
+            if products:
+                recommendation_service.index_products(products)
+        
+        return await asyncio.to_thread(recommendation_materializer.run)
+    except Exception as e:
+        logger.error(f"Erreur matérialisation: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/materialize/status")
+async def get_materialization_status():
+    """Statut des recommandations matérialisées (version, âge, obsolescence)"""
+    return recommendation_materializer.get_status()
+
+
+@router.post("/cart")
+async def get_cart_recommendations(request: CartRecommendationRequest):
+    """
+    Recommandations pour tout un panier en un seul appel
+    
+    Scores des candidats fusionnés sur les produits du panier (sum ou max),
+    produits déjà dans le panier exclus.
+    """
+    try:
+        if not recommendation_service.product_index:
+            products = await java_client.get_all_products()
+            if products:
+                recommendation_service.index_products(products)
+        
+        start = time.time()
+        results = recommendation_service.get_cart_recommendations(
+            request.product_ids,
+            limit=request.limit,
+            merge=request.merge
+        )
+        
+        return {
+            "success": True,
+            "cart": request.product_ids,
+            "merge": request.merge,
+            "count": len(results["recommendations"]),
+            "recommendations": results["recommendations"],
+            "not_found": results["not_found"],
+            "took_ms": round((time.time() - start) * 1000, 2)
+        }
+    except Exception as e:
+        logger.error(f"Erreur recommandations panier: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/product/{product_id}")
 async def get_all_recommendations_for_product(product_id: int):
     """
@@ -175,12 +317,14 @@ async def get_all_recommendations_for_product(product_id: int):
 async def get_category_recommendations(
     category: str,
     limit: int = Query(10, ge=1, le=50),
-    sort_by: str = Query("rating", regex="^(rating|price|rank)$")
+    sort_by: str = Query("rating", regex="^(rating|price|rank)$"),
+    cursor: Optional[str] = None
 ):
     """
     Recommandations par catégorie
     
-    Tri possible par: rating, price, rank
+    Tri possible par: rating, price, rank.
+    Pagination: passer next_cursor de la réponse précédente dans cursor.
     """
     try:
         if not recommendation_service.product_index:
@@ -188,18 +332,22 @@ async def get_category_recommendations(
             if products:
                 recommendation_service.index_products(products)
         
-        results = recommendation_service.get_category_recommendations(
+        page = recommendation_service.get_category_page(
             category, 
             limit=limit, 
-            sort_by=sort_by
+            sort_by=sort_by,
+            cursor=cursor
         )
         
         return {
             "category": category,
             "sort_by": sort_by,
-            "count": len(results),
-            "products": results
+            "count": len(page["products"]),
+            "products": page["products"],
+            "next_cursor": page["next_cursor"]
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Erreur: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,17 @@
 """
 API Routes - Recherche Sémantique
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from typing import Optional, List
 import logging
+import time
 
-from app.models.schemas import SearchQuery, SearchResponse, SearchResult, IndexStatusResponse
+from app.models.schemas import (
+    SearchQuery, SearchResponse, SearchResult, IndexStatusResponse,
+    SimilarProductsBatchRequest, SimilarProductsBatchResponse
+)
 from app.services.search_service import search_service
+from app.services.autocomplete_service import autocomplete_service
 from app.services.java_client import java_client
 
 logger = logging.getLogger(__name__)
@@ -36,7 +41,10 @@ async def search_products(query: SearchQuery):
                 suggestions=["Index non initialisé. Utilisez POST /api/search/index"]
             )
         
-        return search_service.search(query)
+        response = search_service.search(query)
+        if response.results:
+            autocomplete_service.record_query(query.query)
+        return response
     except Exception as e:
         logger.error(f"❌ Erreur recherche: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -77,6 +85,8 @@ async def index_products_from_java():
         success = search_service.index_products(products_data)
         
         if success:
+            autocomplete_service.index_products(products_data)
+            
             # Met à jour les stats ML
             try:
                 from app.services.ml_service_unified import ml_service
@@ -109,6 +119,7 @@ async def index_products_data(products: List[dict]):
         success = search_service.index_products(products)
         
         if success:
+            autocomplete_service.index_products(products)
             return {
                 "success": True,
                 "indexed_count": len(products),
@@ -131,6 +142,32 @@ async def get_similar_products(product_id: int, top_k: int = 5):
     return search_service.get_similar_products(product_id, top_k)
 
 
+@router.post("/similar/batch", response_model=SimilarProductsBatchResponse)
+async def get_similar_products_batch(request: SimilarProductsBatchRequest):
+    """
+    Produits similaires pour plusieurs produits en une requête
+    
+    - **product_ids**: IDs des produits sources (page produit, panier)
+    - **top_k**: Nombre de résultats par produit
+    - **exclude_input**: Exclut les produits sources des résultats
+    """
+    if not search_service.is_ready:
+        raise HTTPException(status_code=400, detail="Index non initialisé")
+    
+    start_time = time.time()
+    results = search_service.get_similar_products_batch(
+        request.product_ids,
+        top_k=request.top_k,
+        exclude_input=request.exclude_input
+    )
+    
+    return SimilarProductsBatchResponse(
+        results=results,
+        not_found=[pid for pid in request.product_ids if pid not in results],
+        search_time_ms=(time.time() - start_time) * 1000
+    )
+
+
 @router.get("/status", response_model=IndexStatusResponse)
 async def get_index_status():
     """Statut de l'index"""
@@ -145,29 +182,23 @@ async def clear_index():
 
 
 @router.get("/autocomplete")
-async def autocomplete(q: str, limit: int = 5):
-    """Suggestions d'autocomplétion"""
-    if not q or len(q) < 2 or not search_service.is_ready:
-        return {"suggestions": []}
-    
-    query = SearchQuery(query=q, top_k=limit * 2)
-    results = search_service.search(query)
+async def autocomplete(q: str, limit: int = Query(5, ge=1, le=20)):
+    """
+    Suggestions d'autocomplétion (index de préfixes)
     
-    suggestions = []
-    seen = set()
+    Titres produits, catégories et requêtes populaires, triés par popularité.
+    """
+    if not q or len(q) < 2:
+        return {"suggestions": [], "items": []}
     
-    for r in results.results:
-        words = r.title.split()[:5]
-        suggestion = " ".join(words)
-        
-        if suggestion.lower() not in seen:
-            suggestions.append(suggestion)
-            seen.add(suggestion.lower())
-        
-        if len(suggestions) >= limit:
-            break
+    start_time = time.time()
+    items = autocomplete_service.suggest(q, limit)
     
-    return {"suggestions": suggestions}
+    return {
+        "suggestions": [item["text"] for item in items],
+        "items": items,
+        "took_ms": round((time.time() - start_time) * 1000, 3)
+    }
 
 
 @router.get("/categories")
@@ -176,14 +207,10 @@ async def get_indexed_categories():
     if not search_service.is_ready:
         return {"categories": []}
     
-    categories = {}
-    for product in search_service.products_data:
-        cat = product.get("category_name") or product.get("category", "Unknown")
-        categories[cat] = categories.get(cat, 0) + 1
-    
+    categories = search_service.products.category_counts()
     sorted_cats = sorted(categories.items(), key=lambda x: x[1], reverse=True)
     
-    return {"categories": [{"name": n, "count": c} for n, c in sorted_cats]}
+    return {"categories": [{"name": n or "Unknown", "count": c} for n, c in sorted_cats]}
 
 
 @router.get("/stats")
@@ -192,19 +219,19 @@ async def get_search_stats():
     if not search_service.is_ready:
         return {"status": "not_ready", "indexed_products": 0}
     
-    products = search_service.products_data
-    prices = [p.get("price", 0) for p in products if p.get("price")]
-    ratings = [p.get("rating", 0) for p in products if p.get("rating")]
+    products = search_service.products
+    prices = products.price[products.price > 0]
+    ratings = products.rating[products.rating > 0]
     
     return {
         "status": "ready",
         "indexed_products": len(products),
         "price_stats": {
-            "min": min(prices) if prices else 0,
-            "max": max(prices) if prices else 0,
-            "avg": round(sum(prices) / len(prices), 2) if prices else 0
+            "min": float(prices.min()) if prices.size else 0,
+            "max": float(prices.max()) if prices.size else 0,
+            "avg": round(float(prices.mean()), 2) if prices.size else 0
         },
         "rating_stats": {
-            "avg": round(sum(ratings) / len(ratings), 2) if ratings else 0
+            "avg": round(float(ratings.mean()), 2) if ratings.size else 0
         }
     }
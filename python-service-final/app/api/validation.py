@@ -2,11 +2,11 @@
 API Routes - Validation
 Validation et nettoyage des données produits
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from typing import List
 import logging
 
-from app.services.validation_service import validation_service
+from app.services.validation_service import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, validation_service
 
 logger = logging.getLogger(__name__)
 
@@ -34,28 +34,32 @@ async def validate_single_product(product: dict):
 
 
 @router.post("/batch")
-async def validate_batch_products(products: List[dict]):
+async def validate_batch_products(
+    products: List[dict],
+    page: int = Query(1, ge=1),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
     """
-    Valide un lot de produits
+    Valide un lot de produits (validation en colonnes)
     
     Retourne:
     - total: nombre total de produits
     - valid: nombre de produits valides
     - invalid: nombre de produits invalides
     - summary: résumé des types d'erreurs
-    - products: détails par produit
+    - products: détails des produits invalides, page `page` sur `pages`
     """
     try:
         if not products:
             raise HTTPException(status_code=400, detail="Liste de produits vide")
         
-        if len(products) > 10000:
+        if len(products) > 100000:
             raise HTTPException(
                 status_code=400, 
-                detail="Maximum 10000 produits par lot"
+                detail="Maximum 100000 produits par lot"
             )
         
-        result = validation_service.validate_batch(products)
+        result = validation_service.validate_batch(products, page, page_size)
         return result
     except HTTPException:
         raise
@@ -93,15 +97,7 @@ async def clean_batch_products(products: List[dict]):
     Retourne les produits nettoyés prêts pour l'import.
     """
     try:
-        cleaned_products = []
-        
-        for product in products:
-            result = validation_service.validate_product(product)
-            cleaned = {
-                **result.cleaned_data,
-                **result.enrichments
-            }
-            cleaned_products.append(cleaned)
+        cleaned_products = validation_service.clean_batch(products)
         
         return {
             "count": len(cleaned_products),
@@ -120,6 +116,28 @@ async def get_validation_stats():
     return validation_service.get_stats()
 
 
+@router.get("/rules")
+async def get_validation_rules():
+    """
+    Règles de validation compilées (registre commun ETL / validation)
+    
+    Par jeu de règles (etl, product, cross): code, champ, sévérité, prédicat,
+    message et profil cumulé (appels, lignes, lignes en faute, temps,
+    coût par ligne). Profil du processus du service: les traitements ETL
+    parallèles (processus fils) n'y figurent pas.
+    """
+    return validation_service.get_rules()
+
+
+@router.post("/rules/reset-profile")
+async def reset_rule_profiles():
+    """
+    Remet à zéro le profil d'exécution des règles
+    """
+    validation_service.reset_rule_profiles()
+    return {"status": "reset"}
+
+
 @router.post("/reset-stats")
 async def reset_validation_stats():
     """
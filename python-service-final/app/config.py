@@ -18,6 +18,10 @@ class Settings(BaseSettings):
     # === Java Backend ===
     java_backend_url: str = "http://localhost:8080"
     java_api_timeout: int = 30
+    java_import_concurrency: int = 16  # Créations de produits simultanées (import en masse)
+    java_retry_attempts: int = 3  # Tentatives par requête (erreurs réseau, 429/502/503/504)
+    java_retry_backoff: float = 0.5  # Délai initial entre tentatives (doublé à chaque fois)
+    java_product_index_ttl: int = 300  # Index ASIN -> empreinte des produits Java (secondes)
     
     # === CORS ===
     cors_origins: List[str] = [
@@ -33,10 +37,38 @@ class Settings(BaseSettings):
     processed_dir: str = "data/processed"
     models_dir: str = "data/models"
     max_upload_size: int = 50 * 1024 * 1024  # 50MB
+    etl_chunk_size: int = 100_000  # Lignes par bloc en traitement streaming
+    etl_parallel_workers: int = 0  # Processus en mode parallèle (0 = nombre de CPU)
+    etl_jobs_db: str = "data/etl_jobs.db"  # État persistant des jobs ETL
+    etl_jobs_dir: str = "data/jobs"  # Points de reprise des jobs
+    etl_job_workers: int = 2  # Jobs ETL exécutés en parallèle
+    etl_job_lease: float = 60.0  # Bail d'un job en cours (s), renouvelé par son worker
+    etl_import_batch_size: int = 500  # Produits par lot d'import Java
+    etl_cache_dir: str = "data/cache/etl"  # Résultats ETL par empreinte de fichier
     
     # === ML Embeddings ===
     embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
     embedding_dimension: int = 384
+    embeddings_dir: str = "data/embeddings"
+    search_snapshot_keep: int = 2  # Snapshots d'index conservés sur disque
+    search_snapshot_poll_seconds: float = 5.0  # Vérification d'une nouvelle version
+    
+    # === Co-achats (cross-sell) ===
+    sales_database_url: str = ""  # URL SQLAlchemy de la base des ventes (ligne_vente, sale)
+    copurchase_metric: str = "cosine"  # cosine ou lift
+    copurchase_top_k: int = 20
+    copurchase_min_support: int = 2  # Nb minimum de paniers communs
+    
+    # === Personnalisation (ALS implicite) ===
+    personalization_factors: int = 32
+    personalization_iterations: int = 15
+    personalization_regularization: float = 0.05
+    personalization_alpha: float = 20.0
+    
+    # === Recommandations matérialisées ===
+    recommendations_dir: str = "data/recommendations"
+    recommendation_batch_workers: int = 0  # 0 = nombre de CPU
+    recommendations_poll_seconds: float = 5.0  # Vérification d'une nouvelle version
     
     # === LLM Open Source ===
     ollama_url: str = "http://localhost:11434"
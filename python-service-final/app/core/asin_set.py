@@ -0,0 +1,104 @@
+"""
+ASIN Set - Ensemble compact d'ASIN pour la détection de doublons en streaming
+Chaque ASIN est codé sur un entier 64 bits, stocké dans des tableaux triés
+"""
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+
+# Chiffre base 36 de chaque octet ASCII (0-9, A-Z), -1 sinon
+_BASE36_DIGITS = np.full(256, -1, dtype=np.int64)
+_BASE36_DIGITS[ord('0'):ord('9') + 1] = np.arange(10)
+_BASE36_DIGITS[ord('A'):ord('Z') + 1] = np.arange(10, 36)
+
+_BASE36_CHARS = np.frombuffer(b'0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ', dtype=np.uint8)
+
+_ASIN_LENGTH = 10
+_POWERS = 36 ** np.arange(_ASIN_LENGTH - 1, -1, -1, dtype=np.int64)
+_STANDARD_LIMIT = 36 ** _ASIN_LENGTH
+
+# Les ASIN non standards sont hachés au-dessus de 36^10 (< 2^62): pas de collision
+# possible avec un ASIN standard, seulement entre ASIN non standards (hash 62 bits)
+_HASH_FLAG = np.uint64(1 << 62)
+_HASH_MASK = np.uint64((1 << 62) - 1)
+
+
+def encode_asins(asins: pd.Series) -> np.ndarray:
+    """
+    Code des ASIN en int64 de façon vectorisée
+
+    - ASIN standard (10 caractères [0-9A-Z]): valeur base 36 exacte
+    - Autre valeur (longueur, minuscules, manquant...): hash 62 bits marqué
+    """
+    values = asins.fillna('').astype(str)
+    codes = np.empty(len(values), dtype=np.int64)
+
+    standard = values.str.fullmatch(r'[0-9A-Z]{10}').fillna(False).to_numpy(dtype=bool)
+    if standard.any():
+        raw = np.asarray(values[standard].tolist(), dtype=f'S{_ASIN_LENGTH}')
+        digits = _BASE36_DIGITS[raw.view(np.uint8).reshape(-1, _ASIN_LENGTH)]
+        codes[standard] = digits @ _POWERS
+    if not standard.all():
+        hashed = pd.util.hash_array(values[~standard].to_numpy(dtype=object))
+        codes[~standard] = ((hashed & _HASH_MASK) | _HASH_FLAG).astype(np.int64)
+    return codes
+
+
+def is_hashed(codes: np.ndarray) -> np.ndarray:
+    """Masque des codes hachés (ASIN non standards, non réversibles)"""
+    return codes >= _STANDARD_LIMIT
+
+
+def decode_asins(codes: np.ndarray) -> np.ndarray:
+    """Inverse de encode_asins pour les codes standards (None pour les codes hachés)"""
+    codes = np.asarray(codes, dtype=np.int64)
+    values = np.full(len(codes), None, dtype=object)
+    standard = ~is_hashed(codes)
+    if standard.any():
+        digits = (codes[standard, None] // _POWERS) % 36
+        chars = np.ascontiguousarray(_BASE36_CHARS[digits])
+        values[standard] = chars.view(f'S{_ASIN_LENGTH}').ravel().astype(str)
+    return values
+
+
+class AsinSet:
+    """
+    Ensemble d'ASIN déjà vus (8 octets par ASIN distinct)
+
+    Les codes sont rangés dans des tableaux triés de tailles décroissantes;
+    un ajout crée un nouveau tableau puis fusionne tant que le dernier est
+    au moins aussi grand que le précédent (O(log n) tableaux, recherche
+    dichotomique vectorisée dans chacun).
+    """
+
+    def __init__(self):
+        self._runs: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self._runs)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(run.nbytes for run in self._runs)
+
+    def contains(self, codes: np.ndarray) -> np.ndarray:
+        """Masque des codes déjà présents"""
+        found = np.zeros(len(codes), dtype=bool)
+        for run in self._runs:
+            pos = np.minimum(np.searchsorted(run, codes), len(run) - 1)
+            found |= run[pos] == codes
+        return found
+
+    def add(self, codes: np.ndarray) -> None:
+        """Ajoute des codes (doublons et codes déjà présents ignorés)"""
+        codes = np.unique(codes)
+        codes = codes[~self.contains(codes)]
+        if not len(codes):
+            return
+
+        self._runs.append(codes)
+        while len(self._runs) > 1 and len(self._runs[-1]) >= len(self._runs[-2]):
+            last = self._runs.pop()
+            self._runs[-1] = np.sort(np.concatenate([self._runs[-1], last]), kind='stable')
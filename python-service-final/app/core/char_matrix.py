@@ -0,0 +1,128 @@
+"""
+Char Matrix - Chaînes courtes sous forme de matrice de codepoints
+Nettoyage de colonnes texte en opérations NumPy au lieu de boucles Python
+
+Disposition par colonnes: matrice (largeur, n) où la ligne j contient le
+j-ième caractère de chaque valeur (0 = remplissage). Les réductions par
+valeur (any, sum, premier indice...) deviennent des opérations élément par
+élément sur quelques lignes de longueur n, rapides en NumPy.
+"""
+from typing import Iterator, Tuple
+
+import numpy as np
+
+
+# Tables de caractères: booléen par codepoint jusqu'à U+3000 (dernier espace
+# Unicode); la dernière entrée (False) couvre tous les codepoints au-delà
+TABLE_SIZE = 0x3002
+
+# Valeurs par bloc: la matrice d'un bloc reste de quelques dizaines de Mo
+BLOCK_ROWS = 65_536
+
+
+def char_table(chars: str) -> np.ndarray:
+    """Table de recherche des caractères donnés (codepoints < U+3001)"""
+    table = np.zeros(TABLE_SIZE, dtype=bool)
+    table[[ord(c) for c in chars]] = True
+    return table
+
+
+def lookup(matrix: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """Masque des caractères présents dans la table (un gather, pas de isin)"""
+    return table[np.minimum(matrix, TABLE_SIZE - 1)]
+
+
+# Espaces Unicode (str.isspace, identique à \s de re)
+WHITESPACE = ''.join(chr(c) for c in range(TABLE_SIZE - 1) if chr(c).isspace())
+
+
+def iter_blocks(
+    values: np.ndarray,
+    max_width: int
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Découpe un tableau de str en matrices (largeur, n_bloc) de codepoints uint32
+
+    Yields:
+        (positions dans values, matrice, masque des valeurs encodées)
+        Les valeurs non encodées (plus longues que max_width, ou contenant
+        un caractère nul) ont une colonne de zéros et doivent être traitées
+        par le chemin scalaire.
+    """
+    for start in range(0, len(values), BLOCK_ROWS):
+        block = values[start:start + BLOCK_ROWS]
+        lengths = np.fromiter(map(len, block), dtype=np.int64, count=len(block))
+        encodable = lengths <= max_width
+
+        width = max(int(lengths[encodable].max()) if encodable.any() else 0, 1)
+        text = np.asarray(np.where(encodable, block, ''), dtype=f'U{width}')
+        matrix = np.ascontiguousarray(text.view(np.uint32).reshape(len(block), width).T)
+
+        # Un caractère nul est indiscernable du remplissage
+        encodable &= (matrix != 0).sum(axis=0) == lengths
+        matrix[:, ~encodable] = 0
+
+        yield np.arange(start, start + len(block)), matrix, encodable
+
+
+def decode(matrix: np.ndarray) -> np.ndarray:
+    """Matrice de codepoints -> tableau de str NumPy (remplissage retiré)"""
+    width = max(matrix.shape[0], 1)
+    rows = np.ascontiguousarray(matrix.T, dtype=np.uint32).reshape(-1, width)
+    return rows.view(f'U{width}').ravel()
+
+
+def compact(matrix: np.ndarray, keep: np.ndarray) -> np.ndarray:
+    """Retire les caractères non gardés en conservant l'ordre de chaque valeur"""
+    out = np.zeros_like(matrix)
+    target = np.cumsum(keep, axis=0, dtype=np.int64) - 1
+    target *= matrix.shape[1]
+    target += np.arange(matrix.shape[1], dtype=np.int64)
+    out.ravel()[target[keep]] = matrix[keep]
+    return out
+
+
+def first_index(mask: np.ndarray) -> np.ndarray:
+    """Position du premier True de chaque valeur (-1 si aucun)"""
+    index = np.full(mask.shape[1], -1, dtype=np.int64)
+    for position in range(mask.shape[0] - 1, -1, -1):
+        index[mask[position]] = position
+    return index
+
+
+def starts_with(matrix: np.ndarray, prefix: str) -> np.ndarray:
+    """Valeurs commençant par prefix"""
+    if matrix.shape[0] < len(prefix):
+        return np.zeros(matrix.shape[1], dtype=bool)
+    result = np.ones(matrix.shape[1], dtype=bool)
+    for position, char in enumerate(prefix):
+        result &= matrix[position] == ord(char)
+    return result
+
+
+def float_syntax(matrix: np.ndarray) -> np.ndarray:
+    """
+    Valeurs au format décimal simple [+-]chiffres[.chiffres][(e|E)[+-]chiffres]
+
+    Ces valeurs se convertissent sans erreur avec astype(float64), avec le même
+    arrondi que float() en Python; les autres passent par le chemin scalaire.
+    """
+    width = matrix.shape[0]
+    digit = (matrix >= ord('0')) & (matrix <= ord('9'))
+    dot = matrix == ord('.')
+    exponent = (matrix == ord('e')) | (matrix == ord('E'))
+    sign = (matrix == ord('+')) | (matrix == ord('-'))
+
+    valid = (digit | dot | exponent | sign | (matrix == 0)).all(axis=0)
+    valid &= (exponent.sum(axis=0) <= 1) & (dot.sum(axis=0) <= 1)
+
+    positions = np.arange(width)[:, None]
+    e_pos = first_index(exponent)
+    e_pos = np.where(e_pos >= 0, e_pos, width)
+    mantissa = positions < e_pos
+
+    valid &= ~(dot & ~mantissa).any(axis=0)
+    valid &= ~(sign & (positions != 0) & (positions != e_pos + 1)).any(axis=0)
+    valid &= (digit & mantissa).any(axis=0)
+    valid &= (e_pos == width) | (digit & (positions > e_pos)).any(axis=0)
+    return valid
@@ -0,0 +1,165 @@
+"""
+Columnar - Copies Arrow typées des catalogues CSV
+Lecture en memory-map avec projection de colonnes; repli CSV sans pyarrow
+"""
+import csv
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Import conditionnel
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+# Copie colonnaire: fichier Arrow IPC non compressé (lisible sans copie en memory-map)
+COLUMNAR_SUFFIX = '.arrow'
+
+# Types du catalogue produit par l'ETL (colonnes produit + classifications);
+# rank reste entier malgré les valeurs manquantes, contrairement au CSV relu
+CATALOG_TYPES = {
+    'asin': 'string', 'title': 'string', 'price': 'double', 'rating': 'double',
+    'review_count': 'int64', 'rank': 'int64', 'stock': 'int64', 'category': 'string',
+    'image_url': 'string', 'rank_category': 'string', 'price_bucket': 'string',
+    'stock_status': 'string'
+}
+
+# Octets de CSV lus par bloc lors de la copie (un lot Arrow par bloc)
+CATALOG_BLOCK_SIZE = 1 << 20
+
+PathLike = Union[str, Path]
+
+
+def columnar_path(path: PathLike) -> Path:
+    """Chemin de la copie colonnaire d'un CSV (même nom, suffixe .arrow)"""
+    return Path(path).with_suffix(COLUMNAR_SUFFIX)
+
+
+def is_fresh(path: PathLike) -> bool:
+    """Copie colonnaire présente et au moins aussi récente que le CSV"""
+    source, copy = Path(path), columnar_path(path)
+    return copy.exists() and copy.stat().st_mtime >= source.stat().st_mtime
+
+
+def write_batches(schema: 'pa.Schema', batches: Iterable['pa.RecordBatch'], path: PathLike) -> int:
+    """Écrit des lots dans un fichier Arrow IPC au fil de l'eau (écriture atomique); nb de lignes"""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    rows = 0
+    try:
+        with pa.OSFile(str(tmp), 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return rows
+
+
+def write_table(table: 'pa.Table', path: PathLike) -> Path:
+    """Écrit un fichier Arrow IPC (écriture atomique)"""
+    write_batches(table.schema, table.to_batches(), path)
+    return Path(path)
+
+
+def write_catalog(csv_path: PathLike, encoding: str = 'utf-8') -> Optional[str]:
+    """
+    Copie colonnaire typée d'un CSV produit par l'ETL (CATALOG_TYPES)
+
+    Le CSV est lu bloc par bloc (open_csv) avec des types imposés (aucune
+    inférence; colonne inconnue en chaîne) et chaque bloc est écrit aussitôt:
+    la mémoire est bornée par la taille d'un bloc, pas par celle du
+    catalogue. None sans pyarrow.
+    """
+    if not ARROW_AVAILABLE:
+        return None
+    with open(csv_path, encoding=encoding, newline='') as f:
+        names = next(csv.reader(f), [])
+    reader = pa_csv.open_csv(
+        str(csv_path),
+        read_options=pa_csv.ReadOptions(encoding=encoding, block_size=CATALOG_BLOCK_SIZE),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={name: pa.type_for_alias(CATALOG_TYPES.get(name, 'string')) for name in names},
+            strings_can_be_null=True
+        )
+    )
+    path = columnar_path(csv_path)
+    rows = write_batches(reader.schema, reader, path)
+    logger.info(f"🧱 Copie colonnaire: {path.name} ({rows} lignes)")
+    return str(path)
+
+
+def read_table(path: PathLike, columns: Optional[List[str]] = None) -> 'pa.Table':
+    """
+    Table Arrow d'un fichier .arrow (memory-map, sans copie) ou .parquet
+
+    Seules les colonnes demandées présentes dans le fichier sont lues.
+    """
+    path = Path(path)
+    if path.suffix == '.parquet':
+        names = pq.read_schema(path).names
+        return pq.read_table(path, columns=_project(names, columns), memory_map=True)
+    # Le memory-map reste ouvert tant que la table référence ses buffers
+    table = pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+    return table.select(_project(table.column_names, columns))
+
+
+def load_frame(
+    path: PathLike,
+    columns: Optional[List[str]] = None,
+    cache: bool = True
+) -> pd.DataFrame:
+    """
+    DataFrame d'un catalogue, lu depuis sa copie colonnaire si possible
+
+    - .arrow / .parquet: lecture directe
+    - CSV avec copie à jour: copie lue en memory-map, colonnes projetées
+    - sinon: CSV lu par pandas (mêmes types qu'avant); avec cache, la copie est
+      écrite pour les lectures suivantes (métadonnées pandas conservées)
+    """
+    path = Path(path)
+    if not ARROW_AVAILABLE:
+        return pd.read_csv(path, usecols=_usecols(columns))
+    if path.suffix in (COLUMNAR_SUFFIX, '.parquet'):
+        return read_table(path, columns).to_pandas()
+    if is_fresh(path):
+        try:
+            return read_table(columnar_path(path), columns).to_pandas()
+        except Exception as e:
+            logger.warning(f"⚠️ Copie colonnaire illisible ({columnar_path(path).name}): {e}")
+
+    df = pd.read_csv(path)
+    if cache:
+        try:
+            write_table(pa.Table.from_pandas(df, preserve_index=False), columnar_path(path))
+        except Exception as e:
+            logger.warning(f"⚠️ Copie colonnaire non écrite ({path.name}): {e}")
+    return df[_project(list(df.columns), columns)] if columns else df
+
+
+def _project(names: List[str], columns: Optional[List[str]]) -> List[str]:
+    """Colonnes demandées présentes, dans l'ordre du fichier (toutes si None)"""
+    if columns is None:
+        return list(names)
+    wanted = set(columns)
+    return [name for name in names if name in wanted]
+
+
+def _usecols(columns: Optional[List[str]]):
+    if columns is None:
+        return None
+    wanted = set(columns)
+    return lambda name: name in wanted
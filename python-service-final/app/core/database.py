@@ -128,3 +128,29 @@ db_pool = DatabasePool()
 def get_db_pool() -> DatabasePool:
     """Retourne l'instance du pool de connexions"""
     return db_pool
+
+
+# ==================== BASE DES VENTES ====================
+
+_sales_engine = None
+_sales_engine_lock = threading.Lock()
+
+
+def get_sales_connection() -> Any:
+    """
+    Connexion DB-API brute vers la base des ventes (sale, ligne_vente)
+    
+    URL SQLAlchemy lue dans settings.sales_database_url (Postgres, MySQL, SQLite).
+    Retourne None si non configurée.
+    """
+    global _sales_engine
+    from app.config import settings
+    
+    if not settings.sales_database_url:
+        return None
+    
+    with _sales_engine_lock:
+        if _sales_engine is None:
+            from sqlalchemy import create_engine
+            _sales_engine = create_engine(settings.sales_database_url, pool_pre_ping=True)
+    return _sales_engine.raw_connection()
@@ -0,0 +1,136 @@
+"""
+Index Store - Snapshots versionnés de l'index de recherche sémantique
+Persiste l'index FAISS, les embeddings et une table produits compacte sur disque
+"""
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.core.product_table import ProductTable
+from app.core.versioned_store import VersionedStore
+
+logger = logging.getLogger(__name__)
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+class SearchIndexStore(VersionedStore):
+    """
+    Stockage versionné de l'index de recherche
+
+    Arborescence:
+        <base_dir>/search_index.version      -> nom de la version courante
+        <base_dir>/snapshots/<version>/
+            products.index                   -> index FAISS
+            embeddings.npy                   -> embeddings normalisés (mmap)
+            products.npz                     -> table produits colonnaire
+            meta.json                        -> métadonnées
+
+    La version courante est publiée par remplacement atomique du fichier
+    de version: les workers la lisent et rechargent le snapshot par référence.
+    """
+
+    VERSION_FILE = 'search_index.version'
+    VERSIONS_DIR = 'snapshots'
+
+    @property
+    def snapshots_dir(self) -> Path:
+        return self.versions_dir
+
+    def save(
+        self,
+        embeddings: np.ndarray,
+        products: ProductTable,
+        index: Any = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """
+        Écrit un nouveau snapshot puis le publie
+
+        Returns:
+            Nom de la version publiée, ou None en cas d'erreur
+        """
+        def write(path: Path) -> Dict[str, Any]:
+            np.save(path / 'embeddings.npy', np.ascontiguousarray(embeddings, dtype=np.float32))
+            np.savez(path / 'products.npz', **products.to_arrays())
+
+            if index is not None and FAISS_AVAILABLE:
+                faiss.write_index(index, str(path / 'products.index'))
+
+            return {
+                'count': len(products),
+                'dimension': int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+                **(metadata or {})
+            }
+
+        version = self._write_version(write)
+        if version:
+            logger.info(f"💾 Snapshot index publié: {version} ({len(products)} produits)")
+        return version
+
+    def load(self, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Charge un snapshot (version courante par défaut)
+
+        Les embeddings sont ouverts en memory-map, l'index FAISS en mmap
+        lorsque la version de FAISS le permet (sinon 'index' est None, voir
+        _read_index): les pages sont partagées entre les workers via le
+        cache du système.
+        """
+        version = version or self.current_version()
+        if not version:
+            return None
+
+        path = self.snapshots_dir / version
+        if not path.exists():
+            logger.warning(f"⚠️ Snapshot introuvable: {version}")
+            return None
+
+        try:
+            embeddings = np.load(path / 'embeddings.npy', mmap_mode='r')
+
+            with np.load(path / 'products.npz') as table:
+                products = ProductTable.from_arrays(table)
+
+            index = None
+            index_path = path / 'products.index'
+            if FAISS_AVAILABLE and index_path.exists():
+                index = self._read_index(index_path)
+
+            meta = self.read_meta(version)
+
+            return {
+                'version': version,
+                'embeddings': embeddings,
+                'products': products,
+                'index': index,
+                'meta': meta
+            }
+        except Exception as e:
+            logger.error(f"❌ Erreur chargement snapshot {version}: {e}")
+            return None
+
+    def _read_index(self, index_path: Path) -> Any:
+        """
+        Lit l'index FAISS en mmap (pages partagées entre workers)
+
+        Seul IO_FLAG_MMAP_IFC (FAISS >= 1.8) mappe les vecteurs d'un index
+        plat; sinon read_index en ferait une copie privée par worker. Dans ce
+        cas pas d'index (None): la recherche exacte se fait sur les
+        embeddings, eux mappés et partagés (mêmes résultats qu'IndexFlatIP).
+        """
+        mmap_flag = getattr(faiss, 'IO_FLAG_MMAP_IFC', None)
+        if mmap_flag is not None:
+            try:
+                return faiss.read_index(str(index_path), mmap_flag)
+            except Exception as e:
+                logger.warning(f"⚠️ Index FAISS non mappable ({e}): recherche sur les embeddings mappés")
+                return None
+        logger.info("Index FAISS non mappable (FAISS < 1.8): recherche sur les embeddings mappés")
+        return None
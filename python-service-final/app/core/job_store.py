@@ -0,0 +1,201 @@
+"""
+Job Store - État persistant des jobs ETL (SQLite)
+Une ligne par job; paramètres, progression et résultat stockés en JSON
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+# Statuts d'un job
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# Statuts d'un job pas encore terminé (en cours: repris seulement si son bail a expiré)
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+_JSON_FIELDS = ('params', 'progress', 'result')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS etl_jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    filename TEXT,
+    file_path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    params TEXT NOT NULL DEFAULT '{}',
+    progress TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    updated_at TEXT NOT NULL,
+    completed_at TEXT,
+    owner TEXT,
+    lease_until REAL
+)
+"""
+
+# Colonnes ajoutées depuis la création de la table (bases existantes)
+_MIGRATIONS = {'owner': 'TEXT', 'lease_until': 'REAL'}
+
+
+class JobStore:
+    """
+    Jobs ETL persistants
+
+    Une connexion SQLite par opération (appelable depuis la boucle asyncio
+    comme depuis les threads de traitement), écritures sérialisées par un verrou.
+
+    Plusieurs processus (workers uvicorn) partagent la base: un job n'est
+    exécuté qu'après claim(), qui le prend atomiquement avec un bail
+    (owner, lease_until) renouvelé par son worker; un job en cours n'est
+    repris ailleurs qu'une fois son bail expiré.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+            existing = {row['name'] for row in conn.execute("PRAGMA table_info(etl_jobs)")}
+            for name, kind in _MIGRATIONS.items():
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE etl_jobs ADD COLUMN {name} {kind}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        for field in _JSON_FIELDS:
+            job[field] = json.loads(job[field]) if job[field] else None
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+
+    def create(
+        self,
+        kind: str,
+        file_path: str,
+        filename: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Enregistre un nouveau job en file d'attente"""
+        job_id = uuid.uuid4().hex[:12]
+        now = datetime.now().isoformat()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO etl_jobs (id, kind, filename, file_path, status, params, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, filename, file_path, QUEUED, json.dumps(params or {}), now, now)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM etl_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Jobs les plus récents d'abord"""
+        query, args = "SELECT * FROM etl_jobs", []
+        if status:
+            query += " WHERE status = ?"
+            args.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, args).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def active(self) -> List[Dict[str, Any]]:
+        """
+        Jobs à reprendre, dans l'ordre de création
+
+        En attente, ou en cours sans bail valide (worker arrêté ou disparu).
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM etl_jobs WHERE status = ? "
+                "OR (status = ? AND (lease_until IS NULL OR lease_until < ?)) ORDER BY created_at",
+                (QUEUED, RUNNING, time.time())
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def claim(self, job_id: str, owner: str, lease: float) -> Optional[Dict[str, Any]]:
+        """
+        Prend un job pour l'exécuter (passe en 'running' avec un bail)
+
+        Réussit si le job est en attente, en cours sans bail valide, ou déjà à
+        owner; None s'il est tenu par un autre worker ou terminé.
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            claimed = conn.execute(
+                "UPDATE etl_jobs SET status = ?, owner = ?, lease_until = ?, updated_at = ? "
+                "WHERE id = ? AND (status = ? OR (status = ? AND "
+                "(lease_until IS NULL OR lease_until < ? OR owner = ?)))",
+                (RUNNING, owner, now + lease, datetime.now().isoformat(),
+                 job_id, QUEUED, RUNNING, now, owner)
+            ).rowcount == 1
+        return self.get(job_id) if claimed else None
+
+    def renew(self, job_id: str, owner: str, lease: float) -> Optional[Dict[str, Any]]:
+        """Prolonge le bail d'un job en cours; None si owner ne le tient plus"""
+        with self._lock, self._connect() as conn:
+            renewed = conn.execute(
+                "UPDATE etl_jobs SET lease_until = ? WHERE id = ? AND owner = ? AND status = ?",
+                (time.time() + lease, job_id, owner, RUNNING)
+            ).rowcount == 1
+        return self.get(job_id) if renewed else None
+
+    def release(self, owner: str) -> int:
+        """Libère les baux des jobs en cours d'owner (arrêt: reprise immédiate ailleurs)"""
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                "UPDATE etl_jobs SET lease_until = NULL WHERE owner = ? AND status = ?",
+                (owner, RUNNING)
+            ).rowcount
+
+    def update(self, job_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """Met à jour des champs (les champs JSON sont sérialisés)"""
+        fields['updated_at'] = datetime.now().isoformat()
+        for field in _JSON_FIELDS:
+            if field in fields:
+                fields[field] = json.dumps(fields[field]) if fields[field] is not None else None
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                f"UPDATE etl_jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id)
+            )
+        return self.get(job_id)
+
+    def set_progress(self, job_id: str, stage: str, **values: Any) -> None:
+        """Progression d'une étape (fusionnée avec les autres étapes)"""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT progress FROM etl_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            progress = json.loads(row['progress'] or '{}')
+            progress[stage] = {**progress.get(stage, {}), **values}
+            conn.execute(
+                "UPDATE etl_jobs SET progress = ?, stage = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(progress), stage, datetime.now().isoformat(), job_id)
+            )
@@ -200,7 +200,7 @@ class ModelManager:
     def _load_products_data(self):
         """Charge les données produits pour les recommandations"""
         try:
-            import pandas as pd
+            from app.core.columnar import load_frame
             
             csv_paths = [
                 Path("data/uploads/amazon_dataset.csv"),
@@ -210,7 +210,8 @@ class ModelManager:
             
             for csv_path in csv_paths:
                 if csv_path.exists():
-                    self._products_df = pd.read_csv(csv_path)
+                    # Copie Arrow à jour lue en memory-map, sinon CSV (copie créée)
+                    self._products_df = load_frame(csv_path)
                     logger.info(f"  ✓ {len(self._products_df)} produits chargés depuis {csv_path.name}")
                     break
                     
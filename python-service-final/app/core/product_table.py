@@ -0,0 +1,270 @@
+"""
+Product Table - Stockage colonnaire compact des produits
+Tableaux NumPy pour les champs numériques, chaînes encodées par offsets
+et catégories internées
+"""
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+# Colonnes numériques (nom -> dtype numpy)
+NUMERIC_COLUMNS = {
+    'id': np.int64,
+    'price': np.float64,
+    'rating': np.float64,
+    'review_count': np.int32,
+    'rank': np.int32,      # 0 = pas de rang
+    'stock': np.int32,
+}
+
+# Colonnes texte encodées en buffer UTF-8 + offsets
+TEXT_COLUMNS = ['asin', 'title', 'image_url']
+
+
+def pack_strings(values: List[str]) -> Dict[str, np.ndarray]:
+    """Encode une liste de chaînes en un buffer UTF-8 + offsets"""
+    encoded = [(v or '').encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return {'data': data, 'offsets': offsets}
+
+
+def unpack_strings(data: np.ndarray, offsets: np.ndarray) -> List[str]:
+    """Décode un buffer UTF-8 + offsets en liste de chaînes"""
+    raw = data.tobytes()
+    return [
+        raw[offsets[i]:offsets[i + 1]].decode('utf-8')
+        for i in range(len(offsets) - 1)
+    ]
+
+
+class ProductTable:
+    """
+    Table produits en struct-of-arrays
+
+    - Champs numériques: un tableau NumPy par colonne
+    - asin, title, image_url: buffer UTF-8 unique + offsets (pas d'objet str par ligne)
+    - category: codes int32 vers une liste de catégories internées
+
+    Les résultats sont construits en rassemblant les colonnes aux indices
+    retournés par l'index, sans dict intermédiaire par produit.
+    """
+
+    def __init__(self):
+        self.columns: Dict[str, np.ndarray] = {
+            col: np.zeros(0, dtype=dtype) for col, dtype in NUMERIC_COLUMNS.items()
+        }
+        self.text: Dict[str, Dict[str, np.ndarray]] = {
+            col: pack_strings([]) for col in TEXT_COLUMNS
+        }
+        self.category_codes = np.zeros(0, dtype=np.int32)
+        self.categories: List[str] = []
+        self._category_lookup: Dict[str, int] = {}
+
+    # ========== Construction ==========
+
+    @classmethod
+    def from_products(cls, products: List[Dict[str, Any]]) -> 'ProductTable':
+        """Construit la table depuis une liste de produits (dicts Java/ETL)"""
+        table = cls()
+        table.columns = {
+            col: cls._column_values(products, col, dtype)
+            for col, dtype in NUMERIC_COLUMNS.items()
+        }
+        table.text = {
+            col: pack_strings([str(p.get(col) or '') for p in products])
+            for col in TEXT_COLUMNS
+        }
+        table.category_codes = np.asarray(
+            [table._intern(cls._category_of(p)) for p in products],
+            dtype=np.int32
+        )
+        return table
+
+    @classmethod
+    def from_arrays(cls, arrays: Any) -> 'ProductTable':
+        """Reconstruit la table depuis to_arrays() (ex: fichier .npz)"""
+        table = cls()
+        table.columns = {
+            col: np.asarray(arrays[col], dtype=dtype)
+            for col, dtype in NUMERIC_COLUMNS.items()
+        }
+        table.text = {
+            col: {
+                'data': np.asarray(arrays[f"{col}__data"]),
+                'offsets': np.asarray(arrays[f"{col}__offsets"])
+            }
+            for col in TEXT_COLUMNS
+        }
+        table.category_codes = np.asarray(arrays['category__codes'], dtype=np.int32)
+        table.categories = unpack_strings(arrays['category__data'], arrays['category__offsets'])
+        table._category_lookup = {c: i for i, c in enumerate(table.categories)}
+        return table
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Exporte la table en tableaux nommés (pour np.savez)"""
+        arrays = dict(self.columns)
+        for col, packed in self.text.items():
+            arrays[f"{col}__data"] = packed['data']
+            arrays[f"{col}__offsets"] = packed['offsets']
+
+        categories = pack_strings(self.categories)
+        arrays['category__codes'] = self.category_codes
+        arrays['category__data'] = categories['data']
+        arrays['category__offsets'] = categories['offsets']
+        return arrays
+
+    def append(self, product: Dict[str, Any]) -> int:
+        """Ajoute un produit, retourne sa ligne (recopie chaque colonne: extend pour un lot)"""
+        return int(self.extend([product])[0])
+
+    def extend(self, products: List[Dict[str, Any]]) -> np.ndarray:
+        """Ajoute un lot de produits (une seule recopie par colonne), retourne leurs lignes"""
+        start = len(self)
+        if not products:
+            return np.zeros(0, dtype=np.int64)
+
+        # Nouveaux tableaux à chaque fois: une table partagée (copie par
+        # extended) ne voit jamais ses colonnes modifiées
+        for col, dtype in NUMERIC_COLUMNS.items():
+            values = self._column_values(products, col, dtype, start=start)
+            self.columns[col] = np.concatenate([self.columns[col], values])
+
+        for col in TEXT_COLUMNS:
+            packed = self.text[col]
+            added = pack_strings([str(p.get(col) or '') for p in products])
+            self.text[col] = {
+                'data': np.concatenate([packed['data'], added['data']]),
+                'offsets': np.concatenate([packed['offsets'], added['offsets'][1:] + packed['offsets'][-1]])
+            }
+
+        codes = np.asarray([self._intern(self._category_of(p)) for p in products], dtype=np.int32)
+        self.category_codes = np.concatenate([self.category_codes, codes])
+        return np.arange(start, len(self))
+
+    def extended(self, products: List[Dict[str, Any]]) -> 'ProductTable':
+        """Nouvelle table = self + products; self (ex: état de recherche publié) reste intact"""
+        table = ProductTable()
+        table.columns = dict(self.columns)
+        table.text = dict(self.text)
+        table.category_codes = self.category_codes
+        table.categories = list(self.categories)
+        table._category_lookup = dict(self._category_lookup)
+        table.extend(products)
+        return table
+
+    # ========== Accès ==========
+
+    def __len__(self) -> int:
+        return len(self.columns['id'])
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.columns['id']
+
+    @property
+    def price(self) -> np.ndarray:
+        return self.columns['price']
+
+    @property
+    def rating(self) -> np.ndarray:
+        return self.columns['rating']
+
+    @property
+    def stock(self) -> np.ndarray:
+        return self.columns['stock']
+
+    def get_text(self, col: str, row: int) -> str:
+        """Décode une chaîne d'une colonne texte"""
+        packed = self.text[col]
+        start, end = packed['offsets'][row], packed['offsets'][row + 1]
+        return packed['data'][start:end].tobytes().decode('utf-8')
+
+    def get_texts(self, col: str, rows: np.ndarray) -> List[str]:
+        """Décode les chaînes d'une colonne texte aux lignes données"""
+        return [self.get_text(col, int(r)) for r in rows]
+
+    def get_categories(self, rows: np.ndarray) -> List[str]:
+        """Catégories aux lignes données"""
+        codes = self.category_codes[rows]
+        return [self.categories[c] for c in codes.tolist()]
+
+    def gather(self, rows: np.ndarray) -> Dict[str, list]:
+        """Rassemble toutes les colonnes aux lignes données (listes Python)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        gathered = {col: values[rows].tolist() for col, values in self.columns.items()}
+        for col in TEXT_COLUMNS:
+            gathered[col] = self.get_texts(col, rows)
+        gathered['category_name'] = self.get_categories(rows)
+        return gathered
+
+    def row_dict(self, row: int) -> Dict[str, Any]:
+        """Retourne une ligne sous forme de dict"""
+        gathered = self.gather(np.array([row]))
+        product = {col: values[0] for col, values in gathered.items()}
+        product['rank'] = product['rank'] or None
+        return product
+
+    def category_mask(self, pattern: str, rows: np.ndarray) -> np.ndarray:
+        """Masque des lignes dont la catégorie contient pattern (insensible à la casse)"""
+        pattern = pattern.lower()
+        matching = np.array(
+            [pattern in c.lower() for c in self.categories] + [False], dtype=bool
+        )
+        return matching[self.category_codes[rows]]
+
+    def category_counts(self) -> Dict[str, int]:
+        """Nombre de produits par catégorie"""
+        counts = np.bincount(self.category_codes, minlength=len(self.categories))
+        return {cat: int(n) for cat, n in zip(self.categories, counts) if n}
+
+    @property
+    def nbytes(self) -> int:
+        """Taille mémoire approximative de la table"""
+        size = sum(v.nbytes for v in self.columns.values())
+        size += sum(p['data'].nbytes + p['offsets'].nbytes for p in self.text.values())
+        size += self.category_codes.nbytes
+        return size
+
+    # ========== Helpers ==========
+
+    def _intern(self, category: str) -> int:
+        code = self._category_lookup.get(category)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(category)
+            self._category_lookup[category] = code
+        return code
+
+    @staticmethod
+    def _category_of(product: Dict[str, Any]) -> str:
+        return str(product.get('category_name') or product.get('category') or '')
+
+    @staticmethod
+    def _column_values(
+        products: List[Dict[str, Any]],
+        col: str,
+        dtype: Any,
+        start: int = 0
+    ) -> np.ndarray:
+        values = []
+        for i, p in enumerate(products):
+            value = p.get(col)
+            if col == 'id' and value is None:
+                value = start + i
+            values.append(value or 0)
+        try:
+            return np.asarray(values, dtype=dtype)
+        except (TypeError, ValueError):
+            return np.asarray([_to_number(v) for v in values], dtype=dtype)
+
+
+def _to_number(value: Any) -> float:
+    """Conversion tolérante (valeurs textuelles du backend)"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
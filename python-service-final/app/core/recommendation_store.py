@@ -0,0 +1,117 @@
+"""
+Recommendation Store - Recommandations précalculées par produit
+Tables NumPy d'ids et de scores (une ligne par produit), ouvertes en memory-map
+"""
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.core.versioned_store import VersionedStore
+
+logger = logging.getLogger(__name__)
+
+
+class MaterializedRecommendations:
+    """
+    Recommandations matérialisées d'une version
+
+    arrays[kind][name] est un tableau (n_produits, k): ids (-1 = vide),
+    scores, et colonnes éventuelles propres à une liste (ex: support).
+    """
+
+    def __init__(
+        self,
+        version: str,
+        product_ids: np.ndarray,
+        arrays: Dict[str, Dict[str, np.ndarray]],
+        meta: Dict[str, Any]
+    ):
+        self.version = version
+        self.product_ids = product_ids
+        self.arrays = arrays
+        self.meta = meta
+        self._row_of = {pid: row for row, pid in enumerate(product_ids.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def __contains__(self, product_id: Any) -> bool:
+        return product_id in self._row_of
+
+    def lookup(self, product_id: Any) -> Optional[Dict[str, Dict[str, np.ndarray]]]:
+        """Lignes de toutes les listes d'un produit (None si non matérialisé)"""
+        row = self._row_of.get(product_id)
+        if row is None:
+            return None
+        return {
+            kind: {name: values[row] for name, values in columns.items()}
+            for kind, columns in self.arrays.items()
+        }
+
+    @property
+    def age_seconds(self) -> float:
+        return time.time() - self.meta.get('created_ts', 0)
+
+
+class RecommendationStore(VersionedStore):
+    """
+    Stockage versionné des recommandations matérialisées
+
+    Arborescence:
+        <base_dir>/recommendations.version   -> nom de la version courante
+        <base_dir>/<version>/
+            product_ids.npy                  -> ids produits (une ligne par produit)
+            <liste>__<colonne>.npy           -> tableaux (n_produits, k)
+            meta.json                        -> métadonnées (version du catalogue...)
+    """
+
+    VERSION_FILE = 'recommendations.version'
+
+    def save(
+        self,
+        product_ids: np.ndarray,
+        arrays: Dict[str, Dict[str, np.ndarray]],
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """Écrit une nouvelle version puis la publie (remplacement atomique)"""
+        def write(path: Path) -> Dict[str, Any]:
+            np.save(path / 'product_ids.npy', np.asarray(product_ids, dtype=np.int64))
+            for kind, columns in arrays.items():
+                for name, values in columns.items():
+                    np.save(path / f"{kind}__{name}.npy", values)
+
+            return {
+                'count': int(len(product_ids)),
+                'lists': {kind: sorted(columns) for kind, columns in arrays.items()},
+                **(metadata or {})
+            }
+
+        version = self._write_version(write)
+        if version:
+            logger.info(f"💾 Recommandations matérialisées: {version} ({len(product_ids)} produits)")
+        return version
+
+    def load(self, version: Optional[str] = None) -> Optional[MaterializedRecommendations]:
+        """Ouvre une version en memory-map (version courante par défaut)"""
+        version = version or self.current_version()
+        if not version:
+            return None
+
+        path = self.versions_dir / version
+        try:
+            meta = self.read_meta(version)
+            arrays = {
+                kind: {
+                    name: np.load(path / f"{kind}__{name}.npy", mmap_mode='r')
+                    for name in columns
+                }
+                for kind, columns in meta['lists'].items()
+            }
+            product_ids = np.load(path / 'product_ids.npy')
+            return MaterializedRecommendations(version, product_ids, arrays, meta)
+        except Exception as e:
+            logger.error(f"❌ Erreur chargement recommandations {version}: {e}")
+            return None
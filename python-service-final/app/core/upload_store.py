@@ -0,0 +1,187 @@
+"""
+Upload Store - Fichiers uploadés adressés par contenu (SHA-256)
+Écriture en streaming: hachage au fil de l'eau, limite de taille appliquée
+pendant la copie, un seul exemplaire par contenu
+"""
+import hashlib
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from fastapi import UploadFile
+
+from app.config import settings
+from app.core.columnar import columnar_path
+
+logger = logging.getLogger(__name__)
+
+
+class UploadTooLarge(Exception):
+    """Fichier uploadé au-delà de la taille maximale"""
+
+    def __init__(self, size: int, max_size: int):
+        super().__init__(f"Fichier trop volumineux ({size} octets lus, maximum {max_size})")
+        self.size = size
+        self.max_size = max_size
+
+
+class StoredUpload(NamedTuple):
+    """Fichier enregistré: chemin adressé par contenu et empreinte"""
+    path: Path
+    sha256: str
+    size: int
+    filename: str
+    duplicate: bool  # Contenu déjà présent (fichier existant réutilisé)
+    named_path: Optional[Path] = None  # Lien <directory>/<nom d'origine> vers path
+
+
+class UploadStore:
+    """
+    Stockage des uploads par empreinte
+
+    Arborescence:
+        <directory>/<sha256><suffixe>   -> un fichier par contenu distinct
+        <directory>/<nom d'origine>     -> lien physique vers le dernier contenu reçu sous ce nom
+        <directory>/.incoming/          -> copies en cours (renommées à la fin)
+
+    Deux uploads de même nom ne s'écrasent plus; un contenu déjà reçu n'est
+    pas stocké deux fois. Le renommage final est atomique: un fichier visible
+    sous son empreinte est toujours complet. Le nom d'origine suit le dernier
+    upload (ex. amazon_dataset.csv lu par ModelManager) et donne le filename
+    de list_files.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    INCOMING_DIR = '.incoming'
+
+    def __init__(self, directory: Optional[str] = None, max_size: Optional[int] = None):
+        self._directory = directory
+        self._max_size = max_size
+
+    @property
+    def directory(self) -> Path:
+        return Path(self._directory or settings.upload_dir)
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size or settings.max_upload_size
+
+    def path_for(self, sha256: str, suffix: str = '.csv') -> Path:
+        return self.directory / f"{sha256}{suffix}"
+
+    async def save(self, upload: UploadFile, suffix: str = '.csv') -> StoredUpload:
+        """
+        Copie un upload par blocs en calculant son SHA-256
+
+        Lève UploadTooLarge dès que la taille annoncée ou lue dépasse max_size
+        (copie partielle supprimée).
+        """
+        max_size = self.max_size
+        if upload.size is not None and upload.size > max_size:
+            raise UploadTooLarge(upload.size, max_size)
+
+        incoming = self.directory / self.INCOMING_DIR
+        incoming.mkdir(parents=True, exist_ok=True)
+        tmp_path = incoming / uuid.uuid4().hex
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as output:
+                while chunk := await upload.read(self.CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_size:
+                        raise UploadTooLarge(size, max_size)
+                    digest.update(chunk)
+                    output.write(chunk)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        sha256 = digest.hexdigest()
+        path = self.path_for(sha256, suffix)
+        duplicate = path.exists()
+        if duplicate:
+            tmp_path.unlink()
+        else:
+            os.replace(tmp_path, path)
+
+        named_path = self._link_name(path, upload.filename)
+        logger.info(f"📁 Upload {upload.filename}: {size} octets, sha256 {sha256[:12]}"
+                    f"{' (contenu déjà reçu)' if duplicate else ''}")
+        return StoredUpload(path, sha256, size, upload.filename or path.name, duplicate, named_path)
+
+    def list_files(self, suffix: str = '.csv') -> List[Dict[str, Any]]:
+        """
+        Fichiers stockés: un par contenu, avec les noms d'origine qui y mènent
+
+        Un fichier nommé qui n'est pas un lien vers un contenu (dépôt manuel,
+        ancien upload) est listé seul, sans sha256.
+        """
+        directory = self.directory
+        if not directory.exists():
+            return []
+
+        by_inode: Dict[tuple, Dict[str, Any]] = {}
+        named = []
+        for path in sorted(directory.glob(f"*{suffix}")):
+            stat = path.stat()
+            stem = path.name[:-len(suffix)] if suffix else path.name
+            if self._is_sha256(stem):
+                by_inode[(stat.st_dev, stat.st_ino)] = {
+                    'name': path.name, 'filename': None, 'filenames': [], 'sha256': stem,
+                    'size_kb': round(stat.st_size / 1024, 2), 'path': str(path)
+                }
+            else:
+                named.append((path, stat))
+
+        files = []
+        for path, stat in named:
+            entry = by_inode.get((stat.st_dev, stat.st_ino))
+            if entry is not None:
+                entry['filenames'].append(path.name)
+                continue
+            files.append({
+                'name': path.name, 'filename': path.name, 'filenames': [path.name], 'sha256': None,
+                'size_kb': round(stat.st_size / 1024, 2), 'path': str(path)
+            })
+        for entry in by_inode.values():
+            entry['filename'] = entry['filenames'][0] if entry['filenames'] else None
+        return list(by_inode.values()) + files
+
+    def _link_name(self, path: Path, filename: Optional[str]) -> Optional[Path]:
+        """
+        Fait pointer <directory>/<nom d'origine> vers le contenu (remplacement atomique)
+
+        Lien physique, copie à défaut (système de fichiers sans liens). La copie
+        colonnaire de l'ancien contenu est supprimée: le lien peut être plus
+        ancien qu'elle et passerait pour à jour.
+        """
+        name = Path(filename or '').name
+        if not name or name.startswith('.') or name == path.name or self._is_sha256(Path(name).stem):
+            return None
+
+        target = self.directory / name
+        tmp_path = self.directory / self.INCOMING_DIR / uuid.uuid4().hex
+        try:
+            try:
+                os.link(path, tmp_path)
+            except OSError:
+                shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, target)
+        except OSError as e:
+            tmp_path.unlink(missing_ok=True)
+            logger.warning(f"⚠️ Nom d'origine {name} non mis à jour: {e}")
+            return None
+        columnar_path(target).unlink(missing_ok=True)
+        return target
+
+    @staticmethod
+    def _is_sha256(name: str) -> bool:
+        return len(name) == 64 and all(c in '0123456789abcdef' for c in name)
+
+
+# Instance singleton
+upload_store = UploadStore()
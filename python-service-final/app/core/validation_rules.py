@@ -0,0 +1,387 @@
+"""
+Règles de validation déclaratives - Définies une fois comme données, compilées en masques
+Registre commun à l'ETL (_validate_data) et au service de validation (validate_columns)
+"""
+import re
+import string
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Seuils partagés
+ASIN_LENGTH = 10
+ASIN_PATTERN = r'^[A-Z0-9]{10}$'
+URL_PATTERN = r'^https?://[^\s]+$'
+
+# Paliers de prix (borne haute exclue), communs à l'ETL (price_bucket)
+# et à la validation (price_tier); au-delà du dernier: PRICE_TIER_TOP
+PRICE_TIERS = ((25, 'budget'), (50, 'economy'), (100, 'standard'), (500, 'premium'))
+PRICE_TIER_TOP = 'luxury'
+
+Columns = Mapping[str, Any]
+
+_FORMATTER = string.Formatter()
+
+
+def price_tier(price: float) -> str:
+    """Palier d'un prix (PRICE_TIERS)"""
+    for bound, tier in PRICE_TIERS:
+        if price < bound:
+            return tier
+    return PRICE_TIER_TOP
+
+
+def price_tiers(prices: np.ndarray) -> np.ndarray:
+    """Paliers d'un tableau de prix"""
+    return np.select(
+        [prices < bound for bound, _ in PRICE_TIERS],
+        [tier for _, tier in PRICE_TIERS], PRICE_TIER_TOP
+    )
+
+
+class Expr:
+    """
+    Prédicat vectorisé décrit comme donnée: opération + arguments
+    
+    Construit avec col() et les opérateurs (&, |, ~, comparaisons) ou
+    missing() / length() / matches(); compile_expr le transforme en fonction
+    colonnes -> masque booléen.
+    """
+    
+    __slots__ = ('op', 'args')
+    
+    def __init__(self, op: str, *args: Any):
+        self.op = op
+        self.args = args
+    
+    def __and__(self, other: 'Expr') -> 'Expr':
+        return Expr('&', self, other)
+    
+    def __or__(self, other: 'Expr') -> 'Expr':
+        return Expr('|', self, other)
+    
+    def __invert__(self) -> 'Expr':
+        return Expr('~', self)
+    
+    def __lt__(self, other: Any) -> 'Expr':
+        return Expr('<', self, other)
+    
+    def __le__(self, other: Any) -> 'Expr':
+        return Expr('<=', self, other)
+    
+    def __gt__(self, other: Any) -> 'Expr':
+        return Expr('>', self, other)
+    
+    def __ge__(self, other: Any) -> 'Expr':
+        return Expr('>=', self, other)
+    
+    def __eq__(self, other: Any) -> 'Expr':  # type: ignore[override]
+        return Expr('==', self, other)
+    
+    def __ne__(self, other: Any) -> 'Expr':  # type: ignore[override]
+        return Expr('!=', self, other)
+    
+    __hash__ = None  # type: ignore[assignment]
+    
+    def missing(self) -> 'Expr':
+        """Valeur manquante (None / NaN)"""
+        return Expr('missing', self)
+    
+    def length(self) -> 'Expr':
+        """Longueur des chaînes (NaN pour les autres valeurs)"""
+        return Expr('length', self)
+    
+    def matches(self, pattern: str) -> 'Expr':
+        """Chaîne reconnue par pattern (re.match)"""
+        return Expr('matches', self, re.compile(pattern))
+    
+    @property
+    def elementwise(self) -> bool:
+        """Évalué élément par élément en Python (coûteux: matches)"""
+        return self.op == 'matches' or any(isinstance(arg, Expr) and arg.elementwise for arg in self.args)
+    
+    @property
+    def columns(self) -> Set[str]:
+        """Colonnes lues par le prédicat"""
+        if self.op == 'col':
+            return {self.args[0]}
+        return set().union(*(arg.columns for arg in self.args if isinstance(arg, Expr)))
+    
+    def __repr__(self) -> str:
+        if self.op == 'col':
+            return self.args[0]
+        if self.op == '~':
+            return f"~{self.args[0]!r}"
+        if self.op in ('missing', 'length'):
+            return f"{self.op}({self.args[0]!r})"
+        if self.op == 'matches':
+            return f"matches({self.args[0]!r}, {self.args[1].pattern!r})"
+        left, right = self.args
+        return f"({left!r} {self.op} {right!r})"
+
+
+def col(name: str) -> Expr:
+    """Colonne (DataFrame ou dictionnaire de tableaux) utilisée dans un prédicat"""
+    return Expr('col', name)
+
+
+@dataclass(frozen=True, eq=False)
+class Rule:
+    """
+    Règle de validation
+    
+    Attributes:
+        code: Identifiant (rapport d'erreurs ETL, profil)
+        field: Champ auquel l'erreur est rattachée
+        predicate: Lignes en faute
+        severity: 'error' (ligne rejetée) ou 'warning'
+        message: Message, éventuellement avec des {colonne} remplacées par ligne
+        value: Colonne dont la valeur est rapportée avec l'erreur
+    """
+    code: str
+    field: str
+    predicate: Expr
+    severity: str = 'error'
+    message: str = ''
+    value: Optional[str] = None
+    
+    @property
+    def placeholders(self) -> List[str]:
+        return [name for _, name, _, _ in _FORMATTER.parse(self.message) if name]
+    
+    @property
+    def columns(self) -> Set[str]:
+        return self.predicate.columns | set(self.placeholders) | ({self.value} if self.value else set())
+    
+    def render(self, columns: Columns, row: int) -> str:
+        """Message de la ligne row (position)"""
+        placeholders = self.placeholders
+        if not placeholders:
+            return self.message
+        return self.message.format(**{name: _at(columns[name], row) for name in placeholders})
+    
+    def reported(self, columns: Columns, row: int) -> Any:
+        """Valeur rapportée pour la ligne row (None sans colonne value)"""
+        return _at(columns[self.value], row) if self.value else None
+
+
+# === Compilation ===
+
+def _at(values: Any, row: int) -> Any:
+    value = values.iloc[row] if isinstance(values, pd.Series) else values[row]
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _as_mask(values: Any) -> np.ndarray:
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype=bool, na_value=False)
+    return np.asarray(values, dtype=bool)
+
+
+def _lengths(values: Any) -> np.ndarray:
+    if isinstance(values, pd.Series):
+        try:
+            return values.str.len().to_numpy(dtype=float, na_value=np.nan)
+        except AttributeError:
+            values = values.to_numpy(dtype=object)
+    return _LENGTH(np.asarray(values, dtype=object)).astype(float)
+
+
+class _Rows(Mapping):
+    """Colonnes restreintes à certaines lignes (positions)"""
+    
+    def __init__(self, columns: Columns, rows: np.ndarray):
+        self._columns = columns
+        self._rows = rows
+    
+    def __getitem__(self, name: str) -> Any:
+        values = self._columns[name]
+        return values.iloc[self._rows] if isinstance(values, pd.Series) else np.asarray(values)[self._rows]
+    
+    def __iter__(self):
+        return iter(self._columns)
+    
+    def __len__(self) -> int:
+        return len(self._columns)
+
+
+_LENGTH = np.frompyfunc(lambda v: len(v) if isinstance(v, str) else np.nan, 1, 1)
+
+_COMPARE: Dict[str, Callable[[Any, Any], Any]] = {
+    '<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+    '==': np.equal, '!=': np.not_equal
+}
+
+
+def compile_expr(expr: Expr) -> Callable[[Columns], Any]:
+    """Prédicat -> fonction colonnes -> tableau (masque pour les opérations logiques)"""
+    op, args = expr.op, expr.args
+    if op == 'col':
+        name = args[0]
+        return lambda columns: columns[name]
+    
+    operand = compile_expr(args[0])
+    if op == 'missing':
+        return lambda columns: np.asarray(pd.isna(operand(columns)))
+    if op == 'length':
+        return lambda columns: _lengths(operand(columns))
+    if op == '~':
+        return lambda columns: ~_as_mask(operand(columns))
+    if op == 'matches':
+        match = np.frompyfunc(lambda v: isinstance(v, str) and args[1].match(v) is not None, 1, 1)
+        return lambda columns: match(np.asarray(operand(columns), dtype=object)).astype(bool)
+    
+    if isinstance(args[1], Expr):
+        other = compile_expr(args[1])
+    else:
+        other = lambda columns, constant=args[1]: constant
+    if op == '&' and isinstance(args[1], Expr) and args[1].elementwise:
+        # Partie droite coûteuse: évaluée sur les seules lignes retenues à gauche
+        def conjunction(columns: Columns) -> np.ndarray:
+            mask = _as_mask(operand(columns)).copy()
+            if mask.any():
+                mask[mask] = _as_mask(other(_Rows(columns, np.flatnonzero(mask))))
+            return mask
+        return conjunction
+    if op == '&':
+        return lambda columns: _as_mask(operand(columns)) & _as_mask(other(columns))
+    if op == '|':
+        return lambda columns: _as_mask(operand(columns)) | _as_mask(other(columns))
+    compare = _COMPARE[op]
+    return lambda columns: _as_mask(compare(operand(columns), other(columns)))
+
+
+class RuleSet:
+    """
+    Règles compilées et profil d'exécution
+    
+    evaluate() applique chaque règle dont les colonnes sont présentes et
+    chronomètre son prédicat; le profil (appels, lignes, lignes en faute,
+    temps) est cumulé par règle dans le processus courant.
+    """
+    
+    def __init__(self, name: str, rules: List[Rule]):
+        self.name = name
+        self.rules = list(rules)
+        self._compiled = [(rule, compile_expr(rule.predicate)) for rule in self.rules]
+        self._lock = threading.Lock()
+        self.reset_profile()
+    
+    def evaluate(self, columns: Columns) -> List[Tuple[Rule, np.ndarray]]:
+        """(règle, masque des lignes en faute) dans l'ordre du registre"""
+        results = []
+        for rule, predicate in self._compiled:
+            if not all(name in columns for name in rule.columns):
+                continue
+            start = time.perf_counter()
+            mask = _as_mask(predicate(columns))
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                profile = self._profile[rule.code]
+                profile['calls'] += 1
+                profile['rows'] += len(mask)
+                profile['hits'] += int(mask.sum())
+                profile['seconds'] += elapsed
+            results.append((rule, mask))
+        return results
+    
+    def describe(self) -> List[Dict[str, Any]]:
+        """Règles et profil cumulé (coût par ligne en nanosecondes)"""
+        with self._lock:
+            profiles = {code: dict(profile) for code, profile in self._profile.items()}
+        described = []
+        for rule in self.rules:
+            profile = profiles[rule.code]
+            described.append({
+                'code': rule.code,
+                'field': rule.field,
+                'severity': rule.severity,
+                'predicate': repr(rule.predicate),
+                'message': rule.message,
+                **profile,
+                'seconds': round(profile['seconds'], 6),
+                'ns_per_row': round(profile['seconds'] * 1e9 / profile['rows'], 1) if profile['rows'] else 0.0
+            })
+        return described
+    
+    def reset_profile(self) -> None:
+        with self._lock:
+            self._profile = {
+                rule.code: {'calls': 0, 'rows': 0, 'hits': 0, 'seconds': 0.0} for rule in self.rules
+            }
+
+
+# === Registre ===
+
+# ETL: colonnes du DataFrame nettoyé, plus asin_duplicate (doublons du bloc et
+# des blocs précédents); une erreur rejette la ligne
+ETL_RULES = [
+    Rule('asin_invalid', 'asin', col('asin').missing() | (col('asin').length() != ASIN_LENGTH),
+         'error', 'ASIN invalide (doit faire 10 caractères)', value='asin'),
+    Rule('asin_duplicate', 'asin', col('asin_duplicate'),
+         'warning', 'ASIN en doublon', value='asin'),
+    Rule('title_invalid', 'title', col('title').missing() | (col('title').length() < 3),
+         'error', 'Titre manquant ou trop court', value='title'),
+    Rule('price_invalid', 'price', col('price') <= 0,
+         'error', 'Prix invalide (doit être > 0)', value='price'),
+]
+
+# API de validation, par champ: valeurs brutes et colonnes préparées par
+# DataValidationService (<champ>_present, _clean, _length, _value, _invalid...)
+PRODUCT_RULES = [
+    Rule('asin_missing', 'asin', ~col('asin_present'), 'error', 'ASIN manquant'),
+    Rule('asin_length', 'asin', col('asin_present') & (col('asin_length') != ASIN_LENGTH),
+         'error', 'ASIN doit avoir 10 caractères (trouvé: {asin_length})', value='asin'),
+    Rule('asin_format', 'asin',
+         col('asin_present') & (col('asin_length') == ASIN_LENGTH) & ~col('asin_clean').matches(ASIN_PATTERN),
+         'error', 'Format ASIN invalide', value='asin'),
+    Rule('title_missing', 'title', ~col('title_present'), 'error', 'Titre manquant'),
+    Rule('title_short', 'title', col('title_present') & (col('title_length') < 5),
+         'warning', 'Titre très court', value='title_clean'),
+    Rule('title_long', 'title', col('title_present') & (col('title_length') > 300),
+         'warning', 'Titre tronqué (trop long)'),
+    Rule('price_missing', 'price', col('price_missing'), 'warning', 'Prix manquant, défaut à 0'),
+    Rule('price_format', 'price', col('price_bad_format'), 'error', 'Format de prix invalide', value='price'),
+    Rule('price_unconvertible', 'price', col('price_unconvertible'), 'error', 'Prix non convertible', value='price'),
+    Rule('price_negative', 'price', col('price_value') < 0, 'error', 'Prix négatif', value='price'),
+    Rule('price_high', 'price', col('price_value') > 100000,
+         'warning', 'Prix exceptionnellement élevé', value='price_value'),
+    Rule('rating_negative', 'rating', col('rating_value') < 0, 'warning', 'Rating négatif corrigé', value='rating'),
+    Rule('rating_above', 'rating', col('rating_value') > 5, 'warning', 'Rating > 5 corrigé', value='rating'),
+    Rule('rating_invalid', 'rating', col('rating_invalid'), 'warning', 'Rating invalide, défaut à 0', value='rating'),
+    Rule('review_count_negative', 'review_count', col('review_count_value') < 0,
+         'warning', "Nombre d'avis négatif corrigé", value='review_count_source'),
+    Rule('review_count_invalid', 'review_count', col('review_count_invalid'),
+         'warning', "Nombre d'avis invalide", value='review_count_source'),
+    Rule('rank_not_positive', 'rank', col('rank_converted') & (col('rank_value') <= 0),
+         'warning', 'Rang invalide (<= 0)', value='rank_source'),
+    Rule('rank_high', 'rank', col('rank_value') > 10000000,
+         'warning', 'Rang exceptionnellement élevé', value='rank_source'),
+    Rule('rank_invalid', 'rank', col('rank_invalid'), 'warning', 'Rang non convertible', value='rank_source'),
+    Rule('stock_negative', 'stock', col('stock_value') < 0, 'warning', 'Stock négatif corrigé', value='stock'),
+    Rule('stock_invalid', 'stock', col('stock_invalid'), 'warning', 'Stock invalide', value='stock'),
+    Rule('category_short', 'category', col('category_present') & (col('category_length') < 2),
+         'warning', 'Catégorie très courte', value='category_clean'),
+    Rule('image_url_invalid', 'image_url', col('image_url_present') & ~col('image_url_clean').matches(URL_PATTERN),
+         'warning', "URL d'image invalide", value='image_url_excerpt'),
+]
+
+# API de validation, entre champs: colonnes nettoyées (rank à 0 si absent)
+CROSS_RULES = [
+    Rule('suspicious_rating', 'cross_validation', (col('rating') >= 4.8) & (col('review_count') < 10),
+         'warning', "Rating excellent ({rating}) avec peu d'avis ({review_count}) - suspect"),
+    Rule('top_rank_low_rating', 'cross_validation',
+         (col('rank') > 0) & (col('rank') < 100) & (col('rating') < 3.5),
+         'warning', 'Top 100 (rang {rank}) avec rating faible ({rating})'),
+    Rule('free_in_stock', 'cross_validation', (col('price') == 0) & (col('stock') > 0),
+         'warning', 'Prix à 0 avec stock disponible - vérifier'),
+]
+
+# Instances singleton
+etl_rules = RuleSet('etl', ETL_RULES)
+product_rules = RuleSet('product', PRODUCT_RULES)
+cross_rules = RuleSet('cross', CROSS_RULES)
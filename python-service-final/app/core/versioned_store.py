@@ -0,0 +1,107 @@
+"""
+Versioned Store - Versions immuables publiées par un fichier de version
+Base commune des snapshots de recherche et des recommandations matérialisées
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class VersionedStore:
+    """
+    Écriture dans un dossier temporaire, renommage, puis remplacement
+    atomique du fichier de version: un lecteur (autre worker) ne voit que
+    des versions complètes. Les versions les plus anciennes au-delà de
+    `keep` sont supprimées.
+
+    Arborescence:
+        <base_dir>/<VERSION_FILE>            -> nom de la version courante
+        <base_dir>/<VERSIONS_DIR>/<version>/ -> fichiers de la version + meta.json
+    """
+
+    VERSION_FILE = 'current.version'
+    VERSIONS_DIR = ''  # Sous-dossier des versions ('' = base_dir)
+
+    def __init__(self, base_dir: str, keep: int = 2):
+        self.base_dir = Path(base_dir)
+        self.keep = max(1, keep)
+        self._lock = threading.Lock()
+
+    @property
+    def version_file(self) -> Path:
+        return self.base_dir / self.VERSION_FILE
+
+    @property
+    def versions_dir(self) -> Path:
+        return self.base_dir / self.VERSIONS_DIR
+
+    def current_version(self) -> Optional[str]:
+        """Lit la version publiée (None si aucune)"""
+        try:
+            return self.version_file.read_text(encoding='utf-8').strip() or None
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ Lecture version impossible ({self.version_file}): {e}")
+            return None
+
+    def read_meta(self, version: str) -> Dict[str, Any]:
+        return json.loads((self.versions_dir / version / 'meta.json').read_text(encoding='utf-8'))
+
+    def _write_version(self, write: Callable[[Path], Dict[str, Any]]) -> Optional[str]:
+        """
+        Écrit une nouvelle version puis la publie
+
+        Args:
+            write: écrit les fichiers dans le dossier donné et retourne les
+                métadonnées propres au store (ajoutées à meta.json)
+
+        Returns:
+            Nom de la version publiée, ou None en cas d'erreur
+        """
+        with self._lock:
+            version = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+            tmp = self.versions_dir / f".{version}.tmp"
+
+            try:
+                tmp.mkdir(parents=True, exist_ok=True)
+                meta = {
+                    'version': version,
+                    'created_at': datetime.now().isoformat(),
+                    'created_ts': time.time(),
+                    **write(tmp)
+                }
+                (tmp / 'meta.json').write_text(json.dumps(meta), encoding='utf-8')
+
+                tmp.rename(self.versions_dir / version)
+                self._publish(version)
+                self._prune()
+                return version
+
+            except Exception as e:
+                logger.error(f"❌ Erreur sauvegarde version {version} ({self.base_dir}): {e}")
+                shutil.rmtree(tmp, ignore_errors=True)
+                return None
+
+    def _publish(self, version: str) -> None:
+        """Remplace atomiquement le fichier de version"""
+        tmp = self.version_file.with_suffix('.tmp')
+        tmp.write_text(version, encoding='utf-8')
+        os.replace(tmp, self.version_file)
+
+    def _prune(self) -> None:
+        """Supprime les anciennes versions"""
+        versions = sorted(
+            p for p in self.versions_dir.iterdir()
+            if p.is_dir() and not p.name.startswith('.')
+        )
+        for old in versions[:-self.keep]:
+            shutil.rmtree(old, ignore_errors=True)
@@ -46,13 +46,30 @@ async def lifespan(app: FastAPI):
     logger.info("=" * 70)
     
     # Crée les répertoires
-    for dir_path in [settings.upload_dir, settings.processed_dir, settings.models_dir, "logs"]:
+    for dir_path in [settings.upload_dir, settings.processed_dir, settings.models_dir,
+                     settings.recommendations_dir, settings.etl_jobs_dir, "logs"]:
         Path(dir_path).mkdir(parents=True, exist_ok=True)
     
+    # Jobs ETL en arrière-plan (reprise des jobs interrompus)
+    from app.services.etl_jobs import etl_job_runner
+    await etl_job_runner.start()
+    
+    # Charge le dernier snapshot de l'index de recherche (démarrage à froid)
+    from app.services.search_service import search_service
+    if search_service.load_snapshot():
+        logger.info(f"[EMB] Index de recherche restauré: {search_service.snapshot_version}")
+        from app.services.autocomplete_service import autocomplete_service
+        autocomplete_service.refresh_from_snapshot()
+    
+    # Recommandations matérialisées du dernier job batch
+    from app.services.recommendation_service import recommendation_service
+    recommendation_service.load_materialized()
+    
     yield
     
     # Shutdown
     logger.info("[STOP] ARRET DU SERVICE")
+    await etl_job_runner.stop()
     from app.services.java_client import java_client
     await java_client.close()
 
@@ -117,10 +117,17 @@ class ETLProcessingResult(BaseModel):
     invalid_rows: int
     products: List[ProductResponse] = []
     classifications: List[ProductClassification] = []
-    errors: List[ETLValidationError] = []
+    errors: List[ETLValidationError] = []  # Premières erreurs seulement (MAX_INLINE_ERRORS)
+    errors_total: int = 0
+    error_counts: Dict[str, int] = {}  # Erreurs par règle (asin_invalid, conversion...)
+    error_report: Optional[str] = None  # Rapport CSV complet (GET /api/etl/reports/{nom})
     warnings: List[str] = []
     processing_time_ms: float
     summary: Dict[str, Any] = {}
+    output_file: Optional[str] = None  # Fichier produit en mode streaming
+    columnar_file: Optional[str] = None  # Copie Arrow typée de output_file (pyarrow)
+    file_sha256: Optional[str] = None  # Empreinte du fichier uploadé
+    cached: bool = False  # Résultat repris du cache (fichier déjà traité)
 
 
 class ETLImportResult(BaseModel):
@@ -173,6 +180,27 @@ class SearchResponse(BaseModel):
     filters_applied: Dict[str, Any] = {}
 
 
+class SimilarProductsBatchRequest(BaseModel):
+    """Requête de produits similaires pour plusieurs produits"""
+    product_ids: List[int] = Field(..., min_length=1, max_length=200)
+    top_k: int = Field(5, ge=1, le=50)
+    exclude_input: bool = False
+
+
+class SimilarProductsBatchResponse(BaseModel):
+    """Produits similaires par produit source"""
+    results: Dict[int, List[SearchResult]]
+    not_found: List[int] = []
+    search_time_ms: float
+
+
+class CartRecommendationRequest(BaseModel):
+    """Requête de recommandations pour un panier"""
+    product_ids: List[int] = Field(..., min_length=1, max_length=50)
+    limit: int = Field(10, ge=1, le=50)
+    merge: str = Field("sum", pattern="^(sum|max)$")  # Fusion des scores par produit du panier
+
+
 class IndexStatusResponse(BaseModel):
     """Statut de l'index"""
     is_ready: bool
@@ -180,6 +208,7 @@ class IndexStatusResponse(BaseModel):
     embedding_model: str
     last_updated: Optional[datetime] = None
     index_size_mb: Optional[float] = None
+    snapshot_version: Optional[str] = None
 
 
 # ============================================
@@ -1,19 +1,28 @@
 """
 Services Module
 Contient tous les services métier de l'application
+
+Exports importés à la demande: un processus de calcul (spawn/forkserver) qui
+charge un module de services n'instancie pas les autres singletons (modèle
+d'embeddings de la recherche, modèles ML).
 """
-from app.services.ml_service_unified import MLService, ml_service
-from app.services.analytics_service import AnalyticsService
-from app.services.recommendation_service import RecommendationService
-from app.services.sync_service import SyncService
-from app.services.validation_service import DataValidationService, validation_service
+import importlib
+
+_EXPORTS = {
+    'MLService': 'app.services.ml_service_unified',
+    'ml_service': 'app.services.ml_service_unified',
+    'AnalyticsService': 'app.services.analytics_service',
+    'RecommendationService': 'app.services.recommendation_service',
+    'SyncService': 'app.services.sync_service',
+    'DataValidationService': 'app.services.validation_service',
+    'validation_service': 'app.services.validation_service'
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = [
-    'MLService',
-    'ml_service',
-    'AnalyticsService', 
-    'RecommendationService',
-    'SyncService',
-    'DataValidationService',
-    'validation_service'
-]
\ No newline at end of file
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
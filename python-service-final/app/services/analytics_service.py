@@ -19,6 +19,68 @@ except ImportError:
     PANDAS_AVAILABLE = False
 
 
+def _top_n(values: np.ndarray, n: int) -> np.ndarray:
+    """
+    Positions des n plus petites valeurs, dans l'ordre d'un tri stable
+    
+    argpartition isole les n premières sans trier tout le tableau; les
+    ex aequo à la frontière sont départagés par position, comme sorted().
+    """
+    if len(values) <= n:
+        return np.argsort(values, kind='stable')
+    kth = values[np.argpartition(values, n - 1)[n - 1]]
+    below = np.flatnonzero(values < kth)
+    chosen = np.concatenate([below, np.flatnonzero(values == kth)[:n - len(below)]])
+    return chosen[np.argsort(values[chosen], kind='stable')]
+
+
+def _group_mean(codes: np.ndarray, values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Moyenne par groupe (0 pour un groupe vide)"""
+    sums = np.bincount(codes, weights=values, minlength=len(counts))
+    return np.divide(sums, counts, out=np.zeros(len(counts)), where=counts > 0)
+
+
+class ProductColumns:
+    """
+    Produits convertis une fois en colonnes NumPy
+    
+    Champs numériques lus comme `p.get(champ) or 0`: `values` garde les objets
+    Python (restitués tels quels dans les réponses), `numbers` leur version
+    float64 pour les calculs. Catégories codées par ordre de première
+    apparition (groupby par np.bincount).
+    """
+    
+    NUMERIC = ('price', 'rating', 'review_count', 'rank', 'stock')
+    
+    def __init__(self, products: List[Dict[str, Any]]):
+        self.products = products
+        self.size = len(products)
+        self.values: Dict[str, np.ndarray] = {}
+        self.numbers: Dict[str, np.ndarray] = {}
+        for name in self.NUMERIC:
+            values = np.empty(self.size, dtype=object)
+            values[:] = [p.get(name) or 0 for p in products]
+            self.values[name] = values
+            self.numbers[name] = values.astype(float)
+        
+        index: Dict[Any, int] = {}
+        self.category_codes = np.fromiter(
+            (index.setdefault(p.get('category') or p.get('category_name', 'Unknown'), len(index)) for p in products),
+            dtype=np.int64, count=self.size
+        )
+        self.categories = list(index)
+    
+    def ranks(self, default: int) -> np.ndarray:
+        """Rangs, `default` pour un rang absent ou nul"""
+        rank = self.numbers['rank']
+        return np.where(rank == 0, default, rank)
+    
+    def item(self, row: int, title_length: int) -> Dict[str, Any]:
+        """id et titre tronqué d'un produit"""
+        product = self.products[row]
+        return {'id': product.get('id'), 'title': (product.get('title') or '')[:title_length]}
+
+
 class AnalyticsService:
     """
     Service d'analytics avancées pour l'e-commerce
@@ -29,12 +91,46 @@ class AnalyticsService:
     - Prédiction de ventes
     - Segmentation produits
     - Détection d'anomalies
+    
+    Chaque analyse travaille sur ProductColumns; build_dashboard convertit
+    les produits une seule fois pour les cinq.
     """
     
+    # Segments (matrice BCG): nom, description, action
+    SEGMENTS = (
+        ('stars', 'Haute performance, forte demande', 'Maintenir et promouvoir'),
+        ('cash_cows', 'Revenus stables', 'Optimiser les marges'),
+        ('question_marks', 'Potentiel incertain', 'Investir ou abandonner'),
+        ('dogs', 'Faible performance', 'Liquider ou repositionner')
+    )
+    
     def __init__(self):
         self.cache = {}
         self.cache_ttl = 300  # 5 minutes
     
+    def build_dashboard(
+        self,
+        products: List[Dict[str, Any]],
+        days_ahead: int = 30
+    ) -> Dict[str, Any]:
+        """
+        KPIs, tendances, demande, segments et anomalies en une conversion
+        
+        Seuls les 10 produits les plus urgents sont détaillés pour la demande.
+        """
+        columns = ProductColumns(products)
+        demand = self._demand(columns, days_ahead)
+        return {
+            'kpis': self._product_kpis(columns),
+            'trends': self._trends(columns),
+            'demand_predictions': {
+                'urgent_restock': int((demand['urgency'] == 'HIGH').sum()),
+                'top_10_urgent': self._demand_items(columns, demand, _top_n(demand['stockout'], 10))
+            },
+            'segments': self._segments(columns),
+            'anomalies': self._anomalies(columns)
+        }
+    
     # ==================== KPIs ====================
     
     def calculate_product_kpis(self, products: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -47,66 +143,65 @@ class AnalyticsService:
         Returns:
             Dictionnaire de KPIs
         """
-        if not products:
+        return self._product_kpis(ProductColumns(products))
+    
+    def _product_kpis(self, columns: ProductColumns) -> Dict[str, Any]:
+        if not columns.size:
             return self._empty_kpis()
         
-        prices = [p.get('price', 0) or 0 for p in products]
-        ratings = [p.get('rating', 0) or 0 for p in products]
-        stocks = [p.get('stock', 0) or 0 for p in products]
-        ranks = [p.get('rank', 0) or 0 for p in products if p.get('rank')]
-        
-        total_products = len(products)
-        in_stock = sum(1 for s in stocks if s > 0)
-        out_of_stock = sum(1 for s in stocks if s == 0)
-        low_stock = sum(1 for s in stocks if 0 < s <= 10)
+        prices = columns.numbers['price']
+        ratings = columns.numbers['rating']
+        stocks = columns.numbers['stock']
+        ranked = np.flatnonzero(columns.numbers['rank'] != 0)
+        ranks = columns.numbers['rank'][ranked]
         
-        # Valeur d'inventaire
-        inventory_value = sum(p.get('price', 0) * p.get('stock', 0) for p in products)
+        total_products = columns.size
+        in_stock = int((stocks > 0).sum())
         
-        # Top performers
-        sorted_by_rating = sorted(products, key=lambda x: x.get('rating', 0) or 0, reverse=True)
-        sorted_by_rank = sorted([p for p in products if p.get('rank')], key=lambda x: x.get('rank', 99999))
+        # Top performers: top 5 sans trier tout le catalogue
+        top_rated = _top_n(-ratings, 5)
+        top_ranked = ranked[_top_n(ranks, 5)]
         
         return {
             'total_products': total_products,
             'in_stock': in_stock,
-            'out_of_stock': out_of_stock,
-            'low_stock': low_stock,
-            'stock_rate': round(in_stock / total_products * 100, 1) if total_products > 0 else 0,
+            'out_of_stock': int((stocks == 0).sum()),
+            'low_stock': int(((stocks > 0) & (stocks <= 10)).sum()),
+            'stock_rate': round(in_stock / total_products * 100, 1),
             
             'price_stats': {
-                'average': round(np.mean(prices), 2) if prices else 0,
-                'median': round(np.median(prices), 2) if prices else 0,
-                'min': round(min(prices), 2) if prices else 0,
-                'max': round(max(prices), 2) if prices else 0,
-                'std': round(np.std(prices), 2) if prices else 0
+                'average': round(np.mean(prices), 2),
+                'median': round(np.median(prices), 2),
+                'min': round(prices.min(), 2),
+                'max': round(prices.max(), 2),
+                'std': round(np.std(prices), 2)
             },
             
             'rating_stats': {
-                'average': round(np.mean(ratings), 2) if ratings else 0,
-                'excellent': sum(1 for r in ratings if r >= 4.5),
-                'good': sum(1 for r in ratings if 4.0 <= r < 4.5),
-                'moderate': sum(1 for r in ratings if 3.0 <= r < 4.0),
-                'poor': sum(1 for r in ratings if r < 3.0 and r > 0)
+                'average': round(np.mean(ratings), 2),
+                'excellent': int((ratings >= 4.5).sum()),
+                'good': int(((ratings >= 4.0) & (ratings < 4.5)).sum()),
+                'moderate': int(((ratings >= 3.0) & (ratings < 4.0)).sum()),
+                'poor': int(((ratings < 3.0) & (ratings > 0)).sum())
             },
             
             'rank_stats': {
-                'average': round(np.mean(ranks), 0) if ranks else 0,
-                'top_100': sum(1 for r in ranks if r <= 100),
-                'top_1000': sum(1 for r in ranks if r <= 1000),
-                'low_performers': sum(1 for r in ranks if r > 10000)
+                'average': round(np.mean(ranks), 0) if len(ranks) else 0,
+                'top_100': int((ranks <= 100).sum()),
+                'top_1000': int((ranks <= 1000).sum()),
+                'low_performers': int((ranks > 10000).sum())
             },
             
-            'inventory_value': round(inventory_value, 2),
+            'inventory_value': round(float(np.dot(prices, stocks)), 2),
             
             'top_rated': [
-                {'id': p.get('id'), 'title': p.get('title', '')[:50], 'rating': p.get('rating')}
-                for p in sorted_by_rating[:5]
+                {**columns.item(row, 50), 'rating': columns.products[row].get('rating')}
+                for row in top_rated.tolist()
             ],
             
             'top_ranked': [
-                {'id': p.get('id'), 'title': p.get('title', '')[:50], 'rank': p.get('rank')}
-                for p in sorted_by_rank[:5]
+                {**columns.item(row, 50), 'rank': columns.products[row].get('rank')}
+                for row in top_ranked.tolist()
             ]
         }
     
@@ -145,71 +240,56 @@ class AnalyticsService:
             products: Produits actuels
             historical_data: Données historiques (optionnel)
         """
-        if not products:
+        return self._trends(ProductColumns(products))
+    
+    def _trends(self, columns: ProductColumns) -> Dict[str, Any]:
+        if not columns.size:
             return {'error': 'Pas de produits à analyser'}
         
-        # Analyse par catégorie
-        category_analysis = {}
-        for p in products:
-            cat = p.get('category') or p.get('category_name', 'Unknown')
-            if cat not in category_analysis:
-                category_analysis[cat] = {
-                    'count': 0,
-                    'total_revenue_potential': 0,
-                    'avg_rating': [],
-                    'avg_price': [],
-                    'in_stock': 0
-                }
-            
-            category_analysis[cat]['count'] += 1
-            category_analysis[cat]['total_revenue_potential'] += (p.get('price', 0) or 0) * (p.get('stock', 0) or 0)
-            if p.get('rating'):
-                category_analysis[cat]['avg_rating'].append(p.get('rating'))
-            category_analysis[cat]['avg_price'].append(p.get('price', 0) or 0)
-            if (p.get('stock', 0) or 0) > 0:
-                category_analysis[cat]['in_stock'] += 1
-        
-        # Calcul des moyennes
-        for cat, data in category_analysis.items():
-            data['avg_rating'] = round(np.mean(data['avg_rating']), 2) if data['avg_rating'] else 0
-            data['avg_price'] = round(np.mean(data['avg_price']), 2) if data['avg_price'] else 0
-            data['stock_rate'] = round(data['in_stock'] / data['count'] * 100, 1) if data['count'] > 0 else 0
-        
-        # Tri par performance
-        sorted_categories = sorted(
-            category_analysis.items(),
-            key=lambda x: x[1]['total_revenue_potential'],
-            reverse=True
-        )
+        prices = columns.numbers['price']
+        ratings = columns.numbers['rating']
+        stocks = columns.numbers['stock']
+        codes = columns.category_codes
+        
+        # Analyse par catégorie (agrégats groupés)
+        counts = np.bincount(codes)
+        revenue = np.bincount(codes, weights=prices * stocks)
+        rated = ratings != 0
+        avg_rating = np.round(_group_mean(codes[rated], ratings[rated], np.bincount(codes[rated], minlength=len(counts))), 2)
+        stock_rate = np.round(np.bincount(codes[stocks > 0], minlength=len(counts)) / counts * 100, 1)
+        
+        # Tri par performance (ex aequo: ordre d'apparition)
+        order = np.argsort(-revenue, kind='stable').tolist()
+        names = columns.categories
         
         # Identification des tendances
         trends = {
             'top_categories': [
                 {
-                    'name': cat,
-                    'products': data['count'],
-                    'avg_rating': data['avg_rating'],
-                    'revenue_potential': round(data['total_revenue_potential'], 2)
+                    'name': names[cat],
+                    'products': int(counts[cat]),
+                    'avg_rating': float(avg_rating[cat]),
+                    'revenue_potential': round(float(revenue[cat]), 2)
                 }
-                for cat, data in sorted_categories[:5]
+                for cat in order[:5]
             ],
             'underperforming_categories': [
                 {
-                    'name': cat,
-                    'products': data['count'],
-                    'avg_rating': data['avg_rating'],
-                    'stock_rate': data['stock_rate']
+                    'name': names[cat],
+                    'products': int(counts[cat]),
+                    'avg_rating': float(avg_rating[cat]),
+                    'stock_rate': float(stock_rate[cat])
                 }
-                for cat, data in sorted_categories[-3:]
-                if data['avg_rating'] < 4.0 or data['stock_rate'] < 50
+                for cat in order[-3:]
+                if avg_rating[cat] < 4.0 or stock_rate[cat] < 50
             ],
             'insights': []
         }
         
         # Génère des insights
-        total_products = len(products)
-        out_of_stock = sum(1 for p in products if (p.get('stock', 0) or 0) == 0)
-        low_rated = sum(1 for p in products if (p.get('rating', 0) or 0) < 3.5 and (p.get('rating', 0) or 0) > 0)
+        total_products = columns.size
+        out_of_stock = int((stocks == 0).sum())
+        low_rated = int(((ratings < 3.5) & (ratings > 0)).sum())
         
         if out_of_stock > total_products * 0.1:
             trends['insights'].append({
@@ -223,12 +303,11 @@ class AnalyticsService:
                 'message': f"⚠️ {low_rated} produits avec notes faibles (<3.5)"
             })
         
-        if sorted_categories:
-            best_cat = sorted_categories[0]
-            trends['insights'].append({
-                'type': 'success',
-                'message': f"✅ Meilleure catégorie: {best_cat[0]} ({best_cat[1]['count']} produits)"
-            })
+        best = order[0]
+        trends['insights'].append({
+            'type': 'success',
+            'message': f"✅ Meilleure catégorie: {names[best]} ({counts[best]} produits)"
+        })
         
         return trends
     
@@ -244,79 +323,68 @@ class AnalyticsService:
         - Nombre d'avis
         - Rang actuel
         - Stock disponible
-        """
-        predictions = []
         
-        for p in products:
-            rating = p.get('rating', 0) or 0
-            reviews = p.get('review_count', 0) or 0
-            rank = p.get('rank', 10000) or 10000
-            stock = p.get('stock', 0) or 0
-            price = p.get('price', 0) or 0
-            
-            # Score de demande basé sur les métriques
-            demand_score = 0
-            
+        Triée par urgence de réapprovisionnement (jours avant rupture).
+        """
+        columns = ProductColumns(products)
+        demand = self._demand(columns, days_ahead)
+        return self._demand_items(columns, demand, np.argsort(demand['stockout'], kind='stable'))
+    
+    def _demand(self, columns: ProductColumns, days_ahead: int) -> Dict[str, np.ndarray]:
+        """Scores de demande et jours avant rupture de tout le catalogue"""
+        rating = columns.numbers['rating']
+        reviews = columns.numbers['review_count']
+        rank = columns.ranks(10000)
+        stock = columns.numbers['stock']
+        price = columns.numbers['price']
+        priced = price > 0
+        
+        demand_score = (
             # Impact du rating (0-30 points)
-            if rating >= 4.5:
-                demand_score += 30
-            elif rating >= 4.0:
-                demand_score += 20
-            elif rating >= 3.5:
-                demand_score += 10
-            
+            np.select([rating >= 4.5, rating >= 4.0, rating >= 3.5], [30, 20, 10], 0)
             # Impact des avis (0-30 points)
-            if reviews >= 1000:
-                demand_score += 30
-            elif reviews >= 500:
-                demand_score += 25
-            elif reviews >= 100:
-                demand_score += 15
-            elif reviews >= 50:
-                demand_score += 10
-            
+            + np.select([reviews >= 1000, reviews >= 500, reviews >= 100, reviews >= 50], [30, 25, 15, 10], 0)
             # Impact du rang (0-25 points)
-            if rank <= 100:
-                demand_score += 25
-            elif rank <= 500:
-                demand_score += 20
-            elif rank <= 1000:
-                demand_score += 15
-            elif rank <= 5000:
-                demand_score += 10
-            
+            + np.select([rank <= 100, rank <= 500, rank <= 1000, rank <= 5000], [25, 20, 15, 10], 0)
             # Impact du prix (0-15 points) - prix compétitifs
-            if price > 0:
-                if price < 50:
-                    demand_score += 15
-                elif price < 100:
-                    demand_score += 10
-                elif price < 200:
-                    demand_score += 5
-            
-            # Prédiction de ventes par jour
-            daily_demand = demand_score / 10  # 0-10 unités/jour
-            predicted_sales = round(daily_demand * days_ahead)
-            
-            # Stock suffisant?
-            days_until_stockout = round(stock / daily_demand) if daily_demand > 0 else float('inf')
-            restock_needed = max(0, predicted_sales - stock)
-            
+            + np.select([priced & (price < 50), priced & (price < 100), priced & (price < 200)], [15, 10, 5], 0)
+        )
+        
+        # Prédiction de ventes par jour (0-10 unités/jour)
+        daily_demand = demand_score / 10
+        selling = daily_demand > 0
+        days_until_stockout = np.full(columns.size, np.inf)
+        days_until_stockout[selling] = np.round(stock[selling] / daily_demand[selling])
+        
+        return {
+            'score': demand_score,
+            'daily': daily_demand,
+            'predicted': np.round(daily_demand * days_ahead),
+            'stockout': np.minimum(days_until_stockout, 999),
+            'urgency': np.select(
+                [days_until_stockout < 7, days_until_stockout < 30], ['HIGH', 'MEDIUM'], 'LOW'
+            )
+        }
+    
+    def _demand_items(
+        self, columns: ProductColumns, demand: Dict[str, np.ndarray], rows: np.ndarray
+    ) -> List[Dict[str, Any]]:
+        """Prédictions détaillées des lignes rows (dans cet ordre)"""
+        predictions = []
+        for row in rows.tolist():
+            stock = columns.values['stock'][row]
+            predicted_sales = int(demand['predicted'][row])
             predictions.append({
-                'product_id': p.get('id'),
-                'title': p.get('title', '')[:60],
+                'product_id': columns.products[row].get('id'),
+                'title': columns.item(row, 60)['title'],
                 'current_stock': stock,
-                'demand_score': demand_score,
-                'predicted_daily_demand': round(daily_demand, 2),
+                'demand_score': int(demand['score'][row]),
+                'predicted_daily_demand': round(float(demand['daily'][row]), 2),
                 'predicted_sales_30d': predicted_sales,
-                'days_until_stockout': min(days_until_stockout, 999),
-                'restock_needed': restock_needed,
-                'restock_urgency': 'HIGH' if days_until_stockout < 7 else 'MEDIUM' if days_until_stockout < 30 else 'LOW'
+                'days_until_stockout': int(demand['stockout'][row]),
+                'restock_needed': max(0, predicted_sales - stock),
+                'restock_urgency': str(demand['urgency'][row])
             })
-        
-        # Tri par urgence de réapprovisionnement
-        predictions.sort(key=lambda x: x['days_until_stockout'])
-        
         return predictions
     
     # ==================== SEGMENTATION ====================
@@ -331,71 +399,45 @@ class AnalyticsService:
         - Question Marks: Potentiel incertain
         - Dogs: Faible performance
         """
-        segments = {
-            'stars': [],
-            'cash_cows': [],
-            'question_marks': [],
-            'dogs': []
-        }
-        
-        for p in products:
-            rating = p.get('rating', 0) or 0
-            reviews = p.get('review_count', 0) or 0
-            rank = p.get('rank', 99999) or 99999
-            stock = p.get('stock', 0) or 0
-            price = p.get('price', 0) or 0
-            
-            product_info = {
-                'id': p.get('id'),
-                'title': p.get('title', '')[:50],
-                'price': price,
-                'rating': rating,
-                'rank': rank,
-                'stock': stock
+        return self._segments(ProductColumns(products))
+    
+    def _segments(self, columns: ProductColumns) -> Dict[str, Any]:
+        rating = columns.numbers['rating']
+        reviews = columns.numbers['review_count']
+        rank = columns.ranks(99999)
+        stock = columns.numbers['stock']
+        rank_values = np.where(columns.numbers['rank'] == 0, 99999, columns.values['rank'])
+        
+        # Classification: premier segment dont la condition est remplie
+        segment = np.select([
+            (rating >= 4.5) & (rank <= 1000) & (reviews >= 100),
+            (rating >= 4.0) & (rank <= 5000) & (stock > 0),
+            (rating >= 3.5) & (rank > 5000) & (reviews < 50)
+        ], [0, 1, 2], 3)
+        counts = np.bincount(segment, minlength=len(self.SEGMENTS))
+        
+        segments = {}
+        for code, (name, description, action) in enumerate(self.SEGMENTS):
+            segments[name] = {
+                'count': int(counts[code]),
+                'description': description,
+                'action': action,
+                'products': [
+                    {
+                        **columns.item(row, 50),
+                        'price': columns.values['price'][row],
+                        'rating': columns.values['rating'][row],
+                        'rank': rank_values[row],
+                        'stock': columns.values['stock'][row]
+                    }
+                    for row in np.flatnonzero(segment == code)[:10].tolist()
+                ]
             }
-            
-            # Classification
-            if rating >= 4.5 and rank <= 1000 and reviews >= 100:
-                segments['stars'].append(product_info)
-            elif rating >= 4.0 and rank <= 5000 and stock > 0:
-                segments['cash_cows'].append(product_info)
-            elif rating >= 3.5 and rank > 5000 and reviews < 50:
-                segments['question_marks'].append(product_info)
-            else:
-                segments['dogs'].append(product_info)
-        
-        # Statistiques par segment
-        summary = {
-            'segments': {
-                'stars': {
-                    'count': len(segments['stars']),
-                    'description': 'Haute performance, forte demande',
-                    'action': 'Maintenir et promouvoir',
-                    'products': segments['stars'][:10]
-                },
-                'cash_cows': {
-                    'count': len(segments['cash_cows']),
-                    'description': 'Revenus stables',
-                    'action': 'Optimiser les marges',
-                    'products': segments['cash_cows'][:10]
-                },
-                'question_marks': {
-                    'count': len(segments['question_marks']),
-                    'description': 'Potentiel incertain',
-                    'action': 'Investir ou abandonner',
-                    'products': segments['question_marks'][:10]
-                },
-                'dogs': {
-                    'count': len(segments['dogs']),
-                    'description': 'Faible performance',
-                    'action': 'Liquider ou repositionner',
-                    'products': segments['dogs'][:10]
-                }
-            },
-            'total_analyzed': len(products)
-        }
         
-        return summary
+        return {
+            'segments': segments,
+            'total_analyzed': columns.size
+        }
     
     # ==================== ANOMALIES ====================
     
@@ -409,82 +451,88 @@ class AnalyticsService:
         - Rating suspect
         - Incohérences
         """
-        anomalies = {
-            'price_anomalies': [],
-            'stock_critical': [],
-            'rating_suspicious': [],
-            'data_inconsistencies': []
-        }
-        
-        # Calcul des statistiques pour la détection
-        prices = [p.get('price', 0) or 0 for p in products if p.get('price')]
-        if prices:
+        return self._anomalies(ProductColumns(products))
+    
+    def _anomalies(self, columns: ProductColumns) -> Dict[str, Any]:
+        price = columns.numbers['price']
+        rating = columns.numbers['rating']
+        reviews = columns.numbers['review_count']
+        stock = columns.numbers['stock']
+        rank = columns.numbers['rank']
+        
+        # Calcul des statistiques pour la détection (produits avec un prix)
+        prices = price[price != 0]
+        if len(prices):
             price_mean = np.mean(prices)
             price_std = np.std(prices)
             price_upper = price_mean + 3 * price_std
             price_lower = max(0, price_mean - 3 * price_std)
         else:
             price_mean = price_std = price_upper = price_lower = 0
+        expected_range = f"{round(price_lower, 2)} - {round(price_upper, 2)}"
         
-        for p in products:
-            product_id = p.get('id')
-            title = p.get('title', '')[:50]
-            price = p.get('price', 0) or 0
-            rating = p.get('rating', 0) or 0
-            reviews = p.get('review_count', 0) or 0
-            stock = p.get('stock', 0) or 0
-            rank = p.get('rank', 0) or 0
-            
+        def rows(mask: np.ndarray) -> List[int]:
+            return np.flatnonzero(mask).tolist()
+        
+        values = columns.values
+        out_of_stock_popular = (stock == 0) & (rank <= 1000)
+        low_stock_wanted = (stock > 0) & (stock <= 5) & (rank <= 5000)
+        
+        anomalies = {
             # Prix anormaux
-            if price > price_upper or (price < price_lower and price > 0):
-                anomalies['price_anomalies'].append({
-                    'product_id': product_id,
-                    'title': title,
-                    'price': price,
-                    'expected_range': f"{round(price_lower, 2)} - {round(price_upper, 2)}",
-                    'severity': 'HIGH' if price > price_upper * 1.5 else 'MEDIUM'
-                })
-            
-            # Stock critique
-            if stock == 0 and rank <= 1000:  # Produit populaire en rupture
-                anomalies['stock_critical'].append({
-                    'product_id': product_id,
-                    'title': title,
-                    'rank': rank,
+            'price_anomalies': [
+                {
+                    'product_id': columns.products[row].get('id'),
+                    'title': columns.item(row, 50)['title'],
+                    'price': values['price'][row],
+                    'expected_range': expected_range,
+                    'severity': 'HIGH' if price[row] > price_upper * 1.5 else 'MEDIUM'
+                }
+                for row in rows((price > price_upper) | ((price < price_lower) & (price > 0)))
+            ],
+            # Stock critique: produit populaire en rupture, ou stock très faible
+            'stock_critical': [
+                {
+                    'product_id': columns.products[row].get('id'),
+                    'title': columns.item(row, 50)['title'],
+                    'rank': values['rank'][row],
                     'reason': 'Produit populaire en rupture',
                     'severity': 'HIGH'
-                })
-            elif 0 < stock <= 5 and rank <= 5000:
-                anomalies['stock_critical'].append({
-                    'product_id': product_id,
-                    'title': title,
-                    'stock': stock,
-                    'rank': rank,
+                } if out_of_stock_popular[row] else {
+                    'product_id': columns.products[row].get('id'),
+                    'title': columns.item(row, 50)['title'],
+                    'stock': values['stock'][row],
+                    'rank': values['rank'][row],
                     'reason': 'Stock très faible pour produit demandé',
                     'severity': 'MEDIUM'
-                })
-            
+                }
+                for row in rows(out_of_stock_popular | low_stock_wanted)
+            ],
             # Rating suspect
-            if rating == 5.0 and reviews < 10:
-                anomalies['rating_suspicious'].append({
-                    'product_id': product_id,
-                    'title': title,
-                    'rating': rating,
-                    'reviews': reviews,
+            'rating_suspicious': [
+                {
+                    'product_id': columns.products[row].get('id'),
+                    'title': columns.item(row, 50)['title'],
+                    'rating': values['rating'][row],
+                    'reviews': values['review_count'][row],
                     'reason': 'Rating parfait avec peu d\'avis',
                     'severity': 'LOW'
-                })
-            
+                }
+                for row in rows((rating == 5.0) & (reviews < 10))
+            ],
             # Incohérences
-            if rank <= 100 and (rating or 0) < 3.0 and rating > 0:
-                anomalies['data_inconsistencies'].append({
-                    'product_id': product_id,
-                    'title': title,
-                    'rank': rank,
-                    'rating': rating,
+            'data_inconsistencies': [
+                {
+                    'product_id': columns.products[row].get('id'),
+                    'title': columns.item(row, 50)['title'],
+                    'rank': values['rank'][row],
+                    'rating': values['rating'][row],
                     'reason': 'Rang excellent mais rating faible',
                     'severity': 'MEDIUM'
-                })
+                }
+                for row in rows((rank <= 100) & (rating < 3.0) & (rating > 0))
+            ]
+        }
         
         # Résumé
         total_anomalies = sum(len(v) for v in anomalies.values())
@@ -0,0 +1,424 @@
+"""
+Service d'Autocomplétion
+Index de préfixes trié sur les titres produits, catégories et requêtes populaires
+"""
+import logging
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(text: str) -> str:
+    """Minuscules, sans accents, espaces normalisés"""
+    text = unicodedata.normalize('NFKD', str(text or '').lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.split())
+
+
+class PrefixIndex:
+    """
+    Tableau de préfixes trié (clé normalisée -> texte affiché, type, poids)
+
+    - Recherche de la plage d'un préfixe par dichotomie
+    - Top-k précalculé pour les préfixes courts (plages les plus larges),
+      en positions relatives au début de la plage
+    - argpartition sur les poids pour les autres plages
+    - merge(): nouvel index par insertion/suppression dans les tableaux triés,
+      top-k recalculé pour les seuls préfixes touchés
+    """
+
+    PRECOMPUTED_PREFIX_LEN = 3
+    PRECOMPUTED_TOP_K = 20
+
+    def __init__(self, entries: List[Tuple[str, str, str, float]]):
+        entries = sorted(entries, key=lambda e: e[0])
+        self.keys: List[str] = [e[0] for e in entries]
+        self.texts: List[str] = [e[1] for e in entries]
+        self.kinds: List[str] = [e[2] for e in entries]
+        self.weights = np.asarray([e[3] for e in entries], dtype=np.float32)
+        self.top: Dict[str, np.ndarray] = self._precompute_top()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, prefix: str, k: int) -> np.ndarray:
+        """Indices des k entrées les plus populaires commençant par prefix"""
+        if not prefix or not self.keys:
+            return np.zeros(0, dtype=np.int64)
+
+        lo = bisect_left(self.keys, prefix)
+        if len(prefix) <= self.PRECOMPUTED_PREFIX_LEN and k <= self.PRECOMPUTED_TOP_K:
+            return self.top.get(prefix, np.zeros(0, dtype=np.int64))[:k] + lo
+
+        hi = bisect_left(self.keys, prefix + '\uffff', lo)
+        return self._top_k(lo, hi, k) + lo
+
+    def merge(
+        self,
+        removed: List[Tuple[str, str, str, float]],
+        added: List[Tuple[str, str, str, float]]
+    ) -> 'PrefixIndex':
+        """
+        Nouvel index = self - removed + added (self n'est pas modifié)
+
+        Pas de retri ni de renormalisation: les entrées ajoutées (triées entre
+        elles) sont insérées à leur place par dichotomie. Le top-k des préfixes
+        courts d'une plage non touchée reste valide (positions relatives).
+        """
+        keep = np.ones(len(self.keys), dtype=bool)
+        for key, text, kind, weight in removed:
+            i = bisect_left(self.keys, key)
+            while i < len(self.keys) and self.keys[i] == key:
+                if keep[i] and self.texts[i] == text and self.kinds[i] == kind \
+                        and self.weights[i] == np.float32(weight):
+                    keep[i] = False
+                    break
+                i += 1
+
+        if keep.all():
+            keys, texts, kinds, weights = self.keys, self.texts, self.kinds, self.weights
+        else:
+            kept = np.flatnonzero(keep)
+            keys = [self.keys[i] for i in kept]
+            texts = [self.texts[i] for i in kept]
+            kinds = [self.kinds[i] for i in kept]
+            weights = self.weights[kept]
+
+        added = sorted(added, key=lambda e: e[0])
+        positions = [bisect_right(keys, e[0]) for e in added]
+
+        index = PrefixIndex.__new__(PrefixIndex)
+        index.keys = self._insert(keys, positions, [e[0] for e in added])
+        index.texts = self._insert(texts, positions, [e[1] for e in added])
+        index.kinds = self._insert(kinds, positions, [e[2] for e in added])
+        index.weights = np.insert(weights, positions, np.asarray([e[3] for e in added], dtype=np.float32))
+
+        index.top = dict(self.top)
+        touched = {
+            key[:length]
+            for key, *_ in (*removed, *added)
+            for length in range(1, min(len(key), self.PRECOMPUTED_PREFIX_LEN) + 1)
+        }
+        for prefix in touched:
+            lo = bisect_left(index.keys, prefix)
+            hi = bisect_left(index.keys, prefix + '\uffff', lo)
+            if hi > lo:
+                index.top[prefix] = index._top_k(lo, hi, self.PRECOMPUTED_TOP_K)
+            else:
+                index.top.pop(prefix, None)
+        return index
+
+    @staticmethod
+    def _insert(values: List[Any], positions: List[int], new: List[Any]) -> List[Any]:
+        """values avec new[j] inséré avant values[positions[j]] (positions croissantes)"""
+        if not new:
+            return values
+        out, previous = [], 0
+        for position, value in zip(positions, new):
+            out.extend(values[previous:position])
+            out.append(value)
+            previous = position
+        out.extend(values[previous:])
+        return out
+
+    def _top_k(self, lo: int, hi: int, k: int) -> np.ndarray:
+        """Top-k par poids décroissant sur la plage [lo, hi), positions relatives à lo"""
+        if hi <= lo:
+            return np.zeros(0, dtype=np.int64)
+
+        weights = self.weights[lo:hi]
+        if len(weights) > k:
+            part = np.argpartition(-weights, k)[:k]
+        else:
+            part = np.arange(len(weights))
+        return part[np.argsort(-weights[part], kind='stable')]
+
+    def _precompute_top(self) -> Dict[str, np.ndarray]:
+        """Top-k pour chaque préfixe de longueur <= PRECOMPUTED_PREFIX_LEN"""
+        top = {}
+        for length in range(1, self.PRECOMPUTED_PREFIX_LEN + 1):
+            start = 0
+            n = len(self.keys)
+            while start < n:
+                prefix = self.keys[start][:length]
+                if len(prefix) < length:
+                    start += 1
+                    continue
+                end = bisect_left(self.keys, prefix + '\uffff', start)
+                top[prefix] = self._top_k(start, end, self.PRECOMPUTED_TOP_K)
+                start = end
+        return top
+
+
+class AutocompleteService:
+    """
+    Autocomplétion pour la recherche et le chatbot
+
+    Sources:
+    - Titres produits (début du titre et débuts de mots), pondérés par popularité
+    - Catégories, pondérées par nombre de produits
+    - Requêtes passées, pondérées par fréquence
+
+    Les termes produits sont mis à jour de façon incrémentale à chaque sync:
+    seuls les produits nouveaux, modifiés ou supprimés sont renormalisés, et
+    leurs entrées fusionnées dans l'index existant (PrefixIndex.merge).
+    Dans les autres workers, la même fusion suit chaque nouveau snapshot de
+    recherche (refresh_from_snapshot), une fois par version.
+    """
+
+    MAX_WORD_STARTS = 4       # Débuts de mots indexés par titre (en plus du titre)
+    MAX_SUGGESTION_WORDS = 8  # Longueur des suggestions de titre
+    MAX_QUERIES = 5000        # Requêtes populaires conservées
+    QUERY_REFRESH_EVERY = 50  # Recompile l'index des requêtes toutes les N requêtes
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        # product_id -> (signature, [(clé, texte, type, poids)])
+        self._product_terms: Dict[Any, Tuple[Tuple, List[Tuple[str, str, str, float]]]] = {}
+        self._category_counts: Counter = Counter()
+        self._query_counts: Counter = Counter()
+        self._pending_queries = 0
+
+        self.catalog_index = PrefixIndex([])
+        self.query_index = PrefixIndex([])
+        self.last_updated: Optional[float] = None
+
+        # Service de recherche dont les snapshots alimentent l'index catalogue
+        # (None: singleton search_service, importé à l'usage)
+        self.snapshot_source: Any = None
+        self.snapshot_version: Optional[str] = None
+        self._refresh_lock = threading.Lock()
+
+    # ==================== INDEXATION ====================
+
+    def index_products(self, products: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Met à jour l'index depuis une liste de produits (dicts)"""
+        rows = [
+            (
+                p.get('id', i),
+                p.get('title') or '',
+                p.get('category_name') or p.get('category') or '',
+                p.get('review_count') or 0,
+                p.get('rating') or 0,
+                p.get('rank') or 0,
+            )
+            for i, p in enumerate(products)
+        ]
+        return self._index_rows(rows)
+
+    def index_table(self, table: Any) -> Dict[str, int]:
+        """Met à jour l'index depuis une ProductTable (snapshot de recherche)"""
+        cols = table.gather(np.arange(len(table)))
+        rows = list(zip(
+            cols['id'], cols['title'], cols['category_name'],
+            cols['review_count'], cols['rating'], cols['rank']
+        ))
+        return self._index_rows(rows)
+
+    def _index_rows(self, rows: List[Tuple]) -> Dict[str, int]:
+        start = time.time()
+        previous = self._product_terms
+        current = {}
+        removed_terms, added_terms = [], []
+        changed = 0
+
+        for pid, title, category, reviews, rating, rank in rows:
+            signature = (title, category, reviews, rating, rank)
+            cached = previous.get(pid)
+            if cached and cached[0] == signature:
+                current[pid] = cached
+                continue
+            current[pid] = (signature, self._product_entries(title, reviews, rating, rank))
+            if cached:
+                removed_terms.extend(cached[1])
+            added_terms.extend(current[pid][1])
+            changed += 1
+
+        gone = previous.keys() - current.keys()
+        for pid in gone:
+            removed_terms.extend(previous[pid][1])
+        removed = len(gone)
+
+        # Catégories dont le nombre de produits a changé: entrée remplacée
+        category_counts = Counter(row[2] for row in rows if row[2])
+        for cat in category_counts.keys() | self._category_counts.keys():
+            old_count, new_count = self._category_counts.get(cat, 0), category_counts.get(cat, 0)
+            if old_count != new_count:
+                if old_count:
+                    removed_terms.append(self._category_entry(cat, old_count))
+                if new_count:
+                    added_terms.append(self._category_entry(cat, new_count))
+
+        if not len(self.catalog_index) or removed_terms or added_terms:
+            if len(self.catalog_index):
+                index = self.catalog_index.merge(removed_terms, added_terms)
+            else:
+                index = PrefixIndex(
+                    [e for _, terms in current.values() for e in terms]
+                    + [self._category_entry(cat, count) for cat, count in category_counts.items()]
+                )
+
+            with self._lock:
+                self._product_terms = current
+                self._category_counts = category_counts
+                self.catalog_index = index
+                self.last_updated = time.time()
+
+        stats = {
+            'products': len(current),
+            'changed': changed,
+            'removed': removed,
+            'entries': len(self.catalog_index),
+            'build_ms': round((time.time() - start) * 1000, 2)
+        }
+        logger.info(f"🔤 Autocomplétion: {stats}")
+        return stats
+
+    def refresh_from_snapshot(self) -> bool:
+        """
+        Fusionne l'index catalogue avec le snapshot de recherche courant
+
+        Un autre worker publie un snapshot (sync, ajout de produits): la
+        recherche de ce worker le recharge et la table produits du snapshot
+        est fusionnée dans l'index de préfixes, une seule fois par version.
+        """
+        source = self.snapshot_source
+        if source is None:
+            from app.services.search_service import search_service
+            source = search_service
+
+        source.refresh_from_snapshot()
+        state = source.state
+        if state.version is None or state.version == self.snapshot_version:
+            return False
+
+        # Une seule fusion à la fois; les autres requêtes gardent l'index courant
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            if state.version == self.snapshot_version:
+                return False
+            self.index_table(state.products)
+            self.snapshot_version = state.version
+            return True
+        except Exception as e:
+            logger.error(f"❌ Erreur autocomplétion depuis le snapshot {state.version}: {e}")
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    @staticmethod
+    def _category_entry(category: str, count: int) -> Tuple[str, str, str, float]:
+        return normalize(category), category, 'category', float(np.log1p(count) * 2 + 5)
+
+    def _product_entries(
+        self, title: str, reviews: int, rating: float, rank: int
+    ) -> List[Tuple[str, str, str, float]]:
+        """Clés d'un titre: titre complet + débuts de mots"""
+        words = str(title).split()
+        if not words:
+            return []
+
+        text = ' '.join(words[:self.MAX_SUGGESTION_WORDS])
+        weight = self._popularity(reviews, rating, rank)
+
+        entries = [(normalize(title), text, 'product', weight)]
+        for i in range(1, min(len(words), self.MAX_WORD_STARTS + 1)):
+            key = normalize(' '.join(words[i:]))
+            if len(key) >= 3:
+                # Légère pénalité: un match en début de titre est plus pertinent
+                entries.append((key, text, 'product', weight * 0.8))
+        return entries
+
+    @staticmethod
+    def _popularity(reviews: Any, rating: Any, rank: Any) -> float:
+        """Poids de popularité d'un produit"""
+        try:
+            reviews, rating, rank = float(reviews or 0), float(rating or 0), float(rank or 0)
+        except (TypeError, ValueError):
+            return 0.0
+        weight = np.log1p(max(reviews, 0)) + rating / 5
+        if rank > 0:
+            weight += 3 / np.log2(rank + 1)
+        return float(weight)
+
+    # ==================== REQUÊTES ====================
+
+    def record_query(self, query: str) -> None:
+        """Enregistre une requête de recherche (popularité)"""
+        text = ' '.join(str(query or '').split())
+        if len(text) < 2 or len(text) > 100:
+            return
+
+        with self._lock:
+            self._query_counts[text] += 1
+            self._pending_queries += 1
+            refresh = self._pending_queries >= self.QUERY_REFRESH_EVERY
+
+        if refresh:
+            self.refresh_queries()
+
+    def refresh_queries(self) -> None:
+        """Recompile l'index des requêtes populaires"""
+        with self._lock:
+            if len(self._query_counts) > self.MAX_QUERIES:
+                self._query_counts = Counter(dict(self._query_counts.most_common(self.MAX_QUERIES)))
+            counts = list(self._query_counts.items())
+            self._pending_queries = 0
+
+        index = PrefixIndex([
+            (normalize(q), q, 'query', float(np.log1p(n) * 3))
+            for q, n in counts
+        ])
+        with self._lock:
+            self.query_index = index
+
+    # ==================== SUGGESTIONS ====================
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Suggestions pondérées par popularité pour un préfixe"""
+        key = normalize(prefix)
+        if not key:
+            return []
+
+        self.refresh_from_snapshot()
+        candidates = []
+        for index in (self.catalog_index, self.query_index):
+            for i in index.lookup(key, limit * 2):
+                candidates.append((float(index.weights[i]), index.texts[i], index.kinds[i]))
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+
+        suggestions = []
+        seen = set()
+        for weight, text, kind in candidates:
+            if text.lower() in seen:
+                continue
+            seen.add(text.lower())
+            suggestions.append({'text': text, 'type': kind, 'score': round(weight, 3)})
+            if len(suggestions) >= limit:
+                break
+
+        return suggestions
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'products': len(self._product_terms),
+            'catalog_entries': len(self.catalog_index),
+            'query_entries': len(self.query_index),
+            'tracked_queries': len(self._query_counts),
+            'snapshot_version': self.snapshot_version,
+            'last_updated': self.last_updated
+        }
+
+
+# Instance singleton
+autocomplete_service = AutocompleteService()
@@ -14,6 +14,7 @@ from app.models.schemas import (
     SearchQuery, SearchResult, ConversationHistory
 )
 from app.services.search_service import search_service
+from app.services.autocomplete_service import autocomplete_service
 
 logger = logging.getLogger(__name__)
 
@@ -416,10 +417,10 @@ Règles:
         
         elif intent == ChatIntent.CATEGORY_BROWSE:
             if search_service.is_ready:
-                categories = {}
-                for p in search_service.products_data:
-                    cat = p.get('category_name') or p.get('category', 'Autre')
-                    categories[cat] = categories.get(cat, 0) + 1
+                categories = {
+                    (cat or 'Autre'): count
+                    for cat, count in search_service.products.category_counts().items()
+                }
                 
                 response = "📂 **Catégories disponibles:**\n\n"
                 for cat, count in sorted(categories.items(), key=lambda x: x[1], reverse=True)[:10]:
@@ -431,15 +432,15 @@ Règles:
         
         elif intent == ChatIntent.ANALYTICS:
             if search_service.is_ready:
-                total = len(search_service.products_data)
-                prices = [p.get('price', 0) for p in search_service.products_data if p.get('price')]
+                total = len(search_service.products)
+                prices = search_service.products.price[search_service.products.price > 0]
                 
                 response = f"📊 **Statistiques du catalogue:**\n\n"
                 response += f"• Total produits: {total}\n"
-                if prices:
-                    response += f"• Prix moyen: {sum(prices)/len(prices):.2f}€\n"
-                    response += f"• Prix min: {min(prices):.2f}€\n"
-                    response += f"• Prix max: {max(prices):.2f}€"
+                if prices.size:
+                    response += f"• Prix moyen: {prices.mean():.2f}€\n"
+                    response += f"• Prix min: {prices.min():.2f}€\n"
+                    response += f"• Prix max: {prices.max():.2f}€"
                 suggestions = ["Voir les catégories", "Recommandations"]
             else:
                 response = "Les statistiques ne sont pas disponibles."
@@ -532,6 +533,11 @@ Règles:
         if partial_lower.startswith("re"):
             suggestions.extend(["recommandations", "rechercher"])
         
+        # Complète avec les produits, catégories et requêtes populaires
+        if len(suggestions) < 5:
+            for item in autocomplete_service.suggest(partial_input, 5 - len(suggestions)):
+                suggestions.append(item["text"])
+        
         return suggestions[:5]
     
     def get_llm_status(self) -> Dict[str, Any]:
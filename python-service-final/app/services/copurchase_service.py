@@ -0,0 +1,284 @@
+"""
+Service Co-achats
+Matrice creuse item-item construite depuis les lignes de vente (ligne_vente)
+pour le cross-selling basé sur les achats réels
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.config import settings
+from app.core.database import get_sales_connection
+
+logger = logging.getLogger(__name__)
+
+
+# Lignes de vente des commandes non annulées, au-delà du dernier id lu
+SALE_LINES_QUERY = """
+    SELECT lv.id, lv.sale_id, lv.product_id
+    FROM ligne_vente lv
+    JOIN sale s ON lv.sale_id = s.id
+    WHERE s.status <> 'CANCELLED' AND lv.id > {last_line_id}
+    ORDER BY lv.id
+"""
+
+
+class CoPurchaseEngine:
+    """
+    Moteur de co-occurrence item-item
+
+    - Matrice creuse symétrique des co-achats (diagonale = nb de paniers par produit)
+    - Mise à jour incrémentale: seuls les paniers nouveaux ou complétés sont ajoutés
+      (delta = B_nouveau^T B_nouveau - B_ancien^T B_ancien)
+    - Scores: cosinus c_ij / sqrt(n_i n_j) ou lift c_ij * N / (n_i n_j)
+    - Top-k précalculé par produit: le cross-sell est une simple lecture
+    """
+
+    FETCH_SIZE = 10000
+
+    def __init__(
+        self,
+        metric: str = 'cosine',
+        top_k: int = 20,
+        min_support: int = 2
+    ):
+        self.metric = metric if metric in ('cosine', 'lift') else 'cosine'
+        self.top_k = top_k
+        self.min_support = max(1, min_support)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._item_col: Dict[Any, int] = {}
+        self._item_ids: List[Any] = []
+        self._baskets: Dict[Any, np.ndarray] = {}
+        self._co = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self._n_baskets = 0
+        self._last_line_id = 0
+        # product_id -> (ids voisins, score de base, support)
+        self._top: Dict[Any, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self.last_updated: Optional[float] = None
+
+    # ==================== CHARGEMENT ====================
+
+    def refresh(self, connection: Any = None, full: bool = False) -> Dict[str, Any]:
+        """
+        Lit les nouvelles lignes de vente et met à jour la matrice
+
+        Args:
+            connection: connexion DB-API (sqlite3, psycopg2...). Par défaut,
+                connexion ouverte depuis settings.sales_database_url
+            full: reconstruit depuis zéro (prend en compte les annulations)
+        """
+        start = time.time()
+        owns_connection = connection is None
+        if owns_connection:
+            connection = get_sales_connection()
+            if connection is None:
+                return {'status': 'skipped', 'reason': 'sales_database_url non configurée'}
+
+        try:
+            with self._lock:
+                if full:
+                    self._reset()
+                last_line_id = self._last_line_id
+
+            cursor = connection.cursor()
+            cursor.execute(SALE_LINES_QUERY.format(last_line_id=int(last_line_id)))
+
+            baskets: Dict[Any, List[Any]] = defaultdict(list)
+            lines = 0
+            while True:
+                rows = cursor.fetchmany(self.FETCH_SIZE)
+                if not rows:
+                    break
+                for line_id, sale_id, product_id in rows:
+                    baskets[sale_id].append(product_id)
+                    last_line_id = max(last_line_id, line_id)
+                lines += len(rows)
+            cursor.close()
+        finally:
+            if owns_connection:
+                connection.close()
+
+        stats = self.add_baskets(baskets, last_line_id=last_line_id)
+        stats['lines'] = lines
+        stats['duration_ms'] = round((time.time() - start) * 1000, 2)
+        logger.info(f"🛒 Co-achats mis à jour: {stats}")
+        return stats
+
+    # ==================== MISE À JOUR ====================
+
+    def add_baskets(
+        self,
+        baskets: Dict[Any, Iterable[Any]],
+        last_line_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Ajoute des paniers (sale_id -> produits); un sale_id déjà vu est complété
+        """
+        with self._lock:
+            new_sales = 0
+            old_rows, new_rows = [], []
+
+            for sale_id, product_ids in baskets.items():
+                cols = np.unique([self._column(pid) for pid in product_ids]).astype(np.int64)
+                previous = self._baskets.get(sale_id)
+                if previous is None:
+                    previous = np.zeros(0, dtype=np.int64)
+                merged = np.union1d(previous, cols)
+                if len(merged) == len(previous):
+                    continue
+                if sale_id not in self._baskets:
+                    new_sales += 1
+                old_rows.append(previous)
+                new_rows.append(merged)
+                self._baskets[sale_id] = merged
+
+            n_items = len(self._item_ids)
+            if self._co.shape[0] < n_items:
+                self._co = self._pad(self._co, n_items)
+
+            touched = np.zeros(0, dtype=np.int64)
+            if new_rows:
+                b_new = self._incidence(new_rows, n_items)
+                b_old = self._incidence(old_rows, n_items)
+                delta = (b_new.T @ b_new - b_old.T @ b_old).tocsr()
+                self._co = (self._co + delta).tocsr()
+                self._co.eliminate_zeros()
+                touched = np.unique(np.concatenate(new_rows))
+
+            self._n_baskets += new_sales
+            if last_line_id is not None:
+                self._last_line_id = max(self._last_line_id, int(last_line_id))
+
+            # Le cosinus d'une paire dépend de n_i et n_j: recalcule aussi les voisins
+            if len(touched):
+                neighbours = self._co[touched].indices
+                self._update_top(np.union1d(touched, neighbours))
+                self.last_updated = time.time()
+
+            return {
+                'status': 'success',
+                'new_sales': new_sales,
+                'updated_baskets': len(new_rows),
+                'updated_products': int(len(touched)),
+                'products': n_items,
+                'baskets': self._n_baskets
+            }
+
+    def _column(self, product_id: Any) -> int:
+        col = self._item_col.get(product_id)
+        if col is None:
+            col = len(self._item_ids)
+            self._item_col[product_id] = col
+            self._item_ids.append(product_id)
+        return col
+
+    @staticmethod
+    def _incidence(rows: List[np.ndarray], n_items: int) -> sparse.csr_matrix:
+        """Matrice paniers x produits binaire"""
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(r) for r in rows], out=indptr[1:])
+        indices = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        data = np.ones(len(indices), dtype=np.int32)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), n_items))
+
+    @staticmethod
+    def _pad(matrix: sparse.csr_matrix, size: int) -> sparse.csr_matrix:
+        """Agrandit une matrice carrée à size x size"""
+        matrix = matrix.tocoo()
+        return sparse.csr_matrix(
+            (matrix.data, (matrix.row, matrix.col)), shape=(size, size), dtype=np.int32
+        )
+
+    def _update_top(self, rows: np.ndarray) -> None:
+        """Recalcule le top-k des produits donnés (vectorisé par sous-matrice)"""
+        counts = self._co.diagonal().astype(np.float64)
+        sub = self._co[rows]
+        entry_rows = np.repeat(rows, np.diff(sub.indptr))
+        cols, support = sub.indices, sub.data
+
+        # Score de base; pour le lift il est multiplié par N à la lecture
+        denom = counts[entry_rows] * counts[cols]
+        if self.metric == 'cosine':
+            denom = np.sqrt(denom)
+        base = support / np.maximum(denom, 1)
+
+        # Exclut le produit lui-même et les paires trop rares
+        base[(cols == entry_rows) | (support < self.min_support)] = -np.inf
+
+        item_ids = np.asarray(self._item_ids, dtype=object)
+        for i, row in enumerate(rows):
+            start, end = sub.indptr[i], sub.indptr[i + 1]
+            scores = base[start:end]
+            k = min(self.top_k, int(np.isfinite(scores).sum()))
+            pid = self._item_ids[row]
+            if k == 0:
+                self._top.pop(pid, None)
+                continue
+            part = np.argpartition(-scores, k - 1)[:k]
+            part = part[np.argsort(-scores[part], kind='stable')]
+            self._top[pid] = (
+                item_ids[cols[start:end][part]],
+                scores[part],
+                support[start:end][part]
+            )
+
+    # ==================== LECTURE ====================
+
+    def get_crosssell(self, product_id: Any, limit: int = 5) -> List[Dict[str, Any]]:
+        """Produits le plus souvent achetés avec product_id (lecture du top-k)"""
+        top = self._top.get(product_id)
+        if top is None:
+            return []
+
+        ids, base, support = top
+        scale = self._n_baskets if self.metric == 'lift' else 1
+        return [
+            {'product_id': ids[i], 'score': round(float(base[i] * scale), 4), 'support': int(support[i])}
+            for i in range(min(limit, len(ids)))
+        ]
+
+    def export_top(self) -> Dict[str, Any]:
+        """Top-k précalculé et ce qu'il faut pour le lire (processus de calcul séparé)"""
+        with self._lock:
+            return {
+                'metric': self.metric,
+                'n_baskets': self._n_baskets,
+                'top': dict(self._top),
+                'last_updated': self.last_updated
+            }
+
+    def import_top(self, state: Dict[str, Any]) -> None:
+        """Lecture seule depuis export_top: get_crosssell sans la matrice des co-achats"""
+        with self._lock:
+            self._reset()
+            self.metric = state['metric']
+            self._n_baskets = state['n_baskets']
+            self._top = state['top']
+            self.last_updated = state['last_updated']
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'metric': self.metric,
+            'products': len(self._item_ids),
+            'baskets': self._n_baskets,
+            'pairs': int((self._co.nnz - np.count_nonzero(self._co.diagonal())) // 2),
+            'products_with_recommendations': len(self._top),
+            'last_line_id': self._last_line_id,
+            'last_updated': self.last_updated
+        }
+
+
+# Instance singleton
+copurchase_engine = CoPurchaseEngine(
+    metric=settings.copurchase_metric,
+    top_k=settings.copurchase_top_k,
+    min_support=settings.copurchase_min_support
+)
@@ -0,0 +1,101 @@
+"""
+Cache des résultats ETL - Résultats indexés par empreinte du fichier et paramètres
+Un fichier déjà traité avec les mêmes paramètres est renvoyé sans retraitement
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+from app.config import settings
+from app.models.schemas import ETLProcessingResult
+
+logger = logging.getLogger(__name__)
+
+
+class ETLResultCache:
+    """
+    Résultats de process_csv sur disque, un fichier JSON par clé
+
+    Clé = SHA-256 du contenu + paramètres de traitement + VERSION. Une entrée
+    dont le fichier de sortie ou le rapport d'erreurs a disparu est ignorée
+    et supprimée. Les produits ne sont conservés qu'en aperçu
+    (MAX_CACHED_PRODUCTS): le détail complet reste dans output_file.
+    """
+
+    # À incrémenter quand la chaîne ETL change ses résultats (invalide le cache)
+    VERSION = 3
+
+    # Produits (et classifications) gardés par entrée; au-delà, aperçu tronqué
+    MAX_CACHED_PRODUCTS = 100
+
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory
+
+    @property
+    def directory(self) -> Path:
+        return Path(self._directory or settings.etl_cache_dir)
+
+    def key(self, sha256: str, **params: Any) -> str:
+        payload = json.dumps({'version': self.VERSION, 'sha256': sha256, 'params': params}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, sha256: str, **params: Any) -> Optional[ETLProcessingResult]:
+        """Résultat enregistré (marqué cached=True), ou None"""
+        path = self.directory / f"{self.key(sha256, **params)}.json"
+        if not path.exists():
+            return None
+        try:
+            result = ETLProcessingResult.model_validate_json(path.read_text(encoding='utf-8'))
+        except Exception as e:
+            logger.warning(f"Entrée de cache ETL illisible ({path.name}): {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        if any(f and not Path(f).exists() for f in (result.output_file, result.columnar_file, result.error_report)):
+            path.unlink(missing_ok=True)
+            return None
+        logger.info(f"♻️ Résultat ETL repris du cache (sha256 {sha256[:12]})")
+        return result.model_copy(update={'cached': True})
+
+    def put(self, sha256: str, result: ETLProcessingResult, **params: Any) -> None:
+        """
+        Enregistre un traitement réussi (écriture atomique)
+
+        Au-delà de MAX_CACHED_PRODUCTS produits, seul l'aperçu est gardé; sans
+        fichier de sortie pour porter le reste, le résultat n'est pas mis en cache.
+        """
+        if not result.success:
+            return
+        limit = self.MAX_CACHED_PRODUCTS
+        if len(result.products) > limit or len(result.classifications) > limit:
+            if not result.output_file:
+                logger.info(f"Résultat ETL non mis en cache: {len(result.products)} produits sans fichier de sortie")
+                return
+            result = result.model_copy(update={
+                'products': result.products[:limit],
+                'classifications': result.classifications[:limit],
+                'warnings': result.warnings + [
+                    f"Aperçu limité à {limit} produits (cache ETL); données complètes dans output_file"
+                ]
+            })
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{self.key(sha256, **params)}.json"
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(result.model_dump_json(), encoding='utf-8')
+        os.replace(tmp, path)
+
+    def clear(self) -> int:
+        """Vide le cache; nombre d'entrées supprimées"""
+        if not self.directory.exists():
+            return 0
+        entries = list(self.directory.glob('*.json'))
+        for path in entries:
+            path.unlink(missing_ok=True)
+        return len(entries)
+
+
+# Instance singleton
+etl_result_cache = ETLResultCache()
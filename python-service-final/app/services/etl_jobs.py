@@ -0,0 +1,400 @@
+"""
+Jobs ETL asynchrones - Traitement CSV et import Java en arrière-plan
+File d'attente, pool de workers, état persistant (SQLite), annulation et reprise
+"""
+import asyncio
+import json
+import logging
+import os
+import shutil
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from app.config import settings
+from app.core import job_store
+from app.core.job_store import JobStore
+from app.services.etl_cache import etl_result_cache
+from app.services.etl_service import ETLService, ProcessingCancelled
+from app.services.java_client import java_client
+
+logger = logging.getLogger(__name__)
+
+
+# Types de job
+PROCESS = 'process'
+PROCESS_IMPORT = 'process_import'
+
+# Étapes (clés de progress)
+STAGE_PROCESSING = 'processing'
+STAGE_IMPORTING = 'importing'
+
+# Erreurs d'import conservées dans le job
+MAX_IMPORT_ERRORS = 100
+
+
+class JobCancelled(Exception):
+    """Job annulé, ou interrompu par l'arrêt du service"""
+
+
+class ETLJobRunner:
+    """
+    Exécute les jobs ETL hors des requêtes HTTP
+
+    - submit() enregistre le job et renvoie immédiatement son état
+    - workers asyncio: le traitement CSV (pandas) tourne dans un pool de
+      threads, l'import Java reste sur la boucle (client httpx partagé)
+    - traitement en streaming avec point de reprise après chaque bloc,
+      import par lots avec le nombre de lignes importées enregistré
+    - au démarrage, les jobs en attente ou interrompus reprennent là où
+      ils s'étaient arrêtés
+
+    Plusieurs processus partagent le store: chaque job est pris par claim()
+    (bail renouvelé tant qu'il tourne), un job en cours n'est donc exécuté
+    que par un seul worker; les jobs dont le bail expire (processus
+    disparu) sont repris périodiquement par les autres.
+    """
+
+    def __init__(self, store: Optional[JobStore] = None, workers: Optional[int] = None):
+        self._store = store
+        self.workers = max(1, workers or settings.etl_job_workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._cancelled: set = set()
+        self._lost: set = set()
+        self._pending: set = set()
+        self._stopping = False
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = JobStore(settings.etl_jobs_db)
+        return self._store
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    # === Cycle de vie ===
+
+    async def start(self) -> int:
+        """Lance les workers et remet en file les jobs à reprendre; nb de jobs repris"""
+        if self.running:
+            return 0
+        self._stopping = False
+        self._queue = asyncio.Queue()
+        self._pending = set()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='etl-job')
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._recover_expired()))
+
+        recovered = self._enqueue_active()
+        if recovered:
+            logger.info(f"🔁 {recovered} job(s) ETL repris")
+        return recovered
+
+    async def stop(self) -> None:
+        """
+        Arrête les workers; les jobs en cours s'interrompent après leur bloc
+        ou lot courant et restent 'running', bail libéré, pour être repris
+        au redémarrage (ou par un autre processus)
+        """
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.store.release(self.owner)
+
+    # === API ===
+
+    def submit(
+        self,
+        file_path: str,
+        filename: Optional[str] = None,
+        import_to_java: bool = False,
+        **params: Any
+    ) -> Dict[str, Any]:
+        """Crée un job (paramètres de process_csv + update_existing pour l'import)"""
+        job = self.store.create(
+            PROCESS_IMPORT if import_to_java else PROCESS,
+            file_path, filename or Path(file_path).name, params
+        )
+        self._enqueue(job['id'])
+        logger.info(f"📥 Job ETL {job['id']} en file ({job['filename']})")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        return self.store.list(status, limit)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Annule un job; en cours, il s'arrête après le bloc ou lot courant"""
+        job = self.store.get(job_id)
+        if job is None or job['status'] not in job_store.ACTIVE_STATUSES:
+            return job
+        self._cancelled.add(job_id)
+        if job['status'] == job_store.QUEUED:
+            self._finish_cancelled(job)
+            return self.store.get(job_id)
+        return self.store.update(job_id, cancel_requested=1)
+
+    def resume(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Relance un job en échec depuis son dernier point de reprise"""
+        job = self.store.get(job_id)
+        if job is None or job['status'] != job_store.FAILED:
+            return job
+        job = self.store.update(job_id, status=job_store.QUEUED, error=None, completed_at=None)
+        self._enqueue(job_id)
+        return job
+
+    # === Exécution ===
+
+    def _enqueue(self, job_id: str) -> None:
+        """Met un job en file (une seule fois tant qu'il y attend)"""
+        if self._queue is None or job_id in self._pending:
+            return
+        self._pending.add(job_id)
+        self._queue.put_nowait(job_id)
+
+    def _enqueue_active(self) -> int:
+        """Met en file les jobs à reprendre (en attente ou bail expiré); nb de jobs"""
+        jobs = self.store.active()
+        for job in jobs:
+            self._enqueue(job['id'])
+        return len(jobs)
+
+    async def _recover_expired(self) -> None:
+        """Reprend périodiquement les jobs d'autres processus (créés ailleurs, ou bail expiré)"""
+        while True:
+            await asyncio.sleep(settings.etl_job_lease)
+            try:
+                self._enqueue_active()
+            except Exception as e:
+                logger.warning(f"Reprise des jobs ETL impossible: {e}")
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Renouvelle le bail d'un job en cours; relaie l'annulation demandée par un autre processus"""
+        while True:
+            await asyncio.sleep(settings.etl_job_lease / 3)
+            job = self.store.renew(job_id, self.owner, settings.etl_job_lease)
+            if job is None:
+                logger.warning(f"Job ETL {job_id}: bail perdu, arrêt du traitement")
+                self._lost.add(job_id)
+                return
+            if job['cancel_requested']:
+                self._cancelled.add(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._pending.discard(job_id)
+            try:
+                await self.run_job(job_id)
+            except Exception as e:
+                logger.error(f"Job ETL {job_id}: erreur inattendue: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def run_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Exécute (ou reprend) un job jusqu'à son terme; état final du job
+
+        Sans effet si le job est terminé ou tenu par un autre worker (claim refusé).
+        """
+        job = self.store.get(job_id)
+        if job is None or job['status'] not in job_store.ACTIVE_STATUSES:
+            return job
+        if job['cancel_requested']:
+            self._cancelled.add(job_id)
+
+        job = self.store.claim(job_id, self.owner, settings.etl_job_lease)
+        if job is None:
+            logger.info(f"Job ETL {job_id} déjà pris par un autre worker")
+            return self.store.get(job_id)
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+
+        try:
+            self._raise_if_stopped(job_id)
+            if job['started_at'] is None:
+                job = self.store.update(job_id, started_at=datetime.now().isoformat())
+
+            # Résultat enregistré une fois le traitement réussi: une reprise passe à l'import
+            if job['result'] is None:
+                result = await self._run_processing(job)
+                if not result['success']:
+                    raise RuntimeError(result['errors'][0]['error'] if result['errors'] else "Échec du traitement")
+                job = self.store.update(job_id, result=result)
+
+            if job['kind'] == PROCESS_IMPORT:
+                await self._run_import(job)
+
+            shutil.rmtree(self._checkpoint_dir(job_id), ignore_errors=True)
+            job = self.store.update(job_id, status=job_store.COMPLETED, completed_at=datetime.now().isoformat())
+            logger.info(f"✅ Job ETL {job_id} terminé")
+            return job
+
+        except (JobCancelled, ProcessingCancelled, asyncio.CancelledError):
+            if self._stopping:
+                logger.info(f"⏸️ Job ETL {job_id} interrompu (reprise au redémarrage)")
+                raise
+            if job_id in self._lost:
+                # Repris par un autre worker: état laissé à son nouveau propriétaire
+                return self.store.get(job_id)
+            self._finish_cancelled(self.store.get(job_id))
+            return self.store.get(job_id)
+
+        except Exception as e:
+            logger.error(f"❌ Job ETL {job_id} en échec: {e}", exc_info=True)
+            if job_id in self._lost:
+                return self.store.get(job_id)
+            return self.store.update(
+                job_id, status=job_store.FAILED, error=str(e), completed_at=datetime.now().isoformat()
+            )
+
+        finally:
+            heartbeat.cancel()
+            self._lost.discard(job_id)
+
+    async def _run_processing(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Traitement streaming dans le pool de threads, point de reprise par bloc
+
+        Fichier connu par son SHA-256 (file_sha256): résultat repris du cache
+        ETL s'il a déjà été traité avec les mêmes paramètres (sauf reprocess).
+        """
+        job_id, params = job['id'], job['params']
+        sha256 = params.get('file_sha256')
+        cache_params = self._cache_params(params)
+        if sha256 and not params.get('reprocess'):
+            cached = etl_result_cache.get(sha256, **cache_params)
+            if cached is not None:
+                self.store.set_progress(job_id, STAGE_PROCESSING, rows=cached.total_rows, fraction=1.0)
+                return cached.model_dump(mode='json')
+
+        self.store.set_progress(job_id, STAGE_PROCESSING, rows=0, fraction=0.0)
+
+        def progress(rows: int, fraction: float) -> None:
+            self.store.set_progress(job_id, STAGE_PROCESSING, rows=rows, fraction=round(fraction, 4))
+
+        def process() -> Dict[str, Any]:
+            # Multi-processus: pas de point de reprise par bloc; un job
+            # parallèle repris après un arrêt retraite tout le fichier
+            parallel = params.get('parallel', False)
+            result = ETLService().process_csv(
+                job['file_path'],
+                validate=params.get('validate', True),
+                clean=params.get('clean', True),
+                chunk_size=params.get('chunk_size'),
+                max_products=params.get('max_products'),
+                progress_callback=progress,
+                checkpoint_dir=None if parallel else str(self._checkpoint_dir(job_id)),
+                should_stop=lambda: self._stop_requested(job_id),
+                parallel=parallel
+            )
+            if sha256:
+                result.file_sha256 = sha256
+                etl_result_cache.put(sha256, result, **cache_params)
+            return result.model_dump(mode='json')
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self._executor, process)
+        self.store.set_progress(job_id, STAGE_PROCESSING, rows=result['total_rows'], fraction=1.0)
+        return result
+
+    async def _run_import(self, job: Dict[str, Any]) -> None:
+        """Import Java par lots du fichier produit; reprise après le dernier lot importé"""
+        job_id = job['id']
+        output_file = job['result']['output_file']
+        total = job['result']['valid_rows']
+        state = {'rows': 0, 'total': total, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0,
+                 'failed': 0, 'errors': []}
+        state.update((job['progress'] or {}).get(STAGE_IMPORTING, {}))
+        state['fraction'] = self._fraction(state)
+        self.store.set_progress(job_id, STAGE_IMPORTING, **state)
+
+        if state['rows'] >= total:
+            return
+        if not await java_client.health_check():
+            raise RuntimeError("Backend Java non disponible")
+
+        update_existing = job['params'].get('update_existing', True)
+        reader = pd.read_csv(
+            output_file, dtype={'asin': str, 'title': str, 'category': str, 'image_url': str},
+            chunksize=settings.etl_import_batch_size
+        )
+        read = 0
+        for batch in reader:
+            # Lignes déjà importées (lots précédant l'interruption) sautées
+            read += len(batch)
+            if read <= state['rows']:
+                continue
+            batch = batch.iloc[len(batch) - (read - state['rows']):]
+            self._raise_if_stopped(job_id)
+            records = batch.astype(object).where(batch.notna(), None).to_dict('records')
+            result = await java_client.import_products_batch(records, update_existing)
+
+            state['rows'] += len(records)
+            for key in ('created', 'updated', 'unchanged', 'skipped', 'failed'):
+                state[key] += result.get(key, 0)
+            state['errors'] = (state['errors'] + result.get('errors', []))[:MAX_IMPORT_ERRORS]
+            state['fraction'] = self._fraction(state)
+            self.store.set_progress(job_id, STAGE_IMPORTING, **state)
+            logger.info(f"📤 Job ETL {job_id}: {state['rows']}/{total} produits importés")
+
+    # === Utilitaires ===
+
+    @staticmethod
+    def _checkpoint_dir(job_id: str) -> Path:
+        return Path(settings.etl_jobs_dir) / job_id
+
+    @staticmethod
+    def _cache_params(params: Dict[str, Any]) -> Dict[str, Any]:
+        """Paramètres qui déterminent le résultat (clé du cache ETL)"""
+        return {
+            'validate': params.get('validate', True),
+            'clean': params.get('clean', True),
+            'max_products': params.get('max_products')
+        }
+
+    @staticmethod
+    def _fraction(state: Dict[str, Any]) -> float:
+        return round(state['rows'] / state['total'], 4) if state['total'] else 1.0
+
+    def _stop_requested(self, job_id: str) -> bool:
+        return self._stopping or job_id in self._cancelled or job_id in self._lost
+
+    def _raise_if_stopped(self, job_id: str) -> None:
+        if self._stop_requested(job_id):
+            raise JobCancelled(job_id)
+
+    def _finish_cancelled(self, job: Dict[str, Any]) -> None:
+        """Statut final 'cancelled'; fichiers partiels et point de reprise supprimés"""
+        job_id = job['id']
+        self._cancelled.discard(job_id)
+        checkpoint = self._checkpoint_dir(job_id)
+        state_file = checkpoint / 'state.json'
+        if state_file.exists() and not job['result']:
+            state = json.loads(state_file.read_text(encoding='utf-8'))
+            Path(state['output_file']).with_suffix('.csv.tmp').unlink(missing_ok=True)
+            if state['report']['path']:
+                Path(state['report']['path']).unlink(missing_ok=True)
+        shutil.rmtree(checkpoint, ignore_errors=True)
+        self.store.update(job_id, status=job_store.CANCELLED, completed_at=datetime.now().isoformat())
+        logger.info(f"🛑 Job ETL {job_id} annulé")
+
+
+# Instance singleton
+etl_job_runner = ETLJobRunner()
@@ -2,15 +2,28 @@
 Service ETL - Extract, Transform, Load
 Traitement et validation des fichiers CSV de produits
 """
+import hashlib
+import io
+import json
 import logging
+import multiprocessing
+import os
 import re
+import shutil
 import time
-from typing import List, Dict, Any, Tuple, Optional
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Any, Tuple, Optional, Callable, Iterator
 from pathlib import Path
 from datetime import datetime
 import chardet
+from pydantic import TypeAdapter
 
 from app.config import settings
+from app.core import char_matrix
+from app.core.asin_set import AsinSet, decode_asins, encode_asins, is_hashed
+from app.core.columnar import write_catalog
+from app.core.validation_rules import etl_rules, price_tier, price_tiers
 from app.models.schemas import (
     ProductResponse, ProductClassification, ETLProcessingResult,
     ETLValidationError, RankCategory, PriceBucket, StockStatus
@@ -28,6 +41,39 @@ except ImportError:
     logger.warning("Pandas non disponible")
 
 
+# Motifs de nettoyage précompilés (partagés par les versions scalaire et vectorisée)
+CURRENCY_PATTERN = re.compile(r'[€$£¥₹]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+RANK_SEPARATORS_PATTERN = re.compile(r'[#,.\s]')
+NON_DIGIT_PATTERN = re.compile(r'[^\d]')
+
+# Messages numérotés par ligne ("Ligne 12: ..."), renumérotés à la fusion des plages
+ROW_MESSAGE_PATTERN = re.compile(r'^Ligne (\d+):')
+
+# Tables de caractères (nettoyage sur matrice): symboles monétaires + espaces, espaces
+PRICE_STRIP_CHARS = char_matrix.char_table('€$£¥₹' + char_matrix.WHITESPACE)
+WHITESPACE_CHARS = char_matrix.char_table(char_matrix.WHITESPACE)
+
+# Validation des listes de produits / classifications en un appel
+PRODUCT_LIST_ADAPTER = TypeAdapter(List[ProductResponse])
+CLASSIFICATION_LIST_ADAPTER = TypeAdapter(List[ProductClassification])
+
+# Découpage en plages (mode parallèle): octets de structure CSV
+CSV_QUOTE = ord('"')
+CSV_COMMA = ord(',')
+CSV_NEWLINE = ord('\n')
+CSV_FIELD_EDGES = np.frombuffer(b',\r\n"', dtype=np.uint8) if PANDAS_AVAILABLE else None
+
+# Colonnes produit du fichier de sortie en streaming (+ classifications)
+STREAM_OUTPUT_COLUMNS = [
+    'asin', 'title', 'price', 'rating', 'review_count', 'rank', 'stock', 'category', 'image_url'
+]
+
+
+class ProcessingCancelled(Exception):
+    """Traitement streaming interrompu à la demande (should_stop)"""
+
+
 class ETLService:
     """Service de traitement ETL pour les fichiers CSV"""
     
@@ -44,15 +90,39 @@ class ETLService:
         'image_url': ['image_url', 'imageurl', 'imgurl', 'image', 'img', 'picture']
     }
     
+    # Mode streaming: produits renvoyés en aperçu, messages conservés au plus
+    STREAM_PREVIEW_ROWS = 100
+    STREAM_MAX_MESSAGES = 1000
+    
+    # Erreurs renvoyées dans la réponse; la liste complète est dans error_report
+    MAX_INLINE_ERRORS = 1000
+    
+    # Largeur max (caractères) des valeurs nettoyées sur matrice; au-delà: chemin scalaire
+    MAX_CLEAN_WIDTH = 64
+    MAX_URL_WIDTH = 1024
+    
+    # Mode parallèle: taille minimale d'une plage, blocs lus pour le découpage
+    PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+    SCAN_BLOCK_BYTES = 64 * 1024 * 1024
+    BOUNDARY_BLOCK_BYTES = 1024 * 1024
+    
     def __init__(self):
-        self.errors: List[ETLValidationError] = []
+        self.report = _ErrorReport()
         self.warnings: List[str] = []
     
     def process_csv(
         self,
         file_path: str,
         validate: bool = True,
-        clean: bool = True
+        clean: bool = True,
+        stream: bool = False,
+        chunk_size: Optional[int] = None,
+        progress_callback: Optional[Callable[[int, float], None]] = None,
+        max_products: Optional[int] = None,
+        checkpoint_dir: Optional[str] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+        parallel: bool = False,
+        workers: Optional[int] = None
     ) -> ETLProcessingResult:
         """
         Traite un fichier CSV
@@ -61,10 +131,45 @@ class ETLService:
             file_path: Chemin du fichier
             validate: Valider les données
             clean: Nettoyer les données
+            stream: Traitement par blocs à mémoire bornée (voir _process_stream)
+            chunk_size: Lignes par bloc en streaming (défaut: settings.etl_chunk_size)
+            progress_callback: Appelé après chaque bloc (lignes lues, fraction du fichier)
+            max_products: Produits renvoyés au plus (compteurs et résumé portent sur
+                tout le fichier; défaut: tous, STREAM_PREVIEW_ROWS en streaming)
+            checkpoint_dir: Point de reprise après chaque bloc (implique stream);
+                un traitement interrompu reprend au dernier bloc enregistré
+            should_stop: Consulté après chaque bloc; True lève ProcessingCancelled
+            parallel: Traitement sur plusieurs processus (voir _process_parallel),
+                même résultat que stream; ignoré avec checkpoint_dir (pas de point
+                de reprise par plage: un traitement parallèle interrompu repart
+                du début)
+            workers: Processus en mode parallèle (défaut: settings.etl_parallel_workers,
+                0 = nombre de CPU)
         """
         start_time = time.time()
-        self.errors = []
+        self.report = _ErrorReport(
+            Path(settings.processed_dir) / f"{self._output_stem(file_path)}_errors.csv",
+            self.MAX_INLINE_ERRORS
+        )
         self.warnings = []
+        preview_rows = self.STREAM_PREVIEW_ROWS if max_products is None else max_products
+        
+        if PANDAS_AVAILABLE and parallel and not checkpoint_dir:
+            return self._process_parallel(
+                file_path, validate, clean,
+                chunk_size or settings.etl_chunk_size,
+                workers or settings.etl_parallel_workers or os.cpu_count() or 1,
+                progress_callback, start_time, preview_rows, should_stop
+            )
+        
+        if PANDAS_AVAILABLE and (stream or checkpoint_dir):
+            return self._process_stream(
+                file_path, validate, clean,
+                chunk_size or settings.etl_chunk_size,
+                progress_callback, start_time, preview_rows,
+                _StreamCheckpoint(checkpoint_dir) if checkpoint_dir else None,
+                should_stop
+            )
         
         if not PANDAS_AVAILABLE:
             return ETLProcessingResult(
@@ -96,15 +201,17 @@ class ETLService:
             if validate:
                 df = self._validate_data(df)
             
-            # Convertit en produits
-            products, classifications = self._convert_to_products(df)
+            # Convertit en colonnes produit (objets pydantic pour la page renvoyée)
+            frame = self._product_frame(df)
+            products, classifications = self._frame_to_products(frame.iloc[:max_products])
             
-            valid_rows = len(products)
+            valid_rows = len(frame)
             invalid_rows = total_rows - valid_rows
             
             # Génère le résumé
-            summary = self._generate_summary(products, classifications)
+            summary = self._generate_summary(frame)
             
+            error_report = self.report.close()
             processing_time = (time.time() - start_time) * 1000
             
             return ETLProcessingResult(
@@ -114,7 +221,10 @@ class ETLService:
                 invalid_rows=invalid_rows,
                 products=products,
                 classifications=classifications,
-                errors=self.errors,
+                errors=self.report.errors,
+                errors_total=self.report.total,
+                error_counts=dict(self.report.counts),
+                error_report=error_report,
                 warnings=self.warnings,
                 processing_time_ms=processing_time,
                 summary=summary
@@ -122,6 +232,186 @@ class ETLService:
         
         except Exception as e:
             logger.error(f"Erreur traitement CSV: {e}", exc_info=True)
+            self.report.discard()
+            return ETLProcessingResult(
+                success=False,
+                total_rows=0, valid_rows=0, invalid_rows=0,
+                errors=[ETLValidationError(row=0, column="file", value=str(file_path),
+                       error=str(e), severity="critical")],
+                processing_time_ms=(time.time() - start_time) * 1000
+            )
+    
+    def _process_stream(
+        self,
+        file_path: str,
+        validate: bool,
+        clean: bool,
+        chunk_size: int,
+        progress_callback: Optional[Callable[[int, float], None]],
+        start_time: float,
+        preview_rows: int,
+        checkpoint: Optional['_StreamCheckpoint'] = None,
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> ETLProcessingResult:
+        """
+        Traite un CSV par blocs de chunk_size lignes
+        
+        Chaque bloc est normalisé, nettoyé, validé et converti puis ajouté au
+        fichier de sortie (processed_dir). Les doublons d'ASIN entre blocs sont
+        détectés par un AsinSet (8 octets par ASIN), le résumé est agrégé au
+        fil de l'eau: la mémoire ne dépend pas de la taille du fichier.
+        
+        Avec un checkpoint, l'état est enregistré après chaque bloc; une reprise
+        tronque les fichiers au dernier bloc enregistré et saute les blocs lus.
+        """
+        state = checkpoint.load() if checkpoint else None
+        if state:
+            output_path = Path(state['output_file'])
+        else:
+            output_path = Path(settings.processed_dir) / f"{self._output_stem(file_path)}.csv"
+        tmp_path = output_path.with_suffix('.csv.tmp')
+        
+        try:
+            encoding = self._detect_encoding(file_path)
+            logger.info(f"📁 Encodage détecté: {encoding} (streaming, blocs de {chunk_size} lignes)")
+            
+            file_size = max(os.path.getsize(file_path), 1)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            seen = AsinSet()
+            summary = _StreamSummary()
+            products: List[ProductResponse] = []
+            classifications: List[ProductClassification] = []
+            warnings: List[str] = []
+            total_rows = valid_rows = 0
+            n_warnings = 0
+            chunks_done = 0
+            columns = None
+            
+            if state:
+                # Reprise: fichiers tronqués au dernier bloc enregistré
+                if not tmp_path.exists() and output_path.exists():
+                    os.replace(output_path, tmp_path)
+                os.truncate(tmp_path, state['output_size'])
+                self.report.restore(state['report'])
+                seen.add(checkpoint.load_asins(state['asins_size']))
+                summary = checkpoint.load_summary()
+                products = [ProductResponse.model_validate(p) for p in state['products']]
+                classifications = [ProductClassification.model_validate(c) for c in state['classifications']]
+                warnings, n_warnings = state['warnings'], state['warnings_total']
+                total_rows, valid_rows = state['total_rows'], state['valid_rows']
+                chunks_done = state['chunks_done']
+                columns = pd.Index(state['columns'])
+                logger.info(f"🔁 Reprise après le bloc {chunks_done} ({total_rows} lignes déjà traitées)")
+            
+            with open(file_path, 'rb') as source, \
+                    open(tmp_path, 'a' if state else 'w', encoding='utf-8', newline='') as output:
+                reader = pd.read_csv(source, encoding=encoding, dtype=str, chunksize=chunk_size)
+                for index, chunk in enumerate(reader):
+                    if index < chunks_done:
+                        continue
+                    total_rows += len(chunk)
+                    self.warnings = []
+                    
+                    # Mapping des colonnes calculé sur le premier bloc seulement
+                    if columns is None:
+                        chunk = self._normalize_columns(chunk)
+                        columns = chunk.columns
+                    else:
+                        chunk.columns = columns
+                    
+                    if clean:
+                        chunk = self._clean_data(chunk)
+                    codes = encode_asins(chunk['asin']) if validate and 'asin' in chunk else None
+                    if validate:
+                        chunk = self._validate_data(chunk, seen=seen, codes=codes)
+                    
+                    frame = self._product_frame(chunk)
+                    valid_rows += len(frame)
+                    
+                    frame.to_csv(output, header=output.tell() == 0, index=False)
+                    summary.update(frame)
+                    
+                    room = max(preview_rows - len(products), 0)
+                    if room:
+                        chunk_products, chunk_classifications = self._frame_to_products(frame.iloc[:room])
+                        products.extend(chunk_products)
+                        classifications.extend(chunk_classifications)
+                    
+                    # Avertissements bornés: seuls les premiers sont conservés
+                    n_warnings += len(self.warnings)
+                    warnings.extend(self.warnings[:self.STREAM_MAX_MESSAGES - len(warnings)])
+                    
+                    if checkpoint:
+                        output.flush()
+                        checkpoint.save({
+                            'chunks_done': index + 1,
+                            'total_rows': total_rows,
+                            'valid_rows': valid_rows,
+                            'columns': list(columns),
+                            'output_file': str(output_path),
+                            'output_size': output.tell(),
+                            'asins_size': checkpoint.append_asins(codes),
+                            'report': self.report.state(),
+                            'products': [p.model_dump(mode='json') for p in products],
+                            'classifications': [c.model_dump(mode='json') for c in classifications],
+                            'warnings': warnings,
+                            'warnings_total': n_warnings
+                        }, summary)
+                    
+                    progress = min(source.tell() / file_size, 1.0)
+                    logger.info(f"📊 {total_rows} lignes traitées ({progress:.0%})")
+                    if progress_callback:
+                        progress_callback(total_rows, progress)
+                    if should_stop and should_stop():
+                        raise ProcessingCancelled(f"Traitement interrompu après {total_rows} lignes")
+            
+            os.replace(tmp_path, output_path)
+            columnar_file = self._write_columnar(output_path)
+            error_report = self.report.close()
+            
+            result_summary = summary.result()
+            result_summary['streaming'] = {
+                'chunk_size': chunk_size,
+                'output_file': str(output_path),
+                'distinct_asins': len(seen),
+                'errors_total': self.report.total,
+                'warnings_total': n_warnings
+            }
+            
+            return ETLProcessingResult(
+                success=True,
+                total_rows=total_rows,
+                valid_rows=valid_rows,
+                invalid_rows=total_rows - valid_rows,
+                products=products,
+                classifications=classifications,
+                errors=self.report.errors,
+                errors_total=self.report.total,
+                error_counts=dict(self.report.counts),
+                error_report=error_report,
+                warnings=warnings,
+                processing_time_ms=(time.time() - start_time) * 1000,
+                summary=result_summary,
+                output_file=str(output_path),
+                columnar_file=columnar_file
+            )
+        
+        except ProcessingCancelled:
+            # Avec un checkpoint, les fichiers sont gardés pour une reprise
+            if checkpoint is None:
+                tmp_path.unlink(missing_ok=True)
+                self.report.discard()
+            else:
+                self.report.close()
+            raise
+        
+        except Exception as e:
+            logger.error(f"Erreur traitement CSV (streaming): {e}", exc_info=True)
+            if checkpoint is None:
+                tmp_path.unlink(missing_ok=True)
+                self.report.discard()
+            else:
+                self.report.close()
             return ETLProcessingResult(
                 success=False,
                 total_rows=0, valid_rows=0, invalid_rows=0,
@@ -130,6 +420,399 @@ class ETLService:
                 processing_time_ms=(time.time() - start_time) * 1000
             )
     
+    def _process_parallel(
+        self,
+        file_path: str,
+        validate: bool,
+        clean: bool,
+        chunk_size: int,
+        workers: int,
+        progress_callback: Optional[Callable[[int, float], None]],
+        start_time: float,
+        preview_rows: int,
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> ETLProcessingResult:
+        """
+        Traite un CSV en parallèle sur plusieurs processus
+        
+        Le fichier est découpé en plages d'octets alignées sur des débuts
+        d'enregistrement (_record_ranges); chaque processus traite sa plage par
+        blocs (normalisation, nettoyage, validation, conversion) et écrit des
+        fichiers partiels. Le parent fusionne les plages dans l'ordre: sortie
+        (copie d'octets), rapport d'erreurs et messages renumérotés, résumés,
+        aperçu, puis les doublons d'ASIN entre plages.
+        
+        Même résultat que _process_stream (ordre du rapport d'erreurs mis à
+        part); repli sur _process_stream si le fichier ne se découpe pas
+        (petit fichier, encodage non ASCII, guillemets hors norme).
+        """
+        encoding = self._detect_encoding(file_path)
+        file_size = os.path.getsize(file_path)
+        n_parts = min(workers, file_size // self.PARALLEL_MIN_BYTES)
+        layout = None
+        if n_parts > 1 and self._ascii_compatible(encoding):
+            layout = self._record_ranges(file_path, n_parts)
+        if layout is None or len(layout[1]) < 2:
+            logger.info("📄 Découpage en plages impossible ou inutile: traitement streaming séquentiel")
+            return self._process_stream(
+                file_path, validate, clean, chunk_size, progress_callback,
+                start_time, preview_rows, should_stop=should_stop
+            )
+        
+        header_end, ranges = layout
+        stem = self._output_stem(file_path)
+        output_path = Path(settings.processed_dir) / f"{stem}.csv"
+        tmp_path = output_path.with_suffix('.csv.tmp')
+        parts_dir = Path(settings.processed_dir) / f"{stem}.parts"
+        with open(file_path, 'rb') as source:
+            header = source.read(header_end)
+        tasks = [
+            {
+                'index': index, 'file_path': file_path, 'encoding': encoding,
+                'header': header, 'start': start, 'end': end,
+                'validate': validate, 'clean': clean, 'chunk_size': chunk_size,
+                'preview_rows': preview_rows,
+                'output_path': str(parts_dir / f"part{index}.csv"),
+                'report_path': str(parts_dir / f"part{index}_errors.csv")
+            }
+            for index, (start, end) in enumerate(ranges)
+        ]
+        logger.info(f"🧵 Traitement parallèle: {len(tasks)} plages, {workers} processus ({encoding})")
+        
+        try:
+            parts_dir.mkdir(parents=True, exist_ok=True)
+            seen = AsinSet()
+            summary = _StreamSummary()
+            products: List[ProductResponse] = []
+            classifications: List[ProductClassification] = []
+            warnings: List[str] = []
+            total_rows = valid_rows = n_warnings = 0
+            finished: Dict[int, Dict[str, Any]] = {}
+            report_tasks: List[Dict[str, Any]] = []
+            duplicates: List[Tuple[np.ndarray, np.ndarray]] = []
+            merged = bytes_done = 0
+            
+            with open(tmp_path, 'wb') as output:
+                for index, part in self._map_partitions(_process_partition, tasks, workers):
+                    finished[index] = part
+                    bytes_done += ranges[index][1] - ranges[index][0]
+                    
+                    # Fusion dans l'ordre des plages (numéros de ligne cumulés)
+                    while merged in finished:
+                        part = finished.pop(merged)
+                        merged += 1
+                        offset = total_rows
+                        
+                        if part['columns'] and output.tell() == 0:
+                            output.write(pd.DataFrame(columns=part['columns']).to_csv(index=False).encode('utf-8'))
+                        with open(part['output_path'], 'rb') as part_output:
+                            shutil.copyfileobj(part_output, output, 1024 * 1024)
+                        self.report.merge(part['report'], offset)
+                        if part['report'].path.exists():
+                            report_tasks.append({
+                                'index': len(report_tasks), 'report_path': str(part['report'].path),
+                                'row_offset': offset
+                            })
+                        summary.merge(part['summary'])
+                        
+                        room = max(preview_rows - len(products), 0)
+                        products.extend(part['products'][:room])
+                        classifications.extend(part['classifications'][:room])
+                        n_warnings += part['warnings_total']
+                        warnings.extend(
+                            self._shift_row_message(message, offset)
+                            for message in part['warnings'][:self.STREAM_MAX_MESSAGES - len(warnings)]
+                        )
+                        
+                        # Doublons entre plages: premières occurrences d'ASIN déjà vus avant
+                        codes = part['asin_codes']
+                        if len(codes):
+                            repeated = seen.contains(codes)
+                            order = np.argsort(part['asin_rows'][repeated], kind='stable')
+                            repeated_codes = codes[repeated][order]
+                            values = decode_asins(repeated_codes)
+                            hashed = is_hashed(repeated_codes)
+                            if hashed.any():
+                                lookup = np.searchsorted(part['hashed_codes'], repeated_codes[hashed])
+                                values[hashed] = part['hashed_values'][lookup]
+                            duplicates.append((part['asin_rows'][repeated][order] + offset, values))
+                            seen.add(codes)
+                        
+                        total_rows += part['total_rows']
+                        valid_rows += part['valid_rows']
+                        Path(part['output_path']).unlink(missing_ok=True)
+                    
+                    progress = min(bytes_done / max(file_size, 1), 1.0)
+                    logger.info(f"📊 Plage {index + 1}/{len(tasks)} traitée ({progress:.0%})")
+                    if progress_callback:
+                        progress_callback(total_rows, progress)
+                    if should_stop and should_stop():
+                        raise ProcessingCancelled(f"Traitement interrompu après {total_rows} lignes")
+            
+            # Rapports des plages renumérotés en parallèle puis concaténés;
+            # doublons entre plages en fin de rapport
+            shifted = dict(self._map_partitions(_shift_report, report_tasks, workers))
+            for index in range(len(report_tasks)):
+                self.report.append(Path(shifted[index]))
+            for rows, values in duplicates:
+                self.report.add('asin_duplicate', 'asin', rows, values, 'ASIN en doublon', severity='warning')
+            
+            os.replace(tmp_path, output_path)
+            columnar_file = self._write_columnar(output_path)
+            error_report = self.report.close()
+            
+            result_summary = summary.result()
+            result_summary['streaming'] = {
+                'chunk_size': chunk_size,
+                'output_file': str(output_path),
+                'distinct_asins': len(seen),
+                'errors_total': self.report.total,
+                'warnings_total': n_warnings,
+                'workers': workers,
+                'partitions': len(tasks)
+            }
+            
+            return ETLProcessingResult(
+                success=True,
+                total_rows=total_rows,
+                valid_rows=valid_rows,
+                invalid_rows=total_rows - valid_rows,
+                products=products,
+                classifications=classifications,
+                errors=self.report.errors,
+                errors_total=self.report.total,
+                error_counts=dict(self.report.counts),
+                error_report=error_report,
+                warnings=warnings,
+                processing_time_ms=(time.time() - start_time) * 1000,
+                summary=result_summary,
+                output_file=str(output_path),
+                columnar_file=columnar_file
+            )
+        
+        except ProcessingCancelled:
+            tmp_path.unlink(missing_ok=True)
+            self.report.discard()
+            raise
+        
+        except Exception as e:
+            logger.error(f"Erreur traitement CSV (parallèle): {e}", exc_info=True)
+            tmp_path.unlink(missing_ok=True)
+            self.report.discard()
+            return ETLProcessingResult(
+                success=False,
+                total_rows=0, valid_rows=0, invalid_rows=0,
+                errors=[ETLValidationError(row=0, column="file", value=str(file_path),
+                       error=str(e), severity="critical")],
+                processing_time_ms=(time.time() - start_time) * 1000
+            )
+        
+        finally:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+    
+    @staticmethod
+    def _map_partitions(
+        func: Callable[[Dict[str, Any]], Any], tasks: List[Dict[str, Any]], workers: int
+    ) -> Iterator[Tuple[int, Any]]:
+        """
+        (index, func(task)) dans l'ordre où les tâches se terminent
+        
+        Pool de processus neufs (forkserver, sinon spawn): appelé depuis un
+        thread du serveur (pool de threads, exécuteur des jobs ETL), avec torch,
+        FAISS et OpenMP chargés, où un fork peut bloquer le processus fils.
+        Chaque tâche porte tout ce qu'il faut au fils (chemin du fichier, plage
+        d'octets, en-tête, fichiers partiels): rien n'est hérité du parent.
+        """
+        if workers > 1 and len(tasks) > 1:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=context) as pool:
+                futures = {pool.submit(func, task): task['index'] for task in tasks}
+                try:
+                    for future in as_completed(futures):
+                        yield futures[future], future.result()
+                finally:
+                    for future in futures:
+                        future.cancel()
+        else:
+            for task in tasks:
+                yield task['index'], func(task)
+    
+    def _process_range(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Traite une plage d'octets du fichier (exécuté dans un processus fils)
+        
+        Mêmes étapes que _process_stream sur les blocs de la plage, précédée de
+        la ligne d'en-tête. Les lignes sont numérotées depuis le début de la
+        plage (décalées à la fusion); produits et erreurs vont dans des fichiers
+        partiels, les ASIN vus reviennent en codes triés avec leur première ligne.
+        """
+        self.report = _ErrorReport(Path(task['report_path']), self.MAX_INLINE_ERRORS)
+        summary = _StreamSummary(seed=task['index'])
+        seen = AsinSet()
+        products: List[ProductResponse] = []
+        classifications: List[ProductClassification] = []
+        warnings: List[str] = []
+        asin_codes, asin_rows, hashed_codes, hashed_values = [], [], [], []
+        total_rows = valid_rows = n_warnings = 0
+        columns = output_columns = None
+        
+        source = io.BufferedReader(
+            _RecordRange(task['file_path'], task['header'], task['start'], task['end']),
+            buffer_size=self.BOUNDARY_BLOCK_BYTES
+        )
+        with source, open(task['output_path'], 'w', encoding='utf-8', newline='') as output:
+            reader = pd.read_csv(source, encoding=task['encoding'], dtype=str, chunksize=task['chunk_size'])
+            for chunk in reader:
+                total_rows += len(chunk)
+                self.warnings = []
+                
+                if columns is None:
+                    chunk = self._normalize_columns(chunk)
+                    columns = chunk.columns
+                else:
+                    chunk.columns = columns
+                
+                if task['clean']:
+                    chunk = self._clean_data(chunk)
+                if task['validate']:
+                    codes = encode_asins(chunk['asin']) if 'asin' in chunk else None
+                    if codes is not None:
+                        hashed = is_hashed(codes)
+                        asin_codes.append(codes)
+                        asin_rows.append(chunk.index.to_numpy() + 2)
+                        hashed_codes.append(codes[hashed])
+                        hashed_values.append(chunk['asin'].to_numpy(dtype=object)[hashed])
+                    chunk = self._validate_data(chunk, seen=seen, codes=codes)
+                
+                frame = self._product_frame(chunk)
+                valid_rows += len(frame)
+                output_columns = output_columns or list(frame.columns)
+                frame.to_csv(output, header=False, index=False)
+                summary.update(frame)
+                
+                room = max(task['preview_rows'] - len(products), 0)
+                if room:
+                    chunk_products, chunk_classifications = self._frame_to_products(frame.iloc[:room])
+                    products.extend(chunk_products)
+                    classifications.extend(chunk_classifications)
+                
+                n_warnings += len(self.warnings)
+                warnings.extend(self.warnings[:self.STREAM_MAX_MESSAGES - len(warnings)])
+        
+        self.report.close()
+        
+        # Première occurrence de chaque ASIN de la plage (doublons entre plages)
+        codes = np.concatenate(asin_codes) if asin_codes else np.zeros(0, dtype=np.int64)
+        unique_codes, first = np.unique(codes, return_index=True)
+        hashed = np.concatenate(hashed_codes) if hashed_codes else np.zeros(0, dtype=np.int64)
+        unique_hashed, first_hashed = np.unique(hashed, return_index=True)
+        
+        return {
+            'total_rows': total_rows,
+            'valid_rows': valid_rows,
+            'columns': output_columns,
+            'output_path': task['output_path'],
+            'report': self.report,
+            'summary': summary,
+            'products': products,
+            'classifications': classifications,
+            'warnings': warnings,
+            'warnings_total': n_warnings,
+            'asin_codes': unique_codes,
+            'asin_rows': (np.concatenate(asin_rows) if asin_rows else np.zeros(0, dtype=np.int64))[first],
+            'hashed_codes': unique_hashed,
+            'hashed_values': (np.concatenate(hashed_values) if hashed_values else np.zeros(0, dtype=object))[first_hashed]
+        }
+    
+    def _record_ranges(self, file_path: str, n_parts: int) -> Optional[Tuple[int, List[Tuple[int, int]]]]:
+        """
+        Découpe le fichier en plages d'octets commençant chacune par un enregistrement
+        
+        Un saut de ligne termine un enregistrement si le nombre de guillemets qui
+        le précèdent est pair (champs entre guillemets, guillemets doublés). Un
+        passage NumPy sur le fichier vérifie que chaque guillemet ouvrant est en
+        début de champ et chaque fermant en fin de champ; sinon (ex: 55" dans un
+        champ non quoté) la parité ne suit plus le parseur et None est renvoyé.
+        
+        Returns:
+            (fin de la ligne d'en-tête, [(début, fin)]) ou None
+        """
+        data = np.memmap(file_path, dtype=np.uint8, mode='r')
+        size = len(data)
+        targets = [size * k // n_parts for k in range(1, n_parts)]
+        parities: List[int] = []
+        odd = 0
+        
+        for start in range(0, size, self.SCAN_BLOCK_BYTES):
+            block = data[start:start + self.SCAN_BLOCK_BYTES]
+            quotes = np.flatnonzero(block == CSV_QUOTE)
+            for target in targets[len(parities):]:
+                if target >= start + len(block):
+                    break
+                parities.append((odd + int(np.searchsorted(quotes, target - start))) & 1)
+            
+            if len(quotes):
+                positions = quotes + start
+                opening = (np.arange(len(quotes)) + odd) % 2 == 0
+                before = data[np.maximum(positions[opening] - 1, 0)]
+                after = data[np.minimum(positions[~opening] + 1, size - 1)]
+                if not (np.isin(before, CSV_FIELD_EDGES) | (positions[opening] == 0)).all():
+                    return None
+                if not (np.isin(after, CSV_FIELD_EDGES) | (positions[~opening] == size - 1)).all():
+                    return None
+            odd = (odd + len(quotes)) & 1
+        
+        if odd:
+            return None
+        
+        header_end = self._next_record_start(data, 0, 0)
+        starts = {header_end} | {
+            max(self._next_record_start(data, target, parity), header_end)
+            for target, parity in zip(targets, parities)
+        }
+        starts = sorted(start for start in starts if start < size)
+        return header_end, list(zip(starts, starts[1:] + [size]))
+    
+    def _next_record_start(self, data: np.ndarray, position: int, odd: int) -> int:
+        """Début du premier enregistrement après position (odd: parité des guillemets avant)"""
+        while position < len(data):
+            block = np.asarray(data[position:position + self.BOUNDARY_BLOCK_BYTES])
+            parity = (np.cumsum(block == CSV_QUOTE) + odd) & 1
+            newlines = np.flatnonzero((block == CSV_NEWLINE) & (parity == 0))
+            if len(newlines):
+                return position + int(newlines[0]) + 1
+            odd = int(parity[-1])
+            position += len(block)
+        return len(data)
+    
+    @staticmethod
+    def _ascii_compatible(encoding: str) -> bool:
+        """Guillemets, virgules et sauts de ligne codés sur un octet ASCII"""
+        try:
+            return '\n",'.encode(encoding).endswith(b'\n",')
+        except LookupError:
+            return False
+    
+    @staticmethod
+    def _shift_row_message(message: str, offset: int) -> str:
+        """Renumérote un message "Ligne N: ..." d'une plage"""
+        return ROW_MESSAGE_PATTERN.sub(lambda m: f"Ligne {int(m.group(1)) + offset}:", message)
+    
+    @staticmethod
+    def _output_stem(file_path: str) -> str:
+        """Préfixe des fichiers produits dans processed_dir (nom source + horodatage)"""
+        return f"{Path(file_path).stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    
+    @staticmethod
+    def _write_columnar(output_path: Path) -> Optional[str]:
+        """Copie Arrow typée du fichier produit (None sans pyarrow ou en cas d'échec)"""
+        try:
+            return write_catalog(output_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Copie colonnaire non écrite ({output_path.name}): {e}")
+            return None
+    
     def _detect_encoding(self, file_path: str) -> str:
         """Détecte l'encodage du fichier"""
         with open(file_path, 'rb') as f:
@@ -158,19 +841,20 @@ class ETLService:
         return df
     
     def _clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Nettoie les données"""
+        """
+        Nettoie les données
+        
+        Opérations vectorisées par colonne; les versions scalaires (_clean_price,
+        _clean_rank, _clean_url) restent la référence et ne sont appelées que
+        sur les valeurs que le chemin vectorisé ne sait pas convertir.
+        """
         # ASIN
         if 'asin' in df.columns:
             df['asin'] = df['asin'].str.strip().str.upper()
             # Génère un ASIN si manquant
             mask = df['asin'].isna() | (df['asin'] == '')
             if mask.any():
-                import hashlib
-                for idx in df[mask].index:
-                    title = str(df.loc[idx, 'title']) if 'title' in df.columns else str(idx)
-                    hash_val = hashlib.md5(title.encode()).hexdigest()[:10].upper()
-                    df.loc[idx, 'asin'] = hash_val
-                    self.warnings.append(f"Ligne {idx+2}: ASIN généré {hash_val}")
+                df.loc[mask, 'asin'] = self._generate_asins(df, mask)
         
         # Title
         if 'title' in df.columns:
@@ -179,7 +863,7 @@ class ETLService:
         
         # Price
         if 'price' in df.columns:
-            df['price'] = df['price'].apply(self._clean_price)
+            df['price'] = self._clean_price_column(df['price'])
         
         # Rating
         if 'rating' in df.columns:
@@ -192,7 +876,7 @@ class ETLService:
         
         # Rank
         if 'rank' in df.columns:
-            df['rank'] = df['rank'].apply(self._clean_rank)
+            df['rank'] = self._clean_rank_column(df['rank'])
         
         # Stock
         if 'stock' in df.columns:
@@ -201,18 +885,157 @@ class ETLService:
         
         # Image URL
         if 'image_url' in df.columns:
-            df['image_url'] = df['image_url'].apply(self._clean_url)
+            df['image_url'] = self._clean_url_column(df['image_url'])
         
         return df
     
+    def _generate_asins(self, df: pd.DataFrame, mask: pd.Series) -> np.ndarray:
+        """
+        ASIN générés pour les lignes masquées: 10 premiers caractères du MD5 du titre
+        
+        Un seul hash par titre distinct (factorize), une seule affectation.
+        """
+        index = df.index[mask]
+        if 'title' in df.columns:
+            titles = df.loc[mask, 'title'].astype(object).where(df.loc[mask, 'title'].notna(), 'nan')
+            titles = titles.astype(str)
+        else:
+            titles = pd.Series(index.astype(str), index=index)
+        
+        codes, uniques = pd.factorize(titles)
+        hashes = np.asarray(
+            [hashlib.md5(t.encode()).hexdigest()[:10].upper() for t in uniques],
+            dtype=object
+        )[codes]
+        
+        self.warnings.extend(
+            f"Ligne {idx+2}: ASIN généré {h}" for idx, h in zip(index.tolist(), hashes.tolist())
+        )
+        return hashes
+    
+    def _clean_price_column(self, values: pd.Series) -> pd.Series:
+        """
+        Nettoie une colonne de prix (équivalent vectorisé de _clean_price)
+        
+        Sur la matrice de caractères: retrait des symboles monétaires et des
+        espaces, format européen (1.234,56) par masques de position de la
+        première virgule / du premier point, puis conversion float64 en bloc.
+        """
+        parsed = np.zeros(len(values), dtype=np.float64)
+        present = values.notna().to_numpy(dtype=bool)
+        texts = values[present].astype(str).to_numpy(dtype=object)
+        cleaned = np.zeros(len(texts), dtype=np.float64)
+        
+        for rows, matrix, encoded in char_matrix.iter_blocks(texts, self.MAX_CLEAN_WIDTH):
+            stripped = char_matrix.lookup(matrix, PRICE_STRIP_CHARS)
+            
+            # Gère les formats européens (1.234,56): positions relatives inchangées
+            # par le retrait des symboles, un seul compactage pour tout retirer
+            comma = matrix == ord(',')
+            dot = matrix == ord('.')
+            first_comma = char_matrix.first_index(comma)
+            first_dot = char_matrix.first_index(dot)
+            both = (first_comma >= 0) & (first_dot >= 0)
+            european = both & (first_comma > first_dot)
+            thousands = both & (first_comma < first_dot)
+            decimal_comma = (first_comma >= 0) & (first_dot < 0)
+            
+            removed = stripped | (european & dot) | (thousands & comma)
+            matrix = np.where((european | decimal_comma) & comma, ord('.'), matrix)
+            matrix = char_matrix.compact(matrix, (matrix != 0) & ~removed)
+            
+            decimal = encoded & char_matrix.float_syntax(matrix)
+            cleaned[rows[decimal]] = char_matrix.decode(matrix[:, decimal]).astype(np.float64)
+            
+            # Autres valeurs (inf, chiffres non ASCII, texte, trop longues...): chemin scalaire
+            other = ~decimal & (~encoded | (matrix != 0).any(axis=0))
+            cleaned[rows[other]] = [self._clean_price(v) for v in texts[rows[other]]]
+        
+        parsed[present] = np.where(cleaned > 0, cleaned, 0.0)
+        return pd.Series(parsed, index=values.index, name=values.name)
+    
+    def _clean_rank_column(self, values: pd.Series) -> pd.Series:
+        """
+        Nettoie une colonne de rangs (équivalent vectorisé de _clean_rank)
+        
+        Les chiffres ASCII de chaque ligne sont compactés puis assemblés en
+        int64 position par position (schéma de Horner).
+        """
+        present = values.notna().to_numpy(dtype=bool)
+        texts = values[present].astype(str).to_numpy(dtype=object)
+        ranks = np.zeros(len(texts), dtype=np.int64)
+        
+        for rows, matrix, encoded in char_matrix.iter_blocks(texts, self.MAX_CLEAN_WIDTH):
+            digit = (matrix >= ord('0')) & (matrix <= ord('9'))
+            n_digits = digit.sum(axis=0)
+            
+            # Chiffres non ASCII possibles ou rang hors int64: chemin scalaire
+            scalar = ~encoded | (matrix >= 128).any(axis=0) | (n_digits > 18)
+            if scalar.any():
+                fallback = [self._clean_rank(v) for v in texts[rows[scalar]]]
+                if any(r is not None and r > np.iinfo(np.int64).max for r in fallback):
+                    return values.map(self._clean_rank)
+                ranks[rows[scalar]] = [r or 0 for r in fallback]
+            
+            digits = char_matrix.compact(np.where(digit, matrix - ord('0'), 0), digit).astype(np.int64)
+            value = np.zeros(matrix.shape[1], dtype=np.int64)
+            for position in range(int(n_digits.max(initial=0))):
+                value = np.where(position < n_digits, value * 10 + digits[position], value)
+            ranks[rows[~scalar]] = value[~scalar]
+        
+        if not present.all() or (ranks <= 0).any():
+            # Même dtype que l'ancien apply: float64 (NaN) dès qu'un rang manque
+            result = np.full(len(values), np.nan)
+            result[np.flatnonzero(present)] = np.where(ranks > 0, ranks, np.nan)
+            if np.isnan(result).all():
+                return values.map(self._clean_rank)
+            return pd.Series(result, index=values.index, name=values.name)
+        return pd.Series(ranks, index=values.index, name=values.name)
+    
+    def _clean_url_column(self, values: pd.Series) -> pd.Series:
+        """
+        Nettoie une colonne d'URL (équivalent vectorisé de _clean_url)
+        
+        Préfixes lus sur la matrice, préfixe ajouté par masques; seules les
+        valeurs entourées d'espaces passent par le chemin scalaire.
+        """
+        urls = np.full(len(values), '', dtype=object)
+        present = values.notna().to_numpy(dtype=bool)
+        texts = values[present].astype(str).to_numpy(dtype=object)
+        cleaned = np.full(len(texts), '', dtype=object)
+        
+        for rows, matrix, encoded in char_matrix.iter_blocks(texts, self.MAX_URL_WIDTH):
+            lengths = (matrix != 0).sum(axis=0)
+            last = np.take_along_axis(matrix, np.maximum(lengths - 1, 0)[None, :], axis=0)[0]
+            
+            # Valeurs entourées d'espaces (ou vides): chemin scalaire (strip)
+            edges = char_matrix.lookup(np.stack([matrix[0], last]), WHITESPACE_CHARS).any(axis=0)
+            scalar = ~encoded | edges | (lengths == 0)
+            
+            absolute = char_matrix.starts_with(matrix, 'http://') | char_matrix.starts_with(matrix, 'https://')
+            protocol_relative = ~absolute & char_matrix.starts_with(matrix, '//')
+            domain = ~absolute & ~protocol_relative & (matrix == ord('.')).any(axis=0)
+            
+            # Les URL absolues sont gardées telles quelles (aucune copie)
+            block = texts[rows]
+            block[~(absolute | protocol_relative | domain)] = ''
+            block[protocol_relative] = 'https:' + block[protocol_relative]
+            block[domain] = 'https://' + block[domain]
+            
+            block[scalar] = [self._clean_url(v) for v in texts[rows[scalar]]]
+            cleaned[rows] = block
+        
+        urls[present] = cleaned
+        return pd.Series(urls, index=values.index, name=values.name)
+    
     def _clean_price(self, value) -> float:
         """Nettoie un prix"""
         if pd.isna(value):
             return 0.0
         
         s = str(value).strip()
-        s = re.sub(r'[€$£¥₹]', '', s)
-        s = re.sub(r'\s+', '', s)
+        s = CURRENCY_PATTERN.sub('', s)
+        s = WHITESPACE_PATTERN.sub('', s)
         
         # Gère les formats européens (1.234,56)
         if ',' in s and '.' in s:
@@ -234,8 +1057,8 @@ class ETLService:
             return None
         
         s = str(value).strip()
-        s = re.sub(r'[#,.\s]', '', s)
-        s = re.sub(r'[^\d]', '', s)
+        s = RANK_SEPARATORS_PATTERN.sub('', s)
+        s = NON_DIGIT_PATTERN.sub('', s)
         
         try:
             rank = int(s)
@@ -258,152 +1081,279 @@ class ETLService:
                 return ""
         return url
     
-    def _validate_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Valide les données"""
-        valid_mask = pd.Series(True, index=df.index)
+    def _validate_data(
+        self,
+        df: pd.DataFrame,
+        seen: Optional[AsinSet] = None,
+        codes: Optional[np.ndarray] = None
+    ) -> pd.DataFrame:
+        """
+        Valide les données
+        
+        Règles compilées du registre (ETL_RULES), un masque vectorisé par règle;
+        les lignes fautives sont transmises en bloc au rapport d'erreurs
+        (self.report), sans objet par ligne.
         
-        # ASIN obligatoire et unique
+        Args:
+            seen: ASIN des blocs précédents (streaming), complété avec ceux du bloc
+            codes: encode_asins(df['asin']) si déjà calculé
+        """
+        valid = np.ones(len(df), dtype=bool)
+        rows = df.index.to_numpy() + 2
+        columns: Dict[str, Any] = {name: df[name] for name in df.columns}
+        
+        # Doublons (dans le bloc et avec les blocs précédents)
         if 'asin' in df.columns:
-            invalid_asin = df['asin'].isna() | (df['asin'].str.len() != 10)
-            for idx in df[invalid_asin].index:
-                self.errors.append(ETLValidationError(
-                    row=idx + 2, column='asin',
-                    value=df.loc[idx, 'asin'],
-                    error='ASIN invalide (doit faire 10 caractères)',
-                    severity='error'
-                ))
-            valid_mask &= ~invalid_asin
-            
-            # Doublons
-            duplicates = df.duplicated(subset=['asin'], keep='first')
-            for idx in df[duplicates].index:
-                self.errors.append(ETLValidationError(
-                    row=idx + 2, column='asin',
-                    value=df.loc[idx, 'asin'],
-                    error='ASIN en doublon',
-                    severity='warning'
-                ))
-        
-        # Title obligatoire
-        if 'title' in df.columns:
-            invalid_title = df['title'].isna() | (df['title'].str.len() < 3)
-            for idx in df[invalid_title].index:
-                self.errors.append(ETLValidationError(
-                    row=idx + 2, column='title',
-                    value=df.loc[idx, 'title'],
-                    error='Titre manquant ou trop court',
-                    severity='error'
-                ))
-            valid_mask &= ~invalid_title
-        
-        # Price > 0
-        if 'price' in df.columns:
-            invalid_price = df['price'] <= 0
-            for idx in df[invalid_price].index:
-                self.errors.append(ETLValidationError(
-                    row=idx + 2, column='price',
-                    value=df.loc[idx, 'price'],
-                    error='Prix invalide (doit être > 0)',
-                    severity='error'
-                ))
-            valid_mask &= ~invalid_price
-        
-        return df[valid_mask].reset_index(drop=True)
+            duplicates = df.duplicated(subset=['asin'], keep='first').to_numpy(copy=True)
+            if seen is not None:
+                codes = encode_asins(df['asin']) if codes is None else codes
+                duplicates |= seen.contains(codes)
+                seen.add(codes)
+            columns['asin_duplicate'] = duplicates
+        
+        # Règles du registre ETL_RULES (ignorées si leurs colonnes sont absentes)
+        for rule, mask in etl_rules.evaluate(columns):
+            positions = np.flatnonzero(mask)
+            error = rule.message if not rule.placeholders else [rule.render(columns, i) for i in positions]
+            self.report.add(
+                rule.code, rule.field, rows[mask], columns[rule.value][mask] if rule.value else [None] * len(positions),
+                error, severity=rule.severity
+            )
+            if rule.severity == 'error':
+                valid &= ~mask
+        
+        # Index conservé: numéros de ligne source des erreurs de conversion
+        return df[valid]
     
     def _convert_to_products(
         self, df: pd.DataFrame
     ) -> Tuple[List[ProductResponse], List[ProductClassification]]:
         """Convertit le DataFrame en produits"""
-        products = []
-        classifications = []
+        return self._frame_to_products(self._product_frame(df))
+    
+    def _product_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Convertit le DataFrame en colonnes produit typées + classifications
+        
+        Les valeurs déjà typées par le nettoyage sont converties par colonne;
+        les lignes dont la validité n'est pas garantie (types inattendus, valeurs
+        hors bornes du schéma) passent par _convert_row, qui valide avec pydantic;
+        ses erreurs de conversion vont au rapport comme avant.
+        """
+        n = len(df)
+        fast = np.ones(n, dtype=bool)
+        
+        # str(v): une valeur manquante donnerait 'nan' -> chemin scalaire
+        asin = self._text_column(df, 'asin', '', fast)
+        fast &= self._text_lengths(asin) == 10
+        title = self._text_column(df, 'title', 'Sans titre', fast)
+        lengths = self._text_lengths(title)
+        fast &= (lengths >= 1) & (lengths <= 500)
+        category = self._text_column(df, 'category', None, fast)
+        image_url = self._text_column(df, 'image_url', None, fast)
+        
+        # float(v or 0) / int(v or 0): valeur manquante -> erreur, sauf colonne absente
+        price, valid = self._numeric_column(df, 'price', float)
+        fast &= valid & (price >= 0)
+        rating, valid = self._numeric_column(df, 'rating', float)
+        fast &= valid & (rating >= 0) & (rating <= 5)
+        review_count, valid = self._numeric_column(df, 'review_count', int)
+        fast &= valid & (review_count >= 0)
+        stock, valid = self._numeric_column(df, 'stock', int)
+        fast &= valid & (stock >= 0)
         
-        for idx, row in df.iterrows():
+        # Rang optionnel: manquant -> None, sinon int(v) >= 1
+        rank, valid = self._numeric_column(df, 'rank', int)
+        rank_missing = df['rank'].isna().to_numpy(copy=True) if 'rank' in df.columns else np.ones(n, dtype=bool)
+        fast &= rank_missing | (valid & (rank >= 1))
+        
+        columns = {
+            'asin': asin, 'title': title, 'price': price, 'rating': rating,
+            'review_count': review_count, 'rank': rank, 'stock': stock,
+            'category': category, 'image_url': image_url
+        }
+        
+        # Chemin scalaire: produit validé recopié dans les colonnes, ou erreur
+        keep = fast.copy()
+        failed_rows, failed_values, failed_errors = [], [], []
+        for position in np.flatnonzero(~fast):
+            row = df.iloc[position]
             try:
-                product = ProductResponse(
-                    asin=str(row.get('asin', '')),
-                    title=str(row.get('title', 'Sans titre')),
-                    price=float(row.get('price', 0) or 0),
-                    rating=float(row.get('rating', 0) or 0),
-                    review_count=int(row.get('review_count', 0) or 0),
-                    rank=int(row.get('rank')) if pd.notna(row.get('rank')) else None,
-                    stock=int(row.get('stock', 0) or 0),
-                    category=str(row.get('category', '')) if pd.notna(row.get('category')) else None,
-                    image_url=str(row.get('image_url', '')) if pd.notna(row.get('image_url')) else None
-                )
-                products.append(product)
-                
-                # Classification
-                classification = ProductClassification(
-                    asin=product.asin,
-                    rank_category=self.classify_rank(product.rank),
-                    price_bucket=self.classify_price(product.price),
-                    stock_status=self.classify_stock(product.stock)
-                )
-                classifications.append(classification)
-            
+                product = self._convert_row(row)
+                for name, values in columns.items():
+                    value = getattr(product, name)
+                    if name == 'rank':
+                        rank_missing[position] = value is None
+                        value = 0 if value is None else value
+                    values[position] = value
+            except OverflowError:
+                error = 'Entier hors limites (64 bits)'
             except Exception as e:
-                self.errors.append(ETLValidationError(
-                    row=idx + 2, column='conversion',
-                    value=str(row.to_dict())[:100],
-                    error=str(e),
-                    severity='error'
-                ))
+                error = str(e)
+            else:
+                keep[position] = True
+                continue
+            failed_rows.append(df.index[position] + 2)
+            failed_values.append(str(row.to_dict())[:100])
+            failed_errors.append(error)
         
-        return products, classifications
+        self.report.add(
+            'conversion', 'conversion', np.asarray(failed_rows, dtype=np.int64),
+            failed_values, failed_errors
+        )
+        
+        frame = pd.DataFrame(columns)[keep].reset_index(drop=True)
+        frame['rank'] = pd.arrays.IntegerArray(rank[keep], rank_missing[keep])
+        
+        # Classifications (mêmes seuils que classify_rank / classify_price / classify_stock)
+        ranks = frame['rank'].fillna(0).to_numpy(dtype=np.int64)
+        prices = frame['price'].to_numpy()
+        stocks = frame['stock'].to_numpy()
+        frame['rank_category'] = np.select(
+            [ranks <= 0, ranks <= 10, ranks <= 100, ranks <= 1000, ranks <= 5000],
+            [RankCategory.BEYOND.value, RankCategory.TOP_10.value, RankCategory.TOP_100.value,
+             RankCategory.TOP_1000.value, RankCategory.TOP_5000.value],
+            default=RankCategory.BEYOND.value
+        )
+        frame['price_bucket'] = price_tiers(prices)
+        frame['stock_status'] = np.select(
+            [stocks <= 0, stocks <= 10, stocks <= 100],
+            [StockStatus.OUT_OF_STOCK.value, StockStatus.LOW_STOCK.value, StockStatus.IN_STOCK.value],
+            default=StockStatus.HIGH_STOCK.value
+        )
+        return frame
     
-    def _generate_summary(
-        self,
-        products: List[ProductResponse],
-        classifications: List[ProductClassification]
-    ) -> Dict[str, Any]:
-        """Génère un résumé des données"""
-        if not products:
-            return {}
+    @staticmethod
+    def _text_column(
+        df: pd.DataFrame, name: str, default: Optional[str], fast: np.ndarray
+    ) -> np.ndarray:
+        """
+        Colonne texte en tableau object (None si manquant)
+        
+        Une colonne non textuelle désactive le chemin vectorisé (str(v) scalaire).
+        """
+        if name not in df.columns:
+            return np.full(len(df), default, dtype=object)
+        
+        column = df[name]
+        if not pd.api.types.is_string_dtype(column):
+            fast[:] = False
+            return np.full(len(df), None, dtype=object)
+        
+        values = column.to_numpy(dtype=object, copy=True)
+        values[column.isna().to_numpy()] = None
+        return values
+    
+    @staticmethod
+    def _text_lengths(values: np.ndarray) -> np.ndarray:
+        """Longueur de chaque chaîne (-1 pour None)"""
+        lengths = np.full(len(values), -1, dtype=np.int64)
+        present = np.not_equal(values, None)
+        lengths[present] = np.fromiter(map(len, values[present]), dtype=np.int64, count=int(present.sum()))
+        return lengths
+    
+    @staticmethod
+    def _numeric_column(df: pd.DataFrame, name: str, kind: type) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Colonne numérique convertie comme kind(v or 0) + masque des valeurs convertibles
         
-        prices = [p.price for p in products if p.price > 0]
-        ratings = [p.rating for p in products if p.rating and p.rating > 0]
-        stocks = [p.stock for p in products if p.stock is not None]
+        Colonne absente: zéros. Colonne non numérique: rien de convertible (scalaire).
+        """
+        dtype = np.float64 if kind is float else np.int64
+        if name not in df.columns:
+            return np.zeros(len(df), dtype=dtype), np.ones(len(df), dtype=bool)
         
-        # Stats par catégorie
-        categories = {}
-        for p in products:
-            cat = p.category or 'Sans catégorie'
-            categories[cat] = categories.get(cat, 0) + 1
+        column = df[name]
+        if not pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column):
+            return np.zeros(len(df), dtype=dtype), np.zeros(len(df), dtype=bool)
         
-        # Stats par classification
-        rank_dist = {}
-        for c in classifications:
-            rank_dist[c.rank_category.value] = rank_dist.get(c.rank_category.value, 0) + 1
+        values = column.to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+        if kind is float:
+            return values, ~np.isnan(values)
         
-        price_dist = {}
-        for c in classifications:
-            price_dist[c.price_bucket.value] = price_dist.get(c.price_bucket.value, 0) + 1
+        if pd.api.types.is_integer_dtype(column) and not column.hasnans:
+            return column.to_numpy(dtype=np.int64, copy=True), np.ones(len(df), dtype=bool)
+        # int(v) tronque; au-delà de 2^62 le chemin scalaire garde l'entier Python exact
+        valid = np.abs(values) < 2.0 ** 62
+        return np.where(valid, np.trunc(values), 0).astype(np.int64), valid
+    
+    @staticmethod
+    def _convert_row(row: pd.Series) -> ProductResponse:
+        """Conversion d'une ligne avec validation pydantic (lève une exception si invalide)"""
+        return ProductResponse(
+            asin=str(row.get('asin', '')),
+            title=str(row.get('title', 'Sans titre')),
+            price=float(row.get('price', 0) or 0),
+            rating=float(row.get('rating', 0) or 0),
+            review_count=int(row.get('review_count', 0) or 0),
+            rank=int(row.get('rank')) if pd.notna(row.get('rank')) else None,
+            stock=int(row.get('stock', 0) or 0),
+            category=str(row.get('category', '')) if pd.notna(row.get('category')) else None,
+            image_url=str(row.get('image_url', '')) if pd.notna(row.get('image_url')) else None
+        )
+    
+    @staticmethod
+    def _frame_to_products(
+        frame: pd.DataFrame
+    ) -> Tuple[List[ProductResponse], List[ProductClassification]]:
+        """
+        Objets pydantic des lignes d'un frame produit (à appeler sur la page renvoyée)
         
-        stock_dist = {}
-        for c in classifications:
-            stock_dist[c.stock_status.value] = stock_dist.get(c.stock_status.value, 0) + 1
+        Validation en un seul appel par liste (TypeAdapter), plus rapide que
+        la construction objet par objet.
+        """
+        columns = {
+            name: frame[name].astype(object).where(frame[name].notna(), None).tolist()
+            for name in STREAM_OUTPUT_COLUMNS
+        }
+        products = PRODUCT_LIST_ADAPTER.validate_python(
+            [dict(zip(columns, values)) for values in zip(*columns.values())]
+        )
+        classifications = CLASSIFICATION_LIST_ADAPTER.validate_python([
+            {'asin': asin, 'rank_category': rank_category,
+             'price_bucket': price_bucket, 'stock_status': stock_status}
+            for asin, rank_category, price_bucket, stock_status in zip(
+                columns['asin'], frame['rank_category'].tolist(),
+                frame['price_bucket'].tolist(), frame['stock_status'].tolist()
+            )
+        ])
+        return products, classifications
+    
+    def _generate_summary(self, frame: pd.DataFrame) -> Dict[str, Any]:
+        """Génère un résumé des données (agrégats vectorisés sur le frame produit)"""
+        if frame.empty:
+            return {}
+        
+        prices = frame['price'].to_numpy()
+        prices = prices[prices > 0]
+        ratings = frame['rating'].to_numpy()
+        ratings = ratings[ratings > 0]
+        stocks = frame['stock'].to_numpy()
+        
+        categories = frame['category'].fillna('').replace('', 'Sans catégorie')
+        middle = len(prices) // 2
         
         return {
             'price': {
-                'min': min(prices) if prices else 0,
-                'max': max(prices) if prices else 0,
-                'avg': sum(prices) / len(prices) if prices else 0,
-                'median': sorted(prices)[len(prices)//2] if prices else 0
+                'min': float(prices.min()) if len(prices) else 0,
+                'max': float(prices.max()) if len(prices) else 0,
+                'avg': float(prices.sum()) / len(prices) if len(prices) else 0,
+                'median': float(np.partition(prices, middle)[middle]) if len(prices) else 0
             },
             'rating': {
-                'min': min(ratings) if ratings else 0,
-                'max': max(ratings) if ratings else 0,
-                'avg': sum(ratings) / len(ratings) if ratings else 0
+                'min': float(ratings.min()) if len(ratings) else 0,
+                'max': float(ratings.max()) if len(ratings) else 0,
+                'avg': float(ratings.sum()) / len(ratings) if len(ratings) else 0
             },
             'stock': {
-                'total': sum(stocks) if stocks else 0,
-                'out_of_stock': len([s for s in stocks if s == 0]),
-                'low_stock': len([s for s in stocks if 0 < s <= 10])
+                'total': int(stocks.sum()),
+                'out_of_stock': int((stocks == 0).sum()),
+                'low_stock': int(((stocks > 0) & (stocks <= 10)).sum())
             },
-            'categories': categories,
-            'rank_distribution': rank_dist,
-            'price_distribution': price_dist,
-            'stock_distribution': stock_dist
+            'categories': categories.value_counts(sort=False).to_dict(),
+            'rank_distribution': frame['rank_category'].value_counts(sort=False).to_dict(),
+            'price_distribution': frame['price_bucket'].value_counts(sort=False).to_dict(),
+            'stock_distribution': frame['stock_status'].value_counts(sort=False).to_dict()
         }
     
     # === Classification Methods ===
@@ -425,18 +1375,8 @@ class ETLService:
     
     @staticmethod
     def classify_price(price: float) -> PriceBucket:
-        """Classifie un prix"""
-        if price <= 0:
-            return PriceBucket.BUDGET
-        if price < 25:
-            return PriceBucket.BUDGET
-        if price < 50:
-            return PriceBucket.ECONOMY
-        if price < 100:
-            return PriceBucket.STANDARD
-        if price < 500:
-            return PriceBucket.PREMIUM
-        return PriceBucket.LUXURY
+        """Classifie un prix (paliers PRICE_TIERS)"""
+        return PriceBucket(price_tier(price))
     
     @staticmethod
     def classify_stock(stock: Optional[int]) -> StockStatus:
@@ -450,5 +1390,386 @@ class ETLService:
         return StockStatus.HIGH_STOCK
 
 
+class _ErrorReport:
+    """
+    Rapport d'erreurs de validation ETL
+    
+    Compteurs par règle, premières erreurs gardées en objets pour la réponse,
+    liste complète écrite au fil de l'eau dans un CSV (path) téléchargeable.
+    Sans path, seuls les compteurs et l'échantillon sont conservés.
+    """
+    
+    COLUMNS = ['row', 'rule', 'column', 'value', 'error', 'severity']
+    
+    def __init__(self, path: Optional[Path] = None, max_inline: int = 1000):
+        self.path = path
+        self.max_inline = max_inline
+        self.errors: List[ETLValidationError] = []
+        self.counts: Counter = Counter()
+        self._file = None
+        self._mode = 'w'
+    
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+    
+    def add(
+        self,
+        rule: str,
+        column: str,
+        rows: np.ndarray,
+        values,
+        error,
+        severity: str = 'error'
+    ) -> None:
+        """
+        Ajoute les erreurs d'une règle en bloc
+        
+        Args:
+            rows: Numéros de ligne dans le fichier source
+            values: Valeurs fautives (même longueur que rows)
+            error: Message commun, ou un message par ligne
+        """
+        if not len(rows):
+            return
+        self.counts[rule] += len(rows)
+        values = pd.Series(values, copy=False).reset_index(drop=True)
+        
+        room = max(self.max_inline - len(self.errors), 0)
+        if room:
+            inline = values.iloc[:room].astype(object)
+            messages = [error] * len(inline) if isinstance(error, str) else list(error)[:room]
+            self.errors.extend(
+                ETLValidationError(row=row, column=column, value=value, error=message, severity=severity)
+                for row, value, message in zip(
+                    rows[:room].tolist(), inline.where(inline.notna(), None).tolist(), messages
+                )
+            )
+        
+        if self.path is None:
+            return
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, self._mode, encoding='utf-8', newline='')
+        pd.DataFrame({
+            'row': rows, 'rule': rule, 'column': column,
+            'value': values, 'error': error if isinstance(error, str) else list(error),
+            'severity': severity
+        }, columns=self.COLUMNS).to_csv(self._file, header=self._file.tell() == 0, index=False)
+    
+    def state(self) -> Dict[str, Any]:
+        """État sérialisable (checkpoint): compteurs, échantillon, taille du fichier"""
+        size = 0
+        if self._file is not None:
+            self._file.flush()
+            size = self._file.tell()
+        return {
+            'path': str(self.path) if self.path else None,
+            'size': size,
+            'counts': dict(self.counts),
+            'errors': [e.model_dump(mode='json') for e in self.errors]
+        }
+    
+    def restore(self, state: Dict[str, Any]) -> None:
+        """Reprend un rapport enregistré; le fichier est tronqué à la taille notée"""
+        self.path = Path(state['path']) if state['path'] else None
+        self.counts = Counter(state['counts'])
+        self.errors = [ETLValidationError.model_validate(e) for e in state['errors']]
+        if self.path is not None and self.path.exists():
+            os.truncate(self.path, state['size'])
+            self._mode = 'a'
+    
+    def close(self) -> Optional[str]:
+        """Ferme le rapport; chemin du fichier, ou None si aucune erreur"""
+        if self._file is None:
+            return str(self.path) if self._mode == 'a' else None
+        self._file.close()
+        self._file = None
+        logger.info(f"📝 Rapport d'erreurs: {self.path} ({self.total} erreurs)")
+        return str(self.path)
+    
+    def merge(self, other: '_ErrorReport', row_offset: int) -> None:
+        """
+        Ajoute les compteurs et l'échantillon du rapport d'une plage du fichier
+        (traitement parallèle), lignes décalées de row_offset; le fichier de la
+        plage est ajouté ensuite par append, une fois renuméroté.
+        """
+        self.counts.update(other.counts)
+        room = max(self.max_inline - len(self.errors), 0)
+        self.errors.extend(
+            error.model_copy(update={'row': error.row + row_offset}) for error in other.errors[:room]
+        )
+    
+    def append(self, path: Path) -> None:
+        """Recopie un rapport CSV sans en-tête (déjà compté par merge)"""
+        if self.path is None:
+            return
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, self._mode, encoding='utf-8', newline='')
+        if self._file.tell() == 0:
+            pd.DataFrame(columns=self.COLUMNS).to_csv(self._file, index=False)
+        with open(path, encoding='utf-8', newline='') as part:
+            shutil.copyfileobj(part, self._file, 1024 * 1024)
+    
+    def discard(self) -> None:
+        """Ferme et supprime un rapport incomplet (traitement en échec)"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self.path.unlink(missing_ok=True)
+
+
+class _StreamSummary:
+    """
+    Résumé ETL agrégé bloc par bloc (mêmes clés que _generate_summary)
+    
+    Compteurs et extrema exacts; la médiane des prix est calculée sur un
+    échantillon uniforme borné (exacte tant que le fichier tient dedans).
+    """
+    
+    MEDIAN_SAMPLE_SIZE = 100_000
+    
+    def __init__(self, seed: int = 0):
+        self.count = 0
+        self.price = {'min': np.inf, 'max': -np.inf, 'sum': 0.0, 'count': 0}
+        self.rating = {'min': np.inf, 'max': -np.inf, 'sum': 0.0, 'count': 0}
+        self.stock = {'total': 0, 'out_of_stock': 0, 'low_stock': 0}
+        self.categories: Counter = Counter()
+        self.distributions = {
+            'rank_distribution': Counter(),
+            'price_distribution': Counter(),
+            'stock_distribution': Counter()
+        }
+        self._rng = np.random.default_rng(seed)
+        self._sample = np.zeros(0, dtype=np.float64)
+        self._sample_keys = np.zeros(0, dtype=np.float64)
+    
+    def update(self, frame: pd.DataFrame) -> None:
+        if frame.empty:
+            return
+        self.count += len(frame)
+        
+        prices = frame['price'].to_numpy(dtype=np.float64)
+        prices = prices[prices > 0]
+        self._add_stats(self.price, prices)
+        self._add_sample(prices)
+        
+        ratings = frame['rating'].to_numpy(dtype=np.float64)
+        self._add_stats(self.rating, ratings[ratings > 0])
+        
+        stocks = frame['stock'].to_numpy(dtype=np.int64)
+        self.stock['total'] += int(stocks.sum())
+        self.stock['out_of_stock'] += int((stocks == 0).sum())
+        self.stock['low_stock'] += int(((stocks > 0) & (stocks <= 10)).sum())
+        
+        categories = frame['category'].fillna('').replace('', 'Sans catégorie')
+        self.categories.update(categories.value_counts(sort=False).to_dict())
+        for key, column in (
+            ('rank_distribution', 'rank_category'),
+            ('price_distribution', 'price_bucket'),
+            ('stock_distribution', 'stock_status')
+        ):
+            self.distributions[key].update(frame[column].value_counts(sort=False).to_dict())
+    
+    @staticmethod
+    def _add_stats(stats: Dict[str, float], values: np.ndarray) -> None:
+        if not len(values):
+            return
+        stats['min'] = min(stats['min'], float(values.min()))
+        stats['max'] = max(stats['max'], float(values.max()))
+        stats['sum'] += float(values.sum())
+        stats['count'] += len(values)
+    
+    def _add_sample(self, prices: np.ndarray, keys: Optional[np.ndarray] = None) -> None:
+        """Échantillon uniforme: garde les prix aux plus petites clés aléatoires"""
+        keys = np.concatenate([self._sample_keys, self._rng.random(len(prices)) if keys is None else keys])
+        values = np.concatenate([self._sample, prices])
+        if len(keys) > self.MEDIAN_SAMPLE_SIZE:
+            keep = np.argpartition(keys, self.MEDIAN_SAMPLE_SIZE - 1)[:self.MEDIAN_SAMPLE_SIZE]
+            keys, values = keys[keep], values[keep]
+        self._sample_keys, self._sample = keys, values
+    
+    def merge(self, other: '_StreamSummary') -> None:
+        """Ajoute le résumé d'une autre plage du fichier (traitement parallèle)"""
+        self.count += other.count
+        for stats, part in ((self.price, other.price), (self.rating, other.rating)):
+            stats['min'] = min(stats['min'], part['min'])
+            stats['max'] = max(stats['max'], part['max'])
+            stats['sum'] += part['sum']
+            stats['count'] += part['count']
+        for key in self.stock:
+            self.stock[key] += other.stock[key]
+        self.categories.update(other.categories)
+        for key, counts in other.distributions.items():
+            self.distributions[key].update(counts)
+        self._add_sample(other._sample, other._sample_keys)
+    
+    def save(self, path: Path) -> None:
+        """Enregistre l'état (compteurs en JSON, échantillon en tableaux)"""
+        meta = {
+            'count': self.count, 'price': self.price, 'rating': self.rating,
+            'stock': self.stock, 'categories': dict(self.categories),
+            'distributions': {key: dict(counts) for key, counts in self.distributions.items()},
+            'rng': self._rng.bit_generator.state
+        }
+        with open(path, 'wb') as f:
+            np.savez(f, sample=self._sample, sample_keys=self._sample_keys, meta=np.array(json.dumps(meta)))
+    
+    @classmethod
+    def load(cls, path: Path) -> '_StreamSummary':
+        summary = cls()
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            summary._sample, summary._sample_keys = data['sample'], data['sample_keys']
+        summary.count = meta['count']
+        summary.price, summary.rating, summary.stock = meta['price'], meta['rating'], meta['stock']
+        summary.categories = Counter(meta['categories'])
+        summary.distributions = {key: Counter(counts) for key, counts in meta['distributions'].items()}
+        summary._rng.bit_generator.state = meta['rng']
+        return summary
+    
+    def result(self) -> Dict[str, Any]:
+        if not self.count:
+            return {}
+        
+        price, rating = self.price, self.rating
+        sample = np.sort(self._sample)
+        return {
+            'price': {
+                'min': price['min'] if price['count'] else 0,
+                'max': price['max'] if price['count'] else 0,
+                'avg': price['sum'] / price['count'] if price['count'] else 0,
+                'median': float(sample[len(sample) // 2]) if len(sample) else 0
+            },
+            'rating': {
+                'min': rating['min'] if rating['count'] else 0,
+                'max': rating['max'] if rating['count'] else 0,
+                'avg': rating['sum'] / rating['count'] if rating['count'] else 0
+            },
+            'stock': dict(self.stock),
+            'categories': dict(self.categories),
+            **{key: dict(counts) for key, counts in self.distributions.items()}
+        }
+
+
+
+class _StreamCheckpoint:
+    """
+    Point de reprise d'un traitement streaming
+    
+    Fichiers du répertoire:
+        state.json    -> blocs traités, compteurs, tailles des fichiers de sortie
+        summary.npz   -> état du résumé agrégé
+        asins.bin     -> codes des ASIN vus (int64, ajoutés bloc par bloc)
+    
+    state.json est remplacé en dernier (écriture atomique): un arrêt brutal
+    laisse au pire des fichiers plus longs que noté, tronqués à la reprise.
+    """
+    
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.state_path = self.directory / 'state.json'
+        self.summary_path = self.directory / 'summary.npz'
+        self.asins_path = self.directory / 'asins.bin'
+    
+    def load(self) -> Optional[Dict[str, Any]]:
+        if not self.state_path.exists():
+            return None
+        return json.loads(self.state_path.read_text(encoding='utf-8'))
+    
+    def load_summary(self) -> '_StreamSummary':
+        return _StreamSummary.load(self.summary_path)
+    
+    def load_asins(self, size: int) -> np.ndarray:
+        if not self.asins_path.exists():
+            return np.zeros(0, dtype=np.int64)
+        os.truncate(self.asins_path, size)
+        return np.fromfile(self.asins_path, dtype=np.int64)
+    
+    def append_asins(self, codes: Optional[np.ndarray]) -> int:
+        """Ajoute les codes d'un bloc; taille du fichier après ajout"""
+        with open(self.asins_path, 'ab') as f:
+            if codes is not None and len(codes):
+                np.unique(codes).astype(np.int64).tofile(f)
+            return f.tell()
+    
+    def save(self, state: Dict[str, Any], summary: '_StreamSummary') -> None:
+        tmp = self.summary_path.with_suffix('.tmp')
+        summary.save(tmp)
+        os.replace(tmp, self.summary_path)
+        
+        tmp = self.state_path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(state), encoding='utf-8')
+        os.replace(tmp, self.state_path)
+
+
+class _RecordRange(io.RawIOBase):
+    """
+    Plage [start, end) d'un fichier précédée de sa ligne d'en-tête
+    
+    Lue par pandas comme un fichier CSV complet (traitement parallèle).
+    """
+    
+    def __init__(self, path: str, header: bytes, start: int, end: int):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._header = header
+        self._remaining = end - start
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        if self._header:
+            n = min(len(buffer), len(self._header))
+            buffer[:n] = self._header[:n]
+            self._header = self._header[n:]
+            return n
+        n = min(len(buffer), self._remaining)
+        if n <= 0:
+            return 0
+        n = self._file.readinto(memoryview(buffer)[:n])
+        self._remaining -= n
+        return n
+    
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def _process_partition(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Traite une plage du fichier dans un processus fils (voir ETLService._process_range)"""
+    return ETLService()._process_range(task)
+
+
+def _shift_report(task: Dict[str, Any]) -> str:
+    """
+    Rapport d'erreurs d'une plage renuméroté (row_offset), sans en-tête; chemin écrit
+    
+    Fichier écrit par to_csv (guillemets réguliers): débuts d'enregistrement
+    repérés par la parité des guillemets, seul le premier champ (row, entier)
+    est réécrit, le reste de chaque enregistrement est recopié tel quel.
+    """
+    path = Path(task['report_path'])
+    raw = path.read_bytes()
+    data = np.frombuffer(raw, dtype=np.uint8)
+    parity = np.cumsum(data == CSV_QUOTE, dtype=np.uint8) & 1
+    starts = np.flatnonzero((data == CSV_NEWLINE) & (parity == 0)) + 1
+    starts = starts[starts < len(raw)]
+    commas = np.flatnonzero(data == CSV_COMMA)
+    fields = commas[np.searchsorted(commas, starts)]
+    
+    offset = task['row_offset']
+    shifted = path.with_name(f"{path.stem}_shifted.csv")
+    with open(shifted, 'wb') as output:
+        output.writelines(
+            b'%d%s' % (int(raw[start:field]) + offset, raw[field:end])
+            for start, field, end in zip(starts.tolist(), fields.tolist(), starts[1:].tolist() + [len(raw)])
+        )
+    return str(shifted)
+
+
 # Instance singleton
 etl_service = ETLService()
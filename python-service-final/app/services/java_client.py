@@ -1,27 +1,60 @@
 """
 Client HTTP pour communiquer avec le backend Java Spring Boot
 """
+import asyncio
+import hashlib
 import logging
-from typing import List, Optional, Dict, Any
+import random
+import time
+from typing import List, Optional, Dict, Any, Tuple
 import httpx
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Réponses transitoires (surcharge, passerelle): la requête est retentée
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# Réponses garantissant que la requête n'a pas été traitée: seules retentées
+# pour un POST (après un 502/504, le backend a pu enregistrer la ligne)
+NOT_PROCESSED_STATUSES = {429, 503}
+
+# Erreurs réseau sans envoi de la requête: retentables même pour un POST
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class JavaAPIError(Exception):
+    """Réponse en erreur du backend Java"""
+    
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+
 
 class JavaBackendClient:
-    def __init__(self):
-        self.base_url = settings.java_backend_url
+    def __init__(self, base_url: Optional[str] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url or settings.java_backend_url
         self.timeout = settings.java_api_timeout
+        self._transport = transport
         self._client = None
+        # Catégories connues: nom (minuscules) -> id, chargé une fois
+        self._categories: Optional[Dict[str, Any]] = None
+        self._category_lock = asyncio.Lock()
+        # Produits existants: ASIN -> (id, empreinte), pour l'import en mode diff
+        self._product_index: Optional[Dict[str, Tuple[Any, str]]] = None
+        self._product_index_at = 0.0
     
     async def get_client(self):
         if self._client is None or self._client.is_closed:
+            # Connexions gardées ouvertes pour toutes les créations simultanées
+            keepalive = max(20, settings.java_import_concurrency)
             self._client = httpx.AsyncClient(
                 base_url=self.base_url,
                 timeout=self.timeout,
-                headers={"Content-Type": "application/json"}
+                headers={"Content-Type": "application/json"},
+                limits=httpx.Limits(max_connections=max(100, keepalive), max_keepalive_connections=keepalive),
+                transport=self._transport
             )
         return self._client
     
@@ -30,6 +63,40 @@ class JavaBackendClient:
             await self._client.aclose()
             self._client = None
     
+    async def _request(self, method: str, url: str, idempotent: bool = True, **kwargs) -> httpx.Response:
+        """
+        Requête avec nouvelles tentatives (backoff exponentiel)
+        
+        Idempotent: retente les réponses RETRY_STATUSES et toutes les erreurs
+        réseau. Sinon (POST): seulement NOT_PROCESSED_STATUSES et les erreurs de
+        connexion, jamais une requête que le backend a pu recevoir et traiter.
+        """
+        client = await self.get_client()
+        retryable = httpx.TransportError if idempotent else CONNECT_ERRORS
+        retry_statuses = RETRY_STATUSES if idempotent else NOT_PROCESSED_STATUSES
+        attempts = max(1, settings.java_retry_attempts)
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                response = await client.request(method, url, **kwargs)
+            except retryable as e:
+                if last:
+                    raise
+                logger.debug(f"{method} {url}: {e!r}, nouvelle tentative")
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            if response.status_code not in retry_statuses or last:
+                return response
+            await asyncio.sleep(self._backoff(attempt, response.headers.get("Retry-After")))
+    
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+        """Délai avant la tentative suivante (Retry-After prioritaire, sinon exponentiel + aléa)"""
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        delay = settings.java_retry_backoff * 2 ** attempt
+        return delay * (1 + random.random() * 0.25)
+    
     async def health_check(self) -> bool:
         try:
             client = await self.get_client()
@@ -41,8 +108,7 @@ class JavaBackendClient:
     
     async def get_all_categories(self):
         try:
-            client = await self.get_client()
-            response = await client.get("/api/categories")
+            response = await self._request("GET", "/api/categories")
             data = response.json()
             if isinstance(data, list):
                 return data
@@ -60,9 +126,8 @@ class JavaBackendClient:
     
     async def create_category(self, name: str):
         try:
-            client = await self.get_client()
             payload = {"name": name, "description": f"Category {name}"}
-            response = await client.post("/api/categories", json=payload)
+            response = await self._request("POST", "/api/categories", idempotent=False, json=payload)
             if response.status_code in [200, 201]:
                 return response.json()
             return None
@@ -70,14 +135,38 @@ class JavaBackendClient:
             logger.error(f"Create category error: {e}")
             return None
     
+    async def load_categories(self, refresh: bool = False) -> Dict[str, Any]:
+        """Table nom -> id des catégories (une seule requête, puis mise à jour locale)"""
+        if self._categories is None or refresh:
+            async with self._category_lock:
+                if self._categories is None or refresh:
+                    categories = await self.get_all_categories()
+                    self._categories = {
+                        cat["name"].lower(): cat["id"]
+                        for cat in categories if cat.get("name") and cat.get("id") is not None
+                    }
+        return self._categories
+    
     async def get_or_create_category(self, name: str):
         if not name:
             name = "Unknown"
-        existing = await self.get_category_by_name(name)
-        if existing:
-            return existing.get("id")
-        created = await self.create_category(name)
-        return created.get("id") if created else None
+        key = name.lower()
+        categories = await self.load_categories()
+        if key in categories:
+            return categories[key]
+        
+        # Une seule création par nom, même avec des appels simultanés
+        async with self._category_lock:
+            if key in self._categories:
+                return self._categories[key]
+            created = await self.create_category(name)
+            if created and created.get("id") is not None:
+                self._categories[key] = created["id"]
+                return created["id"]
+        
+        # Création refusée (catégorie ajoutée ailleurs entre-temps): table rechargée
+        categories = await self.load_categories(refresh=True)
+        return categories.get(key)
     
     async def get_all_products(self, page=0, size=1000):
         try:
@@ -91,53 +180,180 @@ class JavaBackendClient:
             logger.error(f"Get products error: {e}")
             return []
     
+    @staticmethod
+    def _product_payload(product: Dict[str, Any], category_id: Any) -> Dict[str, Any]:
+        payload = {
+            "asin": product.get("asin"),
+            "title": str(product.get("title", ""))[:500],
+            "price": float(product.get("price", 0) or 0),
+            "rating": float(product.get("rating", 0) or 0),
+            "reviewCount": int(product.get("review_count", 0) or 0),
+            "rank": int(product.get("rank", 0) or 0),
+            "stock": int(product.get("stock", 0) or 0),
+            "imageUrl": str(product.get("image_url", "")),
+        }
+        if category_id:
+            # ProductRequest attend categoryId (category gardé pour compatibilité)
+            payload["categoryId"] = category_id
+            payload["category"] = {"id": category_id}
+        return payload
+    
+    async def _send_product(self, method: str, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST (création) ou PUT (modification); JavaAPIError si le backend refuse"""
+        response = await self._request(method, url, idempotent=method == "PUT", json=payload)
+        if response.status_code not in [200, 201]:
+            raise JavaAPIError(response.status_code, response.text[:100])
+        return response.json()
+    
+    async def _create_product(self, product: Dict[str, Any]) -> Dict[str, Any]:
+        """Crée un produit; JavaAPIError si le backend le refuse"""
+        category_id = await self.get_or_create_category(product.get("category") or "Unknown")
+        payload = self._product_payload(product, category_id)
+        created = await self._send_product("POST", "/api/products", payload)
+        self._index_product(payload, created.get("id"))
+        return created
+    
     async def create_product(self, product: Dict[str, Any]):
         try:
-            client = await self.get_client()
-            
-            category_name = product.get("category") or "Unknown"
-            category_id = await self.get_or_create_category(category_name)
-            
-            payload = {
-                "asin": product.get("asin"),
-                "title": str(product.get("title", ""))[:500],
-                "price": float(product.get("price", 0) or 0),
-                "rating": float(product.get("rating", 0) or 0),
-                "reviewCount": int(product.get("review_count", 0) or 0),
-                "rank": int(product.get("rank", 0) or 0),
-                "stock": int(product.get("stock", 0) or 0),
-                "imageUrl": str(product.get("image_url", "")),
-            }
-            
-            if category_id:
-                payload["category"] = {"id": category_id}
-            
-            response = await client.post("/api/products", json=payload)
-            
-            if response.status_code in [200, 201]:
-                return response.json()
-            else:
-                logger.error(f"Create product error: {response.status_code} - {response.text[:100]}")
-                return None
+            return await self._create_product(product)
+        except JavaAPIError as e:
+            logger.error(f"Create product error: {e}")
+            return None
         except Exception as e:
             logger.error(f"Create product exception: {e}")
             return None
     
-    async def import_products_batch(self, products: List[Dict], update_existing=True):
-        results = {"total": len(products), "created": 0, "updated": 0, "failed": 0, "errors": []}
+    @staticmethod
+    def _content_hash(product: Dict[str, Any]) -> str:
+        """
+        Empreinte des champs envoyés au backend
+        
+        Calculée de la même façon pour un payload et pour un produit renvoyé
+        par l'API (valeurs absentes normalisées comme dans _product_payload).
+        """
+        values = (
+            product.get("asin"),
+            str(product.get("title") or ""),
+            float(product.get("price") or 0),
+            float(product.get("rating") or 0),
+            int(product.get("reviewCount") or 0),
+            int(product.get("rank") or 0),
+            int(product.get("stock") or 0),
+            str(product.get("imageUrl") or ""),
+            product.get("categoryId"),
+        )
+        return hashlib.blake2b(repr(values).encode(), digest_size=16).hexdigest()
+    
+    async def load_product_index(self, refresh: bool = False) -> Dict[str, Tuple[Any, str]]:
+        """
+        Produits existants: ASIN -> (id, empreinte du contenu)
+        
+        Chargé en une requête, tenu à jour par les créations et modifications,
+        rechargé après JAVA_PRODUCT_INDEX_TTL secondes. Lève JavaAPIError si la
+        liste est indisponible: un index vide ferait recréer tout le catalogue.
+        """
+        expired = time.monotonic() - self._product_index_at > settings.java_product_index_ttl
+        if self._product_index is None or refresh or expired:
+            response = await self._request("GET", "/api/products")
+            if response.status_code != 200:
+                raise JavaAPIError(response.status_code, response.text[:100])
+            data = response.json()
+            products = data if isinstance(data, list) else data.get("content", [])
+            self._product_index = {
+                p["asin"]: (p.get("id"), self._content_hash(p)) for p in products if p.get("asin")
+            }
+            self._product_index_at = time.monotonic()
+            logger.info(f"📇 Index des produits Java: {len(self._product_index)} ASIN")
+        return self._product_index
+    
+    def _index_product(self, payload: Dict[str, Any], product_id: Any) -> None:
+        """Met à jour l'index après une création ou une modification"""
+        if self._product_index is not None and payload.get("asin"):
+            self._product_index[payload["asin"]] = (product_id, self._content_hash(payload))
+    
+    async def import_products_batch(
+        self,
+        products: List[Dict],
+        update_existing=True,
+        concurrency: Optional[int] = None,
+        diff: bool = True
+    ):
+        """
+        Import en masse: requêtes simultanées (au plus JAVA_IMPORT_CONCURRENCY)
+        
+        Les catégories sont chargées une fois et les nouvelles créées avant les
+        produits. En mode diff, chaque ligne est comparée par ASIN et empreinte
+        aux produits existants: nouvelle -> POST, modifiée -> PUT (ignorée si
+        update_existing=False), inchangée -> aucune requête; pour un ASIN répété
+        seule la dernière ligne compte. Sans diff, chaque ligne est un POST.
+        `items` donne le statut de chaque ligne dans l'ordre d'entrée.
+        """
+        results = {"total": len(products), "created": 0, "updated": 0, "unchanged": 0, "skipped": 0,
+                   "failed": 0, "errors": [], "items": [None] * len(products)}
+        if not products:
+            return results
+        
+        await self.load_categories(refresh=True)
+        for name in dict.fromkeys(p.get("category") or "Unknown" for p in products):
+            await self.get_or_create_category(name)
+        index = await self.load_product_index() if diff else {}
+        last_row = {p.get("asin"): i for i, p in enumerate(products)}
         
+        # Requêtes à envoyer: (ligne, payload, id du produit existant ou None)
+        operations = []
         for i, product in enumerate(products):
-            if i % 50 == 0:
-                logger.info(f"Import progress: {i}/{len(products)}")
-            
-            result = await self.create_product(product)
-            if result:
-                results["created"] += 1
+            asin = product.get("asin")
+            category_id = await self.get_or_create_category(product.get("category") or "Unknown")
+            payload = self._product_payload(product, category_id)
+            existing = index.get(asin)
+            if diff and last_row[asin] != i:
+                results["skipped"] += 1
+                results["items"][i] = {"asin": asin, "status": "skipped", "reason": "ASIN répété plus loin"}
+            elif existing is None:
+                operations.append((i, payload, None))
+            elif existing[1] == self._content_hash(payload):
+                results["unchanged"] += 1
+                results["items"][i] = {"asin": asin, "status": "unchanged"}
+            elif not update_existing:
+                results["skipped"] += 1
+                results["items"][i] = {"asin": asin, "status": "skipped", "reason": "produit existant"}
             else:
-                results["failed"] += 1
+                operations.append((i, payload, existing[0]))
         
-        logger.info(f"Import done: {results['created']} created, {results['failed']} failed")
+        semaphore = asyncio.Semaphore(max(1, concurrency or settings.java_import_concurrency))
+        step = max(len(operations) // 10, 50)
+        sent = 0
+        
+        async def send(index: int, payload: Dict[str, Any], product_id: Any) -> None:
+            nonlocal sent
+            asin = payload.get("asin")
+            async with semaphore:
+                try:
+                    if product_id is None:
+                        status = "created"
+                        saved = await self._send_product("POST", "/api/products", payload)
+                    else:
+                        status = "updated"
+                        saved = await self._send_product("PUT", f"/api/products/{product_id}", payload)
+                except Exception as e:
+                    error = str(e) or type(e).__name__
+                    results["failed"] += 1
+                    results["errors"].append(f"{asin}: {error}")
+                    results["items"][index] = {"asin": asin, "status": "failed", "error": error}
+                else:
+                    self._index_product(payload, saved.get("id", product_id))
+                    results[status] += 1
+                    results["items"][index] = {"asin": asin, "status": status}
+            sent += 1
+            if sent % step == 0:
+                logger.info(f"Import progress: {sent}/{len(operations)}")
+        
+        await asyncio.gather(*(send(*operation) for operation in operations))
+        
+        logger.info(
+            f"Import done: {results['created']} created, {results['updated']} updated, "
+            f"{results['unchanged']} unchanged, {results['skipped']} skipped, {results['failed']} failed"
+        )
         return results
 
-
-java_client = JavaBackendClient()
\ No newline at end of file
+java_client = JavaBackendClient()
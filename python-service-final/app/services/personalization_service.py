@@ -0,0 +1,297 @@
+"""
+Service de Personnalisation
+Factorisation matricielle implicite (ALS) des achats utilisateur x produit,
+recommandations par produit scalaire via un index FAISS
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+from app.config import settings
+from app.core.database import get_sales_connection
+
+logger = logging.getLogger(__name__)
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+# Quantités achetées par (utilisateur, produit), commandes non annulées
+USER_PURCHASES_QUERY = """
+    SELECT s.user_id, lv.product_id, SUM(lv.quantity)
+    FROM ligne_vente lv
+    JOIN sale s ON lv.sale_id = s.id
+    WHERE s.status <> 'CANCELLED' AND s.user_id IS NOT NULL
+    GROUP BY s.user_id, lv.product_id
+"""
+
+
+class ImplicitALS:
+    """
+    ALS pour feedback implicite (Hu, Koren, Volinsky 2008)
+
+    Confiance c_ui = 1 + alpha * log(1 + quantité), préférence p_ui = 1 si achat.
+    Chaque demi-itération résout tous les systèmes utilisateurs (puis produits)
+    en une fois par gradient conjugué vectorisé: seules des opérations
+    matricielles NumPy/SciPy sur les entrées non nulles, par blocs.
+    """
+
+    CG_STEPS = 3
+    CHUNK_NNZ = 500_000  # Entrées non nulles traitées par bloc (mémoire bornée)
+
+    def __init__(self, factors: int = 32, regularization: float = 0.05, alpha: float = 20.0):
+        self.factors = factors
+        self.regularization = regularization
+        self.alpha = alpha
+
+    def fit(
+        self,
+        interactions: sparse.csr_matrix,
+        iterations: int = 15,
+        callback: Any = None,
+        seed: int = 42
+    ) -> Dict[str, np.ndarray]:
+        """
+        Entraîne les facteurs sur une matrice utilisateurs x produits (quantités)
+
+        Returns:
+            {'users': (n_users, f), 'items': (n_items, f)} en float32
+        """
+        confidence = interactions.astype(np.float32).tocsr()
+        confidence.data = 1 + self.alpha * np.log1p(confidence.data)
+        confidence_t = confidence.T.tocsr()
+
+        rng = np.random.default_rng(seed)
+        users = (rng.standard_normal((confidence.shape[0], self.factors)) * 0.01).astype(np.float32)
+        items = (rng.standard_normal((confidence.shape[1], self.factors)) * 0.01).astype(np.float32)
+
+        for iteration in range(iterations):
+            self._solve(confidence, users, items)
+            self._solve(confidence_t, items, users)
+            if callback:
+                callback(iteration + 1, iterations)
+
+        return {'users': users, 'items': items}
+
+    def _solve(self, confidence: sparse.csr_matrix, X: np.ndarray, Y: np.ndarray) -> None:
+        """
+        Met à jour X en place: (YᵀY + Yᵀ(C_u - I)Y + λI) x_u = Yᵀ C_u p_u
+        pour toutes les lignes u, par CG à démarrage à chaud
+        """
+        gram = Y.T @ Y + self.regularization * np.eye(self.factors, dtype=np.float32)
+
+        def apply(V: np.ndarray) -> np.ndarray:
+            return V @ gram + self._weighted(confidence, V, Y)
+
+        r = confidence @ Y - apply(X)
+        p = r.copy()
+        rs = np.einsum('ij,ij->i', r, r)
+
+        for _ in range(self.CG_STEPS):
+            Ap = apply(p)
+            denom = np.einsum('ij,ij->i', p, Ap)
+            step = np.divide(rs, denom, out=np.zeros_like(rs), where=denom > 1e-12)
+            X += step[:, None] * p
+            r -= step[:, None] * Ap
+            rs_new = np.einsum('ij,ij->i', r, r)
+            beta = np.divide(rs_new, rs, out=np.zeros_like(rs), where=rs > 1e-12)
+            p = r + beta[:, None] * p
+            rs = rs_new
+
+    def _weighted(self, confidence: sparse.csr_matrix, V: np.ndarray, Y: np.ndarray) -> np.ndarray:
+        """Σ_i (c_ui - 1) (v_u · y_i) y_i pour chaque ligne u, par blocs de non-nuls"""
+        rows = np.repeat(np.arange(confidence.shape[0]), np.diff(confidence.indptr))
+        cols = confidence.indices
+        weights = np.empty(len(cols), dtype=np.float32)
+
+        for start in range(0, len(cols), self.CHUNK_NNZ):
+            end = start + self.CHUNK_NNZ
+            dots = np.einsum('ij,ij->i', V[rows[start:end]], Y[cols[start:end]])
+            weights[start:end] = (confidence.data[start:end] - 1) * dots
+
+        weighted = sparse.csr_matrix(
+            (weights, cols, confidence.indptr), shape=confidence.shape
+        )
+        return weighted @ Y
+
+
+class PersonalizationEngine:
+    """
+    Recommandations personnalisées à partir de l'historique d'achats
+
+    - Matrice creuse utilisateurs x produits depuis sale.user_id / ligne_vente
+    - Facteurs latents par ALS implicite, entraînés en tâche de fond
+    - Facteurs produits dans un index FAISS produit scalaire
+      (HNSW au-delà de HNSW_MIN_ITEMS produits: recherche sous-linéaire)
+    """
+
+    HNSW_MIN_ITEMS = 50_000
+    HNSW_NEIGHBORS = 32
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        self.user_row: Dict[Any, int] = {}
+        self.item_ids = np.zeros(0, dtype=np.int64)
+        self.user_factors = np.zeros((0, 0), dtype=np.float32)
+        self.item_factors = np.zeros((0, 0), dtype=np.float32)
+        self.purchases = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.index = None
+
+        self.status: Dict[str, Any] = {
+            'running': False,
+            'progress': 0.0,
+            'trained_at': None,
+            'error': None
+        }
+
+    # ==================== ENTRAÎNEMENT ====================
+
+    def start_training(self) -> Dict[str, Any]:
+        """Lance l'entraînement en arrière-plan (un seul à la fois)"""
+        with self._lock:
+            if self.status['running']:
+                return {'status': 'already_running', **self.get_status()}
+            self.status.update({'running': True, 'progress': 0.0, 'error': None})
+
+        self._thread = threading.Thread(target=self._train_job, daemon=True, name='als-training')
+        self._thread.start()
+        return {'status': 'started'}
+
+    def _train_job(self) -> None:
+        try:
+            self.train()
+        except Exception as e:
+            logger.error(f"❌ Erreur entraînement personnalisation: {e}")
+            self.status['error'] = str(e)
+        finally:
+            self.status['running'] = False
+
+    def train(self, connection: Any = None) -> Dict[str, Any]:
+        """Charge les achats, entraîne l'ALS et publie les facteurs + l'index"""
+        start = time.time()
+        owns_connection = connection is None
+        if owns_connection:
+            connection = get_sales_connection()
+            if connection is None:
+                raise RuntimeError("sales_database_url non configurée")
+
+        try:
+            cursor = connection.cursor()
+            cursor.execute(USER_PURCHASES_QUERY)
+            rows = cursor.fetchall()
+            cursor.close()
+        finally:
+            if owns_connection:
+                connection.close()
+
+        if not rows:
+            raise RuntimeError("Aucun achat utilisateur disponible")
+
+        user_ids, user_codes = np.unique(np.asarray([r[0] for r in rows]), return_inverse=True)
+        item_ids, item_codes = np.unique(np.asarray([r[1] for r in rows], dtype=np.int64), return_inverse=True)
+        quantities = np.asarray([float(r[2] or 1) for r in rows], dtype=np.float32)
+
+        purchases = sparse.csr_matrix(
+            (np.maximum(quantities, 1), (user_codes, item_codes)),
+            shape=(len(user_ids), len(item_ids))
+        )
+
+        model = ImplicitALS(
+            factors=settings.personalization_factors,
+            regularization=settings.personalization_regularization,
+            alpha=settings.personalization_alpha
+        )
+        factors = model.fit(
+            purchases,
+            iterations=settings.personalization_iterations,
+            callback=lambda i, n: self.status.update({'progress': round(i / n, 3)})
+        )
+
+        index = self._build_index(factors['items'])
+
+        with self._lock:
+            self.user_row = {uid: row for row, uid in enumerate(user_ids.tolist())}
+            self.item_ids = item_ids
+            self.user_factors = factors['users']
+            self.item_factors = factors['items']
+            self.purchases = purchases
+            self.index = index
+            self.status['trained_at'] = datetime.now().isoformat()
+
+        stats = {
+            'users': len(user_ids),
+            'products': len(item_ids),
+            'interactions': int(purchases.nnz),
+            'duration_seconds': round(time.time() - start, 2)
+        }
+        self.status['last_training'] = stats
+        logger.info(f"👤 Personnalisation entraînée: {stats}")
+        return stats
+
+    def _build_index(self, item_factors: np.ndarray) -> Any:
+        """Index FAISS produit scalaire sur les facteurs produits"""
+        if not FAISS_AVAILABLE:
+            return None
+
+        dim = item_factors.shape[1]
+        if len(item_factors) >= self.HNSW_MIN_ITEMS:
+            index = faiss.IndexHNSWFlat(dim, self.HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexFlatIP(dim)
+        index.add(np.ascontiguousarray(item_factors, dtype=np.float32))
+        return index
+
+    # ==================== RECOMMANDATIONS ====================
+
+    def recommend(self, user_id: Any, limit: int = 10, exclude_purchased: bool = True) -> List[Dict[str, Any]]:
+        """Top produits d'un utilisateur (liste vide si utilisateur inconnu)"""
+        with self._lock:
+            row = self.user_row.get(user_id)
+            if row is None or limit <= 0:
+                return []
+            vector = self.user_factors[row]
+            item_ids, item_factors, index = self.item_ids, self.item_factors, self.index
+            purchases = self.purchases
+
+        bought = purchases.indices[purchases.indptr[row]:purchases.indptr[row + 1]] if exclude_purchased \
+            else np.zeros(0, dtype=np.int32)
+        k = min(len(item_ids), limit + len(bought))
+
+        if index is not None:
+            scores, cols = index.search(vector[None, :].astype(np.float32), k)
+            scores, cols = scores[0], cols[0]
+            valid = cols >= 0
+            scores, cols = scores[valid], cols[valid]
+        else:
+            all_scores = item_factors @ vector
+            cols = np.argpartition(-all_scores, k - 1)[:k] if k < len(all_scores) else np.arange(len(all_scores))
+            cols = cols[np.argsort(-all_scores[cols], kind='stable')]
+            scores = all_scores[cols]
+
+        keep = ~np.isin(cols, bought)
+        return [
+            {'product_id': int(item_ids[c]), 'score': round(float(s), 4)}
+            for c, s in zip(cols[keep][:limit], scores[keep][:limit])
+        ]
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            **self.status,
+            'users': len(self.user_row),
+            'products': len(self.item_ids),
+            'faiss_index': type(self.index).__name__ if self.index is not None else None
+        }
+
+
+# Instance singleton
+personalization_engine = PersonalizationEngine()
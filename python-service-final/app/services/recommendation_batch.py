@@ -0,0 +1,283 @@
+"""
+Job Batch - Matérialisation des recommandations
+Calcule les listes de recommandations de tous les produits après chaque sync
+"""
+import logging
+import multiprocessing
+import os
+import pickle
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.core.index_store import SearchIndexStore
+from app.services.copurchase_service import copurchase_engine
+from app.services.recommendation_service import recommendation_service
+
+logger = logging.getLogger(__name__)
+
+
+# Colonnes stockées par liste, en plus des ids
+LIST_COLUMNS = {
+    'similar_products': {'scores': ('similarity_score', np.float64)},
+    'upsell_options': {},
+    'crosssell_suggestions': {
+        'scores': ('score', np.float64),
+        'support': ('support', np.int32)
+    },
+    'trending_in_category': {}
+}
+
+
+class _EmbeddingNeighbors:
+    """
+    k-NN exact sur les embeddings du snapshot de recherche, ouverts en memory-map
+
+    Produit scalaire sur vecteurs normalisés (mêmes voisins que l'index
+    IndexFlatIP); le processus de calcul n'a ni index FAISS ni service de
+    recherche. prefetch() calcule les voisins d'un lot par produits
+    matriciels (blocs de requêtes x catalogue) au lieu d'un produit
+    matrice-vecteur par produit.
+    """
+
+    # Scores calculés à la fois (requêtes x catalogue): borne la mémoire d'un bloc
+    BLOCK_SCORES = 1 << 24
+
+    def __init__(self, directory: Path):
+        self.embeddings: Optional[np.ndarray] = None
+        self.ids = np.zeros(0, dtype=np.int64)
+        if (directory / 'embeddings.npy').exists() and (directory / 'embedding_ids.npy').exists():
+            self.embeddings = np.load(directory / 'embeddings.npy', mmap_mode='r')
+            self.ids = np.load(directory / 'embedding_ids.npy')
+        self.row_of = dict(zip(self.ids.tolist(), range(len(self.ids))))
+        self._prefetched: Dict[Any, Tuple[np.ndarray, np.ndarray]] = {}
+        self._prefetched_k = 0
+
+    def __call__(self, product_id: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if k == self._prefetched_k and product_id in self._prefetched:
+            return self._prefetched[product_id]
+
+        row = self.row_of.get(product_id)
+        if row is None or self.embeddings is None or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        all_scores = self.embeddings @ np.asarray(self.embeddings[row])
+        return self._ranked(row, all_scores, np.argpartition(-all_scores, min(k, len(self.ids) - 1))[:k + 1])
+
+    def prefetch(self, product_ids: List[int], k: int) -> None:
+        """Voisins (k) d'un lot de produits, servis ensuite par __call__"""
+        self._prefetched, self._prefetched_k = {}, k
+        rows = [self.row_of[pid] for pid in product_ids if pid in self.row_of]
+        if self.embeddings is None or k <= 0 or not rows:
+            return
+
+        kth = min(k, len(self.ids) - 1)
+        block_rows = max(1, self.BLOCK_SCORES // len(self.ids))
+        for start in range(0, len(rows), block_rows):
+            block = np.asarray(rows[start:start + block_rows], dtype=np.int64)
+            scores = np.asarray(self.embeddings[block]) @ self.embeddings.T
+            candidates = np.argpartition(-scores, kth, axis=1)[:, :k + 1]
+            for row, row_scores, row_candidates in zip(block.tolist(), scores, candidates):
+                self._prefetched[int(self.ids[row])] = self._ranked(row, row_scores, row_candidates)
+
+    def _ranked(self, row: int, all_scores: np.ndarray, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Candidats triés par similarité décroissante, produit source exclu"""
+        indices = indices[np.argsort(-all_scores[indices], kind='stable')]
+        scores = all_scores[indices]
+
+        valid = indices != row
+        ids = self.ids[indices[valid]]
+        keep = ids != self.ids[row]
+        return ids[keep], scores[valid][keep]
+
+
+def _write_inputs(directory: Path) -> None:
+    """
+    Entrées des processus de calcul: catalogue (ordre des lignes), top-k des
+    co-achats, embeddings du snapshot de recherche publié (lien physique,
+    mappé par les fils; pas de copie ni de service de recherche) et leurs ids
+    """
+    directory.mkdir(parents=True)
+    with open(directory / 'products.pkl', 'wb') as f:
+        pickle.dump(recommendation_service._products, f, protocol=pickle.HIGHEST_PROTOCOL)
+    with open(directory / 'copurchase.pkl', 'wb') as f:
+        pickle.dump(copurchase_engine.export_top(), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    store = SearchIndexStore(settings.embeddings_dir)
+    version = store.current_version()
+    if not version:
+        return
+    snapshot = store.snapshots_dir / version
+    try:
+        try:
+            os.link(snapshot / 'embeddings.npy', directory / 'embeddings.npy')
+        except OSError:
+            shutil.copyfile(snapshot / 'embeddings.npy', directory / 'embeddings.npy')
+        with np.load(snapshot / 'products.npz') as table:
+            np.save(directory / 'embedding_ids.npy', np.asarray(table['id'], dtype=np.int64))
+    except (OSError, KeyError, ValueError) as e:
+        # Snapshot supprimé entre-temps: similaires sans voisins k-NN (repli par catégorie)
+        logger.warning(f"⚠️ Snapshot de recherche {version} illisible: {e}")
+        (directory / 'embeddings.npy').unlink(missing_ok=True)
+
+
+def _init_worker(directory: str) -> None:
+    """Prépare un processus de calcul (spawn/forkserver) à partir des entrées du parent"""
+    path = Path(directory)
+    with open(path / 'products.pkl', 'rb') as f:
+        products = pickle.load(f)
+    with open(path / 'copurchase.pkl', 'rb') as f:
+        copurchase_engine.import_top(pickle.load(f))
+    recommendation_service.index_products(products)
+    recommendation_service.neighbor_source = _EmbeddingNeighbors(path)
+
+
+def _materialize_chunk(product_ids: List[int]) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Calcule les listes d'un lot de produits
+
+    Dans un processus de calcul, le service a été préparé par _init_worker;
+    seuls les ids du lot à l'aller et les tableaux d'ids/scores au retour
+    sont sérialisés.
+    """
+    service = recommendation_service
+    limits = service.COMPREHENSIVE_LIMITS
+    arrays = {
+        kind: {
+            'ids': np.full((len(product_ids), limits[kind]), -1, dtype=np.int64),
+            **{
+                name: np.zeros((len(product_ids), limits[kind]), dtype=dtype)
+                for name, (_, dtype) in LIST_COLUMNS[kind].items()
+            }
+        }
+        for kind in LIST_COLUMNS
+    }
+
+    prefetch = getattr(service.neighbor_source, 'prefetch', None)
+    if prefetch is not None:
+        prefetch(product_ids, service.knn_size(limits['similar_products']))
+
+    category_cache = {}
+    for row, product_id in enumerate(product_ids):
+        lists = service.compute_product_lists(product_id, category_cache)
+        for kind, items in lists.items():
+            for i, item in enumerate(items[:limits[kind]]):
+                arrays[kind]['ids'][row, i] = item['id']
+                for name, (field, _) in LIST_COLUMNS[kind].items():
+                    # Champ absent (ex: support d'un repli par catégorie) = 0
+                    arrays[kind][name][row, i] = item.get(field) or 0
+    return arrays
+
+
+class RecommendationMaterializer:
+    """
+    Matérialise similar / upsell / crosssell / trending pour chaque produit
+
+    - Lots répartis sur un pool de processus neufs (forkserver, sinon
+      spawn): run() est appelé depuis un thread du serveur, avec torch,
+      FAISS et OpenMP chargés, où un fork peut bloquer le processus fils.
+      Les fils reçoivent leurs entrées par fichiers (_write_inputs)
+    - Un seul worker: calcul sur le service du processus, sans pool
+    - Résultat: tables (n_produits, k) d'ids et de scores publiées par
+      RecommendationStore puis ouvertes en memory-map par le service; les
+      autres workers la rechargent à la lecture (refresh_materialized)
+    """
+
+    CHUNKS_PER_WORKER = 4
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def run(self, workers: Optional[int] = None) -> Dict[str, Any]:
+        """Calcule et publie les recommandations de tout le catalogue"""
+        # Deux déclenchements simultanés (sync, endpoint): un seul calcul
+        if not self._lock.acquire(blocking=False):
+            return {'status': 'skipped', 'reason': 'matérialisation déjà en cours'}
+
+        start = time.time()
+        try:
+            service = recommendation_service
+            product_ids = [pid for pid in service.product_index if isinstance(pid, (int, np.integer))]
+            if not product_ids:
+                return {'status': 'skipped', 'reason': 'aucun produit indexé'}
+
+            catalog_version = service.catalog_version
+            workers = workers or settings.recommendation_batch_workers or os.cpu_count() or 1
+            chunks = self._split(product_ids, workers * self.CHUNKS_PER_WORKER)
+
+            if workers > 1:
+                parts = self._run_pool(chunks, workers)
+            else:
+                parts = [_materialize_chunk(chunk) for chunk in chunks]
+
+            arrays = {
+                kind: {name: np.concatenate([p[kind][name] for p in parts]) for name in parts[0][kind]}
+                for kind in parts[0]
+            }
+
+            version = service.store.save(
+                np.asarray(product_ids, dtype=np.int64),
+                arrays,
+                {'catalog_version': catalog_version, 'workers': workers}
+            )
+            if version:
+                service.load_materialized(version)
+
+            self.last_run = {
+                'status': 'success' if version else 'error',
+                'version': version,
+                'products': len(product_ids),
+                'workers': workers,
+                'duration_seconds': round(time.time() - start, 2)
+            }
+            logger.info(f"📦 Matérialisation terminée: {self.last_run}")
+            return self.last_run
+
+        except Exception as e:
+            logger.error(f"❌ Erreur matérialisation recommandations: {e}")
+            self.last_run = {'status': 'error', 'error': str(e)}
+            return self.last_run
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _run_pool(chunks: List[List[int]], workers: int) -> List[Dict[str, Dict[str, np.ndarray]]]:
+        """Calcule les lots dans des processus neufs; entrées supprimées à la fin"""
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        inputs = Path(settings.recommendations_dir) / f".inputs-{os.getpid()}-{time.time_ns()}"
+        try:
+            _write_inputs(inputs)
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=context,
+                initializer=_init_worker, initargs=(str(inputs),)
+            ) as pool:
+                return list(pool.map(_materialize_chunk, chunks))
+        finally:
+            shutil.rmtree(inputs, ignore_errors=True)
+
+    @staticmethod
+    def _split(items: List[Any], n_chunks: int) -> List[List[Any]]:
+        size = max(1, -(-len(items) // max(1, n_chunks)))
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'last_run': self.last_run,
+            **recommendation_service.get_materialization_status()
+        }
+
+
+# Instance singleton
+recommendation_materializer = RecommendationMaterializer()
@@ -2,12 +2,17 @@
 Service de Recommandations Avancées
 Recommandations personnalisées, cross-selling, up-selling
 """
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional, Tuple
+import time
+from typing import Callable, Dict, Any, List, Optional, Tuple
 import numpy as np
 from collections import defaultdict
 
 from app.config import settings
+from app.core.recommendation_store import MaterializedRecommendations, RecommendationStore
+from app.services.copurchase_service import copurchase_engine
+from app.services.personalization_service import personalization_engine
 
 logger = logging.getLogger(__name__)
 
@@ -24,34 +29,180 @@ class RecommendationService:
     - Recommendations personnalisées
     """
     
+    # Taille des classements matérialisés (limite max des endpoints)
+    MATERIALIZED_TOP_N = 100
+    
+    # Clés de tri des index par catégorie ('default' = ordre du catalogue)
+    SORT_KEYS = ('rating', 'price', 'rank', 'default')
+    
+    # Produits similaires par embeddings: taille du voisinage k-NN et poids
+    # de la similarité cosinus dans le score (index partagé avec la recherche)
+    KNN_CANDIDATES = 50
+    KNN_SIMILARITY_WEIGHT = 0.5
+    
     def __init__(self):
         self.product_index: Dict[int, Dict] = {}
         self.category_products: Dict[str, List[Dict]] = defaultdict(list)
         self.price_ranges: Dict[str, Dict] = {}
+        
+        # Index vectoriel: produits dans l'ordre des lignes + tableaux par catégorie
+        self._products: List[Dict] = []
+        self._row_of: Dict[Any, int] = {}
+        self._catalog_arrays: Dict[str, np.ndarray] = self._build_arrays([], [])
+        self._category_arrays: Dict[str, Dict[str, np.ndarray]] = {}
+        self._categories: List[str] = []
+        
+        # Index triés par catégorie et clé: {'rows': lignes, 'keys': clés croissantes}
+        self._sorted_index: Dict[str, Dict[str, Dict[str, np.ndarray]]] = {}
+        
+        # Classements matérialisés à chaque indexation (lecture seule)
+        self._rankings: Dict[str, Dict[str, np.ndarray]] = self._build_rankings(
+            self._catalog_arrays, {}, []
+        )
+        
+        # id -> ligne vectorisé (ids triés), reconstruit à chaque version du catalogue
+        self._id_lookup: Tuple[Optional[str], np.ndarray, np.ndarray] = (
+            None, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        )
+        
+        # Recommandations matérialisées (job batch après chaque sync)
+        self.catalog_version: Optional[str] = None
+        self.store = RecommendationStore(settings.recommendations_dir)
+        self.materialized: Optional[MaterializedRecommendations] = None
+        self._last_version_check = 0.0
+        
+        # Voisins k-NN (product_id, k) -> (ids, similarités); défaut: index de la
+        # recherche, remplacé dans les processus du job batch (embeddings mappés)
+        self.neighbor_source: Optional[Callable[[int, int], Tuple[np.ndarray, np.ndarray]]] = None
     
     def index_products(self, products: List[Dict[str, Any]]) -> None:
         """Indexe les produits pour les recommandations"""
-        self.product_index = {p.get('id', i): p for i, p in enumerate(products)}
-        self.category_products.clear()
+        product_index = {p.get('id', i): p for i, p in enumerate(products)}
+        category_products: Dict[str, List[Dict]] = defaultdict(list)
+        category_rows: Dict[str, List[int]] = defaultdict(list)
         
-        for p in products:
-            cat = p.get('category') or p.get('category_name', 'Unknown')
-            self.category_products[cat].append(p)
-        
-        # Calcul des statistiques par catégorie
-        for cat, prods in self.category_products.items():
-            prices = [p.get('price', 0) for p in prods if p.get('price', 0) > 0]
-            if prices:
-                self.price_ranges[cat] = {
-                    'min': min(prices),
-                    'max': max(prices),
-                    'median': np.median(prices),
-                    'q1': np.percentile(prices, 25),
-                    'q3': np.percentile(prices, 75)
-                }
+        for row, p in enumerate(products):
+            cat = self._category_of(p)
+            category_products[cat].append(p)
+            category_rows[cat].append(row)
+        
+        # Tableaux du catalogue (une ligne par produit) puis vues par catégorie
+        categories = list(category_products.keys())
+        codes = {cat: i for i, cat in enumerate(categories)}
+        catalog = self._build_arrays(products, [codes[self._category_of(p)] for p in products])
+        
+        category_arrays = {}
+        price_ranges = {}
+        sorted_index = {}
+        for cat, rows in category_rows.items():
+            rows = np.asarray(rows, dtype=np.int64)
+            category_arrays[cat] = {col: values[rows] for col, values in catalog.items()}
+            sorted_index[cat] = self._build_sorted_index(category_arrays[cat])
+            
+            # Calcul des statistiques par catégorie
+            stats = self._price_stats(category_arrays[cat]['price'])
+            if stats:
+                price_ranges[cat] = stats
+        
+        self.product_index = product_index
+        self.category_products = category_products
+        self.price_ranges = price_ranges
+        self._products = list(products)
+        self._row_of = {p.get('id', i): i for i, p in enumerate(products)}
+        self._catalog_arrays = catalog
+        self._category_arrays = category_arrays
+        self._categories = categories
+        self._sorted_index = sorted_index
+        self._rankings = self._build_rankings(catalog, price_ranges, categories)
+        self.catalog_version = self._catalog_signature(catalog, categories)
         
         logger.info(f"✅ {len(products)} produits indexés pour recommandations")
     
+    def upsert_products(self, products: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Ajoute ou met à jour des produits sans réindexer le catalogue
+        
+        Les index triés des catégories touchées sont mis à jour par
+        suppression / insertion à la bonne position (pas de re-tri).
+        """
+        catalog = {col: values.copy() for col, values in self._catalog_arrays.items()}
+        categories = list(self._categories)
+        codes = {cat: i for i, cat in enumerate(categories)}
+        new_rows = []
+        changed: Dict[str, List[int]] = defaultdict(list)  # catégorie -> lignes à (ré)insérer
+        removed: Dict[str, List[int]] = defaultdict(list)  # catégorie -> lignes à retirer
+        stats = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        
+        # Un produit sans id ne peut pas être mis à jour; dernier doublon retenu
+        by_id = {}
+        for p in products:
+            if p.get('id') is None:
+                stats['skipped'] += 1
+            else:
+                by_id[p['id']] = p
+        
+        for pid, p in by_id.items():
+            cat = self._category_of(p)
+            if cat not in codes:
+                codes[cat] = len(categories)
+                categories.append(cat)
+            values = self._build_arrays([p], [codes[cat]])
+            
+            row = self._row_of.get(pid)
+            if row is None:
+                row = len(self._products) + len(new_rows)
+                values['row'][0] = row
+                new_rows.append((p, values))
+                stats['inserted'] += 1
+            else:
+                removed[categories[catalog['category'][row]]].append(row)
+                for col, value in values.items():
+                    if col != 'row':
+                        catalog[col][row] = value[0]
+                self._products[row] = p
+                stats['updated'] += 1
+            
+            self.product_index[pid] = p
+            self._row_of[pid] = row
+            changed[cat].append(row)
+        
+        if new_rows:
+            for p, _ in new_rows:
+                self._products.append(p)
+            catalog = {
+                col: np.concatenate([values] + [v[col] for _, v in new_rows])
+                for col, values in catalog.items()
+            }
+        
+        for cat in set(changed) | set(removed):
+            rows = np.flatnonzero(catalog['category'] == codes[cat])
+            if not len(rows):
+                for mapping in (self.category_products, self._category_arrays, self._sorted_index, self.price_ranges):
+                    mapping.pop(cat, None)
+                continue
+            
+            arrays = {col: values[rows] for col, values in catalog.items()}
+            self._category_arrays[cat] = arrays
+            self.category_products[cat] = [self._products[r] for r in rows]
+            self._sorted_index[cat] = self._update_sorted_index(
+                self._sorted_index.get(cat), arrays,
+                removed=np.asarray(removed.get(cat, []) + changed.get(cat, []), dtype=np.int64),
+                inserted=np.asarray(changed.get(cat, []), dtype=np.int64)
+            )
+            stats_cat = self._price_stats(arrays['price'])
+            if stats_cat:
+                self.price_ranges[cat] = stats_cat
+            else:
+                self.price_ranges.pop(cat, None)
+        
+        self._catalog_arrays = catalog
+        self._categories = categories
+        self._rankings = self._build_rankings(catalog, self.price_ranges, categories)
+        self.catalog_version = self._catalog_signature(catalog, categories)
+        
+        logger.info(f"✅ Recommandations: {stats}")
+        return stats
+    
     def get_similar_products(
         self, 
         product_id: int, 
@@ -60,66 +211,112 @@ class RecommendationService:
     ) -> List[Dict[str, Any]]:
         """
         Trouve des produits similaires basés sur:
+        - Contenu (voisins k-NN dans l'index d'embeddings de la recherche)
         - Catégorie
         - Prix similaire (+/- 30%)
         - Rating comparable
+        
+        Les candidats sont les KNN_CANDIDATES plus proches voisins de l'index
+        FAISS partagé, re-classés par les heuristiques prix / rating. Sans
+        index (ou trop peu de voisins retenus), le pool est la catégorie
+        (ou le catalogue). Scores en une passe vectorisée, top-k par argpartition.
         """
         product = self.product_index.get(product_id)
-        if not product:
+        row = self._row_of.get(product_id)
+        if not product or row is None or limit <= 0:
             return []
         
-        category = product.get('category') or product.get('category_name', 'Unknown')
-        price = product.get('price', 0) or 0
-        rating = product.get('rating', 0) or 0
+        catalog = self._catalog_arrays
+        category = self._category_of(product)
+        price = catalog['price'][row]
+        rating = catalog['rating'][row]
+        code = catalog['category'][row]
         
-        candidates = []
+        pool, similarity = self._knn_pool(product_id, row, limit, code if same_category else None)
+        if pool is None:
+            # Cherche dans la même catégorie ou toutes
+            if same_category and category in self._category_arrays:
+                pool = self._category_arrays[category]
+            else:
+                pool = catalog
         
-        # Cherche dans la même catégorie ou toutes
-        if same_category and category in self.category_products:
-            pool = self.category_products[category]
-        else:
-            pool = list(self.product_index.values())
+        # Score de similarité (plus le score est bas, plus c'est similaire)
+        scores = (
+            np.abs(pool['price'] - price) / max(price, 1) * 0.4 +
+            np.abs(pool['rating'] - rating) * 0.1
+        )
+        # Bonus si même catégorie
+        scores -= np.where(pool['category'] == code, 0.2, 0.0)
+        # Bonus si bon rating
+        scores -= np.where(pool['rating'] >= 4.0, 0.1, 0.0)
+        # Bonus de similarité de contenu (voisins k-NN)
+        if similarity is not None:
+            scores -= similarity * self.KNN_SIMILARITY_WEIGHT
+        # Exclut le produit lui-même
+        scores[pool['row'] == row] = np.inf
         
-        for p in pool:
-            if p.get('id') == product_id:
-                continue
-            
-            p_price = p.get('price', 0) or 0
-            p_rating = p.get('rating', 0) or 0
-            
-            # Score de similarité
-            price_diff = abs(p_price - price) / max(price, 1)
-            rating_diff = abs(p_rating - rating)
-            
-            # Plus le score est bas, plus c'est similaire
-            similarity_score = (price_diff * 0.4) + (rating_diff * 0.1) 
-            
-            # Bonus si même catégorie
-            if p.get('category') == category:
-                similarity_score -= 0.2
-            
-            # Bonus si bon rating
-            if p_rating >= 4.0:
-                similarity_score -= 0.1
-            
-            candidates.append({
-                'product': p,
-                'score': similarity_score,
-                'reason': self._get_similarity_reason(product, p)
-            })
+        top = self._top_k(scores, limit)
+        
+        results = []
+        for i in top:
+            p = self._products[pool['row'][i]]
+            results.append(self._similar_item(product, p, round(1 - float(scores[i]), 3)))
+        return results
+    
+    def _knn_pool(
+        self,
+        product_id: int,
+        row: int,
+        limit: int,
+        category_code: Optional[int] = None
+    ) -> Tuple[Optional[Dict[str, np.ndarray]], Optional[np.ndarray]]:
+        """
+        Pool de candidats issu d'une requête k-NN sur l'index de la recherche
+        
+        Returns:
+            (tableaux des candidats, similarités cosinus) ou (None, None) si
+            l'index est indisponible ou retient moins de `limit` candidats
+        """
+        ids, similarity = self._neighbors(product_id, self.knn_size(limit))
+        if not len(ids):
+            return None, None
         
-        # Trie par score croissant (plus similaire en premier)
-        candidates.sort(key=lambda x: x['score'])
+        rows = self._rows_for_ids(ids)
+        keep = (rows >= 0) & (rows != row)
+        if category_code is not None:
+            keep &= self._catalog_arrays['category'][np.maximum(rows, 0)] == category_code
+        if keep.sum() < limit:
+            return None, None
         
-        return [{
-            'id': c['product'].get('id'),
-            'title': c['product'].get('title', '')[:100],
-            'price': c['product'].get('price', 0),
-            'rating': c['product'].get('rating', 0),
-            'category': c['product'].get('category', ''),
-            'similarity_score': round(1 - c['score'], 3),
-            'reason': c['reason']
-        } for c in candidates[:limit]]
+        rows = rows[keep]
+        pool = {col: values[rows] for col, values in self._catalog_arrays.items()}
+        return pool, similarity[keep].astype(np.float64)
+    
+    def knn_size(self, limit: int) -> int:
+        """Voisins demandés à l'index pour `limit` produits similaires"""
+        return max(self.KNN_CANDIDATES, limit * 3)
+    
+    def _neighbors(self, product_id: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        source = self.neighbor_source
+        if source is None:
+            # Import à l'usage: un processus du job batch (neighbor_source fixé)
+            # n'instancie pas la recherche ni son modèle d'embeddings
+            from app.services.search_service import search_service
+            source = search_service.get_neighbors
+        return source(product_id, k)
+    
+    def _rows_for_ids(self, ids: np.ndarray) -> np.ndarray:
+        """Lignes du catalogue pour des ids produits (-1 si absent), par recherche dichotomique"""
+        version, sorted_ids, order = self._id_lookup
+        if version != self.catalog_version or len(sorted_ids) != len(self._catalog_arrays['id']):
+            order = np.argsort(self._catalog_arrays['id'], kind='stable')
+            sorted_ids = self._catalog_arrays['id'][order]
+            self._id_lookup = (self.catalog_version, sorted_ids, order)
+        
+        if not len(sorted_ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        return np.where(sorted_ids[pos] == ids, order[pos], -1)
     
     def get_upsell_products(
         self, 
@@ -136,44 +333,31 @@ class RecommendationService:
         if not product:
             return []
         
-        category = product.get('category') or product.get('category_name', 'Unknown')
-        price = product.get('price', 0) or 0
-        rating = product.get('rating', 0) or 0
+        row = self._row_of[product_id]
+        catalog = self._catalog_arrays
+        price = catalog['price'][row]
+        rating = catalog['rating'][row]
+        product_rank = product.get('rank', 99999)
+        if product_rank is None:
+            product_rank = 99999
         
-        candidates = []
-        pool = self.category_products.get(category, list(self.product_index.values()))
+        pool = self._category_arrays.get(self._category_of(product), catalog)
+        p_price = pool['price']
+        p_rating = pool['rating']
+        p_rank = np.where(pool['rank'] != 0, pool['rank'], 99999)
         
-        for p in pool:
-            if p.get('id') == product_id:
-                continue
-            
-            p_price = p.get('price', 0) or 0
-            p_rating = p.get('rating', 0) or 0
-            p_rank = p.get('rank', 99999) or 99999
-            
-            # Up-sell: prix plus élevé mais meilleur produit
-            if p_price > price * 1.2 and p_price < price * 3:
-                if p_rating >= rating or p_rank < product.get('rank', 99999):
-                    value_score = (p_rating / max(rating, 1)) * (price / max(p_price, 1))
-                    
-                    candidates.append({
-                        'product': p,
-                        'price_increase': round((p_price - price) / max(price, 1) * 100, 1),
-                        'value_score': value_score,
-                        'reason': self._get_upsell_reason(product, p)
-                    })
+        # Up-sell: prix plus élevé mais meilleur produit
+        eligible = (
+            (p_price > price * 1.2) & (p_price < price * 3) &
+            ((p_rating >= rating) | (p_rank < product_rank)) &
+            (pool['row'] != row)
+        )
+        value_score = (p_rating / max(rating, 1)) * (price / np.maximum(p_price, 1))
         
         # Trie par score de valeur décroissant
-        candidates.sort(key=lambda x: x['value_score'], reverse=True)
+        top = self._top_k(np.where(eligible, -value_score, np.inf), limit)
         
-        return [{
-            'id': c['product'].get('id'),
-            'title': c['product'].get('title', '')[:100],
-            'price': c['product'].get('price', 0),
-            'rating': c['product'].get('rating', 0),
-            'price_increase_percent': c['price_increase'],
-            'reason': c['reason']
-        } for c in candidates[:limit]]
+        return [self._upsell_item(product, self._products[pool['row'][i]]) for i in top]
     
     def get_crosssell_products(
         self, 
@@ -182,13 +366,28 @@ class RecommendationService:
     ) -> List[Dict[str, Any]]:
         """
         Trouve des produits complémentaires (cross-sell)
-        - Catégories différentes mais complémentaires
-        - Prix similaires ou inférieurs
+        - Produits fréquemment achetés ensemble (co-achats réels)
+        - Sinon: catégories complémentaires, prix similaires ou inférieurs
         """
         product = self.product_index.get(product_id)
         if not product:
             return []
         
+        results = []
+        for item in copurchase_engine.get_crosssell(product_id, limit=limit):
+            p = self.product_index.get(item['product_id'])
+            if p:
+                results.append(self._crosssell_item(p, item['score'], item['support']))
+        
+        if len(results) < limit:
+            seen = {r['id'] for r in results} | {product_id}
+            fallback = self._get_category_crosssell(product, limit + len(seen))
+            results.extend([r for r in fallback if r['id'] not in seen][:limit - len(results)])
+        
+        return results
+    
+    def _get_category_crosssell(self, product: Dict, limit: int) -> List[Dict[str, Any]]:
+        """Cross-sell par catégories complémentaires (sans historique d'achats)"""
         current_cat = product.get('category') or product.get('category_name', 'Unknown')
         price = product.get('price', 0) or 0
         
@@ -207,22 +406,13 @@ class RecommendationService:
                     if p_price < price * 1.5 and p_rating >= 3.5:
                         candidates.append({
                             'product': p,
-                            'category': cat,
-                            'rating': p_rating,
-                            'reason': f"Complète votre achat dans {cat}"
+                            'rating': p_rating
                         })
         
         # Trie par rating
         candidates.sort(key=lambda x: x['rating'], reverse=True)
         
-        return [{
-            'id': c['product'].get('id'),
-            'title': c['product'].get('title', '')[:100],
-            'price': c['product'].get('price', 0),
-            'rating': c['product'].get('rating', 0),
-            'category': c['category'],
-            'reason': c['reason']
-        } for c in candidates[:limit]]
+        return [self._crosssell_item(c['product']) for c in candidates[:limit]]
     
     def get_category_recommendations(
         self, 
@@ -231,22 +421,59 @@ class RecommendationService:
         sort_by: str = 'rating'  # rating, price, rank
     ) -> List[Dict[str, Any]]:
         """Recommandations par catégorie"""
-        products = self.category_products.get(category, [])
+        return self.get_category_page(category, limit=limit, sort_by=sort_by)['products']
+    
+    def get_category_page(
+        self,
+        category: str,
+        limit: int = 10,
+        sort_by: str = 'rating',
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Page de produits d'une catégorie, lue dans l'index trié (slicing)
         
-        if sort_by == 'rating':
-            products = sorted(products, key=lambda x: x.get('rating', 0), reverse=True)
-        elif sort_by == 'price':
-            products = sorted(products, key=lambda x: x.get('price', 0))
-        elif sort_by == 'rank':
-            products = sorted(products, key=lambda x: x.get('rank', 99999))
+        cursor: valeur next_cursor de la page précédente ("clé:ligne"),
+        valable pour l'index courant.
         
-        return [{
-            'id': p.get('id'),
-            'title': p.get('title', '')[:100],
-            'price': p.get('price', 0),
-            'rating': p.get('rating', 0),
-            'rank': p.get('rank', 0)
-        } for p in products[:limit]]
+        Raises:
+            ValueError: cursor invalide
+        """
+        if sort_by not in self.SORT_KEYS:
+            sort_by = 'default'
+        
+        entry = self._sorted_index.get(category, {}).get(sort_by)
+        if entry is None:
+            return {'products': [], 'next_cursor': None}
+        
+        rows, keys = entry['rows'], entry['keys']
+        start = 0
+        if cursor:
+            start = self._cursor_position(entry, cursor)
+        end = min(start + max(limit, 0), len(rows))
+        
+        next_cursor = None
+        if end < len(rows) and end > start:
+            next_cursor = f"{float(keys[end - 1])!r}:{int(rows[end - 1])}"
+        
+        return {
+            'products': [self._category_item(self._products[r]) for r in rows[start:end].tolist()],
+            'next_cursor': next_cursor
+        }
+    
+    @staticmethod
+    def _cursor_position(entry: Dict[str, np.ndarray], cursor: str) -> int:
+        """Position qui suit (clé, ligne) dans un index trié"""
+        try:
+            key, row = cursor.rsplit(':', 1)
+            key, row = float(key), int(row)
+        except ValueError:
+            raise ValueError(f"Cursor invalide: {cursor}")
+        
+        keys, rows = entry['keys'], entry['rows']
+        lo = np.searchsorted(keys, key, side='left')
+        hi = np.searchsorted(keys, key, side='right')
+        return int(lo + np.searchsorted(rows[lo:hi], row, side='right'))
     
     def get_trending_products(
         self, 
@@ -257,33 +484,24 @@ class RecommendationService:
         - Bon rang
         - Beaucoup d'avis
         - Bon rating
-        """
-        products = list(self.product_index.values())
-        
-        for p in products:
-            rank = p.get('rank', 99999) or 99999
-            reviews = p.get('review_count', 0) or 0
-            rating = p.get('rating', 0) or 0
-            
-            # Score trending (plus c'est haut, mieux c'est)
-            # Normalise le rang inversé + reviews + rating
-            p['_trending_score'] = (
-                (1 / np.log1p(rank)) * 1000 +
-                np.log1p(reviews) * 2 +
-                rating * 5
-            )
         
-        trending = sorted(products, key=lambda x: x.get('_trending_score', 0), reverse=True)
+        Classement précalculé à l'indexation: seul le top demandé est formaté.
+        """
+        ranking = self._rankings['trending']
         
-        return [{
-            'id': p.get('id'),
-            'title': p.get('title', '')[:100],
-            'price': p.get('price', 0),
-            'rating': p.get('rating', 0),
-            'rank': p.get('rank', 0),
-            'review_count': p.get('review_count', 0),
-            'trending_score': round(p.get('_trending_score', 0), 2)
-        } for p in trending[:limit]]
+        results = []
+        for row, score in zip(*self._ranked(ranking, limit)):
+            p = self._products[row]
+            results.append({
+                'id': p.get('id'),
+                'title': (p.get('title') or '')[:100],
+                'price': p.get('price', 0),
+                'rating': p.get('rating', 0),
+                'rank': p.get('rank', 0),
+                'review_count': p.get('review_count', 0),
+                'trending_score': round(float(score), 2)
+            })
+        return results
     
     def get_deals(
         self, 
@@ -294,34 +512,232 @@ class RecommendationService:
         - Bon rating
         - Prix inférieur à la médiane de la catégorie
         - Bon rang
+        
+        Classement précalculé à l'indexation: seul le top demandé est formaté.
         """
+        ranking = self._rankings['deals']
+        rows, scores = self._ranked(ranking, limit)
+        
         deals = []
+        for row, score in zip(rows, scores):
+            p = self._products[row]
+            deals.append({
+                'id': p.get('id'),
+                'title': (p.get('title') or '')[:100],
+                'price': p.get('price', 0) or 0,
+                'category_median': round(float(ranking['median'][row]), 2),
+                'savings_percent': float(ranking['savings'][row]),
+                'rating': p.get('rating', 0) or 0,
+                'deal_score': float(score)
+            })
+        return deals
+    
+    def _build_rankings(
+        self,
+        catalog: Dict[str, np.ndarray],
+        price_ranges: Dict[str, Dict],
+        categories: List[str]
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Calcule les scores trending et deals du catalogue et matérialise
+        le top-N de chaque classement (lignes + scores)
+        """
+        # Score trending (plus c'est haut, mieux c'est)
+        # Normalise le rang inversé + reviews + rating
+        rank = np.where(catalog['rank'] != 0, catalog['rank'], 99999)
+        trending = (
+            (1 / np.log1p(rank)) * 1000 +
+            np.log1p(catalog['review_count']) * 2 +
+            catalog['rating'] * 5
+        )
+        
+        # Deals: prix < 80% de la médiane de la catégorie et rating >= 4.0
+        medians = np.array(
+            [price_ranges.get(cat, {}).get('median', np.nan) for cat in categories] + [np.nan]
+        )[catalog['category']]
+        price = catalog['price']
+        is_deal = (price > 0) & (price < medians * 0.8) & (catalog['rating'] >= 4.0)
+        savings = np.zeros(len(price))
+        savings[is_deal] = np.round((1 - price[is_deal] / medians[is_deal]) * 100, 1)
+        deal_score = np.where(is_deal, savings * catalog['rating'] / 5, -np.inf)
         
-        for p in self.product_index.values():
-            cat = p.get('category') or p.get('category_name', 'Unknown')
-            price = p.get('price', 0) or 0
-            rating = p.get('rating', 0) or 0
+        return {
+            'trending': self._materialize(trending),
+            'deals': {**self._materialize(deal_score), 'median': medians, 'savings': savings}
+        }
+    
+    def _materialize(self, scores: np.ndarray) -> Dict[str, np.ndarray]:
+        """Top-N (scores décroissants) + scores complets pour les limites plus grandes"""
+        top = self._top_k(-scores, self.MATERIALIZED_TOP_N)
+        return {'rows': top, 'top_scores': scores[top], 'scores': scores}
+    
+    def _ranked(self, ranking: Dict[str, np.ndarray], limit: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Lignes et scores des `limit` premiers d'un classement"""
+        if limit <= len(ranking['rows']) or len(ranking['rows']) < self.MATERIALIZED_TOP_N:
+            return ranking['rows'][:limit], ranking['top_scores'][:limit]
+        top = self._top_k(-ranking['scores'], limit)
+        return top, ranking['scores'][top]
+    
+    @staticmethod
+    def _category_of(product: Dict) -> str:
+        return product.get('category') or product.get('category_name', 'Unknown')
+    
+    @staticmethod
+    def _price_stats(prices: np.ndarray) -> Optional[Dict[str, float]]:
+        """Statistiques de prix d'une catégorie (prix > 0)"""
+        prices = prices[prices > 0]
+        if not len(prices):
+            return None
+        q1, median, q3 = np.percentile(prices, [25, 50, 75])
+        return {
+            'min': float(prices.min()),
+            'max': float(prices.max()),
+            'median': float(median),
+            'q1': float(q1),
+            'q3': float(q3)
+        }
+    
+    @staticmethod
+    def _sort_values(arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Clés de tri croissantes (rating décroissant, rang absent = 99999)"""
+        return {
+            'rating': -arrays['rating'],
+            'price': arrays['price'],
+            'rank': np.where(arrays['rank'] != 0, arrays['rank'], 99999).astype(np.float64),
+            'default': np.zeros(len(arrays['row']))
+        }
+    
+    def _build_sorted_index(self, arrays: Dict[str, np.ndarray]) -> Dict[str, Dict[str, np.ndarray]]:
+        """Index triés d'une catégorie (égalités: ordre du catalogue)"""
+        index = {}
+        for key, values in self._sort_values(arrays).items():
+            order = np.lexsort((arrays['row'], values))
+            index[key] = {'rows': arrays['row'][order], 'keys': values[order]}
+        return index
+    
+    def _update_sorted_index(
+        self,
+        index: Optional[Dict[str, Dict[str, np.ndarray]]],
+        arrays: Dict[str, np.ndarray],
+        removed: np.ndarray,
+        inserted: np.ndarray
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        """Retire puis insère des lignes à leur position (recherche dichotomique)"""
+        if index is None:
+            return self._build_sorted_index(arrays)
+        
+        inserted = np.unique(inserted)
+        positions_in_arrays = np.searchsorted(arrays['row'], inserted)
+        updated = {}
+        for key, values in self._sort_values(arrays).items():
+            keep = ~np.isin(index[key]['rows'], removed)
+            rows, keys = index[key]['rows'][keep], index[key]['keys'][keep]
             
-            cat_stats = self.price_ranges.get(cat, {})
-            median_price = cat_stats.get('median', price)
+            new_keys = values[positions_in_arrays]
+            order = np.lexsort((inserted, new_keys))
+            new_rows, new_keys = inserted[order], new_keys[order]
             
-            # C'est une bonne affaire si:
-            # - Prix < médiane de la catégorie
-            # - Rating >= 4.0
-            if price > 0 and price < median_price * 0.8 and rating >= 4.0:
-                savings = round((1 - price / median_price) * 100, 1)
-                deals.append({
-                    'id': p.get('id'),
-                    'title': p.get('title', '')[:100],
-                    'price': price,
-                    'category_median': round(median_price, 2),
-                    'savings_percent': savings,
-                    'rating': rating,
-                    'deal_score': savings * rating / 5
-                })
+            positions = np.empty(len(new_rows), dtype=np.int64)
+            for i, (k, r) in enumerate(zip(new_keys, new_rows)):
+                lo = np.searchsorted(keys, k, side='left')
+                hi = np.searchsorted(keys, k, side='right')
+                positions[i] = lo + np.searchsorted(rows[lo:hi], r)
+            
+            updated[key] = {
+                'rows': np.insert(rows, positions, new_rows),
+                'keys': np.insert(keys, positions, new_keys)
+            }
+        return updated
+    
+    @staticmethod
+    def _build_arrays(products: List[Dict], category_codes: List[int]) -> Dict[str, np.ndarray]:
+        """Tableaux NumPy (ligne, id, prix, rating, code catégorie) des produits"""
+        def column(key: str) -> np.ndarray:
+            values = []
+            for p in products:
+                try:
+                    values.append(float(p.get(key) or 0))
+                except (TypeError, ValueError):
+                    values.append(0.0)
+            return np.asarray(values, dtype=np.float64)
         
-        deals.sort(key=lambda x: x['deal_score'], reverse=True)
-        return deals[:limit]
+        return {
+            'row': np.arange(len(products), dtype=np.int64),
+            'id': column('id').astype(np.int64),
+            'price': column('price'),
+            'rating': column('rating'),
+            'rank': column('rank'),
+            'review_count': column('review_count'),
+            'category': np.asarray(category_codes, dtype=np.int32)
+        }
+    
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices des k plus petits scores finis, triés par score croissant"""
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        if k < len(scores):
+            # Garde toutes les égalités avec le k-ième score pour départager par position
+            kth = scores[np.argpartition(scores, k - 1)[k - 1]]
+            part = np.flatnonzero(scores <= kth)
+        else:
+            part = np.arange(len(scores))
+        # Tri stable sur les candidats retenus (égalités: ordre du catalogue)
+        return part[np.lexsort((part, scores[part]))][:k]
+    
+    # ========== Format des éléments (live et matérialisés) ==========
+    
+    def _similar_item(self, product: Dict, p: Dict, similarity_score: float) -> Dict[str, Any]:
+        return {
+            'id': p.get('id'),
+            'title': (p.get('title') or '')[:100],
+            'price': p.get('price', 0),
+            'rating': p.get('rating', 0),
+            'category': p.get('category', ''),
+            'similarity_score': similarity_score,
+            'reason': self._get_similarity_reason(product, p)
+        }
+    
+    def _upsell_item(self, product: Dict, p: Dict) -> Dict[str, Any]:
+        price = product.get('price', 0) or 0
+        p_price = p.get('price', 0) or 0
+        return {
+            'id': p.get('id'),
+            'title': (p.get('title') or '')[:100],
+            'price': p.get('price', 0),
+            'rating': p.get('rating', 0),
+            'price_increase_percent': round((p_price - price) / max(price, 1) * 100, 1),
+            'reason': self._get_upsell_reason(product, p)
+        }
+    
+    def _crosssell_item(self, p: Dict, score: Optional[float] = None, support: int = 0) -> Dict[str, Any]:
+        """Élément cross-sell: co-achat (support > 0) ou catégorie complémentaire"""
+        category = self._category_of(p)
+        item = {
+            'id': p.get('id'),
+            'title': (p.get('title') or '')[:100],
+            'price': p.get('price', 0),
+            'rating': p.get('rating', 0),
+            'category': category
+        }
+        if support > 0:
+            item['score'] = score
+            item['support'] = support
+            item['reason'] = f"Souvent acheté avec ce produit ({support} commandes)"
+        else:
+            item['reason'] = f"Complète votre achat dans {category}"
+        return item
+    
+    @staticmethod
+    def _category_item(p: Dict) -> Dict[str, Any]:
+        return {
+            'id': p.get('id'),
+            'title': (p.get('title') or '')[:100],
+            'price': p.get('price', 0),
+            'rating': p.get('rating', 0),
+            'rank': p.get('rank', 0)
+        }
     
     def _get_similarity_reason(self, p1: Dict, p2: Dict) -> str:
         """Génère une raison de similarité"""
@@ -330,11 +746,11 @@ class RecommendationService:
         if p1.get('category') == p2.get('category'):
             reasons.append("même catégorie")
         
-        price_diff = abs(p1.get('price', 0) - p2.get('price', 0))
-        if price_diff < p1.get('price', 1) * 0.2:
+        price_diff = abs((p1.get('price') or 0) - (p2.get('price') or 0))
+        if price_diff < (p1.get('price') or 0) * 0.2:
             reasons.append("prix similaire")
         
-        if abs(p1.get('rating', 0) - p2.get('rating', 0)) < 0.5:
+        if abs((p1.get('rating') or 0) - (p2.get('rating') or 0)) < 0.5:
             reasons.append("rating comparable")
         
         return ", ".join(reasons) if reasons else "produit alternatif"
@@ -343,13 +759,13 @@ class RecommendationService:
         """Génère une raison d'up-sell"""
         reasons = []
         
-        if p2.get('rating', 0) > p1.get('rating', 0):
+        if (p2.get('rating') or 0) > (p1.get('rating') or 0):
             reasons.append("meilleur rating")
         
-        if p2.get('rank', 99999) < p1.get('rank', 99999):
+        if (p2.get('rank') or 99999) < (p1.get('rank') or 99999):
             reasons.append("meilleur classement")
         
-        if p2.get('review_count', 0) > p1.get('review_count', 0) * 1.5:
+        if (p2.get('review_count') or 0) > (p1.get('review_count') or 0) * 1.5:
             reasons.append("plus populaire")
         
         return ", ".join(reasons) if reasons else "version premium"
@@ -377,31 +793,282 @@ class RecommendationService:
         all_cats = list(self.category_products.keys())
         return [c for c in all_cats if c != category][:5]
     
+    # Poids d'un co-achat réel par rapport à la similarité prix/rating
+    CART_COPURCHASE_WEIGHT = 2.0
+    
+    def get_cart_recommendations(
+        self,
+        product_ids: List[int],
+        limit: int = 10,
+        merge: str = 'sum'
+    ) -> Dict[str, Any]:
+        """
+        Recommandations pour un panier (plusieurs produits)
+        
+        Candidats: catégories des produits du panier + co-achats.
+        Une matrice (produits du panier x candidats) est calculée en une
+        passe vectorisée, fusionnée par somme ou max, puis le top-k est
+        extrait hors produits du panier.
+        """
+        cart_ids = list(dict.fromkeys(product_ids))
+        not_found = [pid for pid in cart_ids if pid not in self._row_of]
+        cart_rows = np.asarray(
+            [self._row_of[pid] for pid in cart_ids if pid in self._row_of], dtype=np.int64
+        )
+        if not len(cart_rows) or limit <= 0:
+            return {'recommendations': [], 'not_found': not_found}
+        
+        catalog = self._catalog_arrays
+        cart_codes = catalog['category'][cart_rows]
+        
+        # Co-achats de chaque produit du panier (lignes, scores)
+        copurchased = []
+        for row in cart_rows:
+            items = copurchase_engine.get_crosssell(self._products[row].get('id'), limit=copurchase_engine.top_k)
+            rows = [self._row_of[i['product_id']] for i in items if i['product_id'] in self._row_of]
+            scores = [i['score'] for i in items if i['product_id'] in self._row_of]
+            copurchased.append((np.asarray(rows, dtype=np.int64), np.asarray(scores)))
+        
+        # Candidats: catégories du panier + co-achats
+        mask = np.isin(catalog['category'], cart_codes)
+        for rows, _ in copurchased:
+            mask[rows] = True
+        candidates = np.flatnonzero(mask)
+        
+        # Similarité prix/rating (même formule que get_similar_products), même catégorie uniquement
+        price = catalog['price'][cart_rows][:, None]
+        rating = catalog['rating'][cart_rows][:, None]
+        c_rating = catalog['rating'][candidates][None, :]
+        distance = (
+            np.abs(catalog['price'][candidates][None, :] - price) / np.maximum(price, 1) * 0.4 +
+            np.abs(c_rating - rating) * 0.1 - 0.2 - np.where(c_rating >= 4.0, 0.1, 0.0)
+        )
+        same_category = catalog['category'][candidates][None, :] == cart_codes[:, None]
+        similarity = np.where(same_category, np.clip(1 - distance, 0, None), 0.0)
+        
+        copurchase = np.zeros_like(similarity)
+        for i, (rows, scores) in enumerate(copurchased):
+            copurchase[i, np.searchsorted(candidates, rows)] = scores
+        
+        contributions = similarity + self.CART_COPURCHASE_WEIGHT * copurchase
+        merged = contributions.max(axis=0) if merge == 'max' else contributions.sum(axis=0)
+        merged[np.isin(candidates, cart_rows)] = 0
+        
+        top = self._top_k(np.where(merged > 0, -merged, np.inf), limit)
+        
+        results = []
+        for col in top:
+            p = self._products[candidates[col]]
+            source_idx = int(np.argmax(contributions[:, col]))
+            source = self._products[cart_rows[source_idx]]
+            source_title = (source.get('title') or '')[:50]
+            if copurchase[source_idx, col] > 0:
+                reason = f"Souvent acheté avec {source_title}"
+            else:
+                reason = f"Similaire à {source_title}"
+            results.append({
+                'id': p.get('id'),
+                'title': (p.get('title') or '')[:100],
+                'price': p.get('price', 0),
+                'rating': p.get('rating', 0),
+                'category': self._category_of(p),
+                'score': round(float(merged[col]), 3),
+                'source_product_id': source.get('id'),
+                'reason': reason
+            })
+        
+        return {'recommendations': results, 'not_found': not_found}
+    
+    def get_personalized_recommendations(
+        self,
+        user_id: int,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Recommandations personnalisées (historique d'achats, ALS implicite)
+        
+        Utilisateur sans historique: produits tendance.
+        """
+        results = []
+        for item in personalization_engine.recommend(user_id, limit=limit):
+            p = self.product_index.get(item['product_id'])
+            if p:
+                results.append({
+                    'id': p.get('id'),
+                    'title': (p.get('title') or '')[:100],
+                    'price': p.get('price', 0),
+                    'rating': p.get('rating', 0),
+                    'category': self._category_of(p),
+                    'score': item['score'],
+                    'reason': "Basé sur vos achats"
+                })
+        
+        if not results:
+            results = [
+                {**p, 'reason': "Produit tendance"}
+                for p in self.get_trending_products(limit=limit)
+            ]
+        return results
+    
     def get_comprehensive_recommendations(
         self, 
         product_id: int
     ) -> Dict[str, Any]:
         """
         Retourne toutes les recommandations pour un produit
+        
+        Lues dans la table matérialisée si le produit y figure,
+        sinon calculées à la volée.
         """
         product = self.product_index.get(product_id)
         if not product:
             return {"error": "Produit non trouvé"}
         
-        return {
+        result = {
             "product": {
                 "id": product_id,
                 "title": product.get('title', '')[:100],
                 "price": product.get('price', 0),
                 "category": product.get('category', '')
-            },
-            "similar_products": self.get_similar_products(product_id, limit=5),
-            "upsell_options": self.get_upsell_products(product_id, limit=3),
-            "crosssell_suggestions": self.get_crosssell_products(product_id, limit=3),
-            "trending_in_category": self.get_category_recommendations(
-                product.get('category', ''), limit=5, sort_by='rank'
+            }
+        }
+        
+        self.refresh_materialized()
+        lists = self.materialized.lookup(product_id) if self.materialized else None
+        if lists is not None:
+            result.update(self._hydrate(product, lists))
+            result["source"] = "materialized"
+            result["stale"] = self.is_materialization_stale()
+            return result
+        
+        result.update(self.compute_product_lists(product_id))
+        result["source"] = "live"
+        return result
+    
+    # ========== Matérialisation ==========
+    
+    # Taille des listes de get_comprehensive_recommendations
+    COMPREHENSIVE_LIMITS = {
+        'similar_products': 5,
+        'upsell_options': 3,
+        'crosssell_suggestions': 3,
+        'trending_in_category': 5
+    }
+    
+    def compute_product_lists(
+        self,
+        product_id: int,
+        category_cache: Optional[Dict[str, List[Dict[str, Any]]]] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Calcule à la volée les quatre listes d'un produit
+        
+        category_cache: liste par catégorie réutilisée entre produits (job batch)
+        """
+        product = self.product_index[product_id]
+        limits = self.COMPREHENSIVE_LIMITS
+        category = product.get('category', '')
+        
+        if category_cache is None or category not in category_cache:
+            trending = self.get_category_recommendations(
+                category, limit=limits['trending_in_category'], sort_by='rank'
             )
+            if category_cache is not None:
+                category_cache[category] = trending
+        else:
+            trending = category_cache[category]
+        
+        return {
+            "similar_products": self.get_similar_products(product_id, limit=limits['similar_products']),
+            "upsell_options": self.get_upsell_products(product_id, limit=limits['upsell_options']),
+            "crosssell_suggestions": self.get_crosssell_products(
+                product_id, limit=limits['crosssell_suggestions']
+            ),
+            "trending_in_category": trending
+        }
+    
+    def _hydrate(self, product: Dict, lists: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, List[Dict]]:
+        """Reconstruit les listes depuis les ids/scores matérialisés"""
+        def items(kind):
+            row = lists[kind]
+            for i, pid in enumerate(row['ids'].tolist()):
+                p = self.product_index.get(pid) if pid >= 0 else None
+                if p:
+                    yield i, p
+        
+        return {
+            "similar_products": [
+                self._similar_item(product, p, float(lists['similar_products']['scores'][i]))
+                for i, p in items('similar_products')
+            ],
+            "upsell_options": [
+                self._upsell_item(product, p) for _, p in items('upsell_options')
+            ],
+            "crosssell_suggestions": [
+                self._crosssell_item(
+                    p,
+                    float(lists['crosssell_suggestions']['scores'][i]),
+                    int(lists['crosssell_suggestions']['support'][i])
+                )
+                for i, p in items('crosssell_suggestions')
+            ],
+            "trending_in_category": [
+                self._category_item(p) for _, p in items('trending_in_category')
+            ]
+        }
+    
+    def load_materialized(self, version: Optional[str] = None) -> bool:
+        """Ouvre la dernière table matérialisée (memory-map)"""
+        materialized = self.store.load(version)
+        if materialized is None:
+            return False
+        self.materialized = materialized
+        logger.info(f"📦 Recommandations matérialisées chargées: {materialized.version}")
+        return True
+    
+    def refresh_materialized(self) -> bool:
+        """Recharge la table si un autre worker a publié une nouvelle version"""
+        now = time.time()
+        if now - self._last_version_check < settings.recommendations_poll_seconds:
+            return False
+        self._last_version_check = now
+        
+        version = self.store.current_version()
+        if not version or (self.materialized is not None and version == self.materialized.version):
+            return False
+        
+        return self.load_materialized(version)
+    
+    def is_materialization_stale(self) -> bool:
+        """Vrai si le catalogue ou les co-achats ont changé depuis la matérialisation"""
+        if self.materialized is None:
+            return True
+        meta = self.materialized.meta
+        if meta.get('catalog_version') != self.catalog_version:
+            return True
+        return (copurchase_engine.last_updated or 0) > meta.get('created_ts', 0)
+    
+    def get_materialization_status(self) -> Dict[str, Any]:
+        self.refresh_materialized()
+        if self.materialized is None:
+            return {"available": False, "stale": True}
+        return {
+            "available": True,
+            "version": self.materialized.version,
+            "created_at": self.materialized.meta.get('created_at'),
+            "age_seconds": round(self.materialized.age_seconds, 1),
+            "products": len(self.materialized),
+            "stale": self.is_materialization_stale()
         }
+    
+    @staticmethod
+    def _catalog_signature(catalog: Dict[str, np.ndarray], categories: List[str]) -> str:
+        """Empreinte du catalogue indexé (ids, prix, ratings, rangs, catégories)"""
+        digest = hashlib.sha1()
+        for col in ('id', 'price', 'rating', 'rank', 'category'):
+            digest.update(np.ascontiguousarray(catalog[col]).tobytes())
+        digest.update('\x00'.join(categories).encode('utf-8'))
+        return digest.hexdigest()
 
 
 # Instance singleton
@@ -3,13 +3,16 @@ Service de Recherche Sémantique
 Utilise des embeddings pour la recherche de produits
 """
 import logging
+import threading
 import time
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
 import numpy as np
 
 from app.config import settings
+from app.core.index_store import SearchIndexStore
+from app.core.product_table import ProductTable
 from app.models.schemas import (
     SearchQuery, SearchResponse, SearchResult, IndexStatusResponse
 )
@@ -35,19 +38,100 @@ except ImportError:
     logger.warning("[WARN] FAISS non disponible")
 
 
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Normalise chaque ligne (similarité cosinus = produit scalaire), avec ou sans FAISS"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices des k meilleurs scores de chaque ligne, par score décroissant
+    
+    argpartition isole les k premiers en O(N) puis seuls ceux-ci sont triés,
+    au lieu d'un tri complet des N scores par requête.
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.zeros((len(scores), 0), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1)
+
+
+class SearchIndexState(NamedTuple):
+    """
+    État de l'index à un instant donné (jamais modifié après publication)
+    
+    Le service le remplace en une seule affectation; une requête lit
+    self.state une fois et garde un état cohérent (table, id -> ligne,
+    embeddings, index) même si un snapshot est chargé entre-temps.
+    """
+    products: ProductTable  # Table colonnaire des produits indexés
+    id_to_row: Dict[int, int]  # product_id -> ligne dans l'index
+    embeddings: Optional[np.ndarray] = None
+    index: Any = None
+    version: Optional[str] = None  # Snapshot d'origine (None: pas encore publié)
+    last_updated: Optional[datetime] = None
+    
+    @classmethod
+    def build(cls, products: ProductTable, embeddings: Optional[np.ndarray] = None, index: Any = None,
+              version: Optional[str] = None, last_updated: Optional[datetime] = None) -> 'SearchIndexState':
+        id_to_row = dict(zip(products.ids.tolist(), range(len(products))))
+        return cls(products, id_to_row, embeddings, index, version, last_updated)
+
+
 class SemanticSearchService:
     """Service de recherche sémantique avec embeddings"""
     
     def __init__(self):
         self.model = None
-        self.index = None
-        self.products_data: List[Dict[str, Any]] = []
-        self.embeddings: Optional[np.ndarray] = None
-        self.is_ready = False
-        self.last_updated: Optional[datetime] = None
+        self.state = SearchIndexState.build(ProductTable())
+        
+        # Snapshots sur disque partagés entre workers
+        self.store = SearchIndexStore(settings.embeddings_dir, keep=settings.search_snapshot_keep)
+        self._last_version_check = 0.0
+        
+        # Ajouts incrémentaux (add_products): tampon d'embeddings et index
+        # FAISS construits par ce processus, complétés en place
+        self._add_lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._embedding_buffer: Optional[np.ndarray] = None
+        self._owned_index: Any = None
         
         self._initialize_model()
     
+    # Lecture seule: état courant (une requête lit self.state une seule fois)
+    
+    @property
+    def products(self) -> ProductTable:
+        return self.state.products
+    
+    @property
+    def id_to_row(self) -> Dict[int, int]:
+        return self.state.id_to_row
+    
+    @property
+    def embeddings(self) -> Optional[np.ndarray]:
+        return self.state.embeddings
+    
+    @property
+    def index(self) -> Any:
+        return self.state.index
+    
+    @property
+    def snapshot_version(self) -> Optional[str]:
+        return self.state.version
+    
+    @property
+    def last_updated(self) -> Optional[datetime]:
+        return self.state.last_updated
+    
+    @property
+    def is_ready(self) -> bool:
+        return self.model is not None and len(self.state.products) > 0
+    
     def _initialize_model(self):
         """Initialise le modele d'embeddings"""
         if not SENTENCE_TRANSFORMERS_AVAILABLE:
@@ -80,8 +164,8 @@ class SemanticSearchService:
             logger.info(f" Indexation de {len(products)} produits...")
             start_time = time.time()
             
-            # Stocke les données
-            self.products_data = products
+            # Table colonnaire (remplace les dicts produits)
+            table = ProductTable.from_products(products)
             
             # Génère les textes pour les embeddings
             texts = []
@@ -90,27 +174,32 @@ class SemanticSearchService:
                 texts.append(text)
             
             # Génère les embeddings
-            self.embeddings = self.model.encode(
+            embeddings = self.model.encode(
                 texts,
                 show_progress_bar=True,
                 convert_to_numpy=True
             )
             
+            # Normalise pour cosine similarity
+            embeddings = _normalize_rows(embeddings)
+            
             # Crée l'index FAISS
+            index = None
             if FAISS_AVAILABLE:
-                dimension = self.embeddings.shape[1]
-                self.index = faiss.IndexFlatIP(dimension)  # Inner Product (cosine après normalisation)
-                
-                # Normalise pour cosine similarity
-                faiss.normalize_L2(self.embeddings)
-                self.index.add(self.embeddings)
+                dimension = embeddings.shape[1]
+                index = faiss.IndexFlatIP(dimension)  # Inner Product (cosine après normalisation)
+                index.add(embeddings)
+            self._owned_index = index
             
-            self.is_ready = True
-            self.last_updated = datetime.now()
+            # Remplacement par référence une fois tout construit
+            self.state = SearchIndexState.build(table, embeddings, index, last_updated=datetime.now())
             
             elapsed = time.time() - start_time
             logger.info(f"[OK]  {len(products)} produits indexés en {elapsed:.2f}s")
             
+            # Publie le snapshot pour les autres workers et les redémarrages
+            self.save_snapshot()
+            
             return True
         
         except Exception as e:
@@ -158,6 +247,8 @@ class SemanticSearchService:
             query: Requête de recherche
         """
         start_time = time.time()
+        self.refresh_from_snapshot()
+        state = self.state
         
         if not self.is_ready:
             return SearchResponse(
@@ -170,52 +261,29 @@ class SemanticSearchService:
         
         try:
             # Encode la requête
-            query_embedding = self.model.encode([query.query], convert_to_numpy=True)
-            faiss.normalize_L2(query_embedding)
+            query_embedding = _normalize_rows(self.model.encode([query.query], convert_to_numpy=True))
             
             # Recherche
-            k = min(query.top_k * 3, len(self.products_data))  # Récupère plus pour filtrage
+            k = min(query.top_k * 3, len(state.products))  # Récupère plus pour filtrage
             
-            if FAISS_AVAILABLE and self.index:
-                scores, indices = self.index.search(query_embedding, k)
+            if FAISS_AVAILABLE and state.index:
+                scores, indices = self._index_search(state.index, query_embedding, k)
                 scores = scores[0]
                 indices = indices[0]
             else:
-                # Fallback: recherche manuelle
-                scores = np.dot(self.embeddings, query_embedding.T).flatten()
-                indices = np.argsort(scores)[::-1][:k]
-                scores = scores[indices]
+                # Fallback: recherche exacte sur les embeddings (mappés après un snapshot)
+                all_scores = np.dot(query_embedding, state.embeddings.T)
+                indices = _top_k(all_scores, k)[0]
+                scores = all_scores[0, indices]
             
-            # Construit les résultats avec filtrage
-            results = []
-            for i, (score, idx) in enumerate(zip(scores, indices)):
-                if idx < 0 or idx >= len(self.products_data):
-                    continue
-                
-                product = self.products_data[idx]
-                
-                # Applique les filtres
-                if not self._passes_filters(product, query):
-                    continue
-                
-                result = SearchResult(
-                    product_id=product.get('id', idx),
-                    asin=product.get('asin', ''),
-                    title=product.get('title', ''),
-                    price=float(product.get('price', 0) or 0),
-                    rating=float(product.get('rating', 0) or 0),
-                    review_count=int(product.get('review_count', 0) or 0),
-                    rank=int(product.get('rank', 0) or 0) if product.get('rank') else None,
-                    stock=int(product.get('stock', 0) or 0),
-                    category_name=product.get('category_name') or product.get('category', ''),
-                    image_url=product.get('image_url', ''),
-                    similarity_score=float(score),
-                    highlights=self._generate_highlights(product, query.query)
-                )
-                results.append(result)
-                
-                if len(results) >= query.top_k:
-                    break
+            # Filtrage vectorisé sur les colonnes aux indices trouvés
+            valid = (indices >= 0) & (indices < len(state.products))
+            indices, scores = indices[valid], scores[valid]
+            keep = self._filter_mask(state.products, indices, query)
+            indices = indices[keep][:query.top_k]
+            scores = scores[keep][:query.top_k]
+            
+            results = self._build_results(state.products, indices, scores, query=query.query)
             
             search_time = (time.time() - start_time) * 1000
             
@@ -246,51 +314,45 @@ class SemanticSearchService:
                 suggestions=[f"Erreur: {str(e)}"]
             )
     
-    def _passes_filters(self, product: Dict[str, Any], query: SearchQuery) -> bool:
-        """Vérifie si un produit passe les filtres"""
+    def _filter_mask(self, products: ProductTable, rows: np.ndarray, query: SearchQuery) -> np.ndarray:
+        """Masque des lignes qui passent les filtres de la requête"""
+        mask = np.ones(len(rows), dtype=bool)
+        
         # Filtre catégorie
         if query.category_filter:
-            cat = product.get('category_name') or product.get('category', '')
-            if query.category_filter.lower() not in cat.lower():
-                return False
+            mask &= products.category_mask(query.category_filter, rows)
         
         # Filtre prix
-        price = float(product.get('price', 0) or 0)
-        if query.price_min and price < query.price_min:
-            return False
-        if query.price_max and price > query.price_max:
-            return False
+        price = products.price[rows]
+        if query.price_min:
+            mask &= price >= query.price_min
+        if query.price_max:
+            mask &= price <= query.price_max
         
         # Filtre rating
         if query.min_rating:
-            rating = float(product.get('rating', 0) or 0)
-            if rating < query.min_rating:
-                return False
+            mask &= products.rating[rows] >= query.min_rating
         
         # Filtre stock
         if query.in_stock_only:
-            stock = int(product.get('stock', 0) or 0)
-            if stock <= 0:
-                return False
+            mask &= products.stock[rows] > 0
         
-        return True
+        return mask
     
-    def _generate_highlights(self, product: Dict[str, Any], query: str) -> List[str]:
+    def _generate_highlights(self, title: str, rating: float, stock: int, query: str) -> List[str]:
         """Génère des highlights pour le résultat"""
         highlights = []
         query_words = query.lower().split()
-        title = product.get('title', '').lower()
+        title = title.lower()
         
         for word in query_words:
             if word in title:
                 highlights.append(f"Contient '{word}'")
         
         # Caractéristiques notables
-        rating = product.get('rating', 0)
         if rating and rating >= 4.5:
             highlights.append("⭐ Excellentes notes")
         
-        stock = product.get('stock', 0)
         if stock and stock > 100:
             highlights.append(" Stock important")
         
@@ -313,100 +375,300 @@ class SemanticSearchService:
     
     def get_similar_products(self, product_id: int, top_k: int = 5) -> List[SearchResult]:
         """Trouve des produits similaires"""
+        return self.get_similar_products_batch([product_id], top_k).get(product_id, [])
+    
+    def get_similar_products_batch(
+        self,
+        product_ids: List[int],
+        top_k: int = 5,
+        exclude_input: bool = False
+    ) -> Dict[int, List[SearchResult]]:
+        """
+        Produits similaires pour plusieurs produits en une seule recherche
+        
+        Args:
+            product_ids: IDs des produits sources
+            top_k: Nombre de résultats par produit
+            exclude_input: Exclut tous les produits sources des résultats (ex: panier)
+        
+        Returns:
+            Dict product_id -> résultats (dédoublonnés, sans le produit source)
+        """
+        self.refresh_from_snapshot()
+        state = self.state
         if not self.is_ready:
-            return []
+            return {}
         
-        # Trouve l'index du produit
-        product_idx = None
-        for i, p in enumerate(self.products_data):
-            if p.get('id') == product_id:
-                product_idx = i
-                break
+        # Résout les lignes via l'index id -> ligne
+        sources = []
+        for pid in dict.fromkeys(product_ids):
+            row = state.id_to_row.get(pid)
+            if row is not None:
+                sources.append((pid, row))
         
-        if product_idx is None:
-            return []
+        if not sources:
+            return {}
+        
+        rows = np.array([row for _, row in sources])
+        queries = np.ascontiguousarray(state.embeddings[rows], dtype=np.float32)
         
-        # Recherche les plus similaires
-        product_embedding = self.embeddings[product_idx:product_idx+1]
+        # Marge pour le produit source, les doublons et les exclusions
+        excluded = set(product_ids) if exclude_input else set()
+        k = min(top_k + 1 + len(excluded), len(state.products))
         
-        if FAISS_AVAILABLE and self.index:
-            scores, indices = self.index.search(product_embedding, top_k + 1)
-            scores = scores[0]
-            indices = indices[0]
+        if FAISS_AVAILABLE and state.index:
+            scores, indices = self._index_search(state.index, queries, k)
         else:
-            scores = np.dot(self.embeddings, product_embedding.T).flatten()
-            indices = np.argsort(scores)[::-1][:top_k + 1]
-            scores = scores[indices]
+            all_scores = np.dot(queries, state.embeddings.T)
+            indices = _top_k(all_scores, k)
+            scores = np.take_along_axis(all_scores, indices, axis=1)
+        
+        results: Dict[int, List[SearchResult]] = {}
+        for (pid, row), row_scores, row_indices in zip(sources, scores, indices):
+            valid = (row_indices >= 0) & (row_indices < len(state.products)) & (row_indices != row)
+            row_indices, row_scores = row_indices[valid], row_scores[valid]
+            
+            # Exclut le produit source et dédoublonne par product_id (ordre conservé)
+            ids = state.products.ids[row_indices]
+            keep = ~np.isin(ids, list({pid} | excluded))
+            _, first = np.unique(ids, return_index=True)
+            unique = np.zeros(len(ids), dtype=bool)
+            unique[first] = True
+            keep &= unique
+            
+            results[pid] = self._build_results(
+                state.products,
+                row_indices[keep][:top_k],
+                row_scores[keep][:top_k],
+                highlights=["Produit similaire"]
+            )
+        
+        return results
+    
+    def get_neighbors(self, product_id: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k plus proches voisins d'un produit dans l'index (hors produit source)
+        
+        Ne nécessite pas le modèle: les embeddings du produit sont déjà indexés.
+        Utilisé par le service de recommandations pour partager l'index.
+        
+        Returns:
+            (product_ids, similarités cosinus) triés par similarité décroissante,
+            tableaux vides si l'index ou le produit est absent
+        """
+        self.refresh_from_snapshot()
+        state = self.state
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+        row = state.id_to_row.get(product_id)
+        if row is None or state.embeddings is None or k <= 0:
+            return empty
+        
+        k = min(k + 1, len(state.products))
+        query = np.ascontiguousarray(state.embeddings[row:row + 1], dtype=np.float32)
+        
+        if FAISS_AVAILABLE and state.index:
+            scores, indices = self._index_search(state.index, query, k)
+            scores, indices = scores[0], indices[0]
+        else:
+            all_scores = np.dot(query, state.embeddings.T)
+            indices = _top_k(all_scores, k)[0]
+            scores = all_scores[0, indices]
+        
+        valid = (indices >= 0) & (indices < len(state.products)) & (indices != row)
+        indices, scores = indices[valid], scores[valid]
+        ids = state.products.ids[indices]
+        keep = ids != product_id
+        return ids[keep], scores[keep]
+    
+    def _build_results(
+        self,
+        products: ProductTable,
+        rows: np.ndarray,
+        scores: np.ndarray,
+        query: Optional[str] = None,
+        highlights: Optional[List[str]] = None
+    ) -> List[SearchResult]:
+        """Construit les SearchResult en rassemblant les colonnes aux lignes trouvées"""
+        if len(rows) == 0:
+            return []
+        
+        cols = products.gather(rows)
+        scores = np.asarray(scores, dtype=np.float64).tolist()
         
         results = []
-        for score, idx in zip(scores, indices):
-            if idx == product_idx:
-                continue
-            
-            product = self.products_data[idx]
+        for i in range(len(rows)):
             results.append(SearchResult(
-                product_id=product.get('id', idx),
-                asin=product.get('asin', ''),
-                title=product.get('title', ''),
-                price=float(product.get('price', 0) or 0),
-                rating=float(product.get('rating', 0) or 0),
-                review_count=int(product.get('review_count', 0) or 0),
-                rank=int(product.get('rank', 0) or 0) if product.get('rank') else None,
-                stock=int(product.get('stock', 0) or 0),
-                category_name=product.get('category_name') or product.get('category', ''),
-                image_url=product.get('image_url', ''),
-                similarity_score=float(score),
-                highlights=["Produit similaire"]
+                product_id=cols['id'][i],
+                asin=cols['asin'][i],
+                title=cols['title'][i],
+                price=cols['price'][i],
+                rating=cols['rating'][i],
+                review_count=cols['review_count'][i],
+                rank=cols['rank'][i] or None,
+                stock=cols['stock'][i],
+                category_name=cols['category_name'][i],
+                image_url=cols['image_url'][i],
+                similarity_score=scores[i],
+                highlights=highlights if query is None else self._generate_highlights(
+                    cols['title'][i], cols['rating'][i], cols['stock'][i], query
+                )
             ))
         
-        return results[:top_k]
+        return results
     
     def add_product(self, product: Dict[str, Any]) -> bool:
-        """Ajoute un produit à l'index existant"""
-        if not self.model:
-            return False
+        """Ajoute un produit à l'index existant (voir add_products)"""
+        return self.add_products([product]) == 1
+    
+    def add_products(self, products: List[Dict[str, Any]]) -> int:
+        """
+        Ajoute un lot de produits à l'index existant et publie un snapshot
+        
+        Les embeddings du lot sont écrits à la suite du tampon de ce processus
+        (_append_embeddings) et ajoutés à son index FAISS, sans recopier ni
+        réindexer le catalogue; les états déjà publiés ne voient que leurs
+        propres lignes. Le snapshot rend l'ajout visible aux autres workers
+        (sinon perdu au prochain rechargement): regrouper les ajouts plutôt
+        qu'appeler add_product en boucle. Retourne le nombre de produits ajoutés.
+        """
+        if not self.model or not products:
+            return 0
         
         try:
-            self.products_data.append(product)
-            
-            text = self._create_search_text(product)
-            embedding = self.model.encode([text], convert_to_numpy=True)
-            faiss.normalize_L2(embedding)
-            
-            if self.embeddings is not None:
-                self.embeddings = np.vstack([self.embeddings, embedding])
-            else:
-                self.embeddings = embedding
-            
-            if FAISS_AVAILABLE and self.index:
-                self.index.add(embedding)
-            
-            return True
+            with self._add_lock:
+                state = self.state
+                texts = [self._create_search_text(p) for p in products]
+                embedding = _normalize_rows(self.model.encode(texts, convert_to_numpy=True))
+                
+                # Table de l'état courant non modifiée (lue par les requêtes en cours)
+                table = state.products.extended(products)
+                embeddings = self._append_embeddings(state.embeddings, embedding)
+                
+                index = None
+                if FAISS_AVAILABLE:
+                    if state.embeddings is None:
+                        index = faiss.IndexFlatIP(embeddings.shape[1])
+                        index.add(embeddings)
+                        self._owned_index = index
+                    elif state.index is not None and state.index is self._owned_index \
+                            and state.index.ntotal == len(state.products):
+                        # Lignes en plus ignorées par les états précédents (indices >= leur taille)
+                        index = state.index
+                        with self._index_lock:
+                            index.add(embedding)
+                    # Sinon index mappé d'un snapshot (lecture seule) ou absent:
+                    # recherche exacte sur les embeddings, mêmes résultats
+                
+                self.state = SearchIndexState.build(table, embeddings, index, last_updated=datetime.now())
+            self.save_snapshot()
+            return len(products)
         except Exception as e:
-            logger.error(f"Erreur ajout produit: {e}")
-            return False
+            logger.error(f"Erreur ajout produits: {e}")
+            return 0
+    
+    def _append_embeddings(self, embeddings: Optional[np.ndarray], added: np.ndarray) -> np.ndarray:
+        """
+        embeddings + added, sans recopier l'existant à chaque lot
+        
+        Tampon à capacité doublée: un état voit buffer[:n], les lignes ajoutées
+        sont écrites après n (jamais lues par les états existants). Des
+        embeddings d'une autre origine (snapshot mappé, index_products) sont
+        recopiés une fois dans un nouveau tampon.
+        """
+        n = 0 if embeddings is None else len(embeddings)
+        total = n + len(added)
+        buffer = self._embedding_buffer
+        
+        if buffer is None or embeddings is None or embeddings.base is not buffer or len(buffer) < total:
+            buffer = np.empty((max(total, 2 * n), added.shape[1]), dtype=np.float32)
+            if n:
+                buffer[:n] = embeddings
+            self._embedding_buffer = buffer
+        
+        buffer[n:total] = added
+        return buffer[:total]
+    
+    def _index_search(self, index: Any, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Recherche FAISS, exclusive avec un ajout en place (add_products)"""
+        with self._index_lock:
+            return index.search(queries, k)
     
     def clear_index(self):
         """Vide l'index"""
-        self.products_data = []
-        self.embeddings = None
-        self.is_ready = False
+        self.state = SearchIndexState.build(ProductTable())
+    
+    # ==================== SNAPSHOTS ====================
+    
+    def save_snapshot(self) -> Optional[str]:
+        """Écrit l'index courant sur disque et publie une nouvelle version"""
+        state = self.state
+        if state.embeddings is None or not len(state.products):
+            return None
+        
+        version = self.store.save(
+            state.embeddings,
+            state.products,
+            index=state.index,
+            metadata={'embedding_model': settings.embedding_model}
+        )
+        if version and self.state is state:
+            self.state = state._replace(version=version)
+        return version
+    
+    def load_snapshot(self, version: Optional[str] = None) -> bool:
+        """
+        Charge un snapshot depuis le disque (version publiée par défaut)
+        
+        Permet de servir la recherche dès le démarrage, avant la première sync.
+        """
+        snapshot = self.store.load(version)
+        if not snapshot:
+            return False
+        
+        if snapshot['meta'].get('embedding_model') != settings.embedding_model:
+            logger.warning(f"Snapshot {snapshot['version']} ignoré (modèle d'embeddings différent)")
+            return False
+        
+        # Remplacement en une affectation: les requêtes en cours gardent l'ancien état
+        self.state = SearchIndexState.build(
+            snapshot['products'],
+            snapshot['embeddings'],
+            snapshot['index'],
+            version=snapshot['version'],
+            last_updated=datetime.fromisoformat(snapshot['meta']['created_at'])
+        )
+        
+        logger.info(f"[OK] Snapshot {self.snapshot_version} chargé ({len(self.products)} produits)")
+        return True
+    
+    def refresh_from_snapshot(self) -> bool:
+        """Recharge l'index si un autre worker a publié une nouvelle version"""
+        now = time.time()
+        if now - self._last_version_check < settings.search_snapshot_poll_seconds:
+            return False
+        self._last_version_check = now
+        
+        version = self.store.current_version()
+        if not version or version == self.snapshot_version:
+            return False
         
-        if FAISS_AVAILABLE:
-            self.index = None
+        return self.load_snapshot(version)
     
     def get_status(self) -> IndexStatusResponse:
         """Retourne le statut de l'index"""
+        self.refresh_from_snapshot()
+        state = self.state
         size_mb = None
-        if self.embeddings is not None:
-            size_mb = self.embeddings.nbytes / (1024 * 1024)
+        if state.embeddings is not None:
+            size_mb = (state.embeddings.nbytes + state.products.nbytes) / (1024 * 1024)
         
         return IndexStatusResponse(
-            is_ready=self.is_ready,
-            indexed_products=len(self.products_data),
+            is_ready=self.model is not None and len(state.products) > 0,
+            indexed_products=len(state.products),
             embedding_model=settings.embedding_model,
-            last_updated=self.last_updated,
-            index_size_mb=size_mb
+            last_updated=state.last_updated,
+            index_size_mb=size_mb,
+            snapshot_version=state.version
         )
 
 
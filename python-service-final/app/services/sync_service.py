@@ -13,7 +13,11 @@ from app.config import settings
 from app.services.java_client import java_client
 from app.services.ml_service_unified import ml_service
 from app.services.search_service import search_service
+from app.services.autocomplete_service import autocomplete_service
 from app.services.recommendation_service import recommendation_service
+from app.services.copurchase_service import copurchase_engine
+from app.services.recommendation_batch import recommendation_materializer
+from app.services.personalization_service import personalization_engine
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +55,9 @@ class SyncService:
         2. Entraîne les modèles ML
         3. Indexe pour la recherche sémantique
         4. Indexe pour les recommandations
+        5. Met à jour les co-achats
+        6. Matérialise les recommandations par produit
+        7. Lance l'entraînement de la personnalisation
         """
         async with self._sync_lock:
             start_time = datetime.now()
@@ -119,6 +126,9 @@ class SyncService:
                         "status": "success" if search_success else "failed"
                     }
                     self.sync_status["search_indexed"] = search_success
+                    
+                    # Autocomplétion (mise à jour incrémentale)
+                    results["steps"]["autocomplete_indexing"] = autocomplete_service.index_products(products)
                 except Exception as e:
                     results["steps"]["search_indexing"] = {
                         "status": "error",
@@ -140,6 +150,26 @@ class SyncService:
                         "error": str(e)
                     }
                 
+                # 5. Co-achats (nouvelles lignes de vente uniquement)
+                logger.info("🛒 Étape 5: Mise à jour des co-achats...")
+                try:
+                    results["steps"]["copurchase"] = await asyncio.to_thread(copurchase_engine.refresh)
+                except Exception as e:
+                    results["steps"]["copurchase"] = {
+                        "status": "error",
+                        "error": str(e)
+                    }
+                
+                # 6. Matérialisation des recommandations (tous les produits)
+                logger.info("📦 Étape 6: Matérialisation des recommandations...")
+                results["steps"]["recommendations_materialization"] = await asyncio.to_thread(
+                    recommendation_materializer.run
+                )
+                
+                # 7. Personnalisation (entraînement ALS en arrière-plan)
+                if settings.sales_database_url:
+                    results["steps"]["personalization"] = personalization_engine.start_training()
+                
                 # Mise à jour statut
                 self.last_sync = datetime.now()
                 self.sync_status["last_sync"] = self.last_sync.isoformat()
@@ -5,13 +5,19 @@ Validation, nettoyage et enrichissement des données produits
 import logging
 import re
 from typing import Dict, Any, List, Tuple, Optional
-from datetime import datetime
 import numpy as np
 
 from app.config import settings
+from app.core.validation_rules import (
+    Rule, RuleSet, cross_rules, etl_rules, price_tiers, product_rules
+)
 
 logger = logging.getLogger(__name__)
 
+# Détails des produits invalides renvoyés par page (validate_batch)
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
 
 class ValidationResult:
     """Résultat de validation"""
@@ -47,6 +53,169 @@ class ValidationResult:
         }
 
 
+# === Validation en colonnes (validate_batch) ===
+
+def _elementwise(func):
+    """Fonction Python appliquée élément par élément (tableau object)"""
+    return np.frompyfunc(func, 1, 1)
+
+
+def _parse_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+_truthy = _elementwise(bool)
+_type = _elementwise(type)
+_length = _elementwise(len)
+# Blancs réduits à une espace: équivaut à re.sub(r'\s+', ' ', str(v).strip())
+_clean_text = _elementwise(lambda v: ' '.join(str(v).split()))
+_parse_floats = _elementwise(_parse_float)
+
+
+def _mask(values: np.ndarray) -> np.ndarray:
+    return values.astype(bool)
+
+
+def _is_str(values: np.ndarray) -> np.ndarray:
+    return _type(values) == str
+
+
+def _column(products: List[Dict[str, Any]], name: str) -> np.ndarray:
+    values = np.empty(len(products), dtype=object)
+    values[:] = [product.get(name) for product in products]
+    return values
+
+
+def _to_floats(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """float(v) par élément: (valeurs, masque des non convertibles)"""
+    if not _is_str(values).any():
+        try:
+            return values.astype(float), np.zeros(len(values), dtype=bool)
+        except (ValueError, TypeError, OverflowError):
+            pass
+    parsed = _parse_floats(values)
+    invalid = np.equal(parsed, None)
+    parsed[invalid] = np.nan
+    return parsed.astype(float), invalid
+
+
+def _to_ints(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """int(float(v)) par élément: (valeurs, masque des non convertibles)"""
+    floats, invalid = _to_floats(values)
+    # Hors int64 (ou nan/inf): non convertible
+    invalid |= ~(np.abs(floats) < 2.0 ** 63)
+    return np.where(invalid, 0, np.trunc(floats)).astype(np.int64), invalid
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    """
+    round(v, 2) de Python (arrondi du décimal exact, pas de v * 100)
+    
+    np.round est exact sauf quand v * 100 tombe pile sur ,5 après arrondi
+    binaire (2.675 -> 267.5): ces seules valeurs repassent par round().
+    """
+    scaled = values * 100
+    rounded = np.round(scaled) / 100
+    ties = np.abs(scaled - np.trunc(scaled)) == 0.5
+    rounded[ties] = [round(value, 2) for value in values[ties].tolist()]
+    large = ~(np.abs(values) < 1e15)
+    rounded[large] = values[large]
+    return rounded
+
+
+def _python(value: Any) -> Any:
+    """Scalaire numpy -> type Python (sérialisable tel quel)"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _ranks(rank: np.ndarray) -> np.ndarray:
+    """Rangs nettoyés (None si absent) -> entiers, 0 si absent"""
+    return np.where(np.equal(rank, None), 0, rank).astype(np.int64)
+
+
+def _report_value(value: Any) -> Optional[str]:
+    """Valeur rapportée avec un message (comme ValidationResult)"""
+    value = _python(value)
+    return str(value)[:100] if value else None
+
+
+class BatchValidation:
+    """
+    Validation d'un lot en colonnes
+    
+    Chaque champ est chargé en tableau et préparé en une passe; les règles
+    compilées du registre (app.core.validation_rules) donnent chacune un
+    masque booléen sur le lot (un produit isolé est un lot d'une ligne, voir
+    validate_product). Les listes d'erreurs d'un produit ne sont construites
+    que pour les lignes demandées.
+    """
+    
+    def __init__(self, size: int):
+        self.size = size
+        self.columns: Dict[str, np.ndarray] = {}
+        self.enrichments: Dict[str, np.ndarray] = {}
+        # (règle, masque, colonnes sur lesquelles elle a été évaluée)
+        self.rules: List[Tuple[Rule, np.ndarray, Dict[str, np.ndarray]]] = []
+    
+    def run(self, rules: RuleSet, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Évalue un jeu de règles; masques par code de règle"""
+        results = rules.evaluate(columns)
+        self.rules.extend((rule, mask, columns) for rule, mask in results)
+        return {rule.code: mask for rule, mask in results}
+    
+    @property
+    def is_valid(self) -> np.ndarray:
+        invalid = np.zeros(self.size, dtype=bool)
+        for rule, mask, _ in self.rules:
+            if rule.severity == 'error':
+                invalid |= mask
+        return ~invalid
+    
+    def counts(self, severity: str) -> Dict[str, int]:
+        """Nombre d'erreurs (ou d'avertissements) par champ"""
+        counts: Dict[str, int] = {}
+        for rule, mask, _ in self.rules:
+            hits = int(mask.sum())
+            if rule.severity == severity and hits:
+                counts[rule.field] = counts.get(rule.field, 0) + hits
+        return counts
+    
+    def issues(self, row: int) -> Tuple[List[Dict], List[Dict]]:
+        """Erreurs et avertissements d'une ligne"""
+        errors, warnings = [], []
+        for rule, mask, columns in self.rules:
+            if not mask[row]:
+                continue
+            (errors if rule.severity == 'error' else warnings).append({
+                "field": rule.field,
+                "message": rule.render(columns, row),
+                "value": _report_value(rule.reported(columns, row)) if rule.value else None
+            })
+        return errors, warnings
+    
+    def cleaned(self, row: int) -> Dict[str, Any]:
+        cleaned = {name: _python(values[row]) for name, values in self.columns.items()}
+        if cleaned['asin'] is None:
+            del cleaned['asin']
+        return cleaned
+    
+    def enriched(self, row: int) -> Dict[str, Any]:
+        return {name: _python(values[row]) for name, values in self.enrichments.items()}
+    
+    def details(self, row: int) -> Dict[str, Any]:
+        errors, warnings = self.issues(row)
+        return {
+            "index": row,
+            "is_valid": not errors,
+            "cleaned_data": self.cleaned(row),
+            "errors": errors,
+            "warnings": warnings
+        }
+
+
 class DataValidationService:
     """
     Service de validation et nettoyage des données
@@ -58,10 +227,11 @@ class DataValidationService:
     - Enrichissement de données
     """
     
+    # Champs validés, dans l'ordre des règles
+    FIELDS = ('asin', 'title', 'price', 'rating', 'review_count', 'rank', 'stock', 'category', 'image_url')
+    
     def __init__(self):
-        # Regex patterns
-        self.asin_pattern = re.compile(r'^[A-Z0-9]{10}$')
-        self.url_pattern = re.compile(r'^https?://[^\s]+$')
+        # Montant dans un prix textuel ("$12,50", "€ 7")
         self.price_pattern = re.compile(r'[\$€£]?\s*(\d+(?:[.,]\d+)?)')
         
         # Statistiques de validation
@@ -75,397 +245,252 @@ class DataValidationService:
     def validate_product(self, product: Dict[str, Any]) -> ValidationResult:
         """
         Valide un produit complet
-        """
-        result = ValidationResult()
-        cleaned = {}
-        
-        # 1. ASIN
-        asin = self._validate_asin(product.get('asin'), result)
-        if asin:
-            cleaned['asin'] = asin
-        
-        # 2. Title
-        title = self._validate_title(product.get('title'), result)
-        cleaned['title'] = title
-        
-        # 3. Price
-        price = self._validate_price(product.get('price'), result)
-        cleaned['price'] = price
-        
-        # 4. Rating
-        rating = self._validate_rating(product.get('rating'), result)
-        cleaned['rating'] = rating
-        
-        # 5. Review Count
-        review_count = self._validate_review_count(product.get('review_count'), result)
-        cleaned['review_count'] = review_count
-        
-        # 6. Rank
-        rank = self._validate_rank(product.get('rank'), result)
-        cleaned['rank'] = rank
         
-        # 7. Stock
-        stock = self._validate_stock(product.get('stock'), result)
-        cleaned['stock'] = stock
-        
-        # 8. Category
-        category = self._validate_category(product.get('category'), result)
-        cleaned['category'] = category
-        
-        # 9. Image URL
-        image_url = self._validate_image_url(product.get('image_url'), result)
-        cleaned['image_url'] = image_url
-        
-        # 10. Validations croisées
-        self._cross_validate(cleaned, result)
-        
-        # 11. Enrichissements
-        result.enrichments = self._enrich_product(cleaned)
-        
-        result.cleaned_data = cleaned
-        
-        # Stats
-        self.stats["total_validated"] += 1
-        if result.is_valid:
-            self.stats["valid"] += 1
-        else:
-            self.stats["invalid"] += 1
+        Lot d'un seul produit (validate_columns): mêmes règles, nettoyage et
+        enrichissements que la validation par lot et l'ETL.
+        """
+        batch = self.validate_columns([product])
+        details = batch.details(0)
         
+        result = ValidationResult()
+        result.is_valid = details["is_valid"]
+        result.errors = details["errors"]
+        result.warnings = details["warnings"]
+        result.cleaned_data = details["cleaned_data"]
+        result.enrichments = batch.enriched(0)
         return result
     
-    def validate_batch(self, products: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def validate_batch(
+        self,
+        products: List[Dict[str, Any]],
+        page: int = 1,
+        page_size: int = DEFAULT_PAGE_SIZE
+    ) -> Dict[str, Any]:
         """
-        Valide un lot de produits
+        Valide un lot de produits (en colonnes, voir validate_columns)
+        
+        Renvoie les compteurs sur tout le lot et le détail des seuls produits
+        invalides, par page de page_size (au plus MAX_PAGE_SIZE).
         """
-        results = {
-            "total": len(products),
-            "valid": 0,
-            "invalid": 0,
-            "warnings": 0,
-            "products": [],
+        batch = self.validate_columns(products)
+        invalid_rows = np.flatnonzero(~batch.is_valid)
+        page = max(1, page)
+        page_size = min(max(1, page_size), MAX_PAGE_SIZE)
+        rows = invalid_rows[(page - 1) * page_size:page * page_size]
+        
+        return {
+            "total": batch.size,
+            "valid": batch.size - len(invalid_rows),
+            "invalid": len(invalid_rows),
+            "warnings": sum(batch.counts('warning').values()),
             "summary": {
-                "error_types": {},
-                "warning_types": {}
-            }
+                "error_types": batch.counts('error'),
+                "warning_types": batch.counts('warning')
+            },
+            "page": page,
+            "page_size": page_size,
+            "pages": -(-len(invalid_rows) // page_size),
+            "products": [batch.details(int(row)) for row in rows]
         }
-        
-        for i, product in enumerate(products):
-            validation = self.validate_product(product)
-            
-            if validation.is_valid:
-                results["valid"] += 1
-            else:
-                results["invalid"] += 1
-            
-            if validation.warnings:
-                results["warnings"] += len(validation.warnings)
-            
-            # Agrège les types d'erreurs
-            for error in validation.errors:
-                error_type = error["field"]
-                results["summary"]["error_types"][error_type] = \
-                    results["summary"]["error_types"].get(error_type, 0) + 1
-            
-            for warning in validation.warnings:
-                warning_type = warning["field"]
-                results["summary"]["warning_types"][warning_type] = \
-                    results["summary"]["warning_types"].get(warning_type, 0) + 1
-            
-            results["products"].append({
-                "index": i,
-                "is_valid": validation.is_valid,
-                "cleaned_data": validation.cleaned_data,
-                "errors": validation.errors,
-                "warnings": validation.warnings
-            })
-        
-        return results
     
-    def _validate_asin(self, asin: Any, result: ValidationResult) -> Optional[str]:
-        """Valide l'ASIN Amazon"""
-        if not asin:
-            result.add_error("asin", "ASIN manquant")
-            return None
-        
-        asin_str = str(asin).strip().upper()
-        
-        if len(asin_str) != 10:
-            result.add_error("asin", f"ASIN doit avoir 10 caractères (trouvé: {len(asin_str)})", asin)
-            return None
-        
-        if not self.asin_pattern.match(asin_str):
-            result.add_error("asin", "Format ASIN invalide", asin)
-            return None
-        
-        return asin_str
+    def clean_batch(self, products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Données nettoyées et enrichies de chaque produit (comme /clean)"""
+        batch = self.validate_columns(products)
+        return [{**batch.cleaned(row), **batch.enriched(row)} for row in range(batch.size)]
     
-    def _validate_title(self, title: Any, result: ValidationResult) -> str:
-        """Valide et nettoie le titre"""
-        if not title:
-            result.add_error("title", "Titre manquant")
-            return "Unknown Product"
-        
-        title_str = str(title).strip()
-        
-        # Nettoie les caractères spéciaux excessifs
-        title_str = re.sub(r'\s+', ' ', title_str)
-        title_str = title_str[:500]  # Limite la longueur
-        
-        if len(title_str) < 5:
-            result.add_warning("title", "Titre très court", title_str)
+    def validate_columns(self, products: List[Dict[str, Any]]) -> BatchValidation:
+        """
+        Valide un lot en colonnes: une passe par champ et un masque par règle
         
-        if len(title_str) > 300:
-            result.add_warning("title", "Titre tronqué (trop long)")
+        Les champs sont préparés (_<champ>_column), puis évalués par les règles
+        compilées PRODUCT_RULES; les colonnes nettoyées en découlent, suivies
+        des règles croisées (CROSS_RULES) et des enrichissements. Le résultat
+        d'un produit ne dépend pas des autres lignes du lot.
+        """
+        batch = BatchValidation(len(products))
+        columns = {name: _column(products, name) for name in self.FIELDS}
+        for name in self.FIELDS:
+            getattr(self, f'_{name}_column')(columns)
+        
+        masks = batch.run(product_rules, columns)
+        batch.columns = self._clean_columns(columns, masks)
+        cleaned = batch.columns
+        batch.run(cross_rules, {
+            'price': cleaned['price'], 'rating': cleaned['rating'], 'review_count': cleaned['review_count'],
+            'rank': _ranks(cleaned['rank']), 'stock': cleaned['stock']
+        })
+        self._enrich_columns(batch)
         
-        return title_str
+        valid = int(batch.is_valid.sum())
+        self.stats["total_validated"] += batch.size
+        self.stats["valid"] += valid
+        self.stats["invalid"] += batch.size - valid
+        return batch
     
-    def _validate_price(self, price: Any, result: ValidationResult) -> float:
-        """Valide et nettoie le prix"""
-        if price is None:
-            result.add_warning("price", "Prix manquant, défaut à 0")
-            return 0.0
-        
-        try:
-            if isinstance(price, str):
-                # Extrait le prix d'une chaîne
-                match = self.price_pattern.search(price)
-                if match:
-                    price = match.group(1).replace(',', '.')
-                else:
-                    result.add_error("price", "Format de prix invalide", price)
-                    return 0.0
-            
-            price_float = float(price)
-            
-            if price_float < 0:
-                result.add_error("price", "Prix négatif", price)
-                return 0.0
-            
-            if price_float > 100000:
-                result.add_warning("price", "Prix exceptionnellement élevé", price_float)
-            
-            return round(price_float, 2)
-            
-        except (ValueError, TypeError):
-            result.add_error("price", "Prix non convertible", price)
-            return 0.0
-    
-    def _validate_rating(self, rating: Any, result: ValidationResult) -> float:
-        """Valide le rating"""
-        if rating is None:
-            return 0.0
-        
-        try:
-            rating_float = float(rating)
-            
-            if rating_float < 0:
-                result.add_warning("rating", "Rating négatif corrigé", rating)
-                return 0.0
-            
-            if rating_float > 5:
-                result.add_warning("rating", "Rating > 5 corrigé", rating)
-                return 5.0
-            
-            return round(rating_float, 2)
-            
-        except (ValueError, TypeError):
-            result.add_warning("rating", "Rating invalide, défaut à 0", rating)
-            return 0.0
-    
-    def _validate_review_count(self, reviews: Any, result: ValidationResult) -> int:
-        """Valide le nombre d'avis"""
-        if reviews is None:
-            return 0
-        
-        try:
-            if isinstance(reviews, str):
-                reviews = reviews.replace(',', '').replace(' ', '')
-            
-            reviews_int = int(float(reviews))
-            
-            if reviews_int < 0:
-                result.add_warning("review_count", "Nombre d'avis négatif corrigé", reviews)
-                return 0
-            
-            return reviews_int
-            
-        except (ValueError, TypeError):
-            result.add_warning("review_count", "Nombre d'avis invalide", reviews)
-            return 0
-    
-    def _validate_rank(self, rank: Any, result: ValidationResult) -> Optional[int]:
-        """Valide le rang"""
-        if rank is None:
-            return None
-        
-        try:
-            if isinstance(rank, str):
-                rank = rank.replace(',', '').replace('#', '').strip()
-            
-            rank_int = int(float(rank))
-            
-            if rank_int <= 0:
-                result.add_warning("rank", "Rang invalide (<= 0)", rank)
-                return None
-            
-            if rank_int > 10000000:
-                result.add_warning("rank", "Rang exceptionnellement élevé", rank)
-            
-            return rank_int
-            
-        except (ValueError, TypeError):
-            result.add_warning("rank", "Rang non convertible", rank)
-            return None
-    
-    def _validate_stock(self, stock: Any, result: ValidationResult) -> int:
-        """Valide le stock"""
-        if stock is None:
-            return 0
-        
-        try:
-            stock_int = int(float(stock))
-            
-            if stock_int < 0:
-                result.add_warning("stock", "Stock négatif corrigé", stock)
-                return 0
-            
-            return stock_int
-            
-        except (ValueError, TypeError):
-            result.add_warning("stock", "Stock invalide", stock)
-            return 0
-    
-    def _validate_category(self, category: Any, result: ValidationResult) -> str:
-        """Valide la catégorie"""
-        if not category:
-            return "Unknown"
-        
-        category_str = str(category).strip()
-        
-        # Nettoie et normalise
-        category_str = re.sub(r'\s+', ' ', category_str)
-        category_str = category_str[:100]  # Limite
-        
-        if len(category_str) < 2:
-            result.add_warning("category", "Catégorie très courte", category_str)
-            return "Unknown"
-        
-        return category_str
+    def get_rules(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Règles compilées et leur profil d'exécution (ETL et validation)"""
+        return {rules.name: rules.describe() for rules in (etl_rules, product_rules, cross_rules)}
     
-    def _validate_image_url(self, url: Any, result: ValidationResult) -> Optional[str]:
-        """Valide l'URL de l'image"""
-        if not url:
-            return None
-        
-        url_str = str(url).strip()
-        
-        if not self.url_pattern.match(url_str):
-            result.add_warning("image_url", "URL d'image invalide", url_str[:50])
-            return None
-        
-        return url_str
+    def reset_rule_profiles(self) -> None:
+        for rules in (etl_rules, product_rules, cross_rules):
+            rules.reset_profile()
     
-    def _cross_validate(self, product: Dict, result: ValidationResult) -> None:
-        """Validations croisées entre champs"""
-        
-        # Rating élevé avec peu d'avis
-        rating = product.get('rating', 0)
-        reviews = product.get('review_count', 0)
-        
-        if rating >= 4.8 and reviews < 10:
-            result.add_warning(
-                "cross_validation",
-                f"Rating excellent ({rating}) avec peu d'avis ({reviews}) - suspect"
-            )
-        
-        # Rang très bon mais rating faible
-        rank = product.get('rank')
-        if rank and rank < 100 and rating < 3.5:
-            result.add_warning(
-                "cross_validation",
-                f"Top 100 (rang {rank}) avec rating faible ({rating})"
-            )
-        
-        # Prix à 0 avec stock
-        price = product.get('price', 0)
-        stock = product.get('stock', 0)
-        
-        if price == 0 and stock > 0:
-            result.add_warning(
-                "cross_validation",
-                "Prix à 0 avec stock disponible - vérifier"
-            )
-    
-    def _enrich_product(self, product: Dict) -> Dict:
-        """Enrichit le produit avec des données calculées"""
-        enrichments = {}
-        
-        price = product.get('price', 0)
-        rating = product.get('rating', 0)
-        reviews = product.get('review_count', 0)
-        rank = product.get('rank')
-        stock = product.get('stock', 0)
-        
-        # Score de popularité
-        popularity = (rating * 20) + np.log1p(reviews) * 10
-        if rank and rank < 1000:
-            popularity += (1000 - rank) / 10
-        enrichments['popularity_score'] = round(popularity, 2)
-        
-        # Classification de prix
-        if price < 10:
-            enrichments['price_tier'] = 'budget'
-        elif price < 30:
-            enrichments['price_tier'] = 'economy'
-        elif price < 100:
-            enrichments['price_tier'] = 'standard'
-        elif price < 500:
-            enrichments['price_tier'] = 'premium'
-        else:
-            enrichments['price_tier'] = 'luxury'
-        
-        # Statut de stock
-        if stock == 0:
-            enrichments['stock_status'] = 'out_of_stock'
-        elif stock <= 5:
-            enrichments['stock_status'] = 'critical'
-        elif stock <= 20:
-            enrichments['stock_status'] = 'low'
-        elif stock <= 100:
-            enrichments['stock_status'] = 'normal'
-        else:
-            enrichments['stock_status'] = 'high'
-        
-        # Score de santé produit (0-100)
-        health = 50  # Base
-        
-        if rating >= 4.0:
-            health += 15
-        elif rating >= 3.5:
-            health += 10
-        elif rating < 3.0 and rating > 0:
-            health -= 15
-        
-        if reviews >= 100:
-            health += 10
-        elif reviews >= 50:
-            health += 5
+    def _asin_column(self, columns: Dict[str, np.ndarray]) -> None:
+        values = columns['asin']
+        present = _mask(_truthy(values))
+        asin = np.full(len(values), None, dtype=object)
+        asin[present] = _elementwise(lambda v: str(v).strip().upper())(values[present])
+        lengths = np.zeros(len(values), dtype=np.int64)
+        lengths[present] = _length(asin[present])
+        columns.update(asin_present=present, asin_clean=asin, asin_length=lengths)
+    
+    def _title_column(self, columns: Dict[str, np.ndarray]) -> None:
+        values = columns['title']
+        present = _mask(_truthy(values))
+        title = np.full(len(values), "Unknown Product", dtype=object)
+        title[present] = _elementwise(lambda v: v[:500])(_clean_text(values[present]))
+        columns.update(title_present=present, title_clean=title, title_length=_length(title).astype(np.int64))
+    
+    def _price_column(self, columns: Dict[str, np.ndarray]) -> None:
+        values = columns['price']
+        missing = np.equal(values, None)
+        is_str = _is_str(values)
+        
+        # Chaînes: montant extrait par price_pattern
+        source = values.copy()
+        source[is_str] = _elementwise(self._extract_price)(values[is_str])
+        bad_format = is_str & np.equal(source, None)
+        
+        todo = ~missing & ~bad_format
+        price = np.full(len(values), np.nan)
+        unconvertible = np.zeros(len(values), dtype=bool)
+        price[todo], unconvertible[todo] = _to_floats(source[todo])
+        columns.update(
+            price_missing=missing, price_bad_format=bad_format,
+            price_unconvertible=unconvertible, price_converted=todo & ~unconvertible, price_value=price
+        )
+    
+    def _extract_price(self, price: str) -> Optional[str]:
+        match = self.price_pattern.search(price)
+        return match.group(1).replace(',', '.') if match else None
+    
+    def _rating_column(self, columns: Dict[str, np.ndarray]) -> None:
+        values = columns['rating']
+        present = ~np.equal(values, None)
+        rating = np.full(len(values), np.nan)
+        invalid = np.zeros(len(values), dtype=bool)
+        rating[present], invalid[present] = _to_floats(values[present])
+        columns.update(rating_converted=present & ~invalid, rating_invalid=invalid, rating_value=rating)
+    
+    def _review_count_column(self, columns: Dict[str, np.ndarray]) -> None:
+        values = columns['review_count']
+        present = ~np.equal(values, None)
+        is_str = _is_str(values)
+        # Valeur rapportée: la chaîne déjà nettoyée (sans virgules ni espaces)
+        source = values.copy()
+        source[is_str] = _elementwise(lambda v: v.replace(',', '').replace(' ', ''))(values[is_str])
+        
+        reviews = np.zeros(len(values), dtype=np.int64)
+        invalid = np.zeros(len(values), dtype=bool)
+        reviews[present], invalid[present] = _to_ints(source[present])
+        columns.update(review_count_source=source, review_count_invalid=invalid, review_count_value=reviews)
+    
+    def _rank_column(self, columns: Dict[str, np.ndarray]) -> None:
+        values = columns['rank']
+        present = ~np.equal(values, None)
+        is_str = _is_str(values)
+        source = values.copy()
+        source[is_str] = _elementwise(lambda v: v.replace(',', '').replace('#', '').strip())(values[is_str])
+        
+        rank = np.zeros(len(values), dtype=np.int64)
+        invalid = np.zeros(len(values), dtype=bool)
+        rank[present], invalid[present] = _to_ints(source[present])
+        columns.update(rank_source=source, rank_invalid=invalid, rank_converted=present & ~invalid, rank_value=rank)
+    
+    def _stock_column(self, columns: Dict[str, np.ndarray]) -> None:
+        values = columns['stock']
+        present = ~np.equal(values, None)
+        stock = np.zeros(len(values), dtype=np.int64)
+        invalid = np.zeros(len(values), dtype=bool)
+        stock[present], invalid[present] = _to_ints(values[present])
+        columns.update(stock_invalid=invalid, stock_value=stock)
+    
+    def _category_column(self, columns: Dict[str, np.ndarray]) -> None:
+        values = columns['category']
+        present = _mask(_truthy(values))
+        category = np.full(len(values), "Unknown", dtype=object)
+        category[present] = _elementwise(lambda v: v[:100])(_clean_text(values[present]))
+        columns.update(
+            category_present=present, category_clean=category, category_length=_length(category).astype(np.int64)
+        )
+    
+    def _image_url_column(self, columns: Dict[str, np.ndarray]) -> None:
+        values = columns['image_url']
+        present = _mask(_truthy(values))
+        url = np.full(len(values), None, dtype=object)
+        url[present] = _elementwise(lambda v: str(v).strip())(values[present])
+        excerpt = np.full(len(values), None, dtype=object)
+        excerpt[present] = _elementwise(lambda v: v[:50])(url[present])
+        columns.update(image_url_present=present, image_url_clean=url, image_url_excerpt=excerpt)
+    
+    def _clean_columns(self, columns: Dict[str, np.ndarray], masks: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Colonnes nettoyées à partir des colonnes préparées et des masques des règles"""
+        asin = columns['asin_clean'].copy()
+        asin[masks['asin_length'] | masks['asin_format']] = None
         
-        if rank and rank <= 1000:
-            health += 15
-        elif rank and rank <= 5000:
-            health += 10
-        elif rank and rank > 50000:
-            health -= 10
+        price_kept = columns['price_converted'] & ~masks['price_negative']
+        rating = np.where(masks['rating_above'], 5.0, _round2(columns['rating_value']))
+        rating_reset = ~columns['rating_converted'] | masks['rating_negative']
         
-        if stock > 10:
-            health += 10
-        elif stock == 0:
-            health -= 20
+        rank = columns['rank_value'].astype(object)
+        rank[~columns['rank_converted'] | masks['rank_not_positive']] = None
         
-        enrichments['health_score'] = min(100, max(0, health))
+        category = columns['category_clean'].copy()
+        category[masks['category_short']] = "Unknown"
+        image_url = columns['image_url_clean'].copy()
+        image_url[masks['image_url_invalid']] = None
         
-        return enrichments
+        return {
+            'asin': asin,
+            'title': columns['title_clean'],
+            'price': np.where(price_kept, _round2(columns['price_value']), 0.0),
+            'rating': np.where(rating_reset, 0.0, rating),
+            'review_count': np.where(
+                masks['review_count_negative'] | columns['review_count_invalid'], 0, columns['review_count_value']
+            ),
+            'rank': rank,
+            'stock': np.where(masks['stock_negative'] | columns['stock_invalid'], 0, columns['stock_value']),
+            'category': category,
+            'image_url': image_url
+        }
+    
+    def _enrich_columns(self, batch: BatchValidation) -> None:
+        """Enrichissements (popularité, gamme de prix, stock, santé) calculés sur tout le lot"""
+        columns = batch.columns
+        price, rating, reviews, stock = columns['price'], columns['rating'], columns['review_count'], columns['stock']
+        rank = _ranks(columns['rank'])
+        ranked = rank > 0
+        
+        popularity = rating * 20 + np.log1p(reviews) * 10
+        popularity = popularity + np.where(ranked & (rank < 1000), (1000 - rank) / 10, 0.0)
+        
+        health = (
+            50
+            + np.select([rating >= 4.0, rating >= 3.5, (rating < 3.0) & (rating > 0)], [15, 10, -15], 0)
+            + np.select([reviews >= 100, reviews >= 50], [10, 5], 0)
+            + np.select([ranked & (rank <= 1000), ranked & (rank <= 5000), ranked & (rank > 50000)], [15, 10, -10], 0)
+            + np.select([stock > 10, stock == 0], [10, -20], 0)
+        )
+        
+        batch.enrichments = {
+            'popularity_score': np.round(popularity, 2),
+            'price_tier': price_tiers(price).astype(object),
+            'stock_status': np.select(
+                [stock == 0, stock <= 5, stock <= 20, stock <= 100],
+                ['out_of_stock', 'critical', 'low', 'normal'], 'high'
+            ).astype(object),
+            'health_score': np.clip(health, 0, 100)
+        }
     
     def get_stats(self) -> Dict:
         """Retourne les statistiques de validation"""
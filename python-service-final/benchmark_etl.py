@@ -0,0 +1,145 @@
+"""
+Benchmark du nettoyage ETL
+Compare les nettoyeurs ligne par ligne (apply) aux versions vectorisées
+sur des colonnes synthétiques (prix européens, rangs "#1,234", URLs...)
+
+Usage:
+    python benchmark_etl.py [nb_lignes]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.config import settings
+from app.services.etl_service import ETLService
+
+
+def synthetic_columns(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Colonnes brutes (str) représentatives d'un fichier fournisseur"""
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0, 5000, n_rows)
+
+    price_formats = [
+        lambda v: f"{v:.2f}",
+        lambda v: f"{v:,.2f}".replace(',', ' ').replace('.', ',') + " €",
+        lambda v: f"${v:,.2f}",
+        lambda v: f"{v:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'),
+        lambda v: "",
+    ]
+    rank_formats = [lambda v: f"#{int(v):,}", lambda v: str(int(v)), lambda v: f"{int(v)} in Books", lambda v: ""]
+    url_formats = [
+        lambda i: f"https://img.example.com/{i}.jpg",
+        lambda i: f"//img.example.com/{i}.jpg",
+        lambda i: f"img.example.com/{i}.jpg",
+        lambda i: "",
+    ]
+
+    price_kind = rng.integers(0, len(price_formats), n_rows)
+    rank_kind = rng.integers(0, len(rank_formats), n_rows)
+    url_kind = rng.integers(0, len(url_formats), n_rows)
+
+    return pd.DataFrame({
+        'asin': np.where(rng.random(n_rows) < 0.05, '', 'B000000000'),
+        'title': [f"Produit {i % 50_000}" for i in range(n_rows)],
+        'price': [price_formats[k](v) for k, v in zip(price_kind, values)],
+        'rank': [rank_formats[k](v) for k, v in zip(rank_kind, values)],
+        'image_url': [url_formats[k](i) for i, k in enumerate(url_kind)],
+        'rating': np.round(rng.uniform(3, 5, n_rows), 1).astype(str),
+        'review_count': rng.integers(0, 10_000, n_rows).astype(str),
+        'stock': rng.integers(0, 200, n_rows).astype(str),
+        'category': rng.choice(['Books', 'Electronics', 'Toys & Games', ''], n_rows),
+    }, dtype=str)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def generate_asins_loop(service: ETLService, df: pd.DataFrame) -> pd.DataFrame:
+    """Ancienne génération d'ASIN: boucle Python et affectation df.loc par ligne"""
+    import hashlib
+    mask = df['asin'].isna() | (df['asin'] == '')
+    for idx in df[mask].index:
+        title = str(df.loc[idx, 'title'])
+        hash_val = hashlib.md5(title.encode()).hexdigest()[:10].upper()
+        df.loc[idx, 'asin'] = hash_val
+        service.warnings.append(f"Ligne {idx+2}: ASIN généré {hash_val}")
+    return df
+
+
+def convert_rows_loop(service: ETLService, df: pd.DataFrame) -> list:
+    """Ancienne conversion: iterrows, un ProductResponse validé et trois classify_* par ligne"""
+    products = []
+    for _, row in df.iterrows():
+        try:
+            product = service._convert_row(row)
+        except Exception:
+            continue
+        products.append((product, service.classify_rank(product.rank),
+                         service.classify_price(product.price), service.classify_stock(product.stock)))
+    return products
+
+
+def main(n_rows: int) -> None:
+    service = ETLService()
+    df = synthetic_columns(n_rows)
+    print(f"📊 Benchmark nettoyage ETL sur {n_rows:,} lignes\n")
+    print(f"{'colonne':<12}{'apply (s)':>12}{'vectorisé (s)':>16}{'gain':>8}")
+
+    for column, scalar, vectorized in (
+        ('price', service._clean_price, service._clean_price_column),
+        ('rank', service._clean_rank, service._clean_rank_column),
+        ('image_url', service._clean_url, service._clean_url_column),
+    ):
+        expected, t_apply = timed(df[column].apply, scalar)
+        result, t_vector = timed(vectorized, df[column])
+        assert expected.equals(result), f"Résultats différents pour {column}"
+        print(f"{column:<12}{t_apply:>12.2f}{t_vector:>16.2f}{t_apply / t_vector:>7.1f}x")
+
+    # L'ancienne boucle df.loc est mesurée sur un échantillon puis extrapolée
+    mask = (df['asin'] == '')
+    sample = df.head(min(n_rows, 20_000)).copy()
+    _, t_loop = timed(generate_asins_loop, ETLService(), sample)
+    t_loop *= mask.sum() / max((sample['asin'] != df['asin'].head(len(sample))).sum(), 1)
+    _, t_vector = timed(service._generate_asins, df, mask)
+    print(f"{'asin':<12}{t_loop:>11.2f}*{t_vector:>16.2f}{t_loop / t_vector:>7.1f}x")
+    
+    # Conversion en produits + classification + résumé
+    cleaned = service._clean_data(df.copy())
+    sample = cleaned.head(min(n_rows, 20_000))
+    _, t_loop = timed(convert_rows_loop, service, sample)
+    t_loop *= len(cleaned) / len(sample)
+    frame, t_frame = timed(service._product_frame, cleaned)
+    _, t_summary = timed(service._generate_summary, frame)
+    t_vector = t_frame + t_summary
+    print(f"{'conversion':<12}{t_loop:>11.2f}*{t_vector:>16.2f}{t_loop / t_vector:>7.1f}x")
+    _, t_page = timed(service._frame_to_products, frame.head(100))
+    _, t_all = timed(service._frame_to_products, frame)
+    print(f"{'pydantic':<12}{'':>12}{t_all:>16.2f}   (tous les produits; page de 100: {t_page * 1000:.1f} ms)")
+    
+    # Fichier complet: streaming sur un cœur vs plages d'octets sur tous les cœurs
+    workers = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.processed_dir = tmp
+        path = Path(tmp) / "products.csv"
+        df.to_csv(path, index=False)
+        streamed, t_stream = timed(lambda: ETLService().process_csv(str(path), stream=True))
+        parallel, t_parallel = timed(lambda: ETLService().process_csv(str(path), parallel=True, workers=workers))
+        assert parallel.valid_rows == streamed.valid_rows
+        partitions = parallel.summary['streaming'].get('partitions', 1)
+        print(f"{'fichier':<12}{t_stream:>12.2f}{t_parallel:>16.2f}{t_stream / t_parallel:>7.1f}x"
+              f"   (streaming vs parallèle, {workers} processus, {partitions} plages)")
+    print("\n* extrapolé depuis un échantillon de 20 000 lignes")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,83 @@
+"""
+Tests du moteur d'analytics en colonnes
+Top N par argpartition (ex aequo comme un tri stable), agrégats par catégorie, dashboard en une conversion
+"""
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.analytics_service import AnalyticsService, ProductColumns, _top_n
+
+
+def catalog(n, seed=0):
+    rng = random.Random(seed)
+    products = []
+    for i in range(n):
+        product = {"id": i, "title": f"Produit {i}", "category": rng.choice(["Books", "Toys", None, "Garden"])}
+        for field, values in {
+            "price": [0, 5, 19.99, 49.5, 150, 1000], "rating": [None, 0, 2.9, 3.5, 4.2, 4.5, 5.0],
+            "review_count": [None, 0, 9, 50, 100, 1000], "rank": [None, 0, 50, 800, 4000, 20000],
+            "stock": [0, 3, 10, 50],
+        }.items():
+            if rng.random() > 0.05:
+                product[field] = rng.choice(values)
+        products.append(product)
+    return products
+
+
+def test_top_n_matches_stable_sort():
+    rng = np.random.default_rng(0)
+    for n in (1, 5, 10, 200):
+        values = rng.integers(0, 20, size=100).astype(float)
+        assert _top_n(values, n).tolist() == np.argsort(values, kind="stable")[:n].tolist()
+
+
+def test_kpis_and_trends_from_columns():
+    service = AnalyticsService()
+    products = catalog(2000)
+    kpis = service.calculate_product_kpis(products)
+
+    by_rating = sorted(products, key=lambda p: p.get("rating") or 0, reverse=True)
+    by_rank = sorted((p for p in products if p.get("rank")), key=lambda p: p["rank"])
+    assert [p["id"] for p in kpis["top_rated"]] == [p["id"] for p in by_rating[:5]]
+    assert [p["id"] for p in kpis["top_ranked"]] == [p["id"] for p in by_rank[:5]]
+    assert kpis["out_of_stock"] == sum(1 for p in products if not p.get("stock"))
+    assert kpis["inventory_value"] == round(sum((p.get("price") or 0) * (p.get("stock") or 0) for p in products), 2)
+
+    trends = service.analyze_trends(products)
+    books = [p for p in products if p.get("category") == "Books"]
+    entry = next(c for c in trends["top_categories"] if c["name"] == "Books")
+    assert entry["products"] == len(books)
+    assert entry["revenue_potential"] == round(sum((p.get("price") or 0) * (p.get("stock") or 0) for p in books), 2)
+    rated = [p["rating"] for p in books if p.get("rating")]
+    assert entry["avg_rating"] == round(sum(rated) / len(rated), 2)
+    assert {c["name"] for c in trends["top_categories"]} == {"Books", "Toys", "Unknown", "Garden"}
+
+
+def test_dashboard_matches_individual_analyses():
+    service = AnalyticsService()
+    products = catalog(1500, seed=1)
+    dashboard = service.build_dashboard(products)
+    predictions = service.predict_demand(products)
+
+    assert dashboard["kpis"] == service.calculate_product_kpis(products)
+    assert dashboard["segments"] == service.segment_products(products)
+    assert dashboard["anomalies"] == service.detect_anomalies(products)
+    assert dashboard["demand_predictions"]["top_10_urgent"] == predictions[:10]
+    assert dashboard["demand_predictions"]["urgent_restock"] == \
+        sum(p["restock_urgency"] == "HIGH" for p in predictions)
+    assert [p["days_until_stockout"] for p in predictions] == sorted(p["days_until_stockout"] for p in predictions)
+    assert sum(s["count"] for s in dashboard["segments"]["segments"].values()) == len(products)
+
+
+def test_missing_values_read_as_zero():
+    columns = ProductColumns([{"price": None, "rank": None}, {"category_name": "Alt", "rank": 12}])
+
+    assert columns.numbers["price"].tolist() == [0.0, 0.0]
+    assert columns.ranks(99999).tolist() == [99999.0, 12.0]
+    assert columns.categories == ["Unknown", "Alt"]
+    assert AnalyticsService().analyze_trends([])["error"]
@@ -0,0 +1,109 @@
+"""
+Tests de l'autocomplétion
+Fusion incrémentale de l'index de préfixes identique à une reconstruction complète,
+index suivant les snapshots de recherche publiés par un autre worker
+"""
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.config import settings
+from app.core.index_store import SearchIndexStore
+from app.core.product_table import ProductTable
+from app.services.autocomplete_service import AutocompleteService
+from app.services.search_service import SemanticSearchService
+
+WORDS = ["apple", "apex", "bose", "book", "casque", "câble", "écran", "usb", "laptop", "lampe", "sony", "speaker"]
+
+
+def catalog(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "title": " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5))) + f" {i}",
+            "category": rng.choice(["Audio", "Livres", "Câbles", None]),
+            "review_count": 7 * i + 1,
+            "rating": rng.choice([None, 3.5, 4.5]),
+            "rank": rng.choice([None, 10, 5000]),
+        }
+        for i in range(n)
+    ]
+
+
+def index_state(service):
+    index = service.catalog_index
+    return index.keys, sorted(zip(index.keys, index.texts, index.kinds, index.weights.tolist()))
+
+
+def test_incremental_merge_matches_full_rebuild():
+    products = catalog(400)
+    service = AutocompleteService()
+    service.index_products(products)
+
+    rng = random.Random(1)
+    updated = [dict(p) for p in products if p["id"] % 5]
+    for product in rng.sample(updated, 40):
+        product["title"] = f"sony {product['title']}"
+        product["review_count"] += 3
+    updated += catalog(30, seed=2)
+    for product in updated[-30:]:
+        product["id"] += 1000
+        product["review_count"] += 5000
+    stats = service.index_products(updated)
+
+    rebuilt = AutocompleteService()
+    rebuilt.index_products(updated)
+
+    assert stats["changed"] == 70 and stats["removed"] == 80
+    assert index_state(service) == index_state(rebuilt)
+    for prefix in ["a", "ap", "s", "son", "sony s", "éc", "cab", "livres", "z"]:
+        for limit in (3, 5, 15):
+            assert service.suggest(prefix, limit) == rebuilt.suggest(prefix, limit)
+
+
+def test_unchanged_sync_keeps_index():
+    service = AutocompleteService()
+    products = catalog(50)
+    service.index_products(products)
+    index = service.catalog_index
+
+    stats = service.index_products(products)
+    assert (stats["changed"], stats["removed"]) == (0, 0)
+    assert service.catalog_index is index
+
+
+def test_snapshot_from_other_worker_refreshes_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "search_snapshot_poll_seconds", 0.0)
+    store_dir = str(tmp_path / "embeddings")
+
+    def publish(products):
+        table = ProductTable.from_products(products)
+        embeddings = np.eye(len(products), 8, dtype=np.float32)
+        return SearchIndexStore(store_dir).save(embeddings, table, metadata={"embedding_model": settings.embedding_model})
+
+    search = SemanticSearchService()
+    search.store = SearchIndexStore(store_dir)
+    service = AutocompleteService()
+    service.snapshot_source = search
+
+    products = catalog(60)
+    first = publish(products)
+    assert service.suggest("sony", 3) and service.snapshot_version == first
+    index = service.catalog_index
+    assert not service.refresh_from_snapshot() and service.catalog_index is index
+
+    # Sync traitée par un autre worker: titres modifiés, produits ajoutés et supprimés
+    updated = [dict(p, title=f"zephyr {p['title']}") if p["id"] % 4 == 0 else p for p in products[10:]]
+    updated += [dict(p, id=p["id"] + 500) for p in catalog(5, seed=3)]
+    second = publish(updated)
+
+    rebuilt = AutocompleteService()
+    rebuilt.index_table(ProductTable.from_products(updated))
+    assert [item["text"] for item in service.suggest("zep", 5)] == [item["text"] for item in rebuilt.suggest("zep", 5)]
+    assert service.snapshot_version == second
+    assert index_state(service) == index_state(rebuilt)
@@ -0,0 +1,107 @@
+"""
+Tests du moteur de co-achats
+Base SQLite locale (tables sale / ligne_vente du backend) avec ventes synthétiques
+"""
+import random
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.copurchase_service import CoPurchaseEngine
+
+
+SCHEMA = """
+    CREATE TABLE sale (id INTEGER PRIMARY KEY, status TEXT NOT NULL);
+    CREATE TABLE ligne_vente (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sale_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL DEFAULT 1
+    );
+"""
+
+
+def insert_sales(conn, sales, start_id, status="CONFIRMED"):
+    """Insère des ventes: liste de listes de product_id"""
+    for offset, products in enumerate(sales):
+        sale_id = start_id + offset
+        conn.execute("INSERT INTO sale (id, status) VALUES (?, ?)", (sale_id, status))
+        conn.executemany(
+            "INSERT INTO ligne_vente (sale_id, product_id) VALUES (?, ?)",
+            [(sale_id, pid) for pid in products]
+        )
+    conn.commit()
+
+
+def synthetic_sales(n_sales, n_products=200, seed=0):
+    """Paniers aléatoires + paires fortes (1, 2) et (3, 4)"""
+    rng = random.Random(seed)
+    sales = []
+    for i in range(n_sales):
+        basket = set(rng.sample(range(10, n_products), rng.randint(1, 4)))
+        if i % 3 == 0:
+            basket |= {1, 2}
+        if i % 5 == 0:
+            basket |= {3, 4}
+        sales.append(sorted(basket))
+    return sales
+
+
+@pytest.fixture
+def sales_db():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SCHEMA)
+    yield conn
+    conn.close()
+
+
+def test_top_pairs(sales_db):
+    insert_sales(sales_db, synthetic_sales(600), start_id=1)
+
+    engine = CoPurchaseEngine(metric="cosine", top_k=10, min_support=2)
+    stats = engine.refresh(sales_db)
+
+    assert stats["new_sales"] == 600
+    assert engine.get_crosssell(1, limit=1)[0]["product_id"] == 2
+    assert engine.get_crosssell(3, limit=1)[0]["product_id"] == 4
+    assert all(r["product_id"] != 1 for r in engine.get_crosssell(1, limit=10))
+
+
+def test_cancelled_sales_ignored(sales_db):
+    insert_sales(sales_db, [[7, 8]] * 5, start_id=1, status="CANCELLED")
+
+    engine = CoPurchaseEngine(min_support=1)
+    engine.refresh(sales_db)
+
+    assert engine.get_crosssell(7) == []
+
+
+def test_incremental_matches_full_rebuild(sales_db):
+    sales = synthetic_sales(900, seed=1)
+    insert_sales(sales_db, sales[:500], start_id=1)
+
+    incremental = CoPurchaseEngine(metric="lift", top_k=5, min_support=2)
+    incremental.refresh(sales_db)
+
+    insert_sales(sales_db, sales[500:], start_id=501)
+    # Ligne ajoutée à une vente déjà lue (panier complété)
+    sales_db.execute("INSERT INTO ligne_vente (sale_id, product_id) VALUES (1, 5)")
+    sales_db.commit()
+
+    stats = incremental.refresh(sales_db)
+    assert stats["new_sales"] == 400
+    assert stats["updated_baskets"] == 401
+
+    full = CoPurchaseEngine(metric="lift", top_k=5, min_support=2)
+    full.refresh(sales_db)
+
+    for pid in range(1, 200):
+        a = incremental.get_crosssell(pid, limit=5)
+        b = full.get_crosssell(pid, limit=5)
+        assert [r["support"] for r in a] == [r["support"] for r in b]
+        assert np.allclose([r["score"] for r in a], [r["score"] for r in b])
@@ -0,0 +1,344 @@
+"""
+Tests du service ETL
+Fichiers CSV synthétiques "sales" (prix européens, ASIN manquants, doublons...)
+"""
+import asyncio
+import csv
+import hashlib
+import io
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import UploadFile
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.api.etl import process_existing_csv
+from app.config import settings
+from app.core import columnar
+from app.core.asin_set import AsinSet, encode_asins
+from app.core.upload_store import UploadStore, UploadTooLarge
+from app.services.etl_cache import ETLResultCache
+from app.services.etl_service import ETLService, _ErrorReport
+
+
+def write_dirty_csv(path, n_rows, seed=0):
+    """CSV fournisseur avec des valeurs à nettoyer et à rejeter"""
+    rng = random.Random(seed)
+    asins = [f"B0{rng.randrange(36 ** 8):08X}"[:10] for _ in range(n_rows)]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ASIN", "Product Name", "Price", "Rating", "Reviews Count",
+                         "Rank", "Stock", "Category", "Image_URL"])
+        for i in range(n_rows):
+            asin = rng.choice([asins[i]] * 8 + ["", rng.choice(asins), "short"])
+            title = rng.choice([f"Produit {i}"] * 9 + ["ab"])
+            price = rng.choice(["19.99", "1.234,56 €", "$1,234.56", "", "-5", "n/a", "12,5"])
+            rank = rng.choice(["#1,234", "42", "", "0", "abc", "3.210 in Books"])
+            url = rng.choice(["//img.test/a.jpg", "img.test/b.jpg", "noimage", "", " https://img.test/c.jpg "])
+            writer.writerow([asin, title, price, rng.choice(["4.5", "", "7", "x"]),
+                             rng.choice(["12", "", "x"]), rank, rng.choice(["5", "0", "", "150"]),
+                             rng.choice(["Books", "Toys", ""]), url])
+
+
+@pytest.fixture
+def dirty_csv(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "processed_dir", str(tmp_path / "processed"))
+    path = tmp_path / "dirty.csv"
+    write_dirty_csv(path, 5000)
+    return str(path)
+
+
+def test_asin_set_matches_python_set():
+    rng = np.random.default_rng(0)
+    values = pd.Series([f"B0{v:08d}" for v in rng.integers(0, 3000, 20000)] + ["", "abc", "b000000001"])
+    codes = encode_asins(values)
+
+    seen, expected = AsinSet(), set()
+    for start in range(0, len(values), 1000):
+        chunk = values.iloc[start:start + 1000]
+        found = seen.contains(codes[start:start + 1000])
+        assert found.tolist() == [v in expected for v in chunk]
+        seen.add(codes[start:start + 1000])
+        expected.update(chunk)
+
+    assert len(seen) == len(expected)
+
+
+def test_streaming_matches_in_memory(dirty_csv):
+    service = ETLService()
+    full = service.process_csv(dirty_csv)
+    streamed = service.process_csv(dirty_csv, stream=True, chunk_size=700)
+
+    assert streamed.success
+    assert (streamed.total_rows, streamed.valid_rows) == (full.total_rows, full.valid_rows)
+    assert streamed.summary["streaming"]["errors_total"] == full.errors_total
+    assert streamed.error_counts == full.error_counts
+
+    summary = {k: v for k, v in streamed.summary.items() if k != "streaming"}
+    assert summary.keys() == full.summary.keys()
+    assert summary["price"] == pytest.approx(full.summary["price"])
+    for key in ("categories", "rank_distribution", "price_distribution", "stock_distribution", "stock"):
+        assert summary[key] == full.summary[key]
+
+    output = pd.read_csv(streamed.output_file, dtype=str)
+    assert output["asin"].tolist() == [p.asin for p in full.products]
+    assert [p.model_dump() for p in streamed.products] == \
+        [p.model_dump() for p in full.products[:ETLService.STREAM_PREVIEW_ROWS]]
+
+
+def test_streaming_flags_duplicates_across_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "processed_dir", str(tmp_path))
+    path = tmp_path / "dup.csv"
+    pd.DataFrame({
+        "asin": ["B000000001", "B000000002", "B000000001", "B000000003"],
+        "title": ["Produit A", "Produit B", "Produit A bis", "Produit C"],
+        "price": ["10", "20", "10", "30"]
+    }).to_csv(path, index=False)
+
+    result = ETLService().process_csv(str(path), stream=True, chunk_size=2)
+
+    duplicates = [e.row for e in result.errors if e.error == "ASIN en doublon"]
+    assert duplicates == [4]
+
+
+def test_vectorized_cleaners_match_scalar(tmp_path):
+    path = tmp_path / "dirty.csv"
+    write_dirty_csv(path, 3000, seed=1)
+    df = pd.read_csv(path, dtype=str)
+    service = ETLService()
+
+    for column, scalar, vectorized in (
+        ("Price", service._clean_price, service._clean_price_column),
+        ("Rank", service._clean_rank, service._clean_rank_column),
+        ("Image_URL", service._clean_url, service._clean_url_column),
+    ):
+        expected = df[column].apply(scalar)
+        result = vectorized(df[column])
+        pd.testing.assert_series_equal(result, expected)
+
+
+def test_product_frame_matches_row_conversion(tmp_path):
+    path = tmp_path / "dirty.csv"
+    write_dirty_csv(path, 3000, seed=2)
+    service = ETLService()
+    df = service._clean_data(service._normalize_columns(pd.read_csv(path, dtype=str)))
+    df["rank"] = df["rank"].where(df.index % 7 != 0, 0.5)
+
+    expected, expected_errors = [], []
+    for idx, row in df.iterrows():
+        try:
+            product = service._convert_row(row)
+        except Exception as e:
+            expected_errors.append((idx + 2, str(e)))
+            continue
+        expected.append((product, service.classify_rank(product.rank),
+                         service.classify_price(product.price), service.classify_stock(product.stock)))
+
+    products, classifications = service._convert_to_products(df)
+
+    assert products == [p for p, *_ in expected]
+    assert [(c.rank_category, c.price_bucket, c.stock_status) for c in classifications] == \
+        [tuple(classes) for _, *classes in expected]
+    assert service.report.counts["conversion"] == len(expected_errors)
+    assert [(e.row, e.error) for e in service.report.errors] == \
+        expected_errors[:service.report.max_inline]
+
+
+def test_max_products_limits_only_returned_page(dirty_csv):
+    full = ETLService().process_csv(dirty_csv)
+    page = ETLService().process_csv(dirty_csv, max_products=10)
+
+    assert page.valid_rows == full.valid_rows
+    assert page.summary == full.summary
+    assert page.products == full.products[:10]
+
+
+def test_error_report_caps_inline_errors(dirty_csv, monkeypatch):
+    monkeypatch.setattr(ETLService, "MAX_INLINE_ERRORS", 50)
+    result = ETLService().process_csv(dirty_csv)
+
+    assert len(result.errors) == 50
+    assert result.errors_total == sum(result.error_counts.values()) > 50
+    assert set(result.error_counts) >= {"asin_invalid", "asin_duplicate", "title_invalid", "price_invalid"}
+
+    report = pd.read_csv(result.error_report, dtype={"value": str})
+    assert len(report) == result.errors_total
+    assert report["rule"].value_counts().to_dict() == result.error_counts
+    assert report[["row", "error"]].head(50).values.tolist() == \
+        [[e.row, e.error] for e in result.errors]
+
+
+def test_parallel_matches_streaming(dirty_csv, monkeypatch):
+    monkeypatch.setattr(ETLService, "PARALLEL_MIN_BYTES", 1000)
+    streamed = ETLService().process_csv(dirty_csv, stream=True, chunk_size=400)
+    parallel = ETLService().process_csv(dirty_csv, parallel=True, workers=3, chunk_size=400)
+
+    assert parallel.summary["streaming"]["partitions"] == 3
+    assert (parallel.total_rows, parallel.valid_rows) == (streamed.total_rows, streamed.valid_rows)
+    assert parallel.error_counts == streamed.error_counts
+    assert parallel.products == streamed.products
+    assert parallel.warnings == streamed.warnings
+    assert Path(parallel.output_file).read_bytes() == Path(streamed.output_file).read_bytes()
+
+    summary = {k: v for k, v in parallel.summary.items() if k != "streaming"}
+    expected = {k: v for k, v in streamed.summary.items() if k != "streaming"}
+    assert summary["price"] == pytest.approx(expected.pop("price"))
+    assert summary["rating"] == pytest.approx(expected.pop("rating"))
+    assert {k: summary[k] for k in expected} == expected
+    assert parallel.summary["streaming"]["distinct_asins"] == streamed.summary["streaming"]["distinct_asins"]
+
+    # Même rapport, à l'ordre près (doublons entre plages ajoutés à la fusion)
+    columns = _ErrorReport.COLUMNS
+    reports = [
+        pd.read_csv(r.error_report, dtype=str, keep_default_na=False).sort_values(columns, ignore_index=True)
+        for r in (streamed, parallel)
+    ]
+    pd.testing.assert_frame_equal(*reports)
+
+
+def test_record_ranges_follow_quoted_newlines(tmp_path):
+    path = tmp_path / "quoted.csv"
+    pd.DataFrame({
+        "asin": [f"B{i:09d}" for i in range(3000)],
+        "title": [f'Écran "{i}" pouces\nligne 2, suite' if i % 3 else f"Produit {i}" for i in range(3000)]
+    }).to_csv(path, index=False)
+    service = ETLService()
+
+    header_end, ranges = service._record_ranges(str(path), 4)
+    parts = [
+        pd.read_csv(io.BytesIO(path.read_bytes()[:header_end] + path.read_bytes()[start:end]), dtype=str)
+        for start, end in ranges
+    ]
+    assert len(ranges) == 4
+    pd.testing.assert_frame_equal(pd.concat(parts, ignore_index=True), pd.read_csv(path, dtype=str))
+
+    # Guillemet littéral dans un champ non quoté: découpage refusé
+    path.write_text("asin,title\n" + "".join(f'B{i:09d},TV 55" LED\n' for i in range(3000)))
+    assert service._record_ranges(str(path), 4) is None
+
+
+def test_concurrent_process_csv_requests_keep_their_own_report(dirty_csv, tmp_path):
+    clean = tmp_path / "clean.csv"
+    clean.write_text("asin,title,price\n" + "".join(f"B{i:09d},Produit {i},{i + 1}.5\n" for i in range(3000)))
+
+    async def both():
+        return await asyncio.gather(
+            process_existing_csv(str(clean), stream=True, chunk_size=100),
+            process_existing_csv(dirty_csv, stream=True, chunk_size=100)
+        )
+
+    clean_result, dirty_result = asyncio.run(both())
+    assert (clean_result.valid_rows, clean_result.errors_total, clean_result.error_report) == (3000, 0, None)
+    assert dirty_result.errors_total > 0 and Path(dirty_result.error_report).name.startswith("dirty")
+
+
+def test_upload_store_deduplicates_content_and_enforces_limit(tmp_path):
+    store = UploadStore(str(tmp_path / "uploads"), max_size=1024)
+    content = b"title,price\nA,1.0\n"
+
+    first = asyncio.run(store.save(UploadFile(io.BytesIO(content), filename="a.csv")))
+    second = asyncio.run(store.save(UploadFile(io.BytesIO(content), filename="b.csv")))
+
+    assert first.sha256 == second.sha256 == hashlib.sha256(content).hexdigest()
+    assert (first.duplicate, second.duplicate) == (False, True)
+    assert first.path.read_bytes() == content
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(store.save(UploadFile(io.BytesIO(b"x" * 2048), filename="big.csv")))
+    stored = sorted(p.name for p in (tmp_path / "uploads").rglob("*") if p.is_file())
+    assert stored == sorted([first.path.name, "a.csv", "b.csv"])
+    assert (tmp_path / "uploads" / "b.csv").samefile(first.path)
+
+
+def test_upload_keeps_original_name_pointing_at_latest_content(tmp_path):
+    store = UploadStore(str(tmp_path / "uploads"))
+    old, new = b"title,price\nA,1.0\n", b"title,price\nB,2.0\n"
+
+    first = asyncio.run(store.save(UploadFile(io.BytesIO(old), filename="amazon_dataset.csv")))
+    columnar.columnar_path(first.named_path).write_bytes(b"stale")
+    second = asyncio.run(store.save(UploadFile(io.BytesIO(new), filename="amazon_dataset.csv")))
+
+    named = tmp_path / "uploads" / "amazon_dataset.csv"
+    assert first.named_path == second.named_path == named
+    assert named.read_bytes() == new and first.path.read_bytes() == old
+    assert not columnar.columnar_path(named).exists()
+
+    files = {f["sha256"]: f for f in store.list_files()}
+    assert files[second.sha256]["filename"] == "amazon_dataset.csv"
+    assert files[first.sha256]["filename"] is None
+    assert len(files) == 2
+
+
+def test_result_cache_keeps_only_a_product_preview(dirty_csv, tmp_path):
+    cache = ETLResultCache(str(tmp_path / "cache"))
+    cache.MAX_CACHED_PRODUCTS = 2
+    result = ETLService().process_csv(dirty_csv, stream=True)
+    assert len(result.products) > 2
+    cache.put("abc", result, stream=True)
+
+    cached = cache.get("abc", stream=True)
+    assert cached.products == result.products[:2]
+    assert cached.valid_rows == result.valid_rows and cached.output_file == result.output_file
+
+    cache.put("def", result.model_copy(update={"output_file": None, "columnar_file": None}), stream=True)
+    assert cache.get("def", stream=True) is None
+
+
+def test_result_cache_returns_stored_result(dirty_csv, tmp_path):
+    cache = ETLResultCache(str(tmp_path / "cache"))
+    result = ETLService().process_csv(dirty_csv, stream=True)
+    cache.put("abc", result, stream=True)
+
+    cached = cache.get("abc", stream=True)
+    assert cached.cached and cached.model_copy(update={"cached": False}) == result
+    assert cache.get("abc", stream=False) is None
+
+    Path(result.output_file).unlink()
+    assert cache.get("abc", stream=True) is None
+    assert cache.clear() == 0
+
+
+def test_columnar_copy_matches_processed_csv(dirty_csv):
+    pytest.importorskip("pyarrow")
+    result = ETLService().process_csv(dirty_csv, stream=True)
+
+    table = columnar.read_table(result.columnar_file, columns=["asin", "rank", "missing"])
+    assert table.column_names == ["asin", "rank"]
+    assert str(table.schema.field("rank").type) == "int64"
+
+    expected = pd.read_csv(result.output_file)
+    frame = columnar.load_frame(result.output_file)
+    assert frame["asin"].tolist() == expected["asin"].tolist()
+    assert frame["rank"].astype("Float64").equals(expected["rank"].astype("Float64"))
+    np.testing.assert_allclose(frame["price"], expected["price"])
+
+
+def test_columnar_copy_is_written_block_by_block(dirty_csv, monkeypatch):
+    pytest.importorskip("pyarrow")
+    result = ETLService().process_csv(dirty_csv, stream=True)
+    whole = columnar.read_table(result.columnar_file)
+
+    monkeypatch.setattr(columnar, "CATALOG_BLOCK_SIZE", 4096)
+    path = columnar.write_catalog(result.output_file)
+    table = columnar.read_table(path)
+
+    assert len(table.to_batches()) > 1
+    assert table.equals(whole)
+
+
+def test_load_frame_caches_columnar_copy(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "catalog.csv"
+    write_dirty_csv(path, 500)
+    expected = pd.read_csv(path)
+
+    first = columnar.load_frame(path, columns=["Price", "Missing", "ASIN"])
+    assert columnar.is_fresh(path)
+    second = columnar.load_frame(path, columns=["Price", "Missing", "ASIN"])
+
+    pd.testing.assert_frame_equal(first, expected[["ASIN", "Price"]])
+    pd.testing.assert_frame_equal(second, first)
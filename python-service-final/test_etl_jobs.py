@@ -0,0 +1,173 @@
+"""
+Tests des jobs ETL asynchrones
+Store SQLite, reprise du streaming par point de reprise, annulation, import par lots
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.config import settings
+from app.core import job_store
+from app.core.job_store import JobStore
+from app.services import etl_jobs
+from app.services.etl_jobs import ETLJobRunner
+from app.services.etl_service import ETLService, ProcessingCancelled
+from test_etl import write_dirty_csv
+
+
+@pytest.fixture
+def job_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "processed_dir", str(tmp_path / "processed"))
+    monkeypatch.setattr(settings, "etl_jobs_dir", str(tmp_path / "jobs"))
+    monkeypatch.setattr(settings, "etl_cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setattr(settings, "etl_import_batch_size", 300)
+    path = tmp_path / "dirty.csv"
+    write_dirty_csv(path, 3000)
+    return tmp_path, str(path)
+
+
+class FakeJavaClient:
+    """Backend Java simulé: échoue au lot fail_at (une fois), mémorise les ASIN importés"""
+
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+        self.batches = 0
+        self.asins = []
+
+    async def health_check(self):
+        return True
+
+    async def import_products_batch(self, products, update_existing=True):
+        self.batches += 1
+        if self.batches == self.fail_at:
+            raise ConnectionError("Backend Java injoignable")
+        self.asins.extend(p["asin"] for p in products)
+        return {"total": len(products), "created": len(products), "updated": 0, "failed": 0, "errors": []}
+
+
+def test_job_store_persists_across_connections(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job = store.create("process", "/data/a.csv", "a.csv", {"chunk_size": 10})
+    store.update(job["id"], status=job_store.RUNNING)
+    store.set_progress(job["id"], "processing", rows=10, fraction=0.5)
+    store.set_progress(job["id"], "processing", rows=20)
+
+    reopened = JobStore(str(tmp_path / "jobs.db")).get(job["id"])
+    assert reopened["status"] == job_store.RUNNING
+    assert reopened["params"] == {"chunk_size": 10}
+    assert reopened["progress"] == {"processing": {"rows": 20, "fraction": 0.5}}
+    assert [j["id"] for j in JobStore(str(tmp_path / "jobs.db")).active()] == [job["id"]]
+
+
+def test_claim_is_exclusive_until_lease_expires(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job = store.create("process", "/data/a.csv", "a.csv", {})
+
+    assert store.claim(job["id"], "worker-a", 60)["owner"] == "worker-a"
+    assert store.claim(job["id"], "worker-b", 60) is None
+    assert store.active() == []
+    assert store.renew(job["id"], "worker-b", 60) is None
+
+    store.update(job["id"], lease_until=0)
+    assert [j["id"] for j in store.active()] == [job["id"]]
+    assert store.claim(job["id"], "worker-b", 60)["owner"] == "worker-b"
+    assert store.renew(job["id"], "worker-a", 60) is None
+
+
+def test_runner_skips_job_held_by_another_worker(job_env):
+    tmp_path, csv_path = job_env
+    runner = ETLJobRunner(JobStore(str(tmp_path / "jobs.db")), workers=1)
+    job = runner.submit(csv_path)
+    runner.store.claim(job["id"], "other-process", 60)
+
+    job = asyncio.run(runner.run_job(job["id"]))
+    assert (job["status"], job["owner"], job["result"]) == (job_store.RUNNING, "other-process", None)
+
+    runner.store.release("other-process")
+    assert asyncio.run(runner.run_job(job["id"]))["status"] == job_store.COMPLETED
+
+
+def test_checkpoint_resume_matches_uninterrupted_run(job_env):
+    tmp_path, csv_path = job_env
+    full = ETLService().process_csv(csv_path, stream=True, chunk_size=400)
+
+    calls = {"n": 0}
+
+    def stop_after_three_chunks():
+        calls["n"] += 1
+        return calls["n"] == 3
+
+    checkpoint = str(tmp_path / "checkpoint")
+    with pytest.raises(ProcessingCancelled):
+        ETLService().process_csv(csv_path, chunk_size=400, checkpoint_dir=checkpoint,
+                                 should_stop=stop_after_three_chunks)
+    resumed = ETLService().process_csv(csv_path, chunk_size=400, checkpoint_dir=checkpoint)
+
+    assert (resumed.total_rows, resumed.valid_rows) == (full.total_rows, full.valid_rows)
+    assert resumed.error_counts == full.error_counts
+    assert resumed.products == full.products
+    assert Path(resumed.output_file).read_bytes() == Path(full.output_file).read_bytes()
+    assert Path(resumed.error_report).read_bytes() == Path(full.error_report).read_bytes()
+
+
+def test_runner_completes_process_job(job_env):
+    tmp_path, csv_path = job_env
+    runner = ETLJobRunner(JobStore(str(tmp_path / "jobs.db")), workers=1)
+    job = runner.submit(csv_path, chunk_size=500)
+
+    job = asyncio.run(runner.run_job(job["id"]))
+
+    assert job["status"] == job_store.COMPLETED
+    assert job["progress"]["processing"]["fraction"] == 1.0
+    assert job["result"]["valid_rows"] == len(pd.read_csv(job["result"]["output_file"]))
+    assert not (Path(settings.etl_jobs_dir) / job["id"]).exists()
+
+
+def test_job_result_reused_for_same_content(job_env):
+    tmp_path, csv_path = job_env
+    runner = ETLJobRunner(JobStore(str(tmp_path / "jobs.db")), workers=1)
+    first = asyncio.run(runner.run_job(runner.submit(csv_path, file_sha256="abc", max_products=20)["id"]))
+    again = asyncio.run(runner.run_job(runner.submit(csv_path, file_sha256="abc", max_products=20)["id"]))
+    forced = asyncio.run(runner.run_job(
+        runner.submit(csv_path, file_sha256="abc", max_products=20, reprocess=True)["id"]
+    ))
+
+    assert first["result"]["file_sha256"] == "abc" and not first["result"]["cached"]
+    assert again["result"]["cached"] and again["result"]["output_file"] == first["result"]["output_file"]
+    assert again["result"]["products"] == first["result"]["products"]
+    assert not forced["result"]["cached"]
+
+
+def test_cancel_queued_job(job_env):
+    tmp_path, csv_path = job_env
+    runner = ETLJobRunner(JobStore(str(tmp_path / "jobs.db")), workers=1)
+    job = runner.submit(csv_path)
+
+    assert runner.cancel(job["id"])["status"] == job_store.CANCELLED
+    assert asyncio.run(runner.run_job(job["id"]))["status"] == job_store.CANCELLED
+    assert runner.store.active() == []
+
+
+def test_failed_import_resumes_without_reimporting(job_env, monkeypatch):
+    tmp_path, csv_path = job_env
+    java = FakeJavaClient(fail_at=3)
+    monkeypatch.setattr(etl_jobs, "java_client", java)
+    runner = ETLJobRunner(JobStore(str(tmp_path / "jobs.db")), workers=1)
+    job = runner.submit(csv_path, import_to_java=True, chunk_size=500)
+
+    job = asyncio.run(runner.run_job(job["id"]))
+    assert job["status"] == job_store.FAILED
+    assert job["progress"]["importing"]["rows"] == 600
+
+    runner.resume(job["id"])
+    job = asyncio.run(runner.run_job(job["id"]))
+
+    output = pd.read_csv(job["result"]["output_file"], dtype=str)
+    assert job["status"] == job_store.COMPLETED
+    assert job["progress"]["importing"]["created"] == len(output)
+    assert java.asins == output["asin"].tolist()
@@ -321,6 +321,42 @@ class TestSearch:
             assert response.status_code == 200
             data = response.json()
             assert "is_ready" in data
+    
+    @pytest.mark.asyncio
+    async def test_similar_batch(self, sample_products):
+        async with httpx.AsyncClient() as client:
+            await client.post(
+                f"{BASE_URL}/api/search/index-data",
+                json=sample_products
+            )
+            
+            response = await client.post(
+                f"{BASE_URL}/api/search/similar/batch",
+                json={"product_ids": [1, 2, 999], "top_k": 3}
+            )
+            assert response.status_code == 200
+            data = response.json()
+            assert "results" in data
+            assert 999 in data["not_found"]
+            for pid, items in data["results"].items():
+                assert all(r["product_id"] != int(pid) for r in items)
+    
+    @pytest.mark.asyncio
+    async def test_autocomplete(self, sample_products):
+        async with httpx.AsyncClient() as client:
+            await client.post(
+                f"{BASE_URL}/api/search/index-data",
+                json=sample_products
+            )
+            
+            response = await client.get(
+                f"{BASE_URL}/api/search/autocomplete",
+                params={"q": "prod", "limit": 5}
+            )
+            assert response.status_code == 200
+            data = response.json()
+            assert 0 < len(data["suggestions"]) <= 5
+            assert all(s.lower().startswith("prod") for s in data["suggestions"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,156 @@
+"""
+Tests de l'import en masse vers le backend Java
+Backend simulé par httpx.MockTransport: requêtes comptées, erreurs transitoires injectées
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.config import settings
+from app.services.java_client import JavaBackendClient
+
+
+class FakeBackend:
+    """
+    API Java simulée: catégories, produits, 503 sur les premières tentatives de
+    certains ASIN, 504 de la passerelle après enregistrement pour d'autres
+    """
+
+    def __init__(self, flaky=(), rejected=(), gateway_timeout=()):
+        self.categories = [{"id": 1, "name": "Books"}]
+        self.products = {}
+        self.flaky = {asin: 1 for asin in flaky}
+        self.gateway_timeout = {asin: 1 for asin in gateway_timeout}
+        self.rejected = set(rejected)
+        self.calls = {"GET /api/categories": 0, "POST /api/categories": 0, "GET /api/products": 0,
+                      "POST /api/products": 0, "PUT /api/products": 0}
+        self.in_flight = self.max_in_flight = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        key = f"{request.method} {request.url.path}"
+        product_id = None
+        if key.startswith("PUT /api/products/"):
+            key, product_id = key.rsplit("/", 1)
+        self.calls[key] += 1
+        if key == "GET /api/categories":
+            return httpx.Response(200, json=self.categories)
+        if key == "GET /api/products":
+            return httpx.Response(200, json=list(self.products.values()))
+        body = json.loads(request.content)
+        if key == "POST /api/categories":
+            category = {"id": len(self.categories) + 1, "name": body["name"]}
+            self.categories.append(category)
+            return httpx.Response(201, json=category)
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        asin = body["asin"]
+        if self.flaky.get(asin):
+            self.flaky[asin] -= 1
+            return httpx.Response(503, text="Service Unavailable")
+        if asin in self.rejected:
+            return httpx.Response(400, text="Invalid product")
+        if product_id is None:
+            product_id = len(self.products) + 1
+        # Réponse au format ProductResponse (category imbriquée non renvoyée)
+        saved = {k: v for k, v in body.items() if k != "category"}
+        self.products[asin] = {"id": int(product_id), **saved, "categoryName": "?"}
+        if self.gateway_timeout.get(asin):
+            self.gateway_timeout[asin] -= 1
+            return httpx.Response(504, text="Gateway Timeout")
+        return httpx.Response(200 if request.method == "PUT" else 201, json=self.products[asin])
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "java_retry_backoff", 0.0)
+
+
+def make_products(n):
+    categories = ["Books", "Toys", "Garden", None]
+    return [{"asin": f"B{i:09d}", "title": f"Produit {i}", "price": 10.0 + i,
+             "category": categories[i % len(categories)]} for i in range(n)]
+
+
+def test_bulk_import_loads_categories_once_and_bounds_concurrency():
+    backend = FakeBackend()
+    client = JavaBackendClient("http://java.test", transport=httpx.MockTransport(backend.handler))
+
+    result = asyncio.run(client.import_products_batch(make_products(200), concurrency=8))
+
+    assert (result["created"], result["failed"]) == (200, 0)
+    assert backend.calls["GET /api/categories"] == 1
+    assert backend.calls["POST /api/categories"] == 3  # Toys, Garden, Unknown
+    assert backend.calls["POST /api/products"] == 200
+    assert 1 < backend.max_in_flight <= 8
+    assert backend.products["B000000001"]["categoryId"] == 2
+
+
+def test_bulk_import_retries_transient_errors_and_reports_items():
+    backend = FakeBackend(flaky=["B000000003"], rejected=["B000000005"])
+    client = JavaBackendClient("http://java.test", transport=httpx.MockTransport(backend.handler))
+
+    result = asyncio.run(client.import_products_batch(make_products(10)))
+
+    assert (result["created"], result["failed"]) == (9, 1)
+    assert result["items"][3] == {"asin": "B000000003", "status": "created"}
+    assert result["items"][5]["status"] == "failed" and "HTTP 400" in result["items"][5]["error"]
+    assert result["errors"] == ["B000000005: HTTP 400: Invalid product"]
+    assert backend.calls["POST /api/products"] == 11
+
+
+def test_product_post_is_not_resent_after_gateway_timeout():
+    backend = FakeBackend(gateway_timeout=["B000000002", "B000000004"])
+    client = JavaBackendClient("http://java.test", transport=httpx.MockTransport(backend.handler))
+
+    result = asyncio.run(client.import_products_batch(make_products(6)))
+
+    # Ligne enregistrée malgré le 504: pas de second POST, donc pas de doublon
+    assert backend.calls["POST /api/products"] == 6
+    assert len(backend.products) == 6 and sorted(p["id"] for p in backend.products.values()) == list(range(1, 7))
+    assert (result["created"], result["failed"]) == (4, 2)
+    assert "HTTP 504" in result["items"][2]["error"]
+
+    # PUT idempotent: retenté après un 504
+    backend.gateway_timeout["B000000001"] = 1
+    backend.calls.update({key: 0 for key in backend.calls})
+    product = dict(make_products(2)[1], price=42.0)
+    asyncio.run(client.import_products_batch([product], diff=True))
+    assert backend.calls["PUT /api/products"] == 2 and backend.products["B000000001"]["price"] == 42.0
+
+
+def test_diff_import_sends_only_new_and_changed_products():
+    backend = FakeBackend()
+    transport = httpx.MockTransport(backend.handler)
+    products = make_products(300)
+    asyncio.run(JavaBackendClient("http://java.test", transport=transport).import_products_batch(products))
+
+    # Nouveau client: index reconstruit depuis GET /api/products
+    feed = [dict(p) for p in products] + [{"asin": "B999999999", "title": "Nouveau", "price": 1.0}]
+    feed[7]["price"] = 99.0
+    feed[8]["rating"] = None  # Inchangé: None et 0 envoyés pareil
+    feed.insert(0, dict(feed[20], price=1.0))  # ASIN répété: la dernière ligne l'emporte
+    backend.calls.update({key: 0 for key in backend.calls})
+    client = JavaBackendClient("http://java.test", transport=transport)
+
+    result = asyncio.run(client.import_products_batch(feed))
+
+    assert {k: result[k] for k in ("created", "updated", "unchanged", "skipped", "failed")} == \
+        {"created": 1, "updated": 1, "unchanged": 299, "skipped": 1, "failed": 0}
+    assert (backend.calls["POST /api/products"], backend.calls["PUT /api/products"]) == (1, 1)
+    assert backend.products["B000000007"]["price"] == 99.0
+    assert result["items"][8] == {"asin": "B000000007", "status": "updated"}
+
+    # Index tenu à jour localement: réimport identique sans requête produit
+    backend.calls.update({key: 0 for key in backend.calls})
+    again = asyncio.run(client.import_products_batch(feed, diff=True))
+    assert again["unchanged"] == 301 and backend.calls["GET /api/products"] == 0
+    assert backend.calls["POST /api/products"] == backend.calls["PUT /api/products"] == 0
@@ -0,0 +1,78 @@
+"""
+Tests de la personnalisation (ALS implicite)
+Base SQLite locale (tables sale / ligne_vente du backend) avec achats synthétiques
+"""
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.personalization_service import PersonalizationEngine
+
+
+SCHEMA = """
+    CREATE TABLE sale (id INTEGER PRIMARY KEY, status TEXT NOT NULL, user_id INTEGER);
+    CREATE TABLE ligne_vente (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sale_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL DEFAULT 1
+    );
+"""
+
+N_GROUPS = 5
+GROUP_SIZE = 200
+
+
+@pytest.fixture
+def sales_db():
+    """Chaque utilisateur achète dans le groupe de produits user_id % N_GROUPS"""
+    rng = np.random.default_rng(0)
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SCHEMA)
+
+    sale_id = 0
+    for user_id in range(1000):
+        group = user_id % N_GROUPS
+        for _ in range(4):
+            sale_id += 1
+            conn.execute("INSERT INTO sale VALUES (?, 'CONFIRMED', ?)", (sale_id, user_id))
+            products = set(np.minimum(rng.zipf(1.5, 5), GROUP_SIZE - 1).tolist())
+            conn.executemany(
+                "INSERT INTO ligne_vente (sale_id, product_id, quantity) VALUES (?, ?, ?)",
+                [(sale_id, group * GROUP_SIZE + p, 1) for p in products]
+            )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_recommends_within_purchase_group(sales_db):
+    engine = PersonalizationEngine()
+    stats = engine.train(sales_db)
+
+    assert stats["users"] == 1000
+
+    for user_id in (3, 42, 777):
+        recs = engine.recommend(user_id, limit=10)
+        assert len(recs) == 10
+        in_group = [r["product_id"] // GROUP_SIZE == user_id % N_GROUPS for r in recs]
+        assert sum(in_group) >= 8
+
+
+def test_excludes_purchased_and_unknown_user(sales_db):
+    engine = PersonalizationEngine()
+    engine.train(sales_db)
+
+    bought = {
+        row[0] for row in sales_db.execute(
+            "SELECT lv.product_id FROM ligne_vente lv JOIN sale s ON lv.sale_id = s.id "
+            "WHERE s.user_id = 3"
+        )
+    }
+    assert not bought & {r["product_id"] for r in engine.recommend(3, limit=20)}
+    assert engine.recommend(123456) == []
@@ -0,0 +1,56 @@
+"""
+Tests de la table produits en colonnes
+Ajout par lot identique à une construction complète, copies sans effet sur l'original
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.core.product_table import ProductTable
+
+
+def catalog(start, n):
+    return [
+        {
+            "id": start + i, "asin": f"B{start + i:09d}", "title": f"Produit é {start + i}" * (i % 3),
+            "category": ["Books", "Toys", None][i % 3], "price": i * 1.5, "rating": "4.5" if i % 2 else None,
+            "review_count": i, "rank": i % 4, "stock": 3,
+        }
+        for i in range(n)
+    ]
+
+
+def assert_same_table(table, expected):
+    for col, values in expected.to_arrays().items():
+        if not col.startswith("category__"):
+            np.testing.assert_array_equal(table.to_arrays()[col], values)
+    rows = np.arange(len(expected))
+    assert table.gather(rows) == expected.gather(rows)
+
+
+def test_extend_matches_full_build():
+    first, second = catalog(0, 7), catalog(7, 5)
+    table = ProductTable.from_products(first)
+
+    assert table.extend(second).tolist() == list(range(7, 12))
+    assert table.extend([]).tolist() == []
+    assert_same_table(table, ProductTable.from_products(first + second))
+
+    one_by_one = ProductTable()
+    assert [one_by_one.append(p) for p in first + second] == list(range(12))
+    assert_same_table(one_by_one, table)
+
+
+def test_extended_leaves_shared_table_untouched():
+    table = ProductTable.from_products(catalog(0, 4))
+    before = {col: values.copy() for col, values in table.to_arrays().items()}
+
+    grown = table.extended(catalog(4, 3) + [{"id": 99, "category": "Garden"}])
+
+    assert len(grown) == 8 and grown.get_categories(np.array([7])) == ["Garden"]
+    assert table.categories == ["Books", "Toys", ""] and len(table) == 4
+    for col, values in table.to_arrays().items():
+        np.testing.assert_array_equal(values, before[col])
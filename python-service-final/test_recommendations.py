@@ -0,0 +1,390 @@
+"""
+Tests du service de recommandations
+Scores vectorisés comparés à un calcul produit par produit sur un catalogue synthétique
+"""
+import math
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.config import settings
+from app.core.index_store import SearchIndexStore
+from app.core.product_table import ProductTable
+from app.services import recommendation_batch
+from app.services import recommendation_service as recommendation_module
+from app.services.copurchase_service import CoPurchaseEngine
+from app.services.recommendation_batch import RecommendationMaterializer, _materialize_chunk
+from app.services.recommendation_service import RecommendationService
+from app.services.search_service import SearchIndexState, search_service
+
+CATEGORIES = ["Audio", "Books", "Toys"]
+
+
+def catalog(n, seed=0, start=1):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": start + i,
+            "title": f"Produit {start + i}",
+            "category": rng.choice(CATEGORIES),
+            "price": rng.choice([0, 9.99, 15, 20, 49.5, 80, 120]),
+            "rating": rng.choice([None, 3.0, 3.5, 4.0, 4.5, 5.0]),
+            "rank": rng.choice([None, 5, 40, 300, 5000]),
+            "review_count": rng.choice([0, 3, 50, 900]),
+        }
+        for i in range(n)
+    ]
+
+
+def no_neighbors(product_id, k):
+    return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "recommendations_dir", str(tmp_path / "recommendations"))
+    monkeypatch.setattr(recommendation_module, "copurchase_engine", CoPurchaseEngine(min_support=1))
+    service = RecommendationService()
+    service.neighbor_source = no_neighbors
+    return service
+
+
+def similar_reference(products, product, limit, same_category=True):
+    """get_similar_products sans index k-NN, produit par produit"""
+    def number(p, key):
+        return float(p.get(key) or 0)
+
+    price, rating = number(product, "price"), number(product, "rating")
+    scored = []
+    for row, p in enumerate(products):
+        if p["id"] == product["id"] or (same_category and p["category"] != product["category"]):
+            continue
+        score = abs(number(p, "price") - price) / max(price, 1) * 0.4 + abs(number(p, "rating") - rating) * 0.1
+        score -= 0.2 if p["category"] == product["category"] else 0
+        score -= 0.1 if number(p, "rating") >= 4.0 else 0
+        scored.append((score, row, p))
+    scored.sort(key=lambda s: (s[0], s[1]))
+    return [(p["id"], round(1 - score, 3)) for score, _, p in scored[:limit]]
+
+
+def test_similar_products_match_scalar_scoring(service):
+    products = catalog(300)
+    service.index_products(products)
+
+    for product in products[::17]:
+        for same_category in (True, False):
+            results = service.get_similar_products(product["id"], limit=7, same_category=same_category)
+            assert [(r["id"], r["similarity_score"]) for r in results] == \
+                similar_reference(products, product, 7, same_category)
+
+    assert service.get_similar_products(999999) == []
+    assert service.get_similar_products(products[0]["id"], limit=0) == []
+
+
+def test_materialized_rankings_match_full_sort(service):
+    products = catalog(400, seed=1)
+    service.index_products(products)
+
+    def trending(p):
+        rank = p["rank"] or 99999
+        return 1000 / math.log1p(rank) + math.log1p(p["review_count"]) * 2 + (p["rating"] or 0) * 5
+
+    medians = {
+        cat: float(np.median([p["price"] for p in products if p["category"] == cat and p["price"] > 0]))
+        for cat in CATEGORIES
+    }
+    deals = []
+    for row, p in enumerate(products):
+        median = medians[p["category"]]
+        if 0 < p["price"] < median * 0.8 and (p["rating"] or 0) >= 4.0:
+            savings = round((1 - p["price"] / median) * 100, 1)
+            deals.append((-savings * p["rating"] / 5, row, p["id"], savings))
+    deals.sort()
+
+    by_trending = sorted(range(len(products)), key=lambda row: (-trending(products[row]), row))
+    # Au-delà du top matérialisé (MATERIALIZED_TOP_N): classement complet
+    for limit in (10, service.MATERIALIZED_TOP_N, service.MATERIALIZED_TOP_N + 50):
+        assert [p["id"] for p in service.get_trending_products(limit)] == \
+            [products[row]["id"] for row in by_trending[:limit]]
+        assert [(d["id"], d["savings_percent"]) for d in service.get_deals(limit)] == \
+            [(pid, savings) for _, _, pid, savings in deals[:limit]]
+
+
+@pytest.fixture
+def batch(service, tmp_path, monkeypatch):
+    """
+    Job batch sur le service du test: catalogue, co-achats et embeddings de
+    recherche (k-NN exact) à la place des singletons
+    """
+    products = catalog(120, seed=2)
+    service.index_products(products)
+    service.neighbor_source = None
+
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(len(products), 16)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    # Snapshot publié (lu par les processus de calcul) et index en mémoire identique
+    table = ProductTable.from_products(products)
+    monkeypatch.setattr(settings, "embeddings_dir", str(tmp_path / "embeddings"))
+    store = SearchIndexStore(settings.embeddings_dir)
+    version = store.save(embeddings, table)
+    monkeypatch.setattr(search_service, "store", store)
+    monkeypatch.setattr(search_service, "state", SearchIndexState.build(table, embeddings, version=version))
+
+    engine = recommendation_module.copurchase_engine
+    engine.add_baskets({sale: [1 + sale % 20, 1 + (sale * 7) % 120, 1 + (sale * 13) % 120] for sale in range(300)})
+    monkeypatch.setattr(recommendation_batch, "recommendation_service", service)
+    monkeypatch.setattr(recommendation_batch, "copurchase_engine", engine)
+    monkeypatch.setattr(settings, "recommendations_poll_seconds", 0.0)
+    return products
+
+
+def test_materialized_lookup_matches_live_lists_with_fallback(service, batch):
+    assert RecommendationMaterializer().run(workers=1)["status"] == "success"
+
+    for product in batch[::11]:
+        result = service.get_comprehensive_recommendations(product["id"])
+        live = service.compute_product_lists(product["id"])
+        assert result["source"] == "materialized" and not result["stale"]
+        assert {kind: result[kind] for kind in live} == live
+        assert any(item.get("support") for item in live["crosssell_suggestions"])
+
+    # Produit ajouté après la matérialisation: calcul à la volée
+    service.upsert_products([{**batch[0], "id": 5000, "title": "Nouveau"}])
+    result = service.get_comprehensive_recommendations(5000)
+    assert result["source"] == "live" and result["similar_products"]
+    assert service.get_materialization_status()["stale"]
+
+
+def test_staleness_follows_catalog_signature_and_copurchases(service, batch):
+    assert service.is_materialization_stale()
+    RecommendationMaterializer().run(workers=1)
+    assert not service.is_materialization_stale()
+
+    # Même contenu réindexé: même signature
+    service.index_products([dict(p) for p in batch])
+    assert not service.is_materialization_stale()
+
+    service.index_products([{**p, "price": (p["price"] or 0) + 1} if p["id"] == 7 else p for p in batch])
+    assert service.is_materialization_stale()
+    service.index_products(batch)
+    assert not service.is_materialization_stale()
+
+    recommendation_module.copurchase_engine.add_baskets({1000: [1, 2]})
+    assert service.is_materialization_stale()
+
+
+def test_process_pool_matches_sequential_chunks(service, batch):
+    product_ids = [p["id"] for p in batch]
+    chunks = RecommendationMaterializer._split(product_ids, 4)
+
+    pooled = RecommendationMaterializer._run_pool(chunks, workers=2)
+    for chunk, part in zip(chunks, pooled):
+        expected = _materialize_chunk(chunk)
+        for kind, columns in expected.items():
+            for name, values in columns.items():
+                np.testing.assert_array_equal(part[kind][name], values)
+    assert not any(Path(settings.recommendations_dir).glob(".inputs-*"))
+
+
+def test_batched_neighbors_match_single_queries(batch, tmp_path):
+    inputs = tmp_path / "inputs"
+    recommendation_batch._write_inputs(inputs)
+    neighbors = recommendation_batch._EmbeddingNeighbors(inputs)
+    product_ids = [p["id"] for p in batch] + [99999]
+
+    expected = {pid: neighbors(pid, 10) for pid in product_ids}
+    neighbors.BLOCK_SCORES = 7 * len(batch)  # plusieurs blocs de requêtes
+    neighbors.prefetch(product_ids, 10)
+
+    for pid in product_ids:
+        ids, scores = neighbors(pid, 10)
+        np.testing.assert_array_equal(ids, expected[pid][0])
+        np.testing.assert_allclose(scores, expected[pid][1], rtol=1e-5)
+    assert len(expected[1][0]) == 10 and 1 not in expected[1][0]
+    # Sans ces fichiers: pas de voisins, repli par catégorie
+    assert len(recommendation_batch._EmbeddingNeighbors(tmp_path)(1, 10)[0]) == 0
+
+
+def test_concurrent_run_is_skipped(batch):
+    materializer = RecommendationMaterializer()
+    with materializer._lock:
+        assert materializer.running
+        assert materializer.run(workers=1)["status"] == "skipped"
+    assert not materializer.running
+    assert materializer.run(workers=1)["status"] == "success"
+
+
+def category_order(products, category, sort_by):
+    """Ordre attendu d'une catégorie (égalités: ordre du catalogue)"""
+    keys = {
+        "rating": lambda p: -(p["rating"] or 0),
+        "price": lambda p: p["price"] or 0,
+        "rank": lambda p: p["rank"] or 99999,
+        "default": lambda p: 0,
+    }[sort_by]
+    rows = [row for row, p in enumerate(products) if p["category"] == category]
+    return [products[row]["id"] for row in sorted(rows, key=lambda row: (keys(products[row]), row))]
+
+
+def walk_pages(service, category, sort_by, limit):
+    ids, cursor = [], None
+    while True:
+        page = service.get_category_page(category, limit=limit, sort_by=sort_by, cursor=cursor)
+        ids += [p["id"] for p in page["products"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def test_category_pages_cover_each_product_once(service):
+    products = catalog(250, seed=3)
+    service.index_products(products)
+
+    for category in CATEGORIES:
+        for sort_by in service.SORT_KEYS:
+            expected = category_order(products, category, sort_by)
+            for limit in (1, 7, len(expected), len(expected) + 5):
+                assert walk_pages(service, category, sort_by, limit) == expected
+        assert service.get_category_recommendations(category, limit=5, sort_by="rank") == \
+            [service._category_item(service.product_index[pid]) for pid in category_order(products, category, "rank")[:5]]
+
+    assert service.get_category_page("Inconnue") == {"products": [], "next_cursor": None}
+    with pytest.raises(ValueError):
+        service.get_category_page("Books", cursor="pas-un-cursor")
+
+
+def test_upsert_matches_full_rebuild(service, tmp_path):
+    products = catalog(200, seed=4) + [
+        {"id": 900, "title": "Pelle", "category": "Garden", "price": 12.0, "rating": 4.0},
+        {"id": 901, "title": "Râteau", "category": "Garden", "price": 8.0, "rating": 4.5},
+    ]
+    service.index_products(products)
+
+    rng = random.Random(5)
+    updates = [{**p, "price": rng.choice([1, 30, 99]), "rating": rng.choice([None, 4.5])}
+               for p in rng.sample(products[:200], 30)]
+    updates += [{**p, "category": "Toys"} for p in products[200:]]  # Garden vidée
+    updates += [{**p, "category": "Books"} for p in products[:200:25]]
+    updates += catalog(20, seed=6, start=1000) + [{"title": "sans id"}, {**products[3], "price": 77}]
+    stats = service.upsert_products(updates)
+
+    final = {p["id"]: p for p in products}
+    final.update((p["id"], p) for p in updates if "id" in p)
+    final = list(final.values())
+    rebuilt = RecommendationService()
+    rebuilt.neighbor_source = no_neighbors
+    rebuilt.index_products(final)
+
+    updated = {p["id"] for p in updates if p.get("id") in {q["id"] for q in products}}
+    assert stats == {"inserted": 20, "updated": len(updated), "skipped": 1}
+    assert service._products == rebuilt._products
+    assert set(service._sorted_index) == set(rebuilt._sorted_index) == set(CATEGORIES)
+    for category in CATEGORIES:
+        for sort_by in service.SORT_KEYS:
+            for field in ("rows", "keys"):
+                np.testing.assert_array_equal(
+                    service._sorted_index[category][sort_by][field], rebuilt._sorted_index[category][sort_by][field]
+                )
+        assert service.price_ranges[category] == rebuilt.price_ranges[category]
+        assert service.category_products[category] == rebuilt.category_products[category]
+    assert "Garden" not in service.price_ranges
+    assert service.get_trending_products(150) == rebuilt.get_trending_products(150)
+    assert service.get_deals(50) == rebuilt.get_deals(50)
+    for pid in (3, 50, 1005):
+        assert service.get_similar_products(pid) == rebuilt.get_similar_products(pid)
+
+
+def cart_reference(service, products, cart_ids, limit, merge):
+    """get_cart_recommendations calculé paire par paire (produit du panier, candidat)"""
+    engine = recommendation_module.copurchase_engine
+    cart = [p for p in products if p["id"] in cart_ids]
+    copurchased = [
+        {i["product_id"]: i["score"] for i in engine.get_crosssell(c["id"], limit=engine.top_k)} for c in cart
+    ]
+    categories = {c["category"] for c in cart}
+
+    scored = []
+    for row, p in enumerate(products):
+        if p["id"] in cart_ids or (p["category"] not in categories and not any(p["id"] in c for c in copurchased)):
+            continue
+        contributions = []
+        for c, co in zip(cart, copurchased):
+            price, rating, p_rating = c["price"] or 0, c["rating"] or 0, p["rating"] or 0
+            distance = abs((p["price"] or 0) - price) / max(price, 1) * 0.4 + abs(p_rating - rating) * 0.1 - 0.2
+            distance -= 0.1 if p_rating >= 4.0 else 0
+            similarity = max(1 - distance, 0) if p["category"] == c["category"] else 0
+            contributions.append(similarity + service.CART_COPURCHASE_WEIGHT * co.get(p["id"], 0))
+        merged = max(contributions) if merge == "max" else sum(contributions)
+        if merged > 0:
+            source = contributions.index(max(contributions))
+            scored.append((-merged, row, p["id"], round(merged, 3), cart[source]["id"]))
+    scored.sort()
+    return [(pid, score, source) for _, _, pid, score, source in scored[:limit]]
+
+
+def test_cart_scoring_merges_similarity_and_copurchases(service):
+    products = catalog(200, seed=7)
+    service.index_products(products)
+    engine = recommendation_module.copurchase_engine
+    engine.add_baskets({sale: [1 + sale % 10, 1 + (sale * 7) % 200, 1 + (sale * 31) % 200] for sale in range(400)})
+
+    cart = [1, 2, 5, 2, 99999]
+    for merge in ("sum", "max"):
+        result = service.get_cart_recommendations(cart, limit=12, merge=merge)
+        items = result["recommendations"]
+        assert result["not_found"] == [99999]
+        assert [(r["id"], r["score"], r["source_product_id"]) for r in items] == \
+            cart_reference(service, products, {1, 2, 5}, 12, merge)
+        assert any(r["reason"].startswith("Souvent acheté avec") for r in items)
+
+    assert service.get_cart_recommendations([99999]) == {"recommendations": [], "not_found": [99999]}
+
+
+def test_similar_products_rerank_embedding_neighbors(service):
+    products = catalog(300, seed=8)
+    by_id = {p["id"]: p for p in products}
+    service.index_products(products)
+
+    rng = np.random.default_rng(1)
+    order = rng.permutation([p["id"] for p in products])
+    neighbors = {}
+
+    def source(product_id, k):
+        ids = np.asarray(neighbors.get(product_id, order[:k]), dtype=np.int64)
+        return ids, np.linspace(0.95, 0.2, len(ids)).astype(np.float32)
+
+    service.neighbor_source = source
+
+    for product in products[::29]:
+        # Voisins inconnus ou égaux au produit ignorés; catégorie filtrée après le k-NN
+        neighbors[product["id"]] = [product["id"], 424242] + [int(i) for i in order[:60]]
+        ids, similarity = source(product["id"], 0)
+        price, rating = product["price"] or 0, product["rating"] or 0
+        expected = []
+        for position, (pid, sim) in enumerate(zip(ids.tolist(), similarity.tolist())):
+            p = by_id.get(pid)
+            if p is None or pid == product["id"] or p["category"] != product["category"]:
+                continue
+            score = abs((p["price"] or 0) - price) / max(price, 1) * 0.4 + abs((p["rating"] or 0) - rating) * 0.1
+            score -= 0.2 + (0.1 if (p["rating"] or 0) >= 4.0 else 0) + sim * service.KNN_SIMILARITY_WEIGHT
+            expected.append((score, position, pid))
+        expected.sort()
+
+        results = service.get_similar_products(product["id"], limit=5)
+        if len(expected) >= 5:
+            assert [(r["id"], r["similarity_score"]) for r in results] == \
+                [(pid, round(1 - score, 3)) for score, _, pid in expected[:5]]
+        else:
+            # Trop peu de voisins retenus: repli sur la catégorie
+            assert [(r["id"], r["similarity_score"]) for r in results] == similar_reference(products, product, 5)
+
+    # Index sans le produit: repli sur la catégorie
+    neighbors[products[0]["id"]] = []
+    assert [(r["id"], r["similarity_score"]) for r in service.get_similar_products(products[0]["id"], limit=5)] == \
+        similar_reference(products, products[0], 5)
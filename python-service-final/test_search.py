@@ -0,0 +1,110 @@
+"""
+Tests de la recherche sémantique sans index FAISS (snapshot mappé)
+Top-k partiel identique à un tri complet, ajouts sans recopie du catalogue
+"""
+import sys
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.config import settings
+from app.core.index_store import SearchIndexStore
+from app.core.product_table import ProductTable
+from app.models.schemas import SearchQuery
+from app.services.search_service import SemanticSearchService
+
+
+class FakeModel:
+    """Embeddings déterministes par texte (dimension 16, non normalisés)"""
+
+    def encode(self, texts, **kwargs):
+        return np.stack([
+            np.random.default_rng(zlib.crc32(text.encode())).normal(size=16).astype(np.float32)
+            for text in texts
+        ])
+
+
+def catalog(n, start=0):
+    return [
+        {"id": start + i, "asin": f"B{start + i:09d}", "title": f"Produit {start + i}",
+         "category": ["Books", "Toys"][i % 2], "price": 5.0 + i % 7, "rating": 4.0, "stock": 3}
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """Service chargé depuis un snapshot publié: embeddings mappés, pas d'index"""
+    monkeypatch.setattr(settings, "search_snapshot_poll_seconds", 0.0)
+    service = SemanticSearchService()
+    service.model = FakeModel()
+    service.store = SearchIndexStore(str(tmp_path / "embeddings"))
+
+    products = catalog(300)
+    embeddings = FakeModel().encode([service._create_search_text(p) for p in products])
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    service.store.save(embeddings, ProductTable.from_products(products),
+                       metadata={"embedding_model": settings.embedding_model})
+    assert service.load_snapshot() and service.index is None
+    return service
+
+
+def ranked(scores):
+    return np.argsort(-scores, kind="stable")
+
+
+def test_partial_top_k_matches_full_sort(service):
+    embeddings = np.asarray(service.embeddings)
+    ids = service.products.ids
+
+    for product_id in (0, 17, 299):
+        order = [row for row in ranked(embeddings @ embeddings[product_id]) if row != product_id]
+        neighbor_ids, scores = service.get_neighbors(product_id, 12)
+        assert neighbor_ids.tolist() == ids[order[:12]].tolist()
+        np.testing.assert_allclose(scores, (embeddings @ embeddings[product_id])[order[:12]], rtol=1e-6)
+
+        similar = service.get_similar_products(product_id, top_k=5)
+        assert [r.product_id for r in similar] == ids[order[:5]].tolist()
+
+    query = FakeModel().encode(["casque sans fil"])[0]
+    expected = ids[ranked(embeddings @ (query / np.linalg.norm(query)))[:10]].tolist()
+    assert [r.product_id for r in service.search(SearchQuery(query="casque sans fil", top_k=10)).results] == expected
+
+
+def test_add_products_appends_without_rebuild(service):
+    loaded = service.state
+    full = np.asarray(loaded.embeddings).copy()
+
+    states = []
+    for batch in (catalog(5, start=1000), catalog(3, start=2000), catalog(40, start=3000)):
+        assert service.add_products(batch) == len(batch)
+        states.append(service.state)
+
+        added = FakeModel().encode([service._create_search_text(p) for p in batch])
+        full = np.vstack([full, added / np.linalg.norm(added, axis=1, keepdims=True)])
+        np.testing.assert_allclose(service.embeddings, full, rtol=1e-6)
+
+    # Snapshot mappé recopié une fois, lots suivants écrits à la suite du même tampon
+    assert all(state.embeddings.base is service._embedding_buffer for state in states)
+    assert [len(state.embeddings) for state in states] == [len(state.products) for state in states] == [305, 308, 348]
+
+    assert len(loaded.embeddings) == 300 and isinstance(loaded.embeddings, np.memmap)
+    neighbor_ids, _ = service.get_neighbors(3005, 5)
+    assert 3005 not in neighbor_ids.tolist() and len(neighbor_ids) == 5
+
+    # Publié pour les autres workers
+    snapshot = service.store.load()
+    assert snapshot["version"] == service.snapshot_version
+    np.testing.assert_allclose(snapshot["embeddings"], full, rtol=1e-6)
+
+
+def test_store_keeps_last_versions(service):
+    table, embeddings = service.products, np.asarray(service.embeddings)
+    versions = [service.store.save(embeddings, table) for _ in range(3)]
+
+    assert service.store.current_version() == versions[-1]
+    assert sorted(p.name for p in service.store.snapshots_dir.iterdir()) == versions[1:]
@@ -0,0 +1,133 @@
+"""
+Tests de la validation en colonnes
+Un produit validé seul ou dans un lot donne le même résultat, détails paginés des invalides,
+règles du registre compilé partagées avec l'ETL
+"""
+import math
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pandas as pd
+
+from app.core.validation_rules import Rule, RuleSet, col, price_tiers
+from app.services.etl_service import ETLService, _ErrorReport
+from app.services.validation_service import DataValidationService
+
+
+def dirty_products(n, seed=0):
+    """Produits JSON avec types et valeurs à corriger ou à rejeter"""
+    rng = random.Random(seed)
+    choices = {
+        "asin": [f"B0{rng.randrange(10 ** 8):08d}", " b012345678 ", "SHORT", "", None, 1234567890, "B01234567!"],
+        "title": ["Produit", "ab", "  beaucoup   d'espaces\t", "x" * 400, None, "", 12345],
+        "price": [19.99, "$12,50", "€ 7", "gratuit", -3, 250000, None, "12.3456", 0, [1], True, 2.675],
+        "rating": [4.9, 5.5, -1, "4.2", "abc", None, 3.0, 0, 4.85],
+        "review_count": [3, "1,234", " 5 6 ", -2, "x", None, 150, 60.7, "1e3"],
+        "rank": [50, "#1,234", 0, -5, 20000000, "abc", None, "  #12 ", 99.9, 60000],
+        "stock": [0, 5, 15, 50, 500, -1, "7", "x", None, 3.9],
+        "category": ["Books", "  Home   & Kitchen ", "a", "", None, 42],
+        "image_url": ["https://img.test/x.jpg", " http://a.b/c ", "ftp://x", "not a url", None, ""],
+    }
+    return [{field: rng.choice(values) for field, values in choices.items() if rng.random() > 0.05}
+            for _ in range(n)]
+
+
+def same(a, b):
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a):
+        return math.isnan(b)
+    if isinstance(a, dict):
+        return isinstance(b, dict) and a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return isinstance(b, list) and len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def test_single_product_matches_its_row_in_a_batch():
+    service = DataValidationService()
+    products = dirty_products(3000)
+    batch = service.validate_columns(products)
+
+    for row, product in enumerate(products):
+        expected = service.validate_product(product)
+        details = batch.details(row)
+        assert details["is_valid"] == expected.is_valid
+        assert same(details["cleaned_data"], expected.cleaned_data), product
+        assert same(details["errors"], expected.errors), product
+        assert same(details["warnings"], expected.warnings), product
+        assert same(batch.enriched(row), expected.enrichments), product
+
+
+def test_non_finite_numbers_are_reported_not_raised():
+    service = DataValidationService()
+    for value in ("inf", float("nan"), "-inf", float("inf")):
+        result = service.validate_product({"asin": "B012345678", "title": "Produit", "price": 5, "stock": value})
+        assert result.is_valid and result.cleaned_data["stock"] == 0
+        assert [w["field"] for w in result.warnings] == ["stock"]
+        assert result.enrichments["stock_status"] == "out_of_stock"
+
+
+def test_batch_reports_only_invalid_products_by_page():
+    service = DataValidationService()
+    products = dirty_products(500, seed=1)
+    invalid = [i for i, p in enumerate(products) if not service.validate_product(p).is_valid]
+
+    first = service.validate_batch(products, page=1, page_size=40)
+    last = service.validate_batch(products, page=first["pages"], page_size=40)
+
+    assert (first["valid"], first["invalid"]) == (500 - len(invalid), len(invalid))
+    assert first["pages"] == math.ceil(len(invalid) / 40)
+    assert [p["index"] for p in first["products"]] == invalid[:40]
+    assert [p["index"] for p in last["products"]] == invalid[(first["pages"] - 1) * 40:]
+    assert all(not p["is_valid"] and p["errors"] for p in first["products"])
+    assert sum(first["summary"]["error_types"].values()) >= len(invalid)
+
+
+def test_etl_and_validation_share_price_tiers():
+    service = DataValidationService()
+    prices = [0.0, 9.99, 10.0, 24.99, 25.0, 49.99, 50.0, 99.99, 100.0, 499.99, 500.0, 1e6]
+    enriched = service.clean_batch([{"asin": "B012345678", "title": "Produit", "price": p} for p in prices])
+
+    for price, product in zip(prices, enriched):
+        assert product["price_tier"] == ETLService.classify_price(price).value
+        assert service.validate_product({"price": price}).enrichments["price_tier"] == product["price_tier"]
+    assert list(price_tiers(np.array(prices))) == [p["price_tier"] for p in enriched]
+
+
+def test_compiled_rules_skip_absent_columns_and_profile_each_rule():
+    rules = RuleSet("test", [
+        Rule("short", "name", col("name").missing() | (col("name").length() < 3), "error", "Nom court: {name}",
+             value="name"),
+        Rule("code", "code", col("present") & ~col("code").matches(r"^[A-Z]+$"), "warning", "Code invalide"),
+        Rule("price", "price", col("price") <= 0),
+    ])
+    columns = {"name": pd.Series(["ab", None, "abc"]), "present": np.array([True, False, True]),
+               "code": np.array(["AB", "x", "c1"], dtype=object)}
+
+    results = rules.evaluate(columns)
+
+    assert [(rule.code, mask.tolist()) for rule, mask in results] == \
+        [("short", [True, True, False]), ("code", [False, False, True])]
+    assert results[0][0].render(columns, 0) == "Nom court: ab"
+    profile = {entry["code"]: entry for entry in rules.describe()}
+    assert (profile["short"]["calls"], profile["short"]["rows"], profile["short"]["hits"]) == (1, 3, 2)
+    assert profile["price"]["calls"] == 0
+    assert profile["code"]["predicate"] == "(present & ~matches(code, '^[A-Z]+$'))"
+
+
+def test_etl_validation_reports_registry_rules():
+    service = ETLService()
+    service.report = _ErrorReport()
+    df = pd.DataFrame({"asin": ["B012345678", "SHORT", "B012345678", None],
+                       "title": ["Produit", "ok", "Produit", "Produit"],
+                       "price": [10.0, 5.0, -1.0, 3.0]})
+
+    valid = service._validate_data(df)
+
+    assert valid.index.tolist() == [0]
+    assert dict(service.report.counts) == \
+        {"asin_invalid": 2, "asin_duplicate": 1, "title_invalid": 1, "price_invalid": 1}
+    assert [(e.row, e.column) for e in service.report.errors if e.severity == "warning"] == [(4, "asin")]
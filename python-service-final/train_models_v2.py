@@ -14,18 +14,26 @@ from pathlib import Path
 # Ajouter le chemin du projet
 sys.path.insert(0, str(Path(__file__).parent))
 
+from app.core.columnar import load_frame
+
 # Configuration
 MODELS_DIR = Path(__file__).parent / 'data' / 'models'
 EMBEDDINGS_DIR = Path(__file__).parent / 'data' / 'embeddings'
 DATA_DIR = Path(__file__).parent / 'data' / 'uploads'
 
+# Colonnes utilisées par l'entraînement (liens, descriptions et images non lus)
+TRAINING_COLUMNS = [
+    'ASIN', 'Category', 'No of Sellers', 'Rank', 'Rating', 'Reviews Count', 'Price', 'Product_Name',
+    'asin', 'category', 'sellers', 'rank', 'rating', 'reviews', 'price', 'title'
+]
+
 # Créer les dossiers
 MODELS_DIR.mkdir(parents=True, exist_ok=True)
 EMBEDDINGS_DIR.mkdir(parents=True, exist_ok=True)
 
 
 def load_data():
-    """Charge les données depuis le CSV"""
+    """Charge les données depuis le CSV (ou sa copie colonnaire Arrow à jour)"""
     print("\n📂 Chargement des données...")
     
     csv_paths = [
@@ -37,7 +45,7 @@ def load_data():
     df = None
     for path in csv_paths:
         if path.exists():
-            df = pd.read_csv(path)
+            df = load_frame(path, columns=TRAINING_COLUMNS)
             print(f"✅ Données chargées depuis: {path}")
             print(f"   Shape: {df.shape}")
             print(f"   Colonnes: {list(df.columns)}")